@@ -1,76 +1,367 @@
-# conexion_bd.py - VERSIÓN QUE FUNCIONA CON AMBAS CONEXIONES
+# conexion_bd.py - VERSIÓN QUE FUNCIONA CON AMBAS CONEXIONES (CON POOL DE CONEXIONES)
 import pymysql
 from pymysql import Error
+from pymysql.constants import SERVER_STATUS
 import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
 
-def get_db_connection():
-    """Conexión inteligente que maneja tanto conexión interna como externa"""
+
+def _leer_entero_env(nombre: str, por_defecto: int) -> int:
+    """Lee una variable de entorno entera, usando el valor por defecto si no es válida"""
     try:
-        print(f"\n🔍 [get_db_connection] Iniciando...")
-        
-        # Obtener configuración
-        host = os.environ.get('MYSQLHOST', 'localhost')
-        port_str = os.environ.get('MYSQLPORT', '3306')
-        database = os.environ.get('MYSQLDATABASE', 'fisiosalud-2')
-        user = os.environ.get('MYSQLUSER', 'root')
-        password = os.environ.get('MYSQLPASSWORD', '')
-        
-        # Convertir puerto a int
-        try:
-            port = int(port_str)
-        except ValueError:
-            port = 3306
-        
-        print(f"   Configuración:")
-        print(f"   • Host: {host}")
-        print(f"   • Port: {port}")
-        print(f"   • Database: {database}")
-        print(f"   • User: {user}")
-        
-        # Determinar tipo de conexión
-        if 'railway.internal' in host:
-            print(f"   🏠 Conexión INTERNA (servicio a servicio)")
-            # Para conexión interna, SIEMPRE usar 3306
-            if port != 3306:
-                print(f"   ⚠️  Ajustando puerto a 3306 para conexión interna")
-                port = 3306
-        else:
-            print(f"   🌐 Conexión EXTERNA")
-        
-        print(f"   Conectando a {host}:{port}/{database}...")
-        
+        return int(os.environ.get(nombre, por_defecto))
+    except (TypeError, ValueError):
+        return por_defecto
+
+
+def _obtener_configuracion() -> Dict[str, Any]:
+    """Obtiene la configuración de MySQL desde las variables de entorno"""
+    host = os.environ.get('MYSQLHOST', 'localhost')
+    port_str = os.environ.get('MYSQLPORT', '3306')
+
+    # Convertir puerto a int
+    try:
+        port = int(port_str)
+    except ValueError:
+        port = 3306
+
+    # Para conexión interna, SIEMPRE usar 3306
+    if 'railway.internal' in host and port != 3306:
+        print(f"   ⚠️  Ajustando puerto a 3306 para conexión interna")
+        port = 3306
+
+    return {
+        'host': host,
+        'port': port,
+        'database': os.environ.get('MYSQLDATABASE', 'fisiosalud-2'),
+        'user': os.environ.get('MYSQLUSER', 'root'),
+        'password': os.environ.get('MYSQLPASSWORD', ''),
+    }
+
+
+class ConexionPool:
+    """
+    Envoltorio de una conexión pymysql prestada por el pool.
+    Delega todo en la conexión real, pero close() la devuelve al pool
+    en lugar de cerrarla, así el código existente que llama a conn.close()
+    sigue funcionando sin cambios.
+    """
+
+    def __init__(self, pool: 'PoolConexiones', conexion: pymysql.connections.Connection, creada_en: float):
+        self._pool = pool
+        self._conexion = conexion
+        self._creada_en = creada_en
+        self._devuelta = False
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        # Solo avisar: devolverla desde el recolector (en cualquier hilo y
+        # quizá a mitad de una transacción) la dejaría en el pool en un
+        # estado desconocido. La fuga se corrige cerrando donde se pidió.
+        if not self.__dict__.get('_devuelta', True):
+            print("⚠️ Conexión del pool recolectada sin cerrar: falta close_db_connection()")
+
+    def close(self):
+        """Devuelve la conexión al pool (idempotente)"""
+        if self._devuelta:
+            return
+        self._devuelta = True
+        self._pool.devolver(self._conexion, self._creada_en)
+
+    def descartar(self):
+        """
+        Cierra la conexión física en lugar de devolverla al pool, p. ej. si
+        quedó a medias un resultado sin buffer (SSCursor) que habría que leer
+        entero antes de poder reutilizarla
+        """
+        if self._devuelta:
+            return
+        self._devuelta = True
+        self._pool._descartar(self._conexion)
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones MySQL acotado y con verificación de salud.
+
+    Configuración (variables de entorno):
+    • DB_POOL_MIN: conexiones que se abren al iniciar el pool (por defecto 1)
+    • DB_POOL_MAX: máximo de conexiones abiertas a la vez (por defecto 10);
+      el ejecutor de BD (DB_EXECUTOR_WORKERS) siempre tiene más hilos
+    • DB_POOL_TIMEOUT: segundos máximos esperando una conexión libre (por defecto 10)
+    • DB_POOL_MAX_LIFETIME: segundos antes de reciclar una conexión (por defecto 1800)
+    • DB_CONNECT_TIMEOUT: timeout de conexión a MySQL en segundos (por defecto 15)
+    """
+
+    def __init__(self, config: Dict[str, Any], min_size: int = 1, max_size: int = 10,
+                 timeout_prestamo: float = 10.0, max_lifetime: float = 1800.0,
+                 connect_timeout: int = 15):
+        self.config = config
+        self.max_size = max(1, max_size)
+        self.min_size = max(0, min(min_size, self.max_size))
+        self.timeout_prestamo = timeout_prestamo
+        self.max_lifetime = max_lifetime
+        self.connect_timeout = connect_timeout
+
+        self._condicion = threading.Condition(threading.Lock())
+        self._inactivas = deque()  # (conexion, creada_en)
+        self._total = 0            # conexiones abiertas (en uso + inactivas)
+
+        # Estadísticas
+        self._creadas = 0
+        self._descartadas = 0
+        self._prestamos = 0
+        self._esperas = 0
+        self._tiempo_espera_total = 0.0
+        self._tiempo_espera_max = 0.0
+        self._timeouts = 0
+
+    def _crear_conexion(self) -> pymysql.connections.Connection:
+        """Abre una conexión física nueva a MySQL"""
         connection = pymysql.connect(
-            host=host,
-            port=port,
-            database=database,
-            user=user,
-            password=password,
+            host=self.config['host'],
+            port=self.config['port'],
+            database=self.config['database'],
+            user=self.config['user'],
+            password=self.config['password'],
             charset='utf8mb4',
             cursorclass=pymysql.cursors.DictCursor,
-            connect_timeout=15,
+            connect_timeout=self.connect_timeout,
             autocommit=True,
         )
-        
-        print(f"✅ Conexión exitosa!")
-        
-        # Verificar la base de datos actual
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT DATABASE() as db, USER() as user, @@version as version")
-            info = cursor.fetchone()
-            print(f"   • Base de datos: {info['db']}")
-            print(f"   • Usuario: {info['user']}")
-            print(f"   • MySQL: {info['version']}")
-        
+        with self._condicion:
+            self._creadas += 1
+            primera = self._creadas == 1
+        if primera:
+            # Información del servidor sin consultas adicionales
+            print(f"✅ Pool MySQL conectado a {self.config['host']}:{self.config['port']}/{self.config['database']}")
+            print(f"   • MySQL: {connection.get_server_info()}")
         return connection
-        
+
+    def _cerrar_fisica(self, conexion):
+        """Cierra definitivamente una conexión física"""
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def _esta_vencida(self, creada_en: float) -> bool:
+        return self.max_lifetime > 0 and (time.monotonic() - creada_en) > self.max_lifetime
+
+    def llenar_minimo(self):
+        """Abre conexiones hasta alcanzar el tamaño mínimo configurado"""
+        while True:
+            with self._condicion:
+                if self._total >= self.min_size:
+                    return
+                self._total += 1
+            try:
+                conexion = self._crear_conexion()
+            except Exception:
+                with self._condicion:
+                    self._total -= 1
+                    self._condicion.notify()
+                raise
+            with self._condicion:
+                self._inactivas.append((conexion, time.monotonic()))
+                self._condicion.notify()
+
+    def obtener(self) -> ConexionPool:
+        """
+        Presta una conexión del pool. Verifica su salud con ping, recicla las
+        conexiones que superan la vida máxima y espera hasta timeout_prestamo
+        si todas están en uso. Lanza TimeoutError si no se libera ninguna.
+        """
+        inicio = time.monotonic()
+        espero = False
+
+        while True:
+            candidata = None
+            crear = False
+
+            with self._condicion:
+                while not self._inactivas and self._total >= self.max_size:
+                    restante = self.timeout_prestamo - (time.monotonic() - inicio)
+                    if restante <= 0:
+                        self._timeouts += 1
+                        self._registrar_espera(inicio, espero)
+                        raise TimeoutError(
+                            f"No hay conexiones libres en el pool tras {self.timeout_prestamo}s "
+                            f"({self._total}/{self.max_size} en uso)"
+                        )
+                    espero = True
+                    self._condicion.wait(restante)
+
+                if self._inactivas:
+                    candidata = self._inactivas.pop()  # LIFO: la más reciente está "caliente"
+                else:
+                    self._total += 1
+                    crear = True
+
+            if crear:
+                try:
+                    conexion = self._crear_conexion()
+                except Exception:
+                    with self._condicion:
+                        self._total -= 1
+                        self._condicion.notify()
+                    raise
+                creada_en = time.monotonic()
+            else:
+                conexion, creada_en = candidata
+                if self._esta_vencida(creada_en) or not self._verificar_salud(conexion):
+                    self._descartar(conexion)
+                    continue
+
+            with self._condicion:
+                self._prestamos += 1
+                self._registrar_espera(inicio, espero)
+            return ConexionPool(self, conexion, creada_en)
+
+    def _registrar_espera(self, inicio: float, espero: bool):
+        """Acumula estadísticas de espera (llamar con el lock tomado)"""
+        if not espero:
+            return
+        espera = time.monotonic() - inicio
+        self._esperas += 1
+        self._tiempo_espera_total += espera
+        self._tiempo_espera_max = max(self._tiempo_espera_max, espera)
+
+    def _verificar_salud(self, conexion) -> bool:
+        """Ping ligero antes de prestar la conexión"""
+        try:
+            conexion.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _descartar(self, conexion):
+        """Cierra una conexión y libera su cupo en el pool"""
+        self._cerrar_fisica(conexion)
+        with self._condicion:
+            self._total -= 1
+            self._descartadas += 1
+            self._condicion.notify()
+
+    def devolver(self, conexion, creada_en: float):
+        """Recibe una conexión prestada, limpia su estado y la deja disponible"""
+        try:
+            if conexion.open and not self._esta_vencida(creada_en):
+                # Deshacer transacciones que hayan quedado abiertas
+                if conexion.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                    conexion.rollback()
+                if not conexion.get_autocommit():
+                    conexion.autocommit(True)
+                with self._condicion:
+                    self._inactivas.append((conexion, creada_en))
+                    self._condicion.notify()
+                return
+        except Exception as e:
+            print(f"⚠️ Conexión descartada al devolverla al pool: {e}")
+        self._descartar(conexion)
+
+    def cerrar_todo(self):
+        """Cierra todas las conexiones inactivas (las prestadas se cierran al devolverse)"""
+        with self._condicion:
+            inactivas = list(self._inactivas)
+            self._inactivas.clear()
+            self._total -= len(inactivas)
+            self._condicion.notify_all()
+        for conexion, _ in inactivas:
+            self._cerrar_fisica(conexion)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Devuelve el estado actual del pool"""
+        with self._condicion:
+            inactivas = len(self._inactivas)
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "en_uso": self._total - inactivas,
+                "inactivas": inactivas,
+                "total_abiertas": self._total,
+                "conexiones_creadas": self._creadas,
+                "conexiones_descartadas": self._descartadas,
+                "prestamos": self._prestamos,
+                "esperas": self._esperas,
+                "tiempo_espera_total_ms": round(self._tiempo_espera_total * 1000, 2),
+                "tiempo_espera_promedio_ms": round(self._tiempo_espera_total * 1000 / self._esperas, 2) if self._esperas else 0,
+                "tiempo_espera_max_ms": round(self._tiempo_espera_max * 1000, 2),
+                "timeouts": self._timeouts,
+                "timeout_prestamo_s": self.timeout_prestamo,
+                "max_lifetime_s": self.max_lifetime,
+            }
+
+
+_pool: Optional[PoolConexiones] = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool() -> PoolConexiones:
+    """Devuelve el pool global, creándolo (y precalentándolo) en el primer uso"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = PoolConexiones(
+                    _obtener_configuracion(),
+                    min_size=_leer_entero_env('DB_POOL_MIN', 1),
+                    max_size=_leer_entero_env('DB_POOL_MAX', 10),
+                    timeout_prestamo=_leer_entero_env('DB_POOL_TIMEOUT', 10),
+                    max_lifetime=_leer_entero_env('DB_POOL_MAX_LIFETIME', 1800),
+                    connect_timeout=_leer_entero_env('DB_CONNECT_TIMEOUT', 15),
+                )
+                print(f"🔄 Pool MySQL creado (min={pool.min_size}, max={pool.max_size})")
+                try:
+                    pool.llenar_minimo()
+                except Error as e:
+                    print(f"⚠️ No se pudo precalentar el pool: {e}")
+                _pool = pool
+    return _pool
+
+
+def obtener_estadisticas_pool() -> Dict[str, Any]:
+    """Estadísticas del pool (en uso, inactivas, esperas, tiempo de espera)"""
+    if _pool is None:
+        return {"inicializado": False}
+    estadisticas = _pool.estadisticas()
+    estadisticas["inicializado"] = True
+    return estadisticas
+
+
+def get_db_connection():
+    """Presta una conexión del pool (interna o externa según MYSQLHOST)"""
+    try:
+        return obtener_pool().obtener()
+
+    except TimeoutError as e:
+        print(f"❌ Pool de conexiones agotado: {e}")
+        return None
+
     except Error as e:
         print(f"❌ Error de conexión: {e}")
-        
+
+        config = _obtener_configuracion()
+        host = config['host']
+        port = config['port']
+
         # Diagnóstico detallado
         print(f"\n🔧 DIAGNÓSTICO:")
+        print(f"   Host: {host}:{port}/{config['database']} (usuario {config['user']})")
         print(f"   Error code: {e.args[0] if e.args else 'N/A'}")
         print(f"   Error message: {e.args[1] if len(e.args) > 1 else str(e)}")
-        
+
         # Sugerencias basadas en el error
         if "Connection refused" in str(e):
             if port == 21670 and 'railway.internal' in host:
@@ -79,13 +370,13 @@ def get_db_connection():
             elif port == 3306 and 'proxy.rlwy.net' in host:
                 print(f"\n💡 SUGERENCIA: interchange.proxy.rlwy.net requiere puerto 21670, no 3306")
                 print(f"   Cambia MYSQLPORT=3306 → MYSQLPORT=21670")
-        
+
         return None
 
 def close_db_connection(connection):
+    """Devuelve la conexión al pool (o la cierra si no proviene de él)"""
     if connection:
         try:
             connection.close()
-            print("✅ Conexión cerrada")
         except Error as e:
-            print(f"⚠️ Error cerrando: {e}")
\ No newline at end of file
+            print(f"⚠️ Error cerrando: {e}")
@@ -0,0 +1,151 @@
+# ejecutor_bd.py - ACCESO NO BLOQUEANTE A LA BD DESDE LOS HANDLERS ASYNC
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+
+def _leer_positivo(variable: str) -> Optional[int]:
+    try:
+        valor = int(os.environ.get(variable, ''))
+    except ValueError:
+        return None
+    return valor if valor > 0 else None
+
+
+def _tamano_ejecutor() -> int:
+    """
+    Tamaño del ejecutor: DB_EXECUTOR_WORKERS o, por defecto, el doble de
+    DB_POOL_MAX. Siempre debe ser MAYOR que el pool: una unidad de trabajo
+    retiene su conexión mientras espera hilo para sus consultas, y si todos
+    los hilos estuvieran esperando conexión nadie la devolvería (solo el
+    timeout del pool rompería el bloqueo). Un valor menor o igual se sube
+    a DB_POOL_MAX + 1.
+    """
+    pool = _leer_positivo('DB_POOL_MAX') or 10
+    workers = _leer_positivo('DB_EXECUTOR_WORKERS')
+    if workers is None:
+        return pool * 2
+    if workers <= pool:
+        print(f"⚠️ DB_EXECUTOR_WORKERS={workers} no supera DB_POOL_MAX={pool}; se usan {pool + 1} hilos")
+        return pool + 1
+    return workers
+
+
+_ejecutor: Optional[ThreadPoolExecutor] = None
+_ejecutor_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"pendientes": 0, "en_ejecucion": 0, "completadas": 0, "errores": 0}
+
+
+def obtener_ejecutor() -> ThreadPoolExecutor:
+    """Devuelve el ejecutor acotado de la BD, creándolo en el primer uso"""
+    global _ejecutor
+    if _ejecutor is None:
+        with _ejecutor_lock:
+            if _ejecutor is None:
+                workers = _tamano_ejecutor()
+                _ejecutor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bd")
+                print(f"🧵 Ejecutor de BD creado ({workers} hilos)")
+    return _ejecutor
+
+
+def _ejecutar_con_stats(func: Callable, *args, **kwargs):
+    with _stats_lock:
+        _stats["pendientes"] -= 1
+        _stats["en_ejecucion"] += 1
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        with _stats_lock:
+            _stats["errores"] += 1
+        raise
+    finally:
+        with _stats_lock:
+            _stats["en_ejecucion"] -= 1
+            _stats["completadas"] += 1
+
+
+async def ejecutar_bd(func: Callable, *args, **kwargs) -> Any:
+    """
+    Ejecuta una llamada síncrona (métodos estáticos de los modelos, pymysql)
+    en el ejecutor acotado y la espera sin bloquear el event loop de uvicorn.
+
+    Uso:
+        citas = await ejecutar_bd(CitaFisioModel.obtener_citas_por_terapeuta, terapeuta)
+    """
+    loop = asyncio.get_running_loop()
+    with _stats_lock:
+        _stats["pendientes"] += 1
+    llamada = functools.partial(_ejecutar_con_stats, func, *args, **kwargs)
+    return await loop.run_in_executor(obtener_ejecutor(), llamada)
+
+
+def _cerrar_generador(generador: Iterator):
+    try:
+        generador.close()
+    except ValueError:
+        # Sigue ejecutándose en otro hilo: se cerrará al recolectarse
+        pass
+
+
+async def iterar_en_ejecutor(generador: Iterator) -> AsyncIterator:
+    """
+    Recorre un generador síncrono que lee de la BD (p. ej. un cursor sin
+    buffer) pidiendo cada elemento en el ejecutor acotado. Pensado para
+    StreamingResponse: si el cliente corta, el generador se cierra y su
+    finally libera la conexión.
+    """
+    fin = object()
+    try:
+        while True:
+            elemento = await ejecutar_bd(next, generador, fin)
+            if elemento is fin:
+                break
+            yield elemento
+    finally:
+        # Sin await: puede que la tarea se esté cancelando
+        try:
+            obtener_ejecutor().submit(_cerrar_generador, generador)
+        except RuntimeError:
+            _cerrar_generador(generador)
+
+
+async def iniciar_en_ejecutor(generador: Iterator) -> AsyncIterator:
+    """
+    Pide ya el primer elemento del generador, así un error de conexión o de
+    consulta se lanza aquí (y se puede responder con un 500) en lugar de
+    cortar una respuesta ya empezada. Retorna el recorrido completo, que
+    sigue como iterar_en_ejecutor.
+    """
+    fin = object()
+    primero = await ejecutar_bd(next, generador, fin)
+
+    async def recorrer():
+        if primero is fin:
+            return
+        yield primero
+        async for elemento in iterar_en_ejecutor(generador):
+            yield elemento
+
+    return recorrer()
+
+
+def obtener_estadisticas_ejecutor() -> Dict[str, Any]:
+    """Estado del ejecutor de BD (tareas en cola, en ejecución, completadas)"""
+    with _stats_lock:
+        estadisticas = dict(_stats)
+    estadisticas["max_workers"] = _ejecutor._max_workers if _ejecutor else _tamano_ejecutor()
+    estadisticas["inicializado"] = _ejecutor is not None
+    return estadisticas
+
+
+def cerrar_ejecutor():
+    """Detiene el ejecutor (al apagar la aplicación)"""
+    global _ejecutor
+    with _ejecutor_lock:
+        if _ejecutor is not None:
+            _ejecutor.shutdown(wait=False)
+            _ejecutor = None
@@ -0,0 +1,35 @@
+# migraciones.py - CAMBIOS DE ESQUEMA QUE NO SE HACEN AL ARRANCAR
+#
+# Los ALTER TABLE bloquean o reconstruyen tablas grandes (cita, usuario,
+# paciente), así que no se ejecutan en el arranque de la aplicación sino
+# una vez por despliegue, antes de levantarla:
+#
+#     python -m bd.migraciones
+#
+# Cada paso comprueba antes si ya está aplicado: repetirlo no cambia nada.
+import sys
+
+from modelo.AdminUsuariosModel import AdminUsuariosModel
+from modelo.CitaModel import CitaModel
+
+MIGRACIONES = (
+    ('Restricción de reservas únicas en cita', CitaModel.asegurar_restriccion_reservas),
+    ('Índices del listado de usuarios y pacientes', AdminUsuariosModel.asegurar_indices),
+)
+
+
+def ejecutar() -> bool:
+    """Aplica todas las migraciones pendientes; True si todas terminaron bien"""
+    correctas = True
+    for nombre, migracion in MIGRACIONES:
+        print(f"🛠️ {nombre}...")
+        if migracion():
+            print(f"   ✅ {nombre}: aplicada")
+        else:
+            print(f"   ❌ {nombre}: no se pudo aplicar (ver mensajes anteriores)")
+            correctas = False
+    return correctas
+
+
+if __name__ == '__main__':
+    sys.exit(0 if ejecutar() else 1)
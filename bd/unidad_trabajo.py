@@ -0,0 +1,138 @@
+# unidad_trabajo.py - UNA CONEXIÓN / TRANSACCIÓN POR PETICIÓN
+from pymysql import Error
+from bd.conexion_bd import get_db_connection, close_db_connection
+
+
+class ConexionTransaccional:
+    """
+    Conexión que la unidad de trabajo entrega a los modelos.
+
+    • Se presta del pool de forma perezosa (en el primer uso real), así que
+      una petición que no llega a tocar la BD no ocupa una conexión, y el
+      préstamo ocurre dentro del hilo del ejecutor, no en el event loop.
+    • commit() no hace nada: se confirma una sola vez al terminar la petición.
+    • rollback() marca la unidad como fallida: al terminar se deshace todo.
+    • close() no hace nada: la conexión se devuelve al pool al terminar.
+    • al_confirmar(func) deja func pendiente hasta que la transacción se confirme.
+    """
+
+    def __init__(self, unidad: 'UnidadTrabajo'):
+        self._unidad = unidad
+
+    def __getattr__(self, nombre):
+        return getattr(self._unidad._asegurar_conexion(), nombre)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self._unidad.marcar_fallida()
+
+    def close(self):
+        pass
+
+    def al_confirmar(self, funcion):
+        self._unidad.al_confirmar(funcion)
+
+
+class UnidadTrabajo:
+    """Agrupa todas las operaciones de BD de una petición en una transacción"""
+
+    def __init__(self):
+        self._conexion = None
+        self._fallida = False
+        self._al_confirmar = []
+        self.conexion = ConexionTransaccional(self)
+
+    def _asegurar_conexion(self):
+        if self._conexion is None:
+            conexion = get_db_connection()
+            if conexion is None:
+                raise Error("No se pudo obtener conexión a la BD para la unidad de trabajo")
+            conexion.begin()
+            self._conexion = conexion
+        return self._conexion
+
+    @property
+    def fallida(self) -> bool:
+        return self._fallida
+
+    def marcar_fallida(self):
+        """Hace que la transacción se deshaga al terminar la petición"""
+        self._fallida = True
+
+    def al_confirmar(self, funcion):
+        """Ejecuta `funcion` solo si la transacción llega a confirmarse"""
+        self._al_confirmar.append(funcion)
+
+    def _ejecutar_al_confirmar(self):
+        pendientes, self._al_confirmar = self._al_confirmar, []
+        for funcion in pendientes:
+            try:
+                funcion()
+            except Exception as e:
+                print(f"⚠️ Error en tarea posterior a la confirmación: {e}")
+
+    def finalizar(self) -> bool:
+        """
+        Confirma (o deshace si falló) y devuelve la conexión al pool.
+        Retorna True si la transacción quedó confirmada (o no hubo nada que
+        confirmar). Se puede llamar antes de terminar la petición, p. ej. para
+        confirmar la cita antes de enviar correos; si después se vuelve a usar
+        la conexión se abre una transacción nueva.
+        """
+        conexion, self._conexion = self._conexion, None
+        if conexion is None:
+            self._al_confirmar = []
+            return not self._fallida
+        try:
+            if self._fallida:
+                self._al_confirmar = []
+                conexion.rollback()
+                print("↩️ Unidad de trabajo deshecha")
+                return False
+            conexion.commit()
+            self._ejecutar_al_confirmar()
+            return True
+        except Error as e:
+            self._al_confirmar = []
+            print(f"❌ Error al finalizar la unidad de trabajo: {e}")
+            try:
+                conexion.rollback()
+            except Error:
+                pass
+            return False
+        finally:
+            close_db_connection(conexion)
+
+
+def despues_de_confirmar(conn, funcion):
+    """
+    Ejecuta `funcion` cuando los cambios hechos con `conn` ya son visibles
+    para otras conexiones: al confirmar la unidad de trabajo si `conn` es
+    suya, o de inmediato si es una conexión normal (ya confirmada).
+    """
+    if isinstance(conn, ConexionTransaccional):
+        conn.al_confirmar(funcion)
+    else:
+        funcion()
+
+
+def obtener_unidad_trabajo():
+    """
+    Dependencia de FastAPI: una conexión y una transacción por petición.
+
+        async def endpoint(request: Request, uow: UnidadTrabajo = Depends(obtener_unidad_trabajo)):
+            codigo = await ejecutar_bd(CitaModel.crear_cita, datos, conn=uow.conexion)
+
+    Se confirma al terminar la petición; si el endpoint lanza una excepción o
+    algún modelo llama a rollback(), se deshace todo.
+    """
+    unidad = UnidadTrabajo()
+    try:
+        yield unidad
+    except Exception:
+        unidad.marcar_fallida()
+        raise
+    finally:
+        unidad.finalizar()
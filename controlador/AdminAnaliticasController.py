@@ -1,9 +1,122 @@
 # controlador/AdminAnaliticasController.py
+import asyncio
 import datetime
+import os
+import time
+from typing import Dict, List, Optional
 from modelo.AdminAnaliticasModel import AdminAnaliticasModel
+from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
+from modelo.CacheAnaliticasModel import CacheAnaliticasModel
+from modelo.PronosticoAnaliticasModel import PronosticoAnaliticasModel
+from modelo.MapaCalorAnaliticasModel import MapaCalorAnaliticasModel
+from modelo.SnapshotAnaliticasModel import SnapshotAnaliticasModel
+from modelo.ExportacionAnaliticasModel import ExportacionAnaliticasModel, FORMATOS as FORMATOS_EXPORTACION
 from controlador.AuthAdminController import AuthAdminController
+from bd.conexion_bd import close_db_connection
+from bd.ejecutor_bd import ejecutar_bd, iniciar_en_ejecutor
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Paneles del dashboard: nombre -> función del modelo que devuelve (datos, error)
+PANELES_DASHBOARD = {
+    'estadisticas': AdminAnaliticasModel.obtener_estadisticas_generales,
+    'graficos': AdminAnaliticasModel.obtener_datos_grafico,
+    'servicios_populares': AdminAnaliticasModel.obtener_servicios_populares,
+    'rendimiento_terapeutas': AdminAnaliticasModel.obtener_rendimiento_terapeutas,
+    'top_terapeutas': AdminAnaliticasModel.obtener_top_terapeutas,
+    'datos_financieros': AdminAnaliticasModel.obtener_datos_financieros,
+    'tendencias': AdminAnaliticasModel.obtener_tendencias,
+    'usuarios_pacientes': AdminAnaliticasModel.obtener_datos_usuario_paciente,
+    'productos_servicios_populares': AdminAnaliticasModel.obtener_productos_servicios_populares,
+}
+
+
+def _paralelismo_paneles() -> int:
+    """
+    Paneles que una misma petición calcula a la vez (ANALITICAS_PARALELISMO,
+    4 por defecto), para que un dashboard no ocupe todo el ejecutor de BD
+    """
+    try:
+        return max(1, int(os.environ.get('ANALITICAS_PARALELISMO', '4')))
+    except ValueError:
+        return 4
+
+
+def _parametros_pronostico(params, prefijo: str = '') -> tuple:
+    """(periodos, periodo) del pronóstico de tendencias; ValueError si no son válidos"""
+    periodos = int(params.get(f'{prefijo}periodos', '3'))
+    periodo = params.get(f'{prefijo}periodo', 'month')
+    PronosticoAnaliticasModel.validar_periodos(periodos, periodo)
+    return periodos, periodo
+
+
+async def calcular_paneles(paneles: List[str], argumentos: Optional[Dict[str, tuple]] = None):
+    """
+    Calcula los paneles indicados a la vez en el ejecutor de BD (cada uno con
+    su propia conexión). Retorna (datos, errores, tiempos_ms) por panel.
+    """
+    argumentos = argumentos or {}
+    limite = asyncio.Semaphore(_paralelismo_paneles())
+    
+    async def calcular(nombre: str):
+        async with limite:
+            inicio = time.perf_counter()
+            try:
+                datos, error = await ejecutar_bd(PANELES_DASHBOARD[nombre], *argumentos.get(nombre, ()))
+            except Exception as e:
+                print(f"Error en panel {nombre}: {e}")
+                datos, error = None, "Error interno del servidor"
+            return nombre, datos, error, round((time.perf_counter() - inicio) * 1000, 1)
+    
+    datos, errores, tiempos = {}, {}, {}
+    for nombre, resultado, error, ms in await asyncio.gather(*(calcular(n) for n in paneles)):
+        datos[nombre] = resultado
+        tiempos[nombre] = ms
+        if error:
+            errores[nombre] = error
+    return datos, errores, tiempos
+
+
+async def respuesta_exportacion(tipo: str, formato: str, desde: datetime.date, hasta: datetime.date):
+    """
+    StreamingResponse con la exportación de analíticas. El primer bloque se
+    pide antes de responder, así un error de conexión o de consulta llega
+    como 500 en lugar de como una descarga cortada.
+    """
+    cupo = ExportacionAnaliticasModel.reservar()
+    if cupo is None:
+        return JSONResponse(
+            status_code=429,
+            content={"success": False, "message": "Hay demasiadas exportaciones en curso, inténtalo en unos minutos"}
+        )
+    bloques = ExportacionAnaliticasModel.generar(cupo, tipo, formato, desde, hasta)
+    del cupo
+    
+    try:
+        cuerpo = await iniciar_en_ejecutor(bloques)
+    except Exception as e:
+        print(f"Error al iniciar la exportación {tipo}: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "message": "Error al generar la exportación"}
+        )
+    
+    nombre = ExportacionAnaliticasModel.nombre_archivo(tipo, formato, desde, hasta)
+    return StreamingResponse(
+        cuerpo,
+        media_type=FORMATOS_EXPORTACION[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
+
+
+def _rango_exportacion(valores) -> tuple:
+    """desde/hasta (AAAA-MM-DD) o, por defecto, el mes en curso; ValueError si no son válidos"""
+    desde = datetime.date.fromisoformat(valores['desde']) if valores.get('desde') else None
+    hasta = datetime.date.fromisoformat(valores['hasta']) if valores.get('hasta') else None
+    if desde or hasta:
+        return AdminAnaliticasModel.rango_periodo('custom', desde, hasta)
+    return AdminAnaliticasModel.rango_periodo('month')
+
 
 class AdminAnaliticasController:
     
@@ -20,7 +133,7 @@ class AdminAnaliticasController:
             )
         
         try:
-            estadisticas, error = AdminAnaliticasModel.obtener_estadisticas_generales()
+            estadisticas, error = await ejecutar_bd(AdminAnaliticasModel.obtener_estadisticas_generales)
             
             if error:
                 return JSONResponse(
@@ -57,13 +170,30 @@ class AdminAnaliticasController:
         
         try:
             # Obtener parámetros de filtro
+            # granularidad = day|week|month|quarter; terapeutas/servicios/estados: listas
             body = await request.json() if request.method == "POST" else {}
             periodo = body.get('periodo', 'month')
             fecha_desde = body.get('fecha_desde')
             fecha_hasta = body.get('fecha_hasta')
+            granularidad = body.get('granularidad') or None
+            try:
+                AdminAnaliticasModel.rango_grafico(periodo, fecha_desde, fecha_hasta)
+                if granularidad is not None:
+                    SnapshotAnaliticasModel.validar_granularidad(granularidad)
+            except ValueError as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "message": f"Parámetros no válidos: {e}"}
+                )
+            
+            def filtro(nombre: str) -> tuple:
+                valor = body.get(nombre) or []
+                return tuple(valor if isinstance(valor, list) else [valor])
             
-            datos_graficos, error = AdminAnaliticasModel.obtener_datos_grafico(
-                periodo, fecha_desde, fecha_hasta
+            datos_graficos, error = await ejecutar_bd(
+                AdminAnaliticasModel.obtener_datos_grafico,
+                periodo, fecha_desde, fecha_hasta, granularidad,
+                filtro('terapeutas'), filtro('servicios'), filtro('estados')
             )
             
             if error:
@@ -100,7 +230,7 @@ class AdminAnaliticasController:
             )
         
         try:
-            servicios, error = AdminAnaliticasModel.obtener_servicios_populares()
+            servicios, error = await ejecutar_bd(AdminAnaliticasModel.obtener_servicios_populares)
             
             if error:
                 return JSONResponse(
@@ -136,7 +266,7 @@ class AdminAnaliticasController:
             )
         
         try:
-            terapeutas, error = AdminAnaliticasModel.obtener_rendimiento_terapeutas()
+            terapeutas, error = await ejecutar_bd(AdminAnaliticasModel.obtener_rendimiento_terapeutas)
             
             if error:
                 return JSONResponse(
@@ -172,7 +302,32 @@ class AdminAnaliticasController:
             )
         
         try:
-            datos_financieros, error = AdminAnaliticasModel.obtener_datos_financieros()
+            # ?periodo=month|quarter|year|custom&desde=&hasta=
+            # &comparar=anterior|anio_anterior (o comparar_desde=&comparar_hasta=)
+            params = request.query_params
+            periodo = params.get('periodo', 'month')
+            comparar = params.get('comparar', 'anterior')
+            try:
+                fechas = {
+                    nombre: datetime.date.fromisoformat(params[nombre]) if params.get(nombre) else None
+                    for nombre in ('desde', 'hasta', 'comparar_desde', 'comparar_hasta')
+                }
+                inicio, fin = AdminAnaliticasModel.rango_periodo(periodo, fechas['desde'], fechas['hasta'])
+                if fechas['comparar_desde'] or fechas['comparar_hasta']:
+                    AdminAnaliticasModel.rango_periodo('custom', fechas['comparar_desde'], fechas['comparar_hasta'])
+                else:
+                    AdminAnaliticasModel.rango_comparacion(inicio, fin, comparar)
+            except ValueError as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "message": f"Parámetros no válidos: {e}"}
+                )
+            
+            datos_financieros, error = await ejecutar_bd(
+                AdminAnaliticasModel.obtener_datos_financieros,
+                periodo, fechas['desde'], fechas['hasta'],
+                comparar, fechas['comparar_desde'], fechas['comparar_hasta']
+            )
             
             if error:
                 return JSONResponse(
@@ -198,7 +353,8 @@ class AdminAnaliticasController:
     @staticmethod
     async def obtener_tendencias(request: Request):
         """
-        Endpoint para obtener tendencias
+        Endpoint para obtener tendencias y pronóstico
+        ?periodos=3&periodo=month|week
         """
         admin = AuthAdminController.verificar_sesion_admin(request)
         if not admin:
@@ -208,7 +364,15 @@ class AdminAnaliticasController:
             )
         
         try:
-            tendencias, error = AdminAnaliticasModel.obtener_tendencias()
+            try:
+                periodos, periodo = _parametros_pronostico(request.query_params)
+            except ValueError as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "message": f"Parámetros no válidos: {e}"}
+                )
+            
+            tendencias, error = await ejecutar_bd(AdminAnaliticasModel.obtener_tendencias, periodos, periodo)
             
             if error:
                 return JSONResponse(
@@ -234,7 +398,9 @@ class AdminAnaliticasController:
     @staticmethod
     async def generar_reporte(request: Request):
         """
-        Endpoint para generar reporte
+        Endpoint para generar reporte. Con "formato": "csv"|"jsonl" descarga
+        en streaming las filas de detalle ("detalle": citas|ingresos|terapeutas,
+        "desde"/"hasta") en lugar del reporte consolidado.
         """
         admin = AuthAdminController.verificar_sesion_admin(request)
         if not admin:
@@ -248,16 +414,31 @@ class AdminAnaliticasController:
             body = await request.json() if request.method == "POST" else {}
             tipo_reporte = body.get('tipo', 'mensual')
             
-            # Obtener todos los datos necesarios para el reporte
-            estadisticas, error1 = AdminAnaliticasModel.obtener_estadisticas_generales()
-            datos_financieros, error2 = AdminAnaliticasModel.obtener_datos_financieros()
-            servicios, error3 = AdminAnaliticasModel.obtener_servicios_populares()
-            terapeutas, error4 = AdminAnaliticasModel.obtener_rendimiento_terapeutas()
-            tendencias, error5 = AdminAnaliticasModel.obtener_tendencias()
+            if body.get('formato'):
+                detalle = body.get('detalle', 'citas')
+                try:
+                    ExportacionAnaliticasModel.validar(detalle, body['formato'])
+                    desde, hasta = _rango_exportacion(body)
+                except ValueError as e:
+                    return JSONResponse(
+                        status_code=400,
+                        content={"success": False, "message": f"Parámetros no válidos: {e}"}
+                    )
+                return await respuesta_exportacion(detalle, body['formato'], desde, hasta)
+            
+            # Obtener todos los datos necesarios para el reporte (en paralelo)
+            datos, errores, _ = await calcular_paneles([
+                'estadisticas', 'datos_financieros', 'servicios_populares',
+                'rendimiento_terapeutas', 'tendencias'
+            ])
+            estadisticas = datos['estadisticas']
+            datos_financieros = datos['datos_financieros']
+            servicios = datos['servicios_populares']
+            terapeutas = datos['rendimiento_terapeutas']
+            tendencias = datos['tendencias']
             
             # Verificar errores
-            errores = [error1, error2, error3, error4, error5]
-            errores_mensajes = [e for e in errores if e]
+            errores_mensajes = list(errores.values())
             
             if errores_mensajes:
                 return JSONResponse(
@@ -307,41 +488,53 @@ class AdminAnaliticasController:
                 content={"success": False, "message": "No autorizado"}
             )
         
-        try:
+        def consultar_totales():
             conn = AdminAnaliticasModel.get_db_connection()
             if not conn:
+                return None
+            
+            try:
+                with conn.cursor() as cursor:
+                    # Total usuarios
+                    cursor.execute("SELECT COUNT(*) as total FROM usuario")
+                    total_usuarios = cursor.fetchone()['total']
+                    
+                    # Total pacientes
+                    cursor.execute("SELECT COUNT(DISTINCT ID_usuario) as total FROM paciente")
+                    total_pacientes = cursor.fetchone()['total']
+                    
+                    return total_usuarios, total_pacientes
+            finally:
+                close_db_connection(conn)
+        
+        try:
+            totales = await ejecutar_bd(consultar_totales)
+            if totales is None:
                 return JSONResponse(
                     status_code=500,
                     content={"success": False, "message": "Error de conexión"}
                 )
             
-            with conn.cursor() as cursor:
-                # Total usuarios
-                cursor.execute("SELECT COUNT(*) as total FROM usuario")
-                total_usuarios = cursor.fetchone()['total']
-                
-                # Total pacientes
-                cursor.execute("SELECT COUNT(DISTINCT ID_usuario) as total FROM paciente")
-                total_pacientes = cursor.fetchone()['total']
-                
-                # Usuarios que no son pacientes
-                usuarios_no_pacientes = total_usuarios - total_pacientes
-                
-                datos = {
-                    'total_usuarios': total_usuarios,
-                    'total_pacientes': total_pacientes,
-                    'usuarios_no_pacientes': usuarios_no_pacientes,
-                    'labels': ['Usuarios', 'Pacientes'],
-                    'data': [total_usuarios, total_pacientes]
+            total_usuarios, total_pacientes = totales
+            
+            # Usuarios que no son pacientes
+            usuarios_no_pacientes = total_usuarios - total_pacientes
+            
+            datos = {
+                'total_usuarios': total_usuarios,
+                'total_pacientes': total_pacientes,
+                'usuarios_no_pacientes': usuarios_no_pacientes,
+                'labels': ['Usuarios', 'Pacientes'],
+                'data': [total_usuarios, total_pacientes]
+            }
+            
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "success": True,
+                    "data": datos
                 }
-                
-                return JSONResponse(
-                    status_code=200,
-                    content={
-                        "success": True,
-                        "data": datos
-                    }
-                )
+            )
                 
         except Exception as e:
             print(f"Error en obtener_datos_usuario_paciente: {e}")
@@ -363,15 +556,13 @@ class AdminAnaliticasController:
             )
         
         try:
-            # Esta función usaría datos reales de la BD
-            # Por ahora devolvemos datos de ejemplo
-            datos = [
-                {"nombre": "Masaje Terapéutico", "tipo": "servicio", "ventas": 45, "ingresos": 2250},
-                {"nombre": "Rehabilitación Post-operatoria", "tipo": "servicio", "ventas": 32, "ingresos": 2560},
-                {"nombre": "Terapia Deportiva", "tipo": "servicio", "ventas": 28, "ingresos": 1960},
-                {"nombre": "Proteína Whey", "tipo": "producto", "ventas": 25, "ingresos": 1250},
-                {"nombre": "Banda Elástica", "tipo": "producto", "ventas": 18, "ingresos": 540}
-            ]
+            datos, error = await ejecutar_bd(AdminAnaliticasModel.obtener_productos_servicios_populares)
+            
+            if error:
+                return JSONResponse(
+                    status_code=500,
+                    content={"success": False, "message": error}
+                )
             
             return JSONResponse(
                 status_code=200,
@@ -402,53 +593,266 @@ class AdminAnaliticasController:
         
         try:
             # Obtener terapeutas top por citas
-            conn = AdminAnaliticasModel.get_db_connection()
-            if not conn:
+            resultado, error = await ejecutar_bd(AdminAnaliticasModel.obtener_top_terapeutas)
+            if error:
                 return JSONResponse(
                     status_code=500,
-                    content={"success": False, "message": "Error de conexión"}
+                    content={"success": False, "message": error}
                 )
             
-            with conn.cursor() as cursor:
-                mes_actual = datetime.date.today().replace(day=1)
-                primer_dia_mes_actual = mes_actual
-                ultimo_dia_mes_actual = (mes_actual.replace(month=mes_actual.month % 12 + 1, day=1) - datetime.timedelta(days=1))
-                
-                query = """
-                SELECT 
-                    t.nombre_completo as nombre,
-                    t.especialidad,
-                    COUNT(c.cita_id) as citas_atendidas
-                FROM terapeuta t
-                LEFT JOIN cita c ON t.nombre_completo = c.terapeuta_designado 
-                    AND c.fecha_cita BETWEEN %s AND %s
-                WHERE t.estado = 'Activo'
-                GROUP BY t.nombre_completo, t.especialidad
-                HAVING citas_atendidas > 0
-                ORDER BY citas_atendidas DESC
-                LIMIT 5
-                """
-                cursor.execute(query, (primer_dia_mes_actual, ultimo_dia_mes_actual))
-                terapeutas = cursor.fetchall()
-                
-                resultado = []
-                for terapeuta in terapeutas:
-                    resultado.append({
-                        'nombre': terapeuta['nombre'],
-                        'especialidad': terapeuta['especialidad'],
-                        'citas_atendidas': terapeuta['citas_atendidas']
-                    })
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "success": True,
+                    "data": resultado
+                }
+            )
                 
+        except Exception as e:
+            print(f"Error en obtener_top_terapeutas: {e}")
+            return JSONResponse(
+                status_code=500,
+                content={"success": False, "message": "Error interno del servidor"}
+            )
+    
+    @staticmethod
+    async def obtener_dashboard(request: Request):
+        """
+        Endpoint con todos los paneles de analíticas en una sola respuesta.
+        ?paneles=estadisticas,graficos,... (por defecto todos)
+        ?periodo=&fecha_desde=&fecha_hasta= para graficos
+        ?periodo_financiero=&desde=&hasta=&comparar= para datos_financieros
+        ?pronostico_periodos=&pronostico_periodo= para tendencias
+        """
+        admin = AuthAdminController.verificar_sesion_admin(request)
+        if not admin:
+            return JSONResponse(
+                status_code=401,
+                content={"success": False, "message": "No autorizado"}
+            )
+        
+        try:
+            params = request.query_params
+            solicitados = [p.strip() for p in params.get('paneles', '').split(',') if p.strip()]
+            paneles = list(dict.fromkeys(solicitados)) or list(PANELES_DASHBOARD)
+            desconocidos = [p for p in paneles if p not in PANELES_DASHBOARD]
+            if desconocidos:
                 return JSONResponse(
-                    status_code=200,
+                    status_code=400,
                     content={
-                        "success": True,
-                        "data": resultado
+                        "success": False,
+                        "message": f"Paneles no válidos: {', '.join(desconocidos)}",
+                        "paneles_disponibles": list(PANELES_DASHBOARD)
                     }
                 )
-                
+            
+            argumentos = {
+                'graficos': (
+                    params.get('periodo', 'month'),
+                    params.get('fecha_desde'),
+                    params.get('fecha_hasta')
+                ),
+            }
+            if 'graficos' in paneles:
+                try:
+                    AdminAnaliticasModel.rango_grafico(*argumentos['graficos'])
+                except ValueError as e:
+                    return JSONResponse(
+                        status_code=400,
+                        content={"success": False, "message": f"Parámetros no válidos: {e}"}
+                    )
+            if 'tendencias' in paneles:
+                try:
+                    argumentos['tendencias'] = _parametros_pronostico(params, prefijo='pronostico_')
+                except ValueError as e:
+                    return JSONResponse(
+                        status_code=400,
+                        content={"success": False, "message": f"Parámetros no válidos: {e}"}
+                    )
+            if 'datos_financieros' in paneles:
+                try:
+                    periodo_financiero = params.get('periodo_financiero', 'month')
+                    desde = datetime.date.fromisoformat(params['desde']) if params.get('desde') else None
+                    hasta = datetime.date.fromisoformat(params['hasta']) if params.get('hasta') else None
+                    comparar = params.get('comparar', 'anterior')
+                    inicio, fin = AdminAnaliticasModel.rango_periodo(periodo_financiero, desde, hasta)
+                    AdminAnaliticasModel.rango_comparacion(inicio, fin, comparar)
+                except ValueError as e:
+                    return JSONResponse(
+                        status_code=400,
+                        content={"success": False, "message": f"Parámetros no válidos: {e}"}
+                    )
+                argumentos['datos_financieros'] = (periodo_financiero, desde, hasta, comparar)
+            
+            inicio = time.perf_counter()
+            datos, errores, tiempos = await calcular_paneles(paneles, argumentos)
+            
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "success": not errores,
+                    "data": datos,
+                    "errores": errores,
+                    "tiempos_ms": {
+                        "paneles": tiempos,
+                        "total": round((time.perf_counter() - inicio) * 1000, 1)
+                    }
+                }
+            )
+            
         except Exception as e:
-            print(f"Error en obtener_top_terapeutas: {e}")
+            print(f"Error en obtener_dashboard: {e}")
+            return JSONResponse(
+                status_code=500,
+                content={"success": False, "message": "Error interno del servidor"}
+            )
+    
+    @staticmethod
+    async def obtener_mapa_calor(request: Request):
+        """
+        Endpoint con la ocupación día × hora (7×24) ponderada por la duración
+        de cada servicio.
+        ?desde=&hasta= (AAAA-MM-DD, por defecto los últimos 3 meses)
+        ?terapeuta=a,b&servicio=x,y para filtrar, ?agrupar=terapeuta|servicio
+        """
+        admin = AuthAdminController.verificar_sesion_admin(request)
+        if not admin:
+            return JSONResponse(
+                status_code=401,
+                content={"success": False, "message": "No autorizado"}
+            )
+        
+        try:
+            params = request.query_params
+            desde, hasta = MapaCalorAnaliticasModel.rango_por_defecto()
+            try:
+                if params.get('desde'):
+                    desde = datetime.date.fromisoformat(params['desde'])
+                if params.get('hasta'):
+                    hasta = datetime.date.fromisoformat(params['hasta'])
+                agrupar = params.get('agrupar') or None
+                MapaCalorAnaliticasModel.validar(desde, hasta, agrupar)
+            except ValueError as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "message": f"Parámetros no válidos: {e}"}
+                )
+            
+            def lista(nombre: str) -> List[str]:
+                return [v.strip() for v in params.get(nombre, '').split(',') if v.strip()]
+            
+            mapa, error = await ejecutar_bd(
+                MapaCalorAnaliticasModel.obtener_mapa_calor,
+                desde, hasta, lista('terapeuta'), lista('servicio'), agrupar
+            )
+            
+            if error:
+                return JSONResponse(
+                    status_code=500,
+                    content={"success": False, "message": error}
+                )
+            
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "success": True,
+                    "data": mapa
+                }
+            )
+            
+        except Exception as e:
+            print(f"Error en obtener_mapa_calor: {e}")
+            return JSONResponse(
+                status_code=500,
+                content={"success": False, "message": "Error interno del servidor"}
+            )
+    
+    @staticmethod
+    async def exportar(request: Request):
+        """
+        Endpoint de descarga en streaming de filas de detalle
+        ?tipo=citas|ingresos|terapeutas&formato=csv|jsonl&desde=&hasta=
+        """
+        admin = AuthAdminController.verificar_sesion_admin(request)
+        if not admin:
+            return JSONResponse(
+                status_code=401,
+                content={"success": False, "message": "No autorizado"}
+            )
+        
+        params = request.query_params
+        tipo = params.get('tipo', 'citas')
+        formato = params.get('formato', 'csv')
+        try:
+            ExportacionAnaliticasModel.validar(tipo, formato)
+            desde, hasta = _rango_exportacion(params)
+        except ValueError as e:
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "message": f"Parámetros no válidos: {e}"}
+            )
+        
+        return await respuesta_exportacion(tipo, formato, desde, hasta)
+    
+    @staticmethod
+    async def obtener_estadisticas_cache(request: Request):
+        """
+        Endpoint con los contadores de la caché de analíticas
+        (aciertos, fallos, obsoletos servidos, esperas, refrescos, invalidaciones)
+        """
+        admin = AuthAdminController.verificar_sesion_admin(request)
+        if not admin:
+            return JSONResponse(
+                status_code=401,
+                content={"success": False, "message": "No autorizado"}
+            )
+        
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": dict(CacheAnaliticasModel.estadisticas(), snapshot=SnapshotAnaliticasModel.estado())
+            }
+        )
+    
+    @staticmethod
+    async def reconstruir_resumenes(request: Request):
+        """
+        Endpoint para recalcular las tablas resumen de analíticas desde las
+        tablas origen (todo el histórico, o el rango desde/hasta AAAA-MM-DD)
+        """
+        admin = AuthAdminController.verificar_sesion_admin(request)
+        if not admin:
+            return JSONResponse(
+                status_code=401,
+                content={"success": False, "message": "No autorizado"}
+            )
+        
+        try:
+            desde = request.query_params.get('desde')
+            hasta = request.query_params.get('hasta')
+            try:
+                desde = datetime.date.fromisoformat(desde) if desde else None
+                hasta = datetime.date.fromisoformat(hasta) if hasta else None
+            except ValueError:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "message": "Fechas inválidas (formato AAAA-MM-DD)"}
+                )
+            
+            meses = await ejecutar_bd(ResumenAnaliticasModel.reconstruir, desde, hasta)
+            
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "success": True,
+                    "message": "Tablas resumen reconstruidas",
+                    "data": {"meses_recalculados": meses}
+                }
+            )
+            
+        except Exception as e:
+            print(f"Error en reconstruir_resumenes: {e}")
             return JSONResponse(
                 status_code=500,
                 content={"success": False, "message": "Error interno del servidor"}
@@ -468,7 +872,7 @@ async def obtener_top_terapeutas(request: Request):
         )
     
     try:
-        terapeutas, error = AdminAnaliticasModel.obtener_rendimiento_terapeutas()
+        terapeutas, error = await ejecutar_bd(AdminAnaliticasModel.obtener_rendimiento_terapeutas)
         
         if error:
             return JSONResponse(
@@ -516,7 +920,7 @@ async def obtener_rendimiento_terapeutas(request: Request):
         )
     
     try:
-        terapeutas, error = AdminAnaliticasModel.obtener_rendimiento_terapeutas()
+        terapeutas, error = await ejecutar_bd(AdminAnaliticasModel.obtener_rendimiento_terapeutas)
         
         if error:
             return JSONResponse(
@@ -1,13 +1,20 @@
 from fastapi import Request, UploadFile, File
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional, Dict, List, Any
 import traceback
-import csv
-import io
-from datetime import datetime
+from datetime import date, datetime
 import hashlib 
 from decimal import Decimal
 from controlador.AuthAdminController import AuthAdminController
+from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
+from modelo.AdminUsuariosModel import (
+    AdminUsuariosModel, LIMITE_POR_DEFECTO, ACCIONES_USUARIOS, ACCIONES_PACIENTES
+)
+from modelo.CitaModel import MENSAJE_HORARIO_OCUPADO
+from modelo.ExportacionAnaliticasModel import ExportacionAnaliticasModel
+from modelo.BusquedaModel import BusquedaModel
+from modelo.UsuarioModel import UsuarioModel
+from bd.ejecutor_bd import ejecutar_bd, iniciar_en_ejecutor
 
 class AdminUsuariosController:
     
@@ -129,7 +136,11 @@ class AdminUsuariosController:
     @staticmethod
     async def listar_usuarios(request: Request):
         """
-        Lista usuarios de la tabla usuario con filtros
+        Lista usuarios de la tabla usuario con filtros, paginados por cursor.
+        
+        Query: nombre, correo, estado, es_paciente (si/no), orden (id, nombre,
+        apellido, correo, estado), direccion (asc/desc), limite (1-200) y
+        cursor (el `siguiente_cursor` de la página anterior).
         """
         try:
             # Verificar sesión de administrador
@@ -141,96 +152,44 @@ class AdminUsuariosController:
                 )
             
             # Obtener parámetros de query
-            nombre = request.query_params.get('nombre', '')
-            estado = request.query_params.get('estado', '')
-            correo = request.query_params.get('correo', '')
+            params = request.query_params
+            filtros = {
+                'nombre': params.get('nombre', ''),
+                'estado': params.get('estado', ''),
+                'correo': params.get('correo', ''),
+                'es_paciente': params.get('es_paciente', ''),
+            }
+            orden = params.get('orden', 'id')
+            direccion = params.get('direccion', 'desc').lower()
             
-            from bd.conexion_bd import get_db_connection
-            
-            conn = get_db_connection()
-            if not conn:
+            try:
+                limite = int(params.get('limite', str(LIMITE_POR_DEFECTO)))
+                pagina, error = await ejecutar_bd(
+                    AdminUsuariosModel.listar_usuarios, filtros, orden, direccion,
+                    limite, params.get('cursor') or None
+                )
+            except ValueError as e:
                 return JSONResponse(
-                    status_code=500,
-                    content={"success": False, "error": "Error de conexión a BD"}
+                    status_code=400,
+                    content={"success": False, "error": f"Parámetros no válidos: {e}"}
                 )
             
-            try:
-                with conn.cursor() as cursor:
-                    # Construir query dinámica
-                    sql = """
-                    SELECT 
-                        ID,
-                        nombre,
-                        apellido,
-                        CONCAT(nombre, ' ', apellido) as nombre_completo,
-                        genero,
-                        correo,
-                        telefono,
-                        estado,
-                        historial_medico
-                    FROM usuario
-                    WHERE 1=1
-                    """
-                    
-                    params = []
-                    
-                    if nombre:
-                        sql += " AND (nombre LIKE %s OR apellido LIKE %s OR CONCAT(nombre, ' ', apellido) LIKE %s)"
-                        params.extend([f"%{nombre}%", f"%{nombre}%", f"%{nombre}%"])
-                    
-                    if estado and estado != "Todos los estados":
-                        sql += " AND estado = %s"
-                        params.append(estado)
-                    
-                    if correo:
-                        sql += " AND correo LIKE %s"
-                        params.append(f"%{correo}%")
-                    
-                    sql += " ORDER BY ID DESC"
-                    
-                    cursor.execute(sql, params)
-                    usuarios = cursor.fetchall()
-                    
-                    # Para cada usuario, verificar si es paciente
-                    usuarios_con_info = []
-                    for usuario in usuarios:
-                        usuario_dict = dict(usuario)
-                        
-                        # Verificar si tiene registro en paciente
-                        sql_paciente = """
-                        SELECT COUNT(*) as es_paciente 
-                        FROM paciente 
-                        WHERE ID_usuario = %s
-                        """
-                        cursor.execute(sql_paciente, (usuario['ID'],))
-                        resultado = cursor.fetchone()
-                        
-                        usuario_dict['es_paciente'] = resultado['es_paciente'] > 0 if resultado else False
-                        
-                        # Asegurar que todos los valores sean serializables
-                        for key, value in usuario_dict.items():
-                            if isinstance(value, Decimal):
-                                usuario_dict[key] = float(value)
-                            elif hasattr(value, 'strftime'):  # Para fechas
-                                usuario_dict[key] = value.strftime('%Y-%m-%d')
-                        
-                        usuarios_con_info.append(usuario_dict)
-                    
-                    return JSONResponse(content={
-                        "success": True,
-                        "data": usuarios_con_info,
-                        "total": len(usuarios_con_info)
-                    })
-                    
-            except Exception as e:
-                print(f"❌ Error en listar_usuarios: {e}")
+            if error:
                 return JSONResponse(
                     status_code=500,
-                    content={"success": False, "error": str(e)}
+                    content={"success": False, "error": error}
                 )
-            finally:
-                if conn:
-                    conn.close()
+            
+            return JSONResponse(content={
+                "success": True,
+                "data": pagina['usuarios'],
+                "total": len(pagina['usuarios']),
+                "siguiente_cursor": pagina['siguiente_cursor'],
+                "hay_mas": pagina['hay_mas'],
+                "orden": orden,
+                "direccion": direccion,
+                "limite": limite
+            })
                     
         except Exception as e:
             print(f"❌ Error en listar_usuarios: {e}")
@@ -257,7 +216,8 @@ class AdminUsuariosController:
             # Obtener datos del body
             body = await request.json()
             
-            # Validar campos requeridos
+            # Validar campos requeridos (el correo, ya normalizado)
+            body['correo'] = UsuarioModel.normalizar_correo(body.get('correo'))
             required_fields = ['nombre', 'apellido', 'correo', 'telefono']
             for field in required_fields:
                 if field not in body or not body[field]:
@@ -343,6 +303,12 @@ class AdminUsuariosController:
                         # ===== FIN DE MODIFICACIÓN =====
                     
                     conn.commit()
+                    BusquedaModel.marcar('usuarios', [user_id])
+                    if body.get('registrar_como_paciente', False):
+                        ResumenAnaliticasModel.marcar_citas([datetime.now().date()])
+                        ResumenAnaliticasModel.marcar_planes([datetime.now().date()])
+                        BusquedaModel.marcar('citas', [codigo_cita])
+                        BusquedaModel.marcar('pacientes', [codigo_cita])
                     
                     return JSONResponse(content={
                         "success": True,
@@ -572,7 +538,7 @@ class AdminUsuariosController:
                         )
                     
                     # ===== 1. GENERAR CÓDIGO DE CITA CONSECUTIVO =====
-                    codigo_cita = AdminUsuariosController.generar_codigo_cita_para_admin()
+                    codigo_cita = AdminUsuariosController.generar_codigo_cita_para_admin(conn=conn)
                     
                     if not codigo_cita:
                         print("❌ No se pudo generar código de cita")
@@ -652,6 +618,10 @@ class AdminUsuariosController:
                     print("✅ Paciente creado exitosamente")
                     
                     conn.commit()
+                    ResumenAnaliticasModel.marcar_citas([fecha_cita])
+                    ResumenAnaliticasModel.marcar_planes([datetime.now().date()])
+                    BusquedaModel.marcar('citas', [codigo_cita])
+                    BusquedaModel.marcar('pacientes', [codigo_cita])
                     print("✅ Transacción confirmada")
                     
                     return JSONResponse(content={
@@ -794,7 +764,11 @@ class AdminUsuariosController:
     @staticmethod
     async def exportar_csv(request: Request):
         """
-        Exporta datos a CSV
+        Exporta usuarios o pacientes a CSV en streaming.
+        
+        Query: tipo (usuarios/pacientes), columnas (separadas por comas),
+        desde/hasta (AAAA-MM-DD, solo pacientes) y gzip=1 para descargar
+        el archivo comprimido.
         """
         try:
             # Verificar sesión
@@ -805,103 +779,47 @@ class AdminUsuariosController:
                     content={"success": False, "error": "Acceso no autorizado"}
                 )
             
-            tipo = request.query_params.get('tipo', 'usuarios')
-            
-            from bd.conexion_bd import get_db_connection
+            params = request.query_params
+            tipo = params.get('tipo', 'usuarios')
+            comprimido = params.get('gzip', '').lower() in ('1', 'true', 'si')
+            try:
+                columnas = [c.strip() for c in params.get('columnas', '').split(',') if c.strip()]
+                desde = date.fromisoformat(params['desde']) if params.get('desde') else None
+                hasta = date.fromisoformat(params['hasta']) if params.get('hasta') else None
+                columnas = AdminUsuariosModel.validar_exportacion(tipo, columnas, desde, hasta)
+            except ValueError as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": f"Parámetros no válidos: {e}"}
+                )
             
-            conn = get_db_connection()
-            if not conn:
+            cupo = ExportacionAnaliticasModel.reservar()
+            if cupo is None:
                 return JSONResponse(
-                    status_code=500,
-                    content={"success": False, "error": "Error de conexión a BD"}
+                    status_code=429,
+                    content={"success": False, "error": "Hay demasiadas exportaciones en curso, inténtalo en unos minutos"}
                 )
+            bloques = AdminUsuariosModel.generar_exportacion(cupo, tipo, columnas, desde, hasta)
+            del cupo
+            if comprimido:
+                bloques = ExportacionAnaliticasModel.comprimir(bloques)
             
             try:
-                with conn.cursor() as cursor:
-                    if tipo == 'usuarios':
-                        sql = """
-                        SELECT 
-                            ID, nombre, apellido, genero, correo, telefono,
-                            estado
-                        FROM usuario
-                        ORDER BY ID DESC
-                        """
-                        cursor.execute(sql)
-                        data = cursor.fetchall()
-                        filename = f"usuarios_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                        
-                    elif tipo == 'pacientes':
-                        sql = """
-                        SELECT 
-                            p.codigo_cita,
-                            u.ID as usuario_id,
-                            u.nombre,
-                            u.apellido,
-                            u.correo,
-                            u.telefono,
-                            u.genero,
-                            p.terapeuta_asignado,
-                            p.estado_cita,
-                            p.tipo_plan,
-                            p.precio_plan,
-                            p.fecha_creacion_reporte
-                        FROM paciente p
-                        INNER JOIN usuario u ON p.ID_usuario = u.ID
-                        ORDER BY p.fecha_creacion_reporte DESC
-                        """
-                        cursor.execute(sql)
-                        data = cursor.fetchall()
-                        filename = f"pacientes_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                    
-                    else:
-                        return JSONResponse(
-                            status_code=400,
-                            content={"success": False, "error": "Tipo de exportación no válido"}
-                        )
-                    
-                    # Procesar datos: convertir tipos no serializables
-                    processed_data = []
-                    for row in data:
-                        row_dict = dict(row)
-                        # Convertir todos los tipos no serializables
-                        for key, value in row_dict.items():
-                            if isinstance(value, Decimal):
-                                row_dict[key] = float(value)
-                            elif hasattr(value, 'strftime'):  # Para fechas
-                                row_dict[key] = value.strftime('%Y-%m-%d')
-                            elif isinstance(value, (bytes, bytearray)):
-                                row_dict[key] = value.decode('utf-8', errors='ignore')
-                        processed_data.append(row_dict)
-                    
-                    # Crear CSV en memoria
-                    output = io.StringIO()
-                    if processed_data:
-                        writer = csv.DictWriter(output, fieldnames=processed_data[0].keys())
-                        writer.writeheader()
-                        for row in processed_data:
-                            writer.writerow(row)
-                    
-                    csv_content = output.getvalue()
-                    
-                    # Devolver como respuesta descargable
-                    return Response(
-                        content=csv_content,
-                        media_type="text/csv",
-                        headers={
-                            "Content-Disposition": f"attachment; filename={filename}",
-                            "Content-Type": "text/csv; charset=utf-8"
-                        }
-                    )
-                    
+                # El primer bloque (la cabecera) sale ya; los errores de BD llegan como 500
+                cuerpo = await iniciar_en_ejecutor(bloques)
             except Exception as e:
                 print(f"❌ Error en exportar_csv: {e}")
                 return JSONResponse(
                     status_code=500,
-                    content={"success": False, "error": str(e)}
+                    content={"success": False, "error": "Error al generar la exportación"}
                 )
-            finally:
-                if conn:
-                    conn.close()
+            
+            filename = AdminUsuariosModel.nombre_exportacion(tipo, comprimido)
+            return StreamingResponse(
+                cuerpo,
+                media_type="application/gzip" if comprimido else "text/csv; charset=utf-8",
+                headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+            )
                     
         except Exception as e:
             print(f"❌ Error en exportar_csv: {e}")
@@ -941,91 +859,30 @@ class AdminUsuariosController:
                     "error": "Acceso no autorizado"
                 })
             
-            from bd.conexion_bd import get_db_connection
-            conn = get_db_connection()
-            
-            try:
-                with conn.cursor() as cursor:
-                    # 1. Verificar si el usuario existe y si es paciente
-                    sql_check = """
-                    SELECT u.ID, u.nombre, u.apellido, 
-                        (SELECT COUNT(*) FROM paciente p WHERE p.ID_usuario = u.ID) as es_paciente
-                    FROM usuario u
-                    WHERE u.ID = %s
-                    """
-                    cursor.execute(sql_check, (usuario_id,))
-                    usuario = cursor.fetchone()
-                    
-                    if not usuario:
-                        return JSONResponse(status_code=404, content={
-                            "success": False, 
-                            "error": "Usuario no encontrado"
-                        })
-                    
-                    print(f"🗑️ Eliminando usuario: {usuario['nombre']} {usuario['apellido']}")
-                    print(f"ℹ️ Es paciente: {usuario['es_paciente'] > 0}")
-                    
-                    # 2. Si es paciente, obtener sus códigos de cita
-                    codigos_cita = []
-                    if usuario['es_paciente'] > 0:
-                        sql_codigos = "SELECT codigo_cita FROM paciente WHERE ID_usuario = %s"
-                        cursor.execute(sql_codigos, (usuario_id,))
-                        resultados = cursor.fetchall()
-                        codigos_cita = [r['codigo_cita'] for r in resultados]
-                        print(f"📋 Códigos de cita a eliminar: {codigos_cita}")
-                    
-                    # 3. Eliminar acudientes relacionados (si existen)
-                    if codigos_cita:
-                        for codigo in codigos_cita:
-                            try:
-                                sql_delete_acudiente = "DELETE FROM acudiente WHERE cita_id = %s"
-                                cursor.execute(sql_delete_acudiente, (codigo,))
-                                print(f"✅ Acudiente eliminado para cita {codigo}")
-                            except Exception as e:
-                                print(f"ℹ️ No se pudo eliminar acudiente para cita {codigo}: {e}")
-                    
-                    # 4. Eliminar registros en paciente
-                    sql_delete_paciente = "DELETE FROM paciente WHERE ID_usuario = %s"
-                    cursor.execute(sql_delete_paciente, (usuario_id,))
-                    print("✅ Registros de paciente eliminados")
-                    
-                    # 5. Eliminar citas asociadas (si existen)
-                    if codigos_cita:
-                        for codigo in codigos_cita:
-                            sql_delete_cita = "DELETE FROM cita WHERE cita_id = %s"
-                            cursor.execute(sql_delete_cita, (codigo,))
-                            print(f"✅ Cita {codigo} eliminada")
-                    
-                    # 6. Eliminar usuario
-                    sql_delete_usuario = "DELETE FROM usuario WHERE ID = %s"
-                    cursor.execute(sql_delete_usuario, (usuario_id,))
-                    print("✅ Usuario eliminado")
-                    
-                    conn.commit()
-                    
-                    return JSONResponse(content={
-                        "success": True,
-                        "message": "Usuario y todos sus registros relacionados eliminados exitosamente",
-                        "data": {
-                            "usuario_id": usuario_id,
-                            "nombre_completo": f"{usuario['nombre']} {usuario['apellido']}",
-                            "es_paciente": usuario['es_paciente'] > 0,
-                            "citas_eliminadas": len(codigos_cita)
-                        }
-                    })
-                    
-            except Exception as e:
-                conn.rollback()
-                print(f"❌ Error al eliminar usuario: {e}")
-                import traceback
-                traceback.print_exc()
+            informe, error = await ejecutar_bd(AdminUsuariosModel.eliminar_usuarios, [usuario_id])
+            if error:
                 return JSONResponse(status_code=500, content={
                     "success": False, 
-                    "error": str(e)
+                    "error": error
                 })
-            finally:
-                if conn:
-                    conn.close()
+            
+            resultado = informe['resultados'][0]
+            if not resultado['ok']:
+                return JSONResponse(status_code=404, content={
+                    "success": False, 
+                    "error": resultado['error']
+                })
+            
+            return JSONResponse(content={
+                "success": True,
+                "message": "Usuario y todos sus registros relacionados eliminados exitosamente",
+                "data": {
+                    "usuario_id": usuario_id,
+                    "nombre_completo": resultado['nombre_completo'],
+                    "es_paciente": resultado['es_paciente'],
+                    "citas_eliminadas": resultado['citas_eliminadas']
+                }
+            })
                     
         except Exception as e:
             print(f"❌ Error en eliminar_usuario: {e}")
@@ -1048,152 +905,38 @@ class AdminUsuariosController:
                     "error": "Acceso no autorizado"
                 })
             
-            # Obtener datos del body
             body = await request.json()
             
-            from bd.conexion_bd import get_db_connection
-            from datetime import datetime
-            import random
-            
-            conn = get_db_connection()
-            if not conn:
-                return JSONResponse(status_code=500, content={
+            informe, error = await ejecutar_bd(AdminUsuariosModel.convertir_a_pacientes, [usuario_id], body)
+            if error:
+                return JSONResponse(status_code=409 if error == MENSAJE_HORARIO_OCUPADO else 500, content={
                     "success": False, 
-                    "error": "Error de conexión a BD"
+                    "error": error
                 })
             
-            try:
-                with conn.cursor() as cursor:   
-                    # 1. Verificar si ya es paciente
-                    sql_check = "SELECT codigo_cita FROM paciente WHERE ID_usuario = %s"
-                    cursor.execute(sql_check, (usuario_id,))
-                    if cursor.fetchone():
-                        return JSONResponse(status_code=400, content={
-                            "success": False, 
-                            "error": "Este usuario ya es paciente"
-                        })
-                    
-                    # 2. Obtener datos COMPLETOS del usuario
-                    sql_usuario = """
-                    SELECT ID, nombre, apellido, correo, telefono, genero, estado, historial_medico
-                    FROM usuario WHERE ID = %s
-                    """
-                    cursor.execute(sql_usuario, (usuario_id,))
-                    usuario = cursor.fetchone()
-                    
-                    if not usuario:
-                        return JSONResponse(status_code=404, content={
-                            "success": False, 
-                            "error": "Usuario no encontrado"
-                        })
-                    
-                    # 3. Generar código de cita consecutivo para admin
-                    codigo_cita = AdminUsuariosController.generar_codigo_cita_para_admin()
-                    if not codigo_cita:
-                        return JSONResponse(status_code=500, content={
-                            "success": False, 
-                            "error": "No hay códigos de cita disponibles en el rango admin"
-                        })
-                    
-                    # 4. Obtener valores del formulario o usar valores por defecto
-                    # Si vienen del body, usar esos; si no, usar valores por defecto
-                    nombre_completo = f"{usuario['nombre']} {usuario['apellido']}"
-                    telefono = usuario['telefono'] or body.get('telefono', '000-000-0000')
-                    correo = usuario['correo']
-                    servicio = body.get('servicio', 'Consulta General')
-                    terapeuta = body.get('terapeuta_designado', body.get('terapeuta_asignado', 'Por asignar'))
-                    fecha_cita = body.get('fecha_cita', datetime.now().strftime('%Y-%m-%d'))
-                    hora_cita = body.get('hora_cita', '09:00:00')
-                    notas = body.get('notas_adicionales', 'Usuario convertido automáticamente por administrador')
-                    tipo_pago = body.get('tipo_pago', 'Por definir')
-                    estado_cita = body.get('estado_cita', 'pendiente')
-                    tipo_plan = body.get('tipo_plan', 'Básico')
-                    precio_plan = float(body.get('precio_plan', 0.0))
-                    historial_medico = body.get('historial_medico', usuario.get('historial_medico', ''))
-                    
-                    # 5. CREAR CITA COMPLETA (con todos los campos obligatorios)
-                    print(f"📝 Creando cita completa: {codigo_cita}")
-                    
-                    sql_cita = """
-                    INSERT INTO cita (
-                        cita_id, nombre_paciente, servicio, terapeuta_designado,
-                        telefono, correo, fecha_cita, hora_cita, notas_adicionales,
-                        tipo_pago, estado
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """
-                    
-                    cursor.execute(sql_cita, (
-                        codigo_cita,
-                        nombre_completo,
-                        servicio,
-                        terapeuta,
-                        telefono,
-                        correo,
-                        fecha_cita,
-                        hora_cita,
-                        notas,
-                        tipo_pago,
-                        estado_cita
-                    ))
-                    print("✅ Cita creada exitosamente con todos los campos")
-                    
-                    # 6. CREAR PACIENTE COMPLETO
-                    print(f"📝 Creando paciente: {usuario_id}")
-                    
-                    sql_paciente = """
-                    INSERT INTO paciente (
-                        codigo_cita, ID_usuario, nombre_completo, ID_acudiente,
-                        historial_medico, terapeuta_asignado, ejercicios_registrados,
-                        estado_cita, tipo_plan, precio_plan, fecha_creacion_reporte
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURDATE())
-                    """
-                    
-                    cursor.execute(sql_paciente, (
-                        codigo_cita,
-                        usuario_id,
-                        nombre_completo,
-                        body.get('ID_acudiente'),  # Puede ser None
-                        historial_medico,
-                        terapeuta,
-                        body.get('ejercicios_registrados', ''),
-                        estado_cita,
-                        tipo_plan,
-                        precio_plan
-                    ))
-                    print("✅ Paciente creado exitosamente")
-                    
-                    conn.commit()
-                    
-                    return JSONResponse(content={
-                        "success": True,
-                        "message": "Usuario convertido a paciente exitosamente",
-                        "data": {
-                            "codigo_cita": codigo_cita,
-                            "tipo_codigo": "admin",
-                            "nombre_paciente": nombre_completo,
-                            "servicio": servicio,
-                            "terapeuta": terapeuta,
-                            "fecha_cita": fecha_cita,
-                            "hora_cita": hora_cita,
-                            "estado": estado_cita,
-                            "tipo_plan": tipo_plan,
-                            "precio_plan": precio_plan
-                        }
-                    })
-                    
-            except Exception as e:
-                conn.rollback()
-                print(f"❌ Error al convertir a paciente: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                return JSONResponse(status_code=500, content={
+            resultado = informe['resultados'][0]
+            if not resultado['ok']:
+                return JSONResponse(status_code=404 if resultado['error'] == 'Usuario no encontrado' else 400, content={
                     "success": False, 
-                    "error": f"Error en base de datos: {str(e)}"
+                    "error": resultado['error']
                 })
-            finally:
-                if conn:
-                    conn.close()
+            
+            return JSONResponse(content={
+                "success": True,
+                "message": "Usuario convertido a paciente exitosamente",
+                "data": {
+                    "codigo_cita": resultado['codigo_cita'],
+                    "tipo_codigo": "admin",
+                    "nombre_paciente": resultado['nombre_paciente'],
+                    **informe['cita']
+                }
+            })
                     
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={
+                "success": False, 
+                "error": str(e)
+            })
         except Exception as e:
             print(f"❌ Error en convertir_a_paciente: {str(e)}")
             return JSONResponse(status_code=500, content={
@@ -1214,85 +957,35 @@ class AdminUsuariosController:
                     content={"success": False, "error": "Acceso no autorizado"}
                 )
             
-            from bd.conexion_bd import get_db_connection
-            conn = get_db_connection()
-            
-            try:
-                with conn.cursor() as cursor:
-                    # 1. Verificar que existe el paciente
-                    sql_check_paciente = """
-                    SELECT ID_usuario, nombre_completo 
-                    FROM paciente 
-                    WHERE codigo_cita = %s
-                    """
-                    cursor.execute(sql_check_paciente, (codigo_cita,))
-                    paciente = cursor.fetchone()
-                    
-                    if not paciente:
-                        return JSONResponse(
-                            status_code=404,
-                            content={"success": False, "error": "Paciente no encontrado"}
-                        )
-                    
-                    print(f"🗑️ Eliminando paciente: {paciente['nombre_completo']} (Cita: {codigo_cita})")
-                    
-                    # 2. Eliminar acudientes relacionados (si existe la tabla)
-                    try:
-                        sql_delete_acudiente = "DELETE FROM acudiente WHERE cita_id = %s"
-                        cursor.execute(sql_delete_acudiente, (codigo_cita,))
-                        print("✅ Acudiente eliminado (si existía)")
-                    except Exception as e:
-                        print(f"ℹ️ No se pudo eliminar acudiente (posiblemente tabla no existe): {e}")
-                    
-                    # 3. Eliminar paciente
-                    sql_delete_paciente = "DELETE FROM paciente WHERE codigo_cita = %s"
-                    cursor.execute(sql_delete_paciente, (codigo_cita,))
-                    print("✅ Paciente eliminado")
-                    
-                    # 4. Eliminar la cita asociada
-                    sql_delete_cita = "DELETE FROM cita WHERE cita_id = %s"
-                    cursor.execute(sql_delete_cita, (codigo_cita,))
-                    print("✅ Cita eliminada")
-                    
-                    # 5. Verificar si el usuario sigue teniendo otras citas/pacientes
-                    sql_verificar_usuario = """
-                    SELECT COUNT(*) as total_pacientes 
-                    FROM paciente 
-                    WHERE ID_usuario = %s
-                    """
-                    cursor.execute(sql_verificar_usuario, (paciente['ID_usuario'],))
-                    resultado = cursor.fetchone()
-                    
-                    # 6. Si el usuario no tiene más pacientes, actualizar estado si es necesario
-                    if resultado['total_pacientes'] == 0:
-                        # Opcional: Actualizar algún campo en usuario para indicar que ya no es paciente
-                        # sql_update_usuario = "UPDATE usuario SET es_paciente = 0 WHERE ID = %s"
-                        # cursor.execute(sql_update_usuario, (paciente['ID_usuario'],))
-                        print(f"ℹ️ Usuario {paciente['ID_usuario']} ya no tiene pacientes registrados")
-                    
-                    conn.commit()
-                    
-                    return JSONResponse(content={
-                        "success": True,
-                        "message": "Paciente, cita y registros relacionados eliminados exitosamente",
-                        "data": {
-                            "codigo_cita": codigo_cita,
-                            "usuario_id": paciente['ID_usuario'],
-                            "nombre_paciente": paciente['nombre_completo']
-                        }
-                    })
-                    
-            except Exception as e:
-                conn.rollback()
-                print(f"❌ Error al eliminar paciente y cita: {e}")
+            informe, error = await ejecutar_bd(AdminUsuariosModel.eliminar_pacientes, [codigo_cita])
+            if error:
                 return JSONResponse(
                     status_code=500, 
-                    content={"success": False, "error": str(e)}
+                    content={"success": False, "error": error}
                 )
-            finally:
-                if conn:
-                    conn.close()
+            
+            resultado = informe['resultados'][0]
+            if not resultado['ok']:
+                return JSONResponse(
+                    status_code=404,
+                    content={"success": False, "error": resultado['error']}
+                )
+            
+            return JSONResponse(content={
+                "success": True,
+                "message": "Paciente, cita y registros relacionados eliminados exitosamente",
+                "data": {
+                    "codigo_cita": codigo_cita,
+                    "usuario_id": resultado['usuario_id'],
+                    "nombre_paciente": resultado['nombre_paciente']
+                }
+            })
                     
+        except ValueError as e:
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "error": str(e)}
+            )
         except Exception as e:
             print(f"❌ Error en eliminar_paciente: {e}")
             traceback.print_exc()
@@ -1353,6 +1046,7 @@ class AdminUsuariosController:
                     cursor.execute(sql_update, (nuevo_estado, usuario_id))
                     
                     conn.commit()
+                    BusquedaModel.marcar('usuarios', [usuario_id])
                     
                     return JSONResponse(content={
                         "success": True,
@@ -1421,7 +1115,7 @@ class AdminUsuariosController:
                 with conn.cursor() as cursor:
                     # Verificar que la cita existe
                     sql_check = """
-                    SELECT cita_id, estado, nombre_paciente 
+                    SELECT cita_id, estado, nombre_paciente, fecha_cita 
                     FROM cita WHERE cita_id = %s
                     """
                     cursor.execute(sql_check, (codigo_cita,))
@@ -1445,6 +1139,9 @@ class AdminUsuariosController:
                     cursor.execute(sql_update_paciente, (nuevo_estado, codigo_cita))
                     
                     conn.commit()
+                    ResumenAnaliticasModel.marcar_citas([cita['fecha_cita']])
+                    BusquedaModel.marcar('citas', [codigo_cita])
+                    BusquedaModel.marcar('pacientes', [codigo_cita])
                     
                     return JSONResponse(content={
                         "success": True,
@@ -1476,129 +1173,119 @@ class AdminUsuariosController:
                 content={"success": False, "error": "Error interno del servidor"}
             )
     @staticmethod
-    def obtener_siguiente_codigo_admin() -> str:
-        """
-        Obtiene el siguiente código disponible en el pool de admin (FS-0501 a FS-1000)
+    async def operar_usuarios(request: Request):
         """
-        from bd.conexion_bd import get_db_connection
-        
-        conn = get_db_connection()
-        if conn is None:
-            return ""
+        Operación masiva sobre usuarios en una sola transacción.
         
+        Body: {"accion": "eliminar" | "estado" | "convertir_paciente", "ids": [...]}
+        más "estado" (Activo/Inactivo/Pendiente) para "estado" y, para
+        "convertir_paciente", los mismos campos opcionales que la conversión
+        individual (servicio, fecha_cita, hora_cita, tipo_plan, precio_plan...).
+        Responde con el resultado de cada ID.
+        """
         try:
-            with conn.cursor() as cursor:
-                # Definir rango para admin
-                inicio_rango, fin_rango = ('FS-0501', 'FS-1000')
-                inicio_num = int(inicio_rango.split('-')[1])
-                fin_num = int(fin_rango.split('-')[1])
-                
-                # Buscar todos los códigos de cita existentes
-                sql = """
-                SELECT cita_id 
-                FROM cita 
-                WHERE cita_id LIKE 'FS-%'
-                """
-                cursor.execute(sql)
-                todos_codigos = cursor.fetchall()
-                
-                # Convertir a conjunto de números usados
-                numeros_usados = set()
-                for codigo in todos_codigos:
-                    try:
-                        if codigo['cita_id'].startswith('FS-'):
-                            num = int(codigo['cita_id'].split('-')[1])
-                            if inicio_num <= num <= fin_num:
-                                numeros_usados.add(num)
-                    except (ValueError, IndexError):
-                        continue
-                
-                # Encontrar el primer número disponible en el rango
-                for num in range(inicio_num, fin_num + 1):
-                    if num not in numeros_usados:
-                        codigo_disponible = f"FS-{num:04d}"
-                        print(f"🔢 Código disponible encontrado para admin: {codigo_disponible}")
-                        return codigo_disponible
-                
-                # Si no hay números disponibles en el rango principal
-                print("⚠️ ADVERTENCIA: No hay códigos disponibles en el rango admin (0501-1000)")
-                
-                # Buscar en rango extendido para admin
-                return AdminUsuariosController.buscar_codigo_en_rango_extendido_admin()
-                
+            admin = AuthAdminController.verificar_sesion_admin(request)
+            if not admin:
+                return JSONResponse(
+                    status_code=401,
+                    content={"success": False, "error": "Acceso no autorizado"}
+                )
+            
+            try:
+                body = await request.json()
+                if not isinstance(body, dict):
+                    raise ValueError("el cuerpo debe ser un objeto JSON")
+                accion = body.get('accion')
+                ids = body.get('ids')
+                if accion == 'eliminar':
+                    informe, error = await ejecutar_bd(AdminUsuariosModel.eliminar_usuarios, ids)
+                elif accion == 'estado':
+                    informe, error = await ejecutar_bd(
+                        AdminUsuariosModel.cambiar_estado_usuarios, ids, body.get('estado')
+                    )
+                elif accion == 'convertir_paciente':
+                    informe, error = await ejecutar_bd(AdminUsuariosModel.convertir_a_pacientes, ids, body)
+                else:
+                    raise ValueError(f"accion debe ser una de: {', '.join(ACCIONES_USUARIOS)}")
+            except ValueError as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": f"Parámetros no válidos: {e}"}
+                )
+            
+            return AdminUsuariosController._respuesta_lote(accion, informe, error)
+            
         except Exception as e:
-            print(f"❌ Error al obtener siguiente código de admin: {e}")
-            import random
-            return f"FS-{random.randint(2001, 3000):04d}"  # Fallback aleatorio en rango extendido
-        finally:
-            if conn:
-                conn.close()
-
+            print(f"❌ Error en operar_usuarios: {e}")
+            traceback.print_exc()
+            return JSONResponse(
+                status_code=500,
+                content={"success": False, "error": "Error interno del servidor"}
+            )
+    
     @staticmethod
-    def buscar_codigo_en_rango_extendido_admin() -> str:
+    async def operar_pacientes(request: Request):
         """
-        Busca un código disponible en rangos extendidos para admin
+        Operación masiva sobre pacientes: {"accion": "eliminar", "codigos": [...]}
+        (códigos de cita). Borra pacientes, citas y acudientes en una sola
+        transacción y responde con el resultado de cada código.
         """
         try:
-            rangos_extendidos = [
-                ('FS-2001', 'FS-3000'),
-                ('FS-3001', 'FS-4000')
-            ]
+            admin = AuthAdminController.verificar_sesion_admin(request)
+            if not admin:
+                return JSONResponse(
+                    status_code=401,
+                    content={"success": False, "error": "Acceso no autorizado"}
+                )
             
-            from bd.conexion_bd import get_db_connection
+            try:
+                body = await request.json()
+                if not isinstance(body, dict):
+                    raise ValueError("el cuerpo debe ser un objeto JSON")
+                accion = body.get('accion')
+                if accion not in ACCIONES_PACIENTES:
+                    raise ValueError(f"accion debe ser una de: {', '.join(ACCIONES_PACIENTES)}")
+                informe, error = await ejecutar_bd(AdminUsuariosModel.eliminar_pacientes, body.get('codigos'))
+            except ValueError as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": f"Parámetros no válidos: {e}"}
+                )
             
-            conn = get_db_connection()
-            if conn is None:
-                import random
-                return f"FS-{random.randint(2001, 4000):04d}"
+            return AdminUsuariosController._respuesta_lote(accion, informe, error)
             
-            try:
-                with conn.cursor() as cursor:
-                    # Obtener todos los códigos existentes
-                    sql = "SELECT cita_id FROM cita WHERE cita_id LIKE 'FS-%'"
-                    cursor.execute(sql)
-                    todos_codigos = cursor.fetchall()
-                    
-                    # Convertir a conjunto de números usados
-                    numeros_usados = set()
-                    for codigo in todos_codigos:
-                        try:
-                            if codigo['cita_id'].startswith('FS-'):
-                                num = int(codigo['cita_id'].split('-')[1])
-                                numeros_usados.add(num)
-                        except (ValueError, IndexError):
-                            continue
-                    
-                    # Buscar en cada rango extendido
-                    for inicio_rango, fin_rango in rangos_extendidos:
-                        inicio_num = int(inicio_rango.split('-')[1])
-                        fin_num = int(fin_rango.split('-')[1])
-                        
-                        for num in range(inicio_num, fin_num + 1):
-                            if num not in numeros_usados:
-                                codigo_disponible = f"FS-{num:04d}"
-                                print(f"🔢 Código encontrado en rango extendido admin: {codigo_disponible}")
-                                return codigo_disponible
-                    
-                    # Si no hay en rangos extendidos, generar aleatorio
-                    import random
-                    return f"FS-{random.randint(9001, 9999):04d}"
-                    
-            finally:
-                if conn:
-                    conn.close()
-                    
         except Exception as e:
-            print(f"❌ Error al buscar en rango extendido admin: {e}")
-            import random
-            return f"FS-{random.randint(9001, 9999):04d}"
-
+            print(f"❌ Error en operar_pacientes: {e}")
+            traceback.print_exc()
+            return JSONResponse(
+                status_code=500,
+                content={"success": False, "error": "Error interno del servidor"}
+            )
+    
+    @staticmethod
+    def _respuesta_lote(accion: str, informe: Optional[Dict], error: Optional[str]) -> JSONResponse:
+        if error:
+            # Nada se aplicó: la transacción se deshizo entera
+            return JSONResponse(
+                status_code=409 if error == MENSAJE_HORARIO_OCUPADO else 500,
+                content={"success": False, "error": error}
+            )
+        return JSONResponse(content={
+            "success": True,
+            "accion": accion,
+            "procesados": informe['procesados'],
+            "omitidos": informe['omitidos'],
+            "data": informe['resultados']
+        })
+    
     @staticmethod
-    def generar_codigo_cita_para_admin() -> str:
+    def generar_codigo_cita_para_admin(conn=None) -> str:
         """
-        Genera un código de cita único para admin en rango FS-0501 a FS-1000
+        Genera un código de cita único para admin (FS-0501 a FS-1000 y extendidos)
+        usando el asignador compartido; "" si no hay códigos disponibles
         """
-        return AdminUsuariosController.obtener_siguiente_codigo_admin()
+        from modelo.CodigoCitaModel import CodigoCitaModel
+        return CodigoCitaModel.asignar_codigo('admin', conn=conn)
 
     @staticmethod
     async def verificar_estado_codigos_admin(request: Request):
@@ -1613,85 +1300,36 @@ class AdminUsuariosController:
                     content={"success": False, "error": "Acceso no autorizado"}
                 )
             
-            from bd.conexion_bd import get_db_connection
-            
-            conn = get_db_connection()
-            if conn is None:
-                return JSONResponse(
-                    status_code=500,
-                    content={"success": False, "error": "No hay conexión"}
-                )
+            from modelo.OcupacionCodigosModel import OcupacionCodigosModel
+            from bd.ejecutor_bd import ejecutar_bd
             
             try:
-                with conn.cursor() as cursor:
-                    inicio_rango, fin_rango = ('FS-0501', 'FS-1000')
-                    inicio_num = int(inicio_rango.split('-')[1])
-                    fin_num = int(fin_rango.split('-')[1])
-                    total_codigos = fin_num - inicio_num + 1
-                    
-                    # Obtener todos los códigos
-                    sql = "SELECT cita_id FROM cita WHERE cita_id LIKE 'FS-%'"
-                    cursor.execute(sql)
-                    todos_codigos = cursor.fetchall()
-                    
-                    # Contar códigos usados en el rango de admin
-                    codigos_usados = 0
-                    numeros_usados = []
-                    
-                    for codigo in todos_codigos:
-                        try:
-                            if codigo['cita_id'].startswith('FS-'):
-                                num = int(codigo['cita_id'].split('-')[1])
-                                if inicio_num <= num <= fin_num:
-                                    codigos_usados += 1
-                                    numeros_usados.append(num)
-                        except (ValueError, IndexError):
-                            continue
-                    
-                    # Buscar el siguiente disponible
-                    siguiente_disponible = None
-                    for num in range(inicio_num, fin_num + 1):
-                        if num not in numeros_usados:
-                            siguiente_disponible = f"FS-{num:04d}"
-                            break
-                    
-                    # Calcular estadísticas
-                    porcentaje_uso = (codigos_usados / total_codigos * 100) if total_codigos > 0 else 0
-                    
-                    # Determinar nivel de alerta
-                    if codigos_usados < 300:
-                        alerta = "BAJO"
-                        color = "success"
-                    elif codigos_usados < 400:
-                        alerta = "MEDIO"
-                        color = "warning"
-                    else:
-                        alerta = "ALTO"
-                        color = "danger"
-                    
-                    return JSONResponse(content={
-                        "success": True,
-                        "data": {
-                            "rango": f"{inicio_rango} - {fin_rango}",
-                            "total_codigos": total_codigos,
-                            "codigos_usados": codigos_usados,
-                            "codigos_disponibles": total_codigos - codigos_usados,
-                            "siguiente_disponible": siguiente_disponible,
-                            "porcentaje_uso": round(porcentaje_uso, 2),
-                            "alerta_nivel": alerta,
-                            "alerta_color": color
-                        }
-                    })
-                    
-            except Exception as e:
-                print(f"❌ Error al verificar estado de códigos: {e}")
+                siguientes = int(request.query_params.get('siguientes', 1))
+            except ValueError:
+                siguientes = 1
+            
+            estado = await ejecutar_bd(OcupacionCodigosModel.estado, 'admin', min(max(siguientes, 1), 100))
+            if 'error' in estado:
                 return JSONResponse(
                     status_code=500,
-                    content={"success": False, "error": str(e)}
+                    content={"success": False, "error": estado['error']}
                 )
-            finally:
-                if conn:
-                    conn.close()
+            
+            # Determinar nivel de alerta
+            codigos_usados = estado['codigos_usados']
+            if codigos_usados < 300:
+                alerta = "BAJO"
+                color = "success"
+            elif codigos_usados < 400:
+                alerta = "MEDIO"
+                color = "warning"
+            else:
+                alerta = "ALTO"
+                color = "danger"
+            
+            estado['alerta_nivel'] = alerta
+            estado['alerta_color'] = color
+            return JSONResponse(content={"success": True, "data": estado})
                     
         except Exception as e:
             print(f"❌ Error en verificar_estado_codigos_admin: {e}")
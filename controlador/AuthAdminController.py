@@ -1,10 +1,9 @@
 from fastapi import Request, Form
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from controlador.plantillas import templates_admin
 from modelo.AdministradorModel import AdministradorModel
 import traceback
 
-templates_admin = Jinja2Templates(directory="./vista_admin")
 
 class AuthAdminController:
     
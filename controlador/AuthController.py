@@ -3,10 +3,9 @@ import traceback
 from fastapi.params import Form
 from modelo.UsuarioModel import UsuarioModel
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from controlador.plantillas import templates
 from fastapi import Request, UploadFile
 
-templates = Jinja2Templates(directory="./vista")
 
 class AuthController:
     
@@ -0,0 +1,63 @@
+from fastapi import Request
+from fastapi.responses import JSONResponse
+import time
+import traceback
+from modelo.BusquedaModel import BusquedaModel, LIMITE_POR_DEFECTO
+from controlador.AuthAdminController import AuthAdminController
+from bd.ejecutor_bd import ejecutar_bd
+
+class BusquedaController:
+    
+    @staticmethod
+    async def buscar(request: Request):
+        """
+        Búsqueda instantánea del panel admin (type-ahead).
+        
+        Query: q (al menos 2 letras o números; sin importar acentos ni
+        mayúsculas), tipos (usuarios, pacientes, citas, terapeutas separados
+        por comas; por defecto todos) y limite (resultados por tipo, 1-20).
+        """
+        try:
+            # Verificar sesión de administrador
+            admin = AuthAdminController.verificar_sesion_admin(request)
+            if not admin:
+                return JSONResponse(
+                    status_code=401,
+                    content={"success": False, "error": "Acceso no autorizado"}
+                )
+            
+            params = request.query_params
+            consulta = params.get('q', '')
+            tipos = [t.strip() for t in params.get('tipos', '').split(',') if t.strip()]
+            
+            inicio = time.perf_counter()
+            try:
+                limite = int(params.get('limite', str(LIMITE_POR_DEFECTO)))
+                # En el ejecutor: la primera búsqueda puede tener que cargar el índice
+                resultados, error = await ejecutar_bd(BusquedaModel.buscar, consulta, tipos, limite)
+            except ValueError as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": f"Parámetros no válidos: {e}"}
+                )
+            
+            if error:
+                return JSONResponse(
+                    status_code=503,
+                    content={"success": False, "error": error}
+                )
+            
+            return JSONResponse(content={
+                "success": True,
+                "q": consulta,
+                "data": resultados,
+                "ms": round((time.perf_counter() - inicio) * 1000, 1)
+            })
+                
+        except Exception as e:
+            print(f"❌ Error en buscar: {e}")
+            traceback.print_exc()
+            return JSONResponse(
+                status_code=500,
+                content={"success": False, "error": "Error interno del servidor"}
+            )
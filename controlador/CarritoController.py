@@ -2,6 +2,7 @@ from modelo.CarritoModel import CarritoModel
 from modelo.ServicioNutricionModel import ServicioNutricionModel
 from modelo.ServicioImplementosModel import ServicioImplementosModel
 from controlador.AuthController import AuthController
+from bd.ejecutor_bd import ejecutar_bd
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 import traceback
@@ -24,12 +25,12 @@ class CarritoController:
         
         try:
             # 🔒 Obtener SOLO los productos del carrito DEL USUARIO ACTUAL
-            carrito_items, error_carrito = CarritoModel.obtener_carrito_usuario(usuario['id'])
+            carrito_items, error_carrito = await ejecutar_bd(CarritoModel.obtener_carrito_usuario, usuario['id'])
             print(f"🛒 Carrito del usuario: {len(carrito_items or [])} items")
             
             # 🔒 Obtener productos disponibles de AMBOS tipos
-            productos_nutricion, error_nutricion = ServicioNutricionModel.obtener_todos_servicios()
-            productos_implementos, error_implementos = ServicioImplementosModel.obtener_todos_servicios()
+            productos_nutricion, error_nutricion = await ejecutar_bd(ServicioNutricionModel.obtener_todos_servicios)
+            productos_implementos, error_implementos = await ejecutar_bd(ServicioImplementosModel.obtener_todos_servicios)
             
             print(f"📦 Productos de nutrición disponibles: {len(productos_nutricion or [])}")
             print(f"🏋️ Productos de implementos disponibles: {len(productos_implementos or [])}")
@@ -125,19 +126,20 @@ class CarritoController:
             
             # 🔒 VERIFICAR que el producto existe y está disponible
             if producto_tipo == 'nutricion':
-                productos, error = ServicioNutricionModel.obtener_servicio_por_codigo(producto_id)
+                productos, error = await ejecutar_bd(ServicioNutricionModel.obtener_servicio_por_codigo, producto_id)
                 if error or not productos:
                     return JSONResponse({
                         "success": False, 
                         "message": "Producto no encontrado o no disponible"
                     })
             
-            success, message = CarritoModel.agregar_al_carrito(
+            success, message = await ejecutar_bd(
+                CarritoModel.agregar_al_carrito,
                 usuario['id'], producto_id, producto_tipo, cantidad
             )
             
             # Obtener el carrito actualizado para calcular el nuevo total
-            carrito_actualizado, _ = CarritoModel.obtener_carrito_usuario(usuario['id'])
+            carrito_actualizado, _ = await ejecutar_bd(CarritoModel.obtener_carrito_usuario, usuario['id'])
             total_actualizado = 0
             items_count = 0
             if carrito_actualizado:
@@ -189,17 +191,17 @@ class CarritoController:
                 })
             
             # 🔒 VERIFICAR QUE EL ITEM PERTENECE AL USUARIO
-            if not CarritoController.verificar_propiedad_carrito(usuario['id'], carrito_id):
+            if not await ejecutar_bd(CarritoController.verificar_propiedad_carrito, usuario['id'], carrito_id):
                 print(f"🚫 Intento de eliminar item no propio: usuario={usuario['id']}, item={carrito_id}")
                 return JSONResponse({
                     "success": False, 
                     "message": "No tienes permisos para eliminar este item"
                 }, status_code=403)
             
-            success, message = CarritoModel.eliminar_del_carrito(carrito_id, usuario['id'])
+            success, message = await ejecutar_bd(CarritoModel.eliminar_del_carrito, carrito_id, usuario['id'])
             
             # Obtener el carrito actualizado
-            carrito_actualizado, _ = CarritoModel.obtener_carrito_usuario(usuario['id'])
+            carrito_actualizado, _ = await ejecutar_bd(CarritoModel.obtener_carrito_usuario, usuario['id'])
             total_actualizado = 0
             items_count = 0
             if carrito_actualizado:
@@ -252,16 +254,16 @@ class CarritoController:
                 })
             
             # 🔒 VERIFICAR PROPIEDAD
-            if not CarritoController.verificar_propiedad_carrito(usuario['id'], carrito_id):
+            if not await ejecutar_bd(CarritoController.verificar_propiedad_carrito, usuario['id'], carrito_id):
                 return JSONResponse({
                     "success": False, 
                     "message": "No tienes permisos para modificar este item"
                 }, status_code=403)
             
-            success, message = CarritoModel.actualizar_cantidad_carrito(carrito_id, usuario['id'], cantidad)
+            success, message = await ejecutar_bd(CarritoModel.actualizar_cantidad_carrito, carrito_id, usuario['id'], cantidad)
             
             # Obtener el carrito actualizado
-            carrito_actualizado, _ = CarritoModel.obtener_carrito_usuario(usuario['id'])
+            carrito_actualizado, _ = await ejecutar_bd(CarritoModel.obtener_carrito_usuario, usuario['id'])
             total_actualizado = 0
             items_count = 0
             if carrito_actualizado:
@@ -301,7 +303,7 @@ class CarritoController:
             }, status_code=401)
 
         try:
-            success, message = CarritoModel.vaciar_carrito(usuario['id'])
+            success, message = await ejecutar_bd(CarritoModel.vaciar_carrito, usuario['id'])
             
             return JSONResponse({
                 "success": success, 
@@ -347,7 +349,8 @@ class CarritoController:
                 })
             
             # Confirmar la compra
-            success, message, datos_compra = CarritoModel.confirmar_compra(
+            success, message, datos_compra = await ejecutar_bd(
+                CarritoModel.confirmar_compra,
                 usuario['id'], direccion_envio, ciudad, codigo_postal, metodo_pago
             )
             
@@ -388,7 +391,7 @@ class CarritoController:
             }, status_code=401)
 
         try:
-            compras, error = CarritoModel.obtener_historial_compras(usuario['id'])
+            compras, error = await ejecutar_bd(CarritoModel.obtener_historial_compras, usuario['id'])
             
             if error:
                 return JSONResponse({
@@ -2,10 +2,16 @@ from fastapi import Request, Form, HTTPException
 from fastapi.responses import HTMLResponse, JSONResponse
 from modelo import EmailModel
 from modelo.EmailModel import EmailModel
-from modelo.CitaModel import CitaModel
-from typing import Optional
+from modelo.CitaModel import CitaModel, HorarioOcupadoError
+from modelo.DisponibilidadModel import DisponibilidadModel
+from bd.ejecutor_bd import ejecutar_bd
+from bd.unidad_trabajo import UnidadTrabajo
+from controlador.AuthAdminController import AuthAdminController
+from controlador.plantillas import templates
+from typing import List, Optional
+import asyncio
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 
 class CitaController:
     
@@ -34,7 +40,7 @@ class CitaController:
                 return RedirectResponse(url="/login_user", status_code=303)
             
             # 2. USUARIO SÍ ESTÁ LOGUEADO - mostrar formulario
-            servicios = CitaModel.obtener_servicios_terapia()
+            servicios = await ejecutar_bd(CitaModel.obtener_servicios_terapia)
             
             # Si viene un código de servicio, buscar ese servicio específico
             servicio_seleccionado = None
@@ -44,9 +50,6 @@ class CitaController:
                     None
                 )
             
-            from fastapi.templating import Jinja2Templates
-            templates = Jinja2Templates(directory="./vista")
-            
             # 3. Limpiar la intención guardada (si existe)
             if 'servicio_para_cita' in request.session:
                 del request.session['servicio_para_cita']
@@ -71,7 +74,7 @@ class CitaController:
     async def obtener_servicios_api(request: Request):
         """API endpoint para obtener servicios de terapia (serializable a JSON)"""
         try:
-            servicios = CitaModel.obtener_servicios_terapia()
+            servicios = await ejecutar_bd(CitaModel.obtener_servicios_terapia)
             
             # Formatear para JSON serializable
             servicios_formateados = []
@@ -105,6 +108,36 @@ class CitaController:
                 content={"error": "Error al obtener servicios", "detalle": str(e)}
             )
 
+    @staticmethod
+    def respuesta_horario_ocupado(error: Exception) -> JSONResponse:
+        """409 común para los endpoints de agendamiento cuando el horario ya fue tomado"""
+        content = {"success": False, "error": str(error), "conflicto": True}
+        if getattr(error, 'fechas', None):
+            content["fechas_ocupadas"] = error.fechas
+        return JSONResponse(status_code=409, content=content)
+
+    @staticmethod
+    def _lista_correos(correo: str, emails_adicionales: Optional[str], acudiente_correo: Optional[str]) -> List[str]:
+        """Correo principal + adicionales (JSON o texto) + acudiente, sin duplicados"""
+        emails_list = [correo]  # Siempre enviar al email principal
+        
+        if emails_adicionales:
+            try:
+                emails_data = json.loads(emails_adicionales)
+                if isinstance(emails_data, list):
+                    emails_list.extend([email for email in emails_data if email.strip()])
+            except json.JSONDecodeError:
+                # Si no es JSON válido, tratar como string simple
+                if emails_adicionales.strip():
+                    emails_list.append(emails_adicionales.strip())
+        
+        # Agregar email del acudiente si existe
+        if acudiente_correo and acudiente_correo.strip():
+            emails_list.append(acudiente_correo.strip())
+        
+        # Eliminar duplicados
+        return list(set([e for e in emails_list if e]))
+
     @staticmethod
     async def agendar_cita(
         request: Request,
@@ -121,9 +154,15 @@ class CitaController:
         acudiente_id: Optional[str] = Form(None),
         acudiente_telefono: Optional[str] = Form(None),
         acudiente_correo: Optional[str] = Form(None),
-        emails_adicionales: Optional[str] = Form(None)
+        emails_adicionales: Optional[str] = Form(None),
+        uow: Optional[UnidadTrabajo] = None
     ):
-        """Procesa el agendamiento de una nueva cita por usuario"""
+        """
+        Procesa el agendamiento de una nueva cita por usuario.
+        Si se recibe una unidad de trabajo, la verificación, la cita y el
+        acudiente se guardan en una sola transacción.
+        """
+        conn = uow.conexion if uow else None
         try:
             print(f"Iniciando agendamiento para usuario: {nombre_paciente}")
             
@@ -148,19 +187,9 @@ class CitaController:
                     content={"success": False, "error": "Formato de fecha inválido"}
                 )
 
-            # 1. VERIFICAR DISPONIBILIDAD
-            disponible = CitaModel.verificar_disponibilidad_cita(
-                fecha_cita, hora_cita, terapeuta_designado
-            )
-            
-            if not disponible:
-                return JSONResponse(
-                    status_code=400,
-                    content={"success": False, "error": "El horario seleccionado no está disponible para este terapeuta"}
-                )
-            
-            # 2. OBTENER INFORMACIÓN COMPLETA DEL SERVICIO
-            servicios = CitaModel.obtener_servicios_terapia()
+            # 1. OBTENER INFORMACIÓN COMPLETA DEL SERVICIO
+            # (la disponibilidad la garantiza el INSERT: ver CitaModel.crear_cita)
+            servicios = await ejecutar_bd(CitaModel.obtener_servicios_terapia)
             servicio_info = next((s for s in servicios if s['nombre'] == servicio), None)
             
             if not servicio_info:
@@ -169,7 +198,7 @@ class CitaController:
                     content={"success": False, "error": "Servicio no encontrado"}
                 )
             
-            # 3. CREAR LA CITA
+            # 2. CREAR LA CITA
             datos_cita = {
                 'servicio': servicio,
                 'terapeuta_designado': terapeuta_designado,
@@ -183,15 +212,22 @@ class CitaController:
             }
             
             # Usar tipo_usuario = 'usuario' para autogestión
-            codigo_cita = CitaModel.crear_cita(datos_cita, tipo_usuario='usuario')
+            try:
+                codigo_cita = await ejecutar_bd(CitaModel.crear_cita, datos_cita, tipo_usuario='usuario', conn=conn)
+            except HorarioOcupadoError as e:
+                if uow:
+                    uow.marcar_fallida()
+                return CitaController.respuesta_horario_ocupado(e)
             
             if not codigo_cita:
+                if uow:
+                    uow.marcar_fallida()
                 return JSONResponse(
                     status_code=500,
                     content={"success": False, "error": "Error al crear la cita en el sistema"}
                 )
             
-            # 4. CREAR ACUDIENTE SI EXISTE
+            # 3. CREAR ACUDIENTE SI EXISTE
             acudiente_creado = False
             if acudiente_nombre and acudiente_id:
                 datos_acudiente = {
@@ -201,31 +237,28 @@ class CitaController:
                     'correo': acudiente_correo or ''
                 }
                 
-                acudiente_creado = CitaModel.crear_acudiente(codigo_cita, datos_acudiente)
+                acudiente_creado = await ejecutar_bd(CitaModel.crear_acudiente, codigo_cita, datos_acudiente, conn=conn)
                 if not acudiente_creado:
                     print(f"Advertencia: No se pudo crear el acudiente para la cita {codigo_cita}")
+                    if uow:
+                        # Cita y acudiente van juntos: se deshace la cita completa
+                        uow.marcar_fallida()
+                        return JSONResponse(
+                            status_code=500,
+                            content={"success": False, "error": "No se pudo registrar el acudiente de la cita"}
+                        )
             
-            # 5. PROCESAR EMAILS ADICIONALES PARA ENVÍO
-            emails_list = [correo]  # Siempre enviar al email principal
+            # Confirmar antes de enviar correos: no se anuncia una cita sin guardar
+            if uow and not await ejecutar_bd(uow.finalizar):
+                return JSONResponse(
+                    status_code=500,
+                    content={"success": False, "error": "Error al crear la cita en el sistema"}
+                )
             
-            if emails_adicionales:
-                try:
-                    emails_data = json.loads(emails_adicionales)
-                    if isinstance(emails_data, list):
-                        emails_list.extend([email for email in emails_data if email.strip()])
-                except json.JSONDecodeError:
-                    # Si no es JSON válido, tratar como string simple
-                    if emails_adicionales.strip():
-                        emails_list.append(emails_adicionales.strip())
-            
-            # Agregar email del acudiente si existe
-            if acudiente_correo and acudiente_correo.strip():
-                emails_list.append(acudiente_correo.strip())
-            
-            # Eliminar duplicados
-            emails_list = list(set([e for e in emails_list if e]))
-            
-            # 6. ENVIAR CORREOS DE CONFIRMACIÓN
+            # 4. PROCESAR EMAILS ADICIONALES PARA ENVÍO
+            emails_list = CitaController._lista_correos(correo, emails_adicionales, acudiente_correo)
+            
+            # 5. ENVIAR CORREOS DE CONFIRMACIÓN
             resultados_envio = []
             if emails_list and len(emails_list) > 0:
                 print(f"Preparando envío de correos a: {emails_list}")
@@ -245,9 +278,11 @@ class CitaController:
                     'recomendaciones_precita': servicio_info.get('recomendacion_precita', '')
                 }
                 
-                # Enviar correos usando EmailModel
+                # Enviar correos usando EmailModel, fuera del ejecutor de BD (el SMTP tarda segundos)
                 try:
-                    resultado = EmailModel.enviar_correo_confirmacion_cita(datos_correo, emails_list)
+                    resultado = await asyncio.get_running_loop().run_in_executor(
+                        None, EmailModel.enviar_correo_confirmacion_cita, datos_correo, emails_list
+                    )
                     resultados_envio = resultado.get('detalles', [])
                     print(f"Resultado envío correos: {resultado}")
                 except Exception as email_error:
@@ -256,7 +291,7 @@ class CitaController:
             else:
                 print("No hay emails para enviar")
             
-            # 7. RESPUESTA EXITOSA
+            # 6. RESPUESTA EXITOSA
             response_data = {
                 "success": True,
                 "message": "Cita agendada exitosamente",
@@ -285,6 +320,8 @@ class CitaController:
             
         except Exception as e:
             print(f"Error al agendar cita: {e}")
+            if uow:
+                uow.marcar_fallida()
             import traceback
             traceback.print_exc()
             return JSONResponse(
@@ -292,4 +329,219 @@ class CitaController:
                 content={"success": False, "error": "Error interno del servidor al procesar la cita"}
             )
     
-    
\ No newline at end of file
+    
+    @staticmethod
+    def _tipo_usuario_sesion(request: Request) -> str:
+        """Rango de códigos según quién agenda: nunca se toma del formulario"""
+        if AuthAdminController.verificar_sesion_admin(request):
+            return 'admin'
+        if request.session.get('fisioterapeuta'):
+            return 'fisio'
+        return 'usuario'
+    
+    @staticmethod
+    async def agendar_serie_citas(
+        request: Request,
+        servicio: str = Form(...),
+        terapeuta_designado: str = Form(...),
+        nombre_paciente: str = Form(...),
+        telefono: str = Form(...),
+        correo: str = Form(...),
+        fecha_inicio: str = Form(...),
+        hora_cita: str = Form(...),
+        tipo_pago: str = Form(...),
+        sesiones: int = Form(...),
+        cada_semanas: int = Form(1),
+        dias_semana: Optional[str] = Form(None),
+        notas_adicionales: Optional[str] = Form(None),
+        emails_adicionales: Optional[str] = Form(None),
+        uow: Optional[UnidadTrabajo] = None
+    ):
+        """
+        Agenda un plan de tratamiento completo: `sesiones` citas a la misma hora
+        con el mismo terapeuta, semanalmente (o cada `cada_semanas` semanas, en
+        los `dias_semana` indicados, p. ej. "lunes y jueves"). Todas las
+        sesiones se guardan juntas o ninguna, y se envía un solo correo.
+        El rango de códigos sale de la sesión (admin, fisio o usuario).
+        """
+        conn = uow.conexion if uow else None
+        tipo_usuario = CitaController._tipo_usuario_sesion(request)
+        try:
+            if not all([servicio, terapeuta_designado, nombre_paciente, telefono, correo, fecha_inicio, hora_cita, tipo_pago]):
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": "Todos los campos obligatorios deben ser completados"}
+                )
+            
+            if not 1 <= sesiones <= CitaModel.MAX_SESIONES_SERIE:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": f"El número de sesiones debe estar entre 1 y {CitaModel.MAX_SESIONES_SERIE}"}
+                )
+            
+            try:
+                fecha_obj = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
+                if fecha_obj < datetime.now().date():
+                    return JSONResponse(
+                        status_code=400,
+                        content={"success": False, "error": "No se pueden agendar citas en fechas pasadas"}
+                    )
+            except ValueError:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": "Formato de fecha inválido"}
+                )
+            
+            dias = DisponibilidadModel.parsear_dias(dias_semana) if dias_semana else None
+            if dias_semana and not dias:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": "Días de la semana inválidos"}
+                )
+            
+            # 1. SERVICIO Y FECHAS DE LA SERIE
+            servicios = await ejecutar_bd(CitaModel.obtener_servicios_terapia)
+            servicio_info = next((s for s in servicios if s['nombre'] == servicio), None)
+            if not servicio_info:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": "Servicio no encontrado"}
+                )
+            
+            fechas = [
+                f.strftime('%Y-%m-%d')
+                for f in CitaModel.fechas_serie(fecha_obj, sesiones, cada_semanas, dias)
+            ]
+            
+            # 2. CREAR TODAS LAS SESIONES (una transacción)
+            datos_cita = {
+                'servicio': servicio,
+                'terapeuta_designado': terapeuta_designado,
+                'nombre_paciente': nombre_paciente,
+                'telefono': telefono,
+                'correo': correo,
+                'hora_cita': hora_cita,
+                'notas_adicionales': notas_adicionales or '',
+                'tipo_pago': tipo_pago
+            }
+            try:
+                codigos = await ejecutar_bd(CitaModel.crear_serie_citas, datos_cita, fechas, tipo_usuario=tipo_usuario, conn=conn)
+            except HorarioOcupadoError as e:
+                if uow:
+                    uow.marcar_fallida()
+                return CitaController.respuesta_horario_ocupado(e)
+            
+            if not codigos:
+                if uow:
+                    uow.marcar_fallida()
+                return JSONResponse(
+                    status_code=500,
+                    content={"success": False, "error": "Error al crear las citas de la serie"}
+                )
+            
+            if uow and not await ejecutar_bd(uow.finalizar):
+                return JSONResponse(
+                    status_code=500,
+                    content={"success": False, "error": "Error al crear las citas de la serie"}
+                )
+            
+            # 3. UN SOLO CORREO CON TODAS LAS SESIONES
+            sesiones_creadas = [
+                {"codigo_cita": codigo, "fecha_cita": fecha, "hora_cita": hora_cita}
+                for codigo, fecha in zip(codigos, fechas)
+            ]
+            emails_list = CitaController._lista_correos(correo, emails_adicionales, None)
+            resultados_envio = []
+            try:
+                datos_correo = {
+                    'nombre_paciente': nombre_paciente,
+                    'servicio': servicio,
+                    'terapeuta_designado': terapeuta_designado,
+                    'hora_cita': hora_cita,
+                    'sesiones': sesiones_creadas,
+                    'precio': servicio_info.get('precio', 'Consultar'),
+                    'modalidad': servicio_info.get('modalidad', 'Presencial'),
+                    'tipo_pago': tipo_pago,
+                    'recomendaciones_precita': servicio_info.get('recomendacion_precita', '')
+                }
+                # Fuera del ejecutor de BD: el SMTP no debe ocupar sus hilos
+                resultado = await asyncio.get_running_loop().run_in_executor(
+                    None, EmailModel.enviar_correo_confirmacion_serie, datos_correo, emails_list
+                )
+                resultados_envio = resultado.get('detalles', [])
+            except Exception as email_error:
+                print(f"Error enviando correo de la serie: {email_error}")
+                resultados_envio = [{"email": email, "estado": "error", "error": str(email_error)} for email in emails_list]
+            
+            print(f"Serie de {len(codigos)} citas agendada por {tipo_usuario}: {codigos[0]} ... {codigos[-1]}")
+            return JSONResponse(content={
+                "success": True,
+                "message": f"Plan de {len(codigos)} sesiones agendado exitosamente",
+                "tipo_usuario": tipo_usuario,
+                "codigos_cita": codigos,
+                "sesiones": sesiones_creadas,
+                "correos_enviados": {
+                    "total": len([r for r in resultados_envio if isinstance(r, dict) and r.get("estado") == "enviado"]),
+                    "detalles": resultados_envio
+                }
+            })
+            
+        except Exception as e:
+            print(f"Error al agendar serie de citas: {e}")
+            if uow:
+                uow.marcar_fallida()
+            return JSONResponse(
+                status_code=500,
+                content={"success": False, "error": "Error interno del servidor al procesar la serie de citas"}
+            )
+    
+    
+    @staticmethod
+    async def obtener_disponibilidad(
+        request: Request,
+        terapeuta: Optional[str] = None,
+        servicio: Optional[str] = None,
+        desde: Optional[str] = None,
+        dias: int = 7
+    ):
+        """
+        Horarios libres de un terapeuta o servicio para una semana (o hasta 31 días)
+        en una sola llamada, en lugar de probar hora por hora
+        """
+        try:
+            if not terapeuta and not servicio:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": "Indica un terapeuta o un servicio"}
+                )
+            
+            try:
+                fecha_desde = datetime.strptime(desde, '%Y-%m-%d').date() if desde else datetime.now().date()
+            except ValueError:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": "Formato de fecha inválido"}
+                )
+            fecha_desde = max(fecha_desde, datetime.now().date())
+            fecha_hasta = fecha_desde + timedelta(days=max(1, dias) - 1)
+            
+            resultado = await ejecutar_bd(
+                DisponibilidadModel.obtener_slots_libres,
+                fecha_desde, fecha_hasta, terapeuta=terapeuta, servicio=servicio
+            )
+            if "error" in resultado:
+                # Sin conexión: 503; fallo al calcular: 500; el resto es culpa de la petición
+                interno = resultado.get("interno")
+                return JSONResponse(
+                    status_code=503 if interno == "conexion" else 500 if interno else 400,
+                    content={"success": False, "error": resultado["error"]}
+                )
+            
+            return JSONResponse(content={"success": True, **resultado})
+            
+        except Exception as e:
+            print(f"Error al obtener disponibilidad: {e}")
+            return JSONResponse(
+                status_code=500,
+                content={"success": False, "error": "Error al obtener la disponibilidad"}
+            )
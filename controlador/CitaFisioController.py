@@ -2,6 +2,7 @@
 from fastapi import Request, Form, HTTPException
 from fastapi.responses import JSONResponse
 from modelo.CitaFisioModel import CitaFisioModel
+from bd.ejecutor_bd import ejecutar_bd
 from typing import Optional, Dict, Any, List
 import traceback
 import json
@@ -31,14 +32,14 @@ class CitaFisioController:
             print(f"🔍 Buscando citas para el terapeuta: {terapeuta_actual}")
             
             # Obtener citas del terapeuta
-            citas = CitaFisioModel.obtener_citas_por_terapeuta(terapeuta_actual)
+            citas = await ejecutar_bd(CitaFisioModel.obtener_citas_por_terapeuta, terapeuta_actual)
             print(f"📋 Citas obtenidas para {terapeuta_actual}: {len(citas)}")
             
             # Para cada cita, obtener info de acudiente si existe
             citas_completas = []
             for cita in citas:
                 cita_completa = dict(cita)
-                acudiente = CitaFisioModel.obtener_acudiente_por_cita(cita['cita_id'])
+                acudiente = await ejecutar_bd(CitaFisioModel.obtener_acudiente_por_cita, cita['cita_id'])
                 if acudiente:
                     cita_completa['acudiente'] = acudiente
                 else:
@@ -111,7 +112,7 @@ class CitaFisioController:
             print(f"👨‍⚕️ Terapeuta solicitante: {terapeuta_actual}")
             
             # Llamar al modelo para cambiar estado
-            resultado = CitaFisioModel.cambiar_estado_cita(cita_id, nuevo_estado, terapeuta_actual)
+            resultado = await ejecutar_bd(CitaFisioModel.cambiar_estado_cita, cita_id, nuevo_estado, terapeuta_actual)
             
             if resultado.get('success'):
                 print(f"✅ Estado cambiado exitosamente: {resultado}")
@@ -169,7 +170,7 @@ class CitaFisioController:
             terapeuta_actual = fisioterapeuta.get('nombre_completo')
             
             # Obtener estadísticas
-            estadisticas = CitaFisioModel.obtener_estadisticas_citas(terapeuta_actual)
+            estadisticas = await ejecutar_bd(CitaFisioModel.obtener_estadisticas_citas, terapeuta_actual)
             
             return JSONResponse(content={
                 "success": True,
@@ -226,13 +227,13 @@ class CitaFisioController:
             terapeuta_actual = fisioterapeuta.get('nombre_completo')
             
             # Filtrar citas
-            citas_filtradas = CitaFisioModel.filtrar_citas(terapeuta_actual, filtros)
+            citas_filtradas = await ejecutar_bd(CitaFisioModel.filtrar_citas, terapeuta_actual, filtros)
             
             # Añadir info de acudiente si existe
             citas_completas = []
             for cita in citas_filtradas:
                 cita_completa = dict(cita)
-                acudiente = CitaFisioModel.obtener_acudiente_por_cita(cita['cita_id'])
+                acudiente = await ejecutar_bd(CitaFisioModel.obtener_acudiente_por_cita, cita['cita_id'])
                 if acudiente:
                     cita_completa['acudiente'] = acudiente
                 else:
@@ -280,7 +281,7 @@ class CitaFisioController:
             terapeuta_actual = fisioterapeuta.get('nombre_completo')
             
             # Obtener todas las citas del terapeuta
-            todas_citas = CitaFisioModel.obtener_citas_por_terapeuta(terapeuta_actual)
+            todas_citas = await ejecutar_bd(CitaFisioModel.obtener_citas_por_terapeuta, terapeuta_actual)
             
             # Buscar la cita específica
             cita_encontrada = None
@@ -299,7 +300,7 @@ class CitaFisioController:
                 )
             
             # Obtener info de acudiente si existe
-            acudiente = CitaFisioModel.obtener_acudiente_por_cita(cita_id)
+            acudiente = await ejecutar_bd(CitaFisioModel.obtener_acudiente_por_cita, cita_id)
             
             cita_detalle = dict(cita_encontrada)
             if acudiente:
@@ -374,7 +375,8 @@ class CitaFisioController:
             print(f"👨‍⚕️ Terapeuta: {terapeuta_actual}")
             
             # Llamar al modelo para cancelar con motivo
-            resultado = CitaFisioModel.cancelar_cita_con_motivo(
+            resultado = await ejecutar_bd(
+                CitaFisioModel.cancelar_cita_con_motivo,
                 cita_id=cita_id,
                 terapeuta_nombre=terapeuta_actual,
                 motivo_cancelacion=motivo,
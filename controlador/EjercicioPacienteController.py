@@ -3,6 +3,8 @@ import json
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from bd.conexion_bd import close_db_connection, get_db_connection
+from bd.ejecutor_bd import ejecutar_bd
+from bd.unidad_trabajo import UnidadTrabajo
 from modelo.EjercicioPacienteModel import EjercicioPacienteModel
 from controlador.AuthController import AuthController
 from datetime import datetime, date, time, timedelta
@@ -53,7 +55,7 @@ class EjercicioPacienteController:
         try:
             print(f"✅ Usuario autorizado: {usuario['email']} - ID: {usuario['id']}")
             
-            ejercicios = EjercicioPacienteModel.obtener_ejercicios_por_paciente(usuario['id'])
+            ejercicios = await ejecutar_bd(EjercicioPacienteModel.obtener_ejercicios_por_paciente, usuario['id'])
             print(f"💪 Ejercicios encontrados: {len(ejercicios)}")
             
             # Serializar todos los ejercicios
@@ -81,7 +83,7 @@ class EjercicioPacienteController:
         try:
             print(f"✅ Usuario autorizado: {usuario['email']} - ID: {usuario['id']}")
             
-            ejercicios = EjercicioPacienteModel.obtener_ejercicios_completados(usuario['id'])
+            ejercicios = await ejecutar_bd(EjercicioPacienteModel.obtener_ejercicios_completados, usuario['id'])
             print(f"✅ Ejercicios completados encontrados: {len(ejercicios)}")
             
             # Serializar todos los ejercicios
@@ -97,7 +99,7 @@ class EjercicioPacienteController:
             raise HTTPException(status_code=500, detail="Error interno del servidor")
     
     @staticmethod
-    async def obtener_ejercicios_pendientes(request: Request):
+    async def obtener_ejercicios_pendientes(request: Request, uow: UnidadTrabajo):
         """Obtiene ejercicios pendientes del paciente"""
         print("🔍 Iniciando obtener_ejercicios_pendientes...")
         
@@ -109,7 +111,7 @@ class EjercicioPacienteController:
         try:
             print(f"✅ Usuario autorizado: {usuario['email']} - ID: {usuario['id']}")
             
-            ejercicios = EjercicioPacienteModel.obtener_ejercicios_pendientes(usuario['id'])
+            ejercicios = await ejecutar_bd(EjercicioPacienteModel.obtener_ejercicios_pendientes, usuario['id'], conn=uow.conexion)
             print(f"⏳ Ejercicios pendientes encontrados: {len(ejercicios)}")
             
             # Serializar todos los ejercicios
@@ -125,7 +127,7 @@ class EjercicioPacienteController:
             raise HTTPException(status_code=500, detail="Error interno del servidor")
     
     @staticmethod
-    async def obtener_estadisticas(request: Request):
+    async def obtener_estadisticas(request: Request, uow: UnidadTrabajo):
         """Obtiene estadísticas de ejercicios del paciente"""
         print("🔍 Iniciando obtener_estadisticas_ejercicios...")
         
@@ -137,7 +139,7 @@ class EjercicioPacienteController:
         try:
             print(f"✅ Usuario autorizado: {usuario['email']} - ID: {usuario['id']}")
             
-            estadisticas = EjercicioPacienteModel.obtener_estadisticas_ejercicios(usuario['id'])
+            estadisticas = await ejecutar_bd(EjercicioPacienteModel.obtener_estadisticas_ejercicios, usuario['id'], conn=uow.conexion)
             print(f"📊 Estadísticas de ejercicios: {estadisticas}")
             
             return JSONResponse({
@@ -150,7 +152,7 @@ class EjercicioPacienteController:
             raise HTTPException(status_code=500, detail="Error interno del servidor")
     
     @staticmethod
-    async def marcar_como_completado(request: Request):
+    async def marcar_como_completado(request: Request, uow: UnidadTrabajo):
         """Marca un ejercicio como completado - VERSIÓN CORREGIDA"""
         print("🔍 Iniciando marcar_como_completado...")
         
@@ -183,8 +185,9 @@ class EjercicioPacienteController:
             
             print(f"✅ Marcando ejercicio {codigo_ejercicio} como completado...")
             
-            success, message = EjercicioPacienteModel.marcar_como_completado(
-                usuario['id'], codigo_ejercicio, feedback, nivel_dificultad
+            success, message = await ejecutar_bd(
+                EjercicioPacienteModel.marcar_como_completado,
+                usuario['id'], codigo_ejercicio, feedback, nivel_dificultad, conn=uow.conexion
             )
             
             return JSONResponse({
@@ -201,13 +204,14 @@ class EjercicioPacienteController:
         except Exception as e:
             print(f"🔥 Error en controlador marcar_como_completado: {e}")
             print(traceback.format_exc())
+            uow.marcar_fallida()
             return JSONResponse({
                 "success": False,
                 "message": "Error interno del servidor"
             })
         
     @staticmethod
-    async def obtener_ejercicio_por_codigo(request: Request, codigo_ejercicio: str):
+    async def obtener_ejercicio_por_codigo(request: Request, codigo_ejercicio: str, uow: UnidadTrabajo):
         """Obtiene un ejercicio específico por su código"""
         print(f"🔍 Iniciando obtener_ejercicio_por_codigo: {codigo_ejercicio}")
         
@@ -219,7 +223,7 @@ class EjercicioPacienteController:
         try:
             print(f"✅ Usuario autorizado: {usuario['email']}")
             
-            ejercicio = EjercicioPacienteModel.obtener_ejercicio_por_codigo(codigo_ejercicio)
+            ejercicio = await ejecutar_bd(EjercicioPacienteModel.obtener_ejercicio_por_codigo, codigo_ejercicio, conn=uow.conexion)
             if not ejercicio:
                 return JSONResponse({
                     "success": False,
@@ -227,8 +231,8 @@ class EjercicioPacienteController:
                 })
             
             # Verificar que el ejercicio esté asignado al paciente
-            ejercicios_asignados = EjercicioPacienteModel.obtener_ejercicios_por_paciente(usuario['id'])
-            codigos_asignados = [ej['codigo_ejercicio'] for ej in ejercicios_asignados]
+            ejercicios_asignados = await ejecutar_bd(EjercicioPacienteModel.obtener_ejercicios_por_paciente, usuario['id'], conn=uow.conexion)
+            codigos_asignados = {ej['codigo_ejercicio'] for ej in ejercicios_asignados}
             
             if codigo_ejercicio not in codigos_asignados:
                 return JSONResponse({
@@ -0,0 +1,102 @@
+from fastapi import Request, UploadFile, File
+from fastapi.responses import JSONResponse, FileResponse
+import traceback
+from modelo.ImportacionModel import ImportacionModel
+from controlador.AuthAdminController import AuthAdminController
+from bd.ejecutor_bd import ejecutar_bd
+
+class ImportacionController:
+
+    @staticmethod
+    async def importar_csv(request: Request, archivo: UploadFile = File(...)):
+        """
+        Importación masiva desde CSV (campo de formulario `archivo`).
+
+        Query: tipo (usuarios, pacientes, terapeutas) y codificacion (utf-8 por
+        defecto o latin-1). Separador coma o punto y coma. Las filas
+        rechazadas se descargan en GET /api/admin/importar/errores/{reporte}.
+        """
+        try:
+            # Verificar sesión de administrador
+            admin = AuthAdminController.verificar_sesion_admin(request)
+            if not admin:
+                return JSONResponse(
+                    status_code=401,
+                    content={"success": False, "error": "Acceso no autorizado"}
+                )
+
+            params = request.query_params
+            tipo = params.get('tipo', 'usuarios')
+            codificacion = params.get('codificacion', 'utf-8').lower()
+            try:
+                ImportacionModel.validar(tipo, codificacion)
+            except ValueError as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": f"Parámetros no válidos: {e}"}
+                )
+
+            if not ImportacionModel.reservar():
+                return JSONResponse(
+                    status_code=429,
+                    content={"success": False, "error": "Ya hay una importación en curso, inténtalo en unos minutos"}
+                )
+            try:
+                # El archivo ya está en disco (UploadFile); se lee en el ejecutor por lotes
+                resumen, error = await ejecutar_bd(ImportacionModel.importar, tipo, archivo.file, codificacion)
+            except ValueError as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": str(e)}
+                )
+            finally:
+                ImportacionModel.liberar()
+                await archivo.close()
+
+            if error:
+                return JSONResponse(
+                    status_code=500,
+                    content={"success": False, "error": error}
+                )
+
+            if resumen['reporte']:
+                resumen['reporte_url'] = f"/api/admin/importar/errores/{resumen['reporte']}"
+            if resumen['interrumpido']:
+                # Los lotes anteriores sí quedaron guardados (ver importadas)
+                return JSONResponse(
+                    status_code=400,
+                    content={"success": False, "error": resumen['interrumpido'], "data": resumen}
+                )
+
+            return JSONResponse(content={
+                "success": True,
+                "message": f"{resumen['importadas']} de {resumen['filas']} filas importadas",
+                "data": resumen
+            })
+
+        except Exception as e:
+            print(f"❌ Error en importar_csv: {e}")
+            traceback.print_exc()
+            return JSONResponse(
+                status_code=500,
+                content={"success": False, "error": "Error interno del servidor"}
+            )
+
+    @staticmethod
+    async def descargar_errores(request: Request, reporte: str):
+        """CSV con las filas rechazadas de una importación (vigente una hora)"""
+        admin = AuthAdminController.verificar_sesion_admin(request)
+        if not admin:
+            return JSONResponse(
+                status_code=401,
+                content={"success": False, "error": "Acceso no autorizado"}
+            )
+
+        encontrado = ImportacionModel.reporte(reporte)
+        if encontrado is None:
+            return JSONResponse(
+                status_code=404,
+                content={"success": False, "error": "Reporte no encontrado o caducado"}
+            )
+        ruta, nombre = encontrado
+        return FileResponse(ruta, media_type='text/csv; charset=utf-8', filename=nombre)
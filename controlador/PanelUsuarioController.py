@@ -1,10 +1,9 @@
 # controlador/PanelUsuarioController.py
-from fastapi.templating import Jinja2Templates
+from controlador.plantillas import templates_panel
 from fastapi import Request
 from fastapi.responses import RedirectResponse
 from controlador.AuthController import AuthController
 
-templates_panel = Jinja2Templates(directory="./vista_panel")
 
 class PanelUsuarioController:
     
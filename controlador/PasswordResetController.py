@@ -2,12 +2,11 @@
 from modelo.EmailModel import EmailModel
 from modelo.PasswordResetModel import PasswordResetModel
 from modelo.UsuarioModel import UsuarioModel
-from fastapi.templating import Jinja2Templates
+from controlador.plantillas import templates
 from fastapi import Request
 from fastapi.responses import RedirectResponse
 import os
 
-templates = Jinja2Templates(directory="./vista")
 
 class PasswordResetController:
     
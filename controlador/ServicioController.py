@@ -1,7 +1,6 @@
 from modelo.ServicioModel import ServicioModel
-from fastapi.templating import Jinja2Templates
+from controlador.plantillas import templates
 
-templates = Jinja2Templates(directory="./vista")
 
 class ServicioController:
     
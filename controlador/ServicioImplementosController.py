@@ -1,8 +1,7 @@
 from modelo.ServicioImplementosModel import ServicioImplementosModel
-from fastapi.templating import Jinja2Templates
+from controlador.plantillas import templates
 from fastapi import Request, Query
 
-templates = Jinja2Templates(directory="./vista")
 
 class ServicioImplementosController:
     
@@ -1,7 +1,6 @@
 from modelo.ServicioNutricionModel import ServicioNutricionModel
-from fastapi.templating import Jinja2Templates
+from controlador.plantillas import templates
 
-templates = Jinja2Templates(directory="./vista")
 
 class ServicioNutricionController:
     
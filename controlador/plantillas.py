@@ -0,0 +1,83 @@
+# controlador/plantillas.py - REGISTRO ÚNICO DE PLANTILLAS JINJA2
+import os
+import tempfile
+from typing import Dict
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+
+# Carpetas de plantillas de la aplicación
+DIRECTORIOS_PLANTILLAS = {
+    'vista': './vista',
+    'panel': './vista_panel',
+    'admin': './vista_admin',
+    'fisio': './vista_fisio',
+}
+
+_registro: Dict[str, Jinja2Templates] = {}
+
+
+def es_produccion() -> bool:
+    """ENTORNO=produccion o despliegue en Railway"""
+    entorno = os.environ.get('ENTORNO', '').strip().lower()
+    return entorno in ('produccion', 'production') or 'RAILWAY_ENVIRONMENT' in os.environ
+
+
+def _auto_recarga() -> bool:
+    """
+    Revisar en cada render si la plantilla cambió en disco solo tiene sentido
+    en desarrollo. PLANTILLAS_AUTO_RELOAD=1/0 fuerza el valor.
+    """
+    valor = os.environ.get('PLANTILLAS_AUTO_RELOAD')
+    if valor is not None:
+        return valor.strip().lower() in ('1', 'true', 'si', 'sí')
+    return not es_produccion()
+
+
+def _cache_bytecode() -> jinja2.FileSystemBytecodeCache:
+    """
+    Caché en disco de las plantillas compiladas: un worker que reinicia las
+    carga sin volver a compilarlas. Jinja invalida cada entrada si cambia la
+    plantilla, así que no hay que limpiarla al desplegar.
+    """
+    directorio = os.environ.get('PLANTILLAS_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'fisiosalud_jinja')
+    os.makedirs(directorio, exist_ok=True)
+    return jinja2.FileSystemBytecodeCache(directorio, '%s.cache')
+
+
+def obtener_plantillas(nombre: str = 'vista') -> Jinja2Templates:
+    """Entorno de plantillas de una carpeta, creado una sola vez por proceso"""
+    plantillas = _registro.get(nombre)
+    if plantillas is None:
+        env = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(DIRECTORIOS_PLANTILLAS[nombre]),
+            autoescape=jinja2.select_autoescape(),
+            auto_reload=_auto_recarga(),
+            bytecode_cache=_cache_bytecode(),
+        )
+        plantillas = _registro.setdefault(nombre, Jinja2Templates(env=env))
+    return plantillas
+
+
+def precompilar_plantillas() -> int:
+    """
+    Compila todas las plantillas al arrancar para que ninguna petición pague
+    la compilación. Una plantilla con errores se avisa pero no impide arrancar.
+    """
+    total = 0
+    for nombre in DIRECTORIOS_PLANTILLAS:
+        env = obtener_plantillas(nombre).env
+        for archivo in env.list_templates(extensions=['html']):
+            try:
+                env.get_template(archivo)
+                total += 1
+            except jinja2.TemplateError as e:
+                print(f"⚠️ No se pudo compilar la plantilla {nombre}/{archivo}: {e}")
+    print(f"🧩 Plantillas precompiladas: {total} (auto_reload={'sí' if _auto_recarga() else 'no'})")
+    return total
+
+
+templates = obtener_plantillas('vista')
+templates_panel = obtener_plantillas('panel')
+templates_admin = obtener_plantillas('admin')
+templates_fisio = obtener_plantillas('fisio')
@@ -1,9 +1,10 @@
 from datetime import datetime
 from http.client import HTTPException
-from fastapi import APIRouter, FastAPI, Request, Form, UploadFile, File
+from fastapi import APIRouter, Depends, FastAPI, Request, Form, UploadFile, File
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from controlador.plantillas import templates, templates_panel, templates_admin, templates_fisio, precompilar_plantillas
 from bd.conexion_bd import close_db_connection, get_db_connection
+from bd.unidad_trabajo import UnidadTrabajo, obtener_unidad_trabajo
 from controlador import  AdminServicioController, CarritoController, CitaPacienteController, ReporteFisioController
 from controlador.AdminAnaliticasController import AdminAnaliticasController
 from controlador.AdminFisioController import AdminFisioController
@@ -20,12 +21,20 @@ from controlador.ServicioNutricionController import ServicioNutricionController
 from controlador.PacienteFisioController import PacienteFisioController
 from controlador.ServicioImplementosController import ServicioImplementosController
 from controlador.CitaFisioController import CitaFisioController
+from controlador.CarritoController import CarritoController
 from starlette.middleware.sessions import SessionMiddleware
 from controlador.FisioBotController import router as chatbot_router
 from controlador.AdminUsuariosController import AdminUsuariosController
+from controlador.BusquedaController import BusquedaController
+from controlador.ImportacionController import ImportacionController
 from controlador.AuthAdminController import AuthAdminController
-from modelo import CitaModel
+from modelo.CitaModel import CitaModel, HorarioOcupadoError
+from bd.ejecutor_bd import ejecutar_bd
 from modelo.AdministradorModel import AdministradorModel
+from modelo.BusquedaModel import BusquedaModel
+from modelo.LineasCompraModel import LineasCompraModel
+from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
+from modelo.SnapshotAnaliticasModel import SnapshotAnaliticasModel
 from controlador.AdminServicioController import AdminServicioController
 from controlador.AdminCitaController import AdminCitaController
 from controlador.PasswordResetController import PasswordResetController as PRController
@@ -33,6 +42,7 @@ from dotenv import load_dotenv
 print("\n" + "="*60)
 print("🚀 INICIANDO APLICACIÓN EN RAILWAY")
 print("="*60)
+import asyncio
 import os
 from fastapi import Form, status
 from fastapi.responses import RedirectResponse
@@ -92,11 +102,6 @@ app.add_middleware(
 
 app.include_router(chatbot_router)
 
-templates = Jinja2Templates(directory="./vista")
-templates_panel = Jinja2Templates(directory="./vista_panel")
-templates_admin = Jinja2Templates(directory="./vista_admin")
-templates_fisio = Jinja2Templates(directory="./vista_fisio")
-
 
 @app.get("/diagnose-connection")
 async def diagnose_connection():
@@ -783,7 +788,8 @@ async def agendar_cita_api(
     acudiente_id: Optional[str] = Form(None),
     acudiente_telefono: Optional[str] = Form(None),
     acudiente_correo: Optional[str] = Form(None),
-    emails_adicionales: Optional[str] = Form(None)
+    emails_adicionales: Optional[str] = Form(None),
+    uow: UnidadTrabajo = Depends(obtener_unidad_trabajo)
 ):
     """API para agendar una nueva cita (usuario autogestionado)"""
     return await CitaController.agendar_cita(
@@ -801,7 +807,8 @@ async def agendar_cita_api(
         acudiente_id=acudiente_id,
         acudiente_telefono=acudiente_telefono,
         acudiente_correo=acudiente_correo,
-        emails_adicionales=emails_adicionales
+        emails_adicionales=emails_adicionales,
+        uow=uow
     )
 
 # 2.4 API para agendar cita - ADMINISTRADOR (pool FS-0501 a FS-1000)
@@ -821,7 +828,8 @@ async def agendar_cita_admin_api(
     acudiente_id: Optional[str] = Form(None),
     acudiente_telefono: Optional[str] = Form(None),
     acudiente_correo: Optional[str] = Form(None),
-    emails_adicionales: Optional[str] = Form(None)
+    emails_adicionales: Optional[str] = Form(None),
+    uow: UnidadTrabajo = Depends(obtener_unidad_trabajo)
 ):
     """API para agendar cita como administrador (pool diferente)"""
     try:
@@ -841,9 +849,14 @@ async def agendar_cita_admin_api(
         }
         
         # Usar tipo_usuario = 'admin' para usar pool diferente
-        codigo_cita = CitaModel.crear_cita(datos_cita, tipo_usuario='admin')
+        try:
+            codigo_cita = await ejecutar_bd(CitaModel.crear_cita, datos_cita, tipo_usuario='admin', conn=uow.conexion)
+        except HorarioOcupadoError as e:
+            uow.marcar_fallida()
+            return CitaController.respuesta_horario_ocupado(e)
         
         if not codigo_cita:
+            uow.marcar_fallida()
             return JSONResponse(
                 status_code=500,
                 content={"success": False, "error": "Error al crear la cita como administrador"}
@@ -859,7 +872,13 @@ async def agendar_cita_admin_api(
                 'correo': acudiente_correo or ''
             }
             
-            acudiente_creado = CitaModel.crear_acudiente(codigo_cita, datos_acudiente)
+            acudiente_creado = await ejecutar_bd(CitaModel.crear_acudiente, codigo_cita, datos_acudiente, conn=uow.conexion)
+            if not acudiente_creado:
+                uow.marcar_fallida()
+                return JSONResponse(
+                    status_code=500,
+                    content={"success": False, "error": "No se pudo registrar el acudiente de la cita"}
+                )
         
         return JSONResponse(content={
             "success": True,
@@ -871,6 +890,7 @@ async def agendar_cita_admin_api(
         
     except Exception as e:
         print(f"Error al agendar cita como admin: {e}")
+        uow.marcar_fallida()
         return JSONResponse(
             status_code=500,
             content={"success": False, "error": "Error interno del servidor"}
@@ -893,7 +913,8 @@ async def agendar_cita_fisio_api(
     acudiente_id: Optional[str] = Form(None),
     acudiente_telefono: Optional[str] = Form(None),
     acudiente_correo: Optional[str] = Form(None),
-    emails_adicionales: Optional[str] = Form(None)
+    emails_adicionales: Optional[str] = Form(None),
+    uow: UnidadTrabajo = Depends(obtener_unidad_trabajo)
 ):
     """API para agendar cita como fisioterapeuta (pool diferente)"""
     try:
@@ -913,9 +934,14 @@ async def agendar_cita_fisio_api(
         }
         
         # Usar tipo_usuario = 'fisio' para usar pool diferente
-        codigo_cita = CitaModel.crear_cita(datos_cita, tipo_usuario='fisio')
+        try:
+            codigo_cita = await ejecutar_bd(CitaModel.crear_cita, datos_cita, tipo_usuario='fisio', conn=uow.conexion)
+        except HorarioOcupadoError as e:
+            uow.marcar_fallida()
+            return CitaController.respuesta_horario_ocupado(e)
         
         if not codigo_cita:
+            uow.marcar_fallida()
             return JSONResponse(
                 status_code=500,
                 content={"success": False, "error": "Error al crear la cita como fisioterapeuta"}
@@ -931,7 +957,13 @@ async def agendar_cita_fisio_api(
                 'correo': acudiente_correo or ''
             }
             
-            acudiente_creado = CitaModel.crear_acudiente(codigo_cita, datos_acudiente)
+            acudiente_creado = await ejecutar_bd(CitaModel.crear_acudiente, codigo_cita, datos_acudiente, conn=uow.conexion)
+            if not acudiente_creado:
+                uow.marcar_fallida()
+                return JSONResponse(
+                    status_code=500,
+                    content={"success": False, "error": "No se pudo registrar el acudiente de la cita"}
+                )
         
         return JSONResponse(content={
             "success": True,
@@ -943,17 +975,56 @@ async def agendar_cita_fisio_api(
         
     except Exception as e:
         print(f"Error al agendar cita como fisio: {e}")
+        uow.marcar_fallida()
         return JSONResponse(
             status_code=500,
             content={"success": False, "error": "Error interno del servidor"}
         )
 
+# 2.5.1 API para agendar una serie de citas (plan de tratamiento semanal)
+@app.post("/api/agendar-serie-citas")
+async def agendar_serie_citas_api(
+    request: Request,
+    servicio: str = Form(...),
+    terapeuta_designado: str = Form(...),
+    nombre_paciente: str = Form(...),
+    telefono: str = Form(...),
+    correo: str = Form(...),
+    fecha_inicio: str = Form(...),
+    hora_cita: str = Form(...),
+    tipo_pago: str = Form(...),
+    sesiones: int = Form(...),
+    cada_semanas: int = Form(1),
+    dias_semana: Optional[str] = Form(None),
+    notas_adicionales: Optional[str] = Form(None),
+    emails_adicionales: Optional[str] = Form(None),
+    uow: UnidadTrabajo = Depends(obtener_unidad_trabajo)
+):
+    """API para agendar N sesiones semanales en una sola operación"""
+    return await CitaController.agendar_serie_citas(
+        request=request,
+        servicio=servicio,
+        terapeuta_designado=terapeuta_designado,
+        nombre_paciente=nombre_paciente,
+        telefono=telefono,
+        correo=correo,
+        fecha_inicio=fecha_inicio,
+        hora_cita=hora_cita,
+        tipo_pago=tipo_pago,
+        sesiones=sesiones,
+        cada_semanas=cada_semanas,
+        dias_semana=dias_semana,
+        notas_adicionales=notas_adicionales,
+        emails_adicionales=emails_adicionales,
+        uow=uow
+    )
+
 # 2.6 API para verificar estado del pool de códigos
 @app.get("/api/estado-pool-citas")
-async def verificar_pool_codigos_api(request: Request):
-    """Verifica el estado del pool de códigos FS-0001 a FS-0500"""
+async def verificar_pool_codigos_api(request: Request, siguientes: int = 1):
+    """Verifica el estado del pool de códigos FS-0001 a FS-0500 (y los próximos `siguientes` libres)"""
     try:
-        estado = CitaModel.verificar_estado_pool_usuario()
+        estado = await ejecutar_bd(CitaModel.verificar_estado_pool_usuario, min(max(siguientes, 1), 100))
         return JSONResponse(content=estado)
     except Exception as e:
         print(f"Error al verificar pool: {e}")
@@ -972,7 +1043,7 @@ async def verificar_disponibilidad_api(
 ):
     """Verifica si un horario está disponible para un terapeuta"""
     try:
-        disponible = CitaModel.verificar_disponibilidad_cita(fecha, hora, terapeuta)
+        disponible = await ejecutar_bd(CitaModel.verificar_disponibilidad_cita, fecha, hora, terapeuta)
         return JSONResponse(content={
             "disponible": disponible,
             "fecha": fecha,
@@ -986,6 +1057,18 @@ async def verificar_disponibilidad_api(
             content={"error": "Error al verificar disponibilidad"}
         )
 
+# 2.7.1 API de horarios libres (semana completa por terapeuta o servicio)
+@app.get("/api/disponibilidad")
+async def obtener_disponibilidad_api(
+    request: Request,
+    terapeuta: Optional[str] = None,
+    servicio: Optional[str] = None,
+    desde: Optional[str] = None,
+    dias: int = 7
+):
+    """Todos los horarios libres entre `desde` (hoy por defecto) y `dias` días después"""
+    return await CitaController.obtener_disponibilidad(request, terapeuta, servicio, desde, dias)
+
 # 2.8 API para obtener detalles de una cita
 @app.get("/api/cita/{codigo_cita}")
 async def obtener_cita_api(request: Request, codigo_cita: str):
@@ -1238,23 +1321,23 @@ async def api_obtener_ejercicios_completados(request: Request):
     return await EjercicioPacienteController.obtener_ejercicios_completados(request)
 
 @app.get("/api/ejercicios/pendientes")
-async def api_obtener_ejercicios_pendientes(request: Request):
+async def api_obtener_ejercicios_pendientes(request: Request, uow: UnidadTrabajo = Depends(obtener_unidad_trabajo)):
     print("🔍 [ROUTE] /api/ejercicios/pendientes llamado")
-    return await EjercicioPacienteController.obtener_ejercicios_pendientes(request)
+    return await EjercicioPacienteController.obtener_ejercicios_pendientes(request, uow)
 
 @app.get("/api/ejercicios/estadisticas")
-async def api_obtener_estadisticas_ejercicios(request: Request):
+async def api_obtener_estadisticas_ejercicios(request: Request, uow: UnidadTrabajo = Depends(obtener_unidad_trabajo)):
     print("🔍 [ROUTE] /api/ejercicios/estadisticas llamado")
-    return await EjercicioPacienteController.obtener_estadisticas(request)
+    return await EjercicioPacienteController.obtener_estadisticas(request, uow)
 
 @app.post("/api/ejercicios/completar")
-async def api_marcar_ejercicio_completado(request: Request):
-    return await EjercicioPacienteController.marcar_como_completado(request)
+async def api_marcar_ejercicio_completado(request: Request, uow: UnidadTrabajo = Depends(obtener_unidad_trabajo)):
+    return await EjercicioPacienteController.marcar_como_completado(request, uow)
 
 @app.get("/api/ejercicios/{codigo_ejercicio}")
-async def api_obtener_ejercicio_por_codigo(request: Request, codigo_ejercicio: str):
+async def api_obtener_ejercicio_por_codigo(request: Request, codigo_ejercicio: str, uow: UnidadTrabajo = Depends(obtener_unidad_trabajo)):
     print(f"🔍 [ROUTE] /api/ejercicios/{codigo_ejercicio} llamado")
-    return await EjercicioPacienteController.obtener_ejercicio_por_codigo(request, codigo_ejercicio)
+    return await EjercicioPacienteController.obtener_ejercicio_por_codigo(request, codigo_ejercicio, uow)
 
 
 
@@ -1291,13 +1374,10 @@ async def api_vaciar_carrito(request: Request):
 async def panel_mercado(request: Request):
     print("✅ RUTA /panel_mercado LLAMADA")
     from controlador.CarritoController import CarritoController
-    from fastapi.templating import Jinja2Templates
-    templates = Jinja2Templates(directory="./vista_panel")
-    
     try:
         data = await CarritoController.mostrar_panel_productos(request)
         if data["success"]:
-            return templates.TemplateResponse("panel_producto.html", {
+            return templates_panel.TemplateResponse("panel_producto.html", {
                 "request": request,
                 "usuario": data["usuario"],
                 "carrito_items": data["carrito_items"],
@@ -1308,7 +1388,7 @@ async def panel_mercado(request: Request):
             })
     except Exception as e:
         print(f"Error en panel_mercado: {e}")
-        return templates.TemplateResponse("panel_producto.html", {
+        return templates_panel.TemplateResponse("panel_producto.html", {
             "request": request,
             "error": "Error al cargar el panel"
         })
@@ -1765,6 +1845,11 @@ app.add_api_route("/api/admin/estadisticas",
                   AdminUsuariosController.obtener_estadisticas_admin, 
                   methods=["GET"])
 
+# Búsqueda instantánea (usuarios, pacientes, citas y terapeutas)
+app.add_api_route("/api/admin/buscar", 
+                  BusquedaController.buscar, 
+                  methods=["GET"])
+
 # Usuarios - CRUD completo
 app.add_api_route("/api/admin/usuarios", 
                   AdminUsuariosController.listar_usuarios, 
@@ -1782,6 +1867,11 @@ app.add_api_route("/api/admin/usuarios/{usuario_id}",
                   AdminUsuariosController.eliminar_usuario, 
                   methods=["DELETE"])  # NUEVO ENDPOINT
 
+# Operaciones masivas (eliminar, estado, convertir en paciente)
+app.add_api_route("/api/admin/usuarios/lote", 
+                  AdminUsuariosController.operar_usuarios, 
+                  methods=["POST"])
+
 app.add_api_route("/api/admin/usuarios/{usuario_id}/convertir-paciente", 
                   AdminUsuariosController.convertir_a_paciente, 
                   methods=["POST"])  # NUEVO ENDPOINT
@@ -1799,6 +1889,10 @@ app.add_api_route("/api/admin/pacientes/{codigo_cita}",
                   AdminUsuariosController.eliminar_paciente,  # Si creas esta función
                   methods=["DELETE"])  # OPCIONAL
 
+app.add_api_route("/api/admin/pacientes/lote", 
+                  AdminUsuariosController.operar_pacientes, 
+                  methods=["POST"])
+
 # Historial médico
 app.add_api_route("/api/admin/historial/{usuario_id}", 
                   AdminUsuariosController.obtener_historial_completo, 
@@ -1809,6 +1903,15 @@ app.add_api_route("/api/admin/exportar",
                   AdminUsuariosController.exportar_csv, 
                   methods=["GET"])
 
+# Importación masiva CSV (usuarios, pacientes, terapeutas)
+app.add_api_route("/api/admin/importar", 
+                  ImportacionController.importar_csv, 
+                  methods=["POST"])
+
+app.add_api_route("/api/admin/importar/errores/{reporte}", 
+                  ImportacionController.descargar_errores, 
+                  methods=["GET"])
+
 # Debug
 app.add_api_route("/api/admin/debug", 
                   AdminUsuariosController.debug_archivo, 
@@ -2033,6 +2136,26 @@ app.add_api_route("/api/admin/analiticas/productos-servicios-populares",
                   AdminAnaliticasController.obtener_productos_servicios_populares, 
                   methods=["GET"])
 
+app.add_api_route("/api/admin/analiticas/dashboard", 
+                  AdminAnaliticasController.obtener_dashboard, 
+                  methods=["GET"])
+
+app.add_api_route("/api/admin/analiticas/mapa-calor", 
+                  AdminAnaliticasController.obtener_mapa_calor, 
+                  methods=["GET"])
+
+app.add_api_route("/api/admin/analiticas/exportar", 
+                  AdminAnaliticasController.exportar, 
+                  methods=["GET"])
+
+app.add_api_route("/api/admin/analiticas/cache", 
+                  AdminAnaliticasController.obtener_estadisticas_cache, 
+                  methods=["GET"])
+
+app.add_api_route("/api/admin/analiticas/reconstruir-resumenes", 
+                  AdminAnaliticasController.reconstruir_resumenes, 
+                  methods=["POST"])
+
 # ─────────────────────────────────────────────────────────────
 # PANELES DE ADMINISTRADOR - CORREOS
 # ─────────────────────────────────────────────────────────────
@@ -2106,13 +2229,68 @@ async def health_check():
 
 @app.get("/test-db")
 async def test_db():
-    from bd.conexion_bd import get_db_connection, close_db_connection
+    from bd.conexion_bd import get_db_connection, close_db_connection, obtener_estadisticas_pool
     conn = get_db_connection()
     if conn:
         close_db_connection(conn)
-        return {"database": "connected", "status": "ok"}
+        return {"database": "connected", "status": "ok", "pool": obtener_estadisticas_pool()}
     else:
-        return {"database": "disconnected", "status": "error"}
+        return {"database": "disconnected", "status": "error", "pool": obtener_estadisticas_pool()}
+
+@app.get("/health/db-pool")
+async def estado_pool_db():
+    """Estadísticas del pool de conexiones MySQL (en uso, inactivas, esperas, tiempo de espera)"""
+    from bd.conexion_bd import obtener_estadisticas_pool
+    from bd.ejecutor_bd import obtener_estadisticas_ejecutor
+    estadisticas = obtener_estadisticas_pool()
+    estadisticas["ejecutor"] = obtener_estadisticas_ejecutor()
+    return estadisticas
+
+_tareas_fondo = []
+
+async def _reconciliar_ocupacion_codigos():
+    """Reconstruye periódicamente la ocupación de los pools de códigos desde la BD"""
+    from modelo.OcupacionCodigosModel import OcupacionCodigosModel
+    while True:
+        await ejecutar_bd(OcupacionCodigosModel.reconciliar)
+        await asyncio.sleep(OcupacionCodigosModel.intervalo_reconciliacion())
+
+async def _refrescar_catalogo():
+    """Recarga periódicamente el catálogo de servicios (cambios hechos fuera de la app)"""
+    from modelo.CatalogoModel import CatalogoModel
+    while True:
+        await ejecutar_bd(CatalogoModel.recargar)
+        await asyncio.sleep(CatalogoModel.intervalo_refresco())
+
+@app.on_event("startup")
+async def iniciar_tareas_fondo():
+    """
+    Plantillas, estado de las restricciones de la BD y tareas periódicas en
+    segundo plano. Los cambios de esquema se aplican con `python -m bd.migraciones`.
+    """
+    await asyncio.get_running_loop().run_in_executor(None, precompilar_plantillas)
+    await ejecutar_bd(CitaModel.comprobar_restriccion_reservas)
+    _tareas_fondo.append(asyncio.create_task(_reconciliar_ocupacion_codigos()))
+    _tareas_fondo.append(asyncio.create_task(_refrescar_catalogo()))
+    # Tablas resumen de analíticas (carga inicial si están vacías), sin retrasar el arranque
+    _tareas_fondo.append(asyncio.create_task(ejecutar_bd(ResumenAnaliticasModel.inicializar)))
+    # Líneas de las compras anteriores a compras_lineas (solo las que falten)
+    _tareas_fondo.append(asyncio.create_task(ejecutar_bd(LineasCompraModel.inicializar)))
+    # Copia columnar de citas y ventas para los gráficos de analíticas
+    _tareas_fondo.append(asyncio.create_task(ejecutar_bd(SnapshotAnaliticasModel.cargar)))
+    # Índice de búsqueda instantánea del panel admin
+    _tareas_fondo.append(asyncio.create_task(ejecutar_bd(BusquedaModel.cargar)))
+
+@app.on_event("shutdown")
+async def cerrar_recursos_bd():
+    """Libera el ejecutor y las conexiones del pool al apagar la aplicación"""
+    from bd.ejecutor_bd import cerrar_ejecutor
+    from bd.conexion_bd import obtener_estadisticas_pool, obtener_pool
+    for tarea in _tareas_fondo:
+        tarea.cancel()
+    cerrar_ejecutor()
+    if obtener_estadisticas_pool().get("inicializado"):
+        obtener_pool().cerrar_todo()
 
 # ============================================
 # ESTO YA LO TIENES (MANTENERLO)
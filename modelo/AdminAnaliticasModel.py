@@ -1,7 +1,54 @@
 import json
+import numpy as np  # type: ignore
 from datetime import datetime, date, timedelta
 from bd.conexion_bd import get_db_connection, close_db_connection
 from typing import Dict, List, Tuple, Optional
+from modelo.CacheAnaliticasModel import CacheAnaliticasModel
+from modelo.LineasCompraModel import LineasCompraModel
+from modelo.PronosticoAnaliticasModel import PronosticoAnaliticasModel
+from modelo.MapaCalorAnaliticasModel import MapaCalorAnaliticasModel
+from modelo.SnapshotAnaliticasModel import SnapshotAnaliticasModel, EPOCA
+
+# Ingresos de servicios sobre resumen_citas_dia r: citas no canceladas por el
+# precio del servicio en el catálogo (el código es la clave; puede repetirse el nombre)
+SQL_PRECIO_SERVICIO = """
+    LEFT JOIN (
+        SELECT nombre, MAX(precio) as precio FROM servicio_terapia GROUP BY nombre
+    ) s ON s.nombre = r.servicio
+"""
+SQL_INGRESOS_SERVICIO = (
+    "COALESCE(SUM(CASE WHEN r.estado NOT IN ('cancelada', 'cancelado') "
+    "THEN r.citas * s.precio END), 0)"
+)
+
+# Días de los que depende cada función (para invalidar solo lo afectado)
+
+def _rango_mes_actual(*_, **__):
+    return AdminAnaliticasModel.rango_periodo('month')
+
+
+def _rango_mes_y_anterior(*_, **__):
+    inicio, fin = AdminAnaliticasModel.rango_periodo('month')
+    return AdminAnaliticasModel._sumar_meses(inicio, -1), fin
+
+
+def _rango_ultimo_anio(*_, **__):
+    return date.today() - timedelta(days=366), None
+
+
+def _rango_grafico(periodo: str = 'month', fecha_desde: str = None, fecha_hasta: str = None, *_, **__):
+    return AdminAnaliticasModel.rango_grafico(periodo, fecha_desde, fecha_hasta)
+
+
+def _rango_financiero(periodo: str = 'month', fecha_desde: date = None, fecha_hasta: date = None,
+                      comparar: str = 'anterior', comparar_desde: date = None, comparar_hasta: date = None):
+    inicio, fin = AdminAnaliticasModel.rango_periodo(periodo, fecha_desde, fecha_hasta)
+    if comparar_desde and comparar_hasta:
+        inicio_anterior, fin_anterior = comparar_desde, comparar_hasta
+    else:
+        inicio_anterior, fin_anterior = AdminAnaliticasModel.rango_comparacion(inicio, fin, comparar)
+    return min(inicio, inicio_anterior), max(fin, fin_anterior)
+
 
 class AdminAnaliticasModel:
     
@@ -15,6 +62,7 @@ class AdminAnaliticasModel:
             return None
     
     @staticmethod
+    @CacheAnaliticasModel.cacheado('estadisticas', ttl=60, rango=_rango_mes_y_anterior)
     def obtener_estadisticas_generales() -> Tuple[Dict, str]:
         """
         Obtiene estadísticas generales del sistema usando datos reales de BD
@@ -24,7 +72,7 @@ class AdminAnaliticasModel:
             return {}, "Error de conexión con la base de datos"
         
         try:
-            with conn.cursor(dictionary=True) as cursor:
+            with conn.cursor() as cursor:
                 # 1. Total usuarios registrados
                 query_usuarios = "SELECT COUNT(*) as total FROM usuario"
                 cursor.execute(query_usuarios)
@@ -53,75 +101,69 @@ class AdminAnaliticasModel:
                 else:
                     ultimo_dia_mes_actual = hoy.replace(month=hoy.month + 1, day=1) - timedelta(days=1)
                 
-                # 5. Citas este mes
-                query_citas_mes = """
-                SELECT COUNT(*) as total FROM cita 
-                WHERE fecha_cita BETWEEN %s AND %s
-                """
-                cursor.execute(query_citas_mes, (primer_dia_mes_actual, ultimo_dia_mes_actual))
-                citas_mes_actual = cursor.fetchone()['total'] or 0
-                
-                # 6. Citas mes anterior (para cálculo de variación)
+                # 5. Citas, ingresos y ventas de este mes y del anterior (tablas resumen)
                 primer_dia_mes_anterior = (primer_dia_mes_actual - timedelta(days=1)).replace(day=1)
                 ultimo_dia_mes_anterior = primer_dia_mes_actual - timedelta(days=1)
                 
-                query_citas_mes_anterior = """
-                SELECT COUNT(*) as total FROM cita 
-                WHERE fecha_cita BETWEEN %s AND %s
+                query_citas_meses = """
+                SELECT 
+                    COALESCE(SUM(CASE WHEN fecha >= %s THEN citas END), 0) as actual,
+                    COALESCE(SUM(CASE WHEN fecha < %s THEN citas END), 0) as anterior
+                FROM resumen_citas_dia
+                WHERE fecha BETWEEN %s AND %s
                 """
-                cursor.execute(query_citas_mes_anterior, (primer_dia_mes_anterior, ultimo_dia_mes_anterior))
-                citas_mes_anterior = cursor.fetchone()['total'] or 0
-                
-                # 7. Ingresos del mes (de planes de pacientes)
-                query_ingresos_citas_mes = """
-                SELECT COALESCE(SUM(precio_plan), 0) as total FROM paciente 
-                WHERE fecha_creacion_reporte BETWEEN %s AND %s
+                cursor.execute(query_citas_meses, (
+                    primer_dia_mes_actual, primer_dia_mes_actual,
+                    primer_dia_mes_anterior, ultimo_dia_mes_actual
+                ))
+                fila = cursor.fetchone()
+                citas_mes_actual = int(fila['actual'] or 0)
+                citas_mes_anterior = int(fila['anterior'] or 0)
+                
+                # 6. Ingresos de planes de pacientes
+                query_ingresos_planes = """
+                SELECT 
+                    COALESCE(SUM(CASE WHEN fecha >= %s THEN ingresos END), 0) as actual,
+                    COALESCE(SUM(CASE WHEN fecha < %s THEN ingresos END), 0) as anterior
+                FROM resumen_planes_dia
+                WHERE fecha BETWEEN %s AND %s
                 """
-                cursor.execute(query_ingresos_citas_mes, (primer_dia_mes_actual, ultimo_dia_mes_actual))
-                ingresos_citas_mes_actual = float(cursor.fetchone()['total'] or 0)
-                
-                # 8. Ingresos del mes (de productos vendidos)
-                query_ingresos_productos_mes = """
-                SELECT COALESCE(SUM(total), 0) as total FROM compras_confirmadas 
-                WHERE fecha_compra BETWEEN %s AND %s
+                cursor.execute(query_ingresos_planes, (
+                    primer_dia_mes_actual, primer_dia_mes_actual,
+                    primer_dia_mes_anterior, ultimo_dia_mes_actual
+                ))
+                fila = cursor.fetchone()
+                ingresos_citas_mes_actual = float(fila['actual'] or 0)
+                ingresos_citas_mes_anterior = float(fila['anterior'] or 0)
+                
+                # 7. Ingresos de productos y número de pedidos
+                query_ventas_meses = """
+                SELECT 
+                    COALESCE(SUM(CASE WHEN fecha >= %s THEN ingresos END), 0) as ingresos_actual,
+                    COALESCE(SUM(CASE WHEN fecha < %s THEN ingresos END), 0) as ingresos_anterior
+                FROM resumen_ventas_dia
+                WHERE fecha BETWEEN %s AND %s
                 """
-                cursor.execute(query_ingresos_productos_mes, (primer_dia_mes_actual, ultimo_dia_mes_actual))
-                ingresos_productos_mes_actual = float(cursor.fetchone()['total'] or 0)
+                cursor.execute(query_ventas_meses, (
+                    primer_dia_mes_actual, primer_dia_mes_actual,
+                    primer_dia_mes_anterior, ultimo_dia_mes_actual
+                ))
+                fila = cursor.fetchone()
+                ingresos_productos_mes_actual = float(fila['ingresos_actual'] or 0)
+                ingresos_productos_mes_anterior = float(fila['ingresos_anterior'] or 0)
+                # Un pedido con varios productos cuenta una vez
+                total_ventas = LineasCompraModel.contar_pedidos(cursor, primer_dia_mes_actual, ultimo_dia_mes_actual)
                 
                 ingresos_mes_actual = ingresos_citas_mes_actual + ingresos_productos_mes_actual
-                
-                # 9. Ingresos mes anterior
-                query_ingresos_citas_mes_anterior = """
-                SELECT COALESCE(SUM(precio_plan), 0) as total FROM paciente 
-                WHERE fecha_creacion_reporte BETWEEN %s AND %s
-                """
-                cursor.execute(query_ingresos_citas_mes_anterior, (primer_dia_mes_anterior, ultimo_dia_mes_anterior))
-                ingresos_citas_mes_anterior = float(cursor.fetchone()['total'] or 0)
-                
-                query_ingresos_productos_mes_anterior = """
-                SELECT COALESCE(SUM(total), 0) as total FROM compras_confirmadas 
-                WHERE fecha_compra BETWEEN %s AND %s
-                """
-                cursor.execute(query_ingresos_productos_mes_anterior, (primer_dia_mes_anterior, ultimo_dia_mes_anterior))
-                ingresos_productos_mes_anterior = float(cursor.fetchone()['total'] or 0)
-                
                 ingresos_mes_anterior = ingresos_citas_mes_anterior + ingresos_productos_mes_anterior
                 
-                # 10. Total productos vendidos este mes
-                query_ventas_mes = """
-                SELECT COUNT(*) as total FROM compras_confirmadas 
-                WHERE fecha_compra BETWEEN %s AND %s
-                """
-                cursor.execute(query_ventas_mes, (primer_dia_mes_actual, ultimo_dia_mes_actual))
-                total_ventas = cursor.fetchone()['total'] or 0
-                
-                # 11. Servicio más vendido (basado en citas)
+                # 8. Servicio más vendido (basado en citas)
                 query_servicio_popular = """
                 SELECT 
                     servicio as nombre,
-                    COUNT(*) as cantidad
-                FROM cita
-                WHERE fecha_cita BETWEEN %s AND %s
+                    SUM(citas) as cantidad
+                FROM resumen_citas_dia
+                WHERE fecha BETWEEN %s AND %s
                 GROUP BY servicio
                 ORDER BY cantidad DESC
                 LIMIT 1
@@ -130,16 +172,15 @@ class AdminAnaliticasModel:
                 servicio_popular_data = cursor.fetchone()
                 servicio_mas_vendido = servicio_popular_data['nombre'] if servicio_popular_data else 'No hay datos'
                 
-                # 12. Terapeuta con más citas (usando datos reales)
+                # 9. Terapeuta con más citas
                 query_terapeuta_popular = """
                 SELECT 
-                    c.terapeuta_designado as nombre,
-                    COUNT(c.cita_id) as citas
-                FROM cita c
-                WHERE c.fecha_cita BETWEEN %s AND %s
-                    AND c.terapeuta_designado IS NOT NULL
-                    AND c.terapeuta_designado != ''
-                GROUP BY c.terapeuta_designado
+                    terapeuta as nombre,
+                    SUM(citas) as citas
+                FROM resumen_citas_dia
+                WHERE fecha BETWEEN %s AND %s
+                    AND terapeuta != ''
+                GROUP BY terapeuta
                 ORDER BY citas DESC
                 LIMIT 1
                 """
@@ -147,35 +188,24 @@ class AdminAnaliticasModel:
                 terapeuta_popular_data = cursor.fetchone()
                 terapeuta_mas_citas = terapeuta_popular_data['nombre'] if terapeuta_popular_data else 'No hay datos'
                 
-                # 13. Ocupación promedio real (basada en horas de terapeutas)
-                # Primero, obtener todos los terapeutas activos
-                query_terapeutas_activos = """
-                SELECT nombre_completo FROM terapeuta WHERE estado = 'Activo'
+                # 10. Ocupación promedio real: citas del mes de cada terapeuta activo
+                # (8 horas/día × 22 días/mes = 176 horas disponibles, 1 hora por cita)
+                query_ocupacion = """
+                SELECT 
+                    t.nombre_completo,
+                    COALESCE(SUM(r.citas), 0) as citas
+                FROM terapeuta t
+                LEFT JOIN resumen_citas_dia r 
+                    ON r.terapeuta = t.nombre_completo
+                    AND r.fecha BETWEEN %s AND %s
+                WHERE t.estado = 'Activo'
+                GROUP BY t.nombre_completo
                 """
-                cursor.execute(query_terapeutas_activos)
+                cursor.execute(query_ocupacion, (primer_dia_mes_actual, ultimo_dia_mes_actual))
                 terapeutas_activos = cursor.fetchall()
                 
-                total_horas_disponibles = 0
-                total_horas_ocupadas = 0
-                
-                for terapeuta in terapeutas_activos:
-                    nombre_terapeuta = terapeuta['nombre_completo']
-                    
-                    # Horas disponibles: 8 horas/día × 22 días/mes = 176 horas
-                    horas_disponibles_terapeuta = 176
-                    total_horas_disponibles += horas_disponibles_terapeuta
-                    
-                    # Contar citas de este terapeuta
-                    query_citas_terapeuta = """
-                    SELECT COUNT(*) as citas
-                    FROM cita 
-                    WHERE terapeuta_designado = %s 
-                        AND fecha_cita BETWEEN %s AND %s
-                    """
-                    cursor.execute(query_citas_terapeuta, (nombre_terapeuta, primer_dia_mes_actual, ultimo_dia_mes_actual))
-                    citas_terapeuta = cursor.fetchone()
-                    horas_ocupadas_terapeuta = (citas_terapeuta['citas'] or 0) * 1  # 1 hora por cita
-                    total_horas_ocupadas += horas_ocupadas_terapeuta
+                total_horas_disponibles = 176 * len(terapeutas_activos)
+                total_horas_ocupadas = sum(int(t['citas'] or 0) for t in terapeutas_activos)
                 
                 # Calcular ocupación promedio
                 if total_horas_disponibles > 0:
@@ -183,7 +213,7 @@ class AdminAnaliticasModel:
                 else:
                     ocupacion_promedio = 0
                 
-                # 14. Pacientes nuevos del mes
+                # 11. Pacientes nuevos del mes (usuarios distintos: no se puede sumar por día)
                 query_pacientes_nuevos = """
                 SELECT COUNT(DISTINCT ID_usuario) as total FROM paciente 
                 WHERE fecha_creacion_reporte BETWEEN %s AND %s
@@ -191,7 +221,7 @@ class AdminAnaliticasModel:
                 cursor.execute(query_pacientes_nuevos, (primer_dia_mes_actual, ultimo_dia_mes_actual))
                 pacientes_nuevos = cursor.fetchone()['total'] or 0
                 
-                # 15. Calcular variaciones
+                # 12. Calcular variaciones
                 variacion_citas = 0
                 if citas_mes_anterior > 0:
                     variacion_citas = ((citas_mes_actual - citas_mes_anterior) / citas_mes_anterior) * 100
@@ -200,13 +230,13 @@ class AdminAnaliticasModel:
                 if ingresos_mes_anterior > 0:
                     variacion_ingresos = ((ingresos_mes_actual - ingresos_mes_anterior) / ingresos_mes_anterior) * 100
                 
-                # 16. Producto más vendido
+                # 13. Producto más vendido
                 query_producto_popular = """
                 SELECT 
                     producto_nombre as nombre,
-                    COUNT(*) as cantidad
-                FROM compras_confirmadas
-                WHERE fecha_compra BETWEEN %s AND %s
+                    SUM(unidades) as cantidad
+                FROM resumen_ventas_dia
+                WHERE fecha BETWEEN %s AND %s
                 GROUP BY producto_nombre
                 ORDER BY cantidad DESC
                 LIMIT 1
@@ -247,205 +277,73 @@ class AdminAnaliticasModel:
                 close_db_connection(conn)
     
     @staticmethod
-    def obtener_datos_grafico(periodo: str = 'month', fecha_desde: str = None, fecha_hasta: str = None) -> Tuple[Dict, str]:
+    @CacheAnaliticasModel.cacheado('graficos', ttl=120, rango=_rango_grafico)
+    def obtener_datos_grafico(periodo: str = 'month', fecha_desde: str = None, fecha_hasta: str = None,
+                              granularidad: str = None, terapeutas: Tuple[str, ...] = (),
+                              servicios: Tuple[str, ...] = (), estados: Tuple[str, ...] = ()) -> Tuple[Dict, str]:
         """
-        Obtiene datos para los gráficos usando datos reales de BD
+        Obtiene datos para los gráficos: ingresos y citas desde la copia
+        columnar en memoria (SnapshotAnaliticasModel) y pacientes nuevos de la BD.
+        granularidad = day|week|month|quarter (por defecto día hasta 90 días,
+        mes en adelante); terapeutas/servicios/estados filtran las citas.
         """
+        # Definir rango de fechas según período
+        try:
+            fecha_inicio, fecha_fin = AdminAnaliticasModel.rango_grafico(periodo, fecha_desde, fecha_hasta)
+        except ValueError as e:
+            return {}, str(e)
+        
+        if granularidad is None:
+            # Agrupar por día, o por mes para períodos largos
+            por_dia = periodo in ['week', 'month', 'custom'] and (fecha_fin - fecha_inicio).days <= 90
+            granularidad = 'day' if por_dia else 'month'
+        try:
+            SnapshotAnaliticasModel.validar_granularidad(granularidad)
+        except ValueError as e:
+            return {}, str(e)
+        
+        # 1 y 2. Ingresos y citas por cubeta, con las cubetas vacías a 0
+        ingresos, error = SnapshotAnaliticasModel.serie('ventas', fecha_inicio, fecha_fin, granularidad, medida='total')
+        if error:
+            return {}, error
+        citas, error = SnapshotAnaliticasModel.serie(
+            'citas', fecha_inicio, fecha_fin, granularidad,
+            filtros={'terapeuta': terapeutas, 'servicio': servicios, 'estado': [e.lower() for e in estados]}
+        )
+        if error:
+            return {}, error
+        
         conn = AdminAnaliticasModel.get_db_connection()
         if not conn:
             return {}, "Error de conexión con la base de datos"
         
         try:
-            hoy = date.today()
+            with conn.cursor() as cursor:
+                # 3. Pacientes nuevos: usuarios distintos por cubeta
+                cursor.execute("""
+                SELECT DISTINCT DATE(fecha_creacion_reporte) as fecha, ID_usuario
+                FROM paciente
+                WHERE fecha_creacion_reporte >= %s AND fecha_creacion_reporte < %s
+                """, (fecha_inicio, fecha_fin + timedelta(days=1)))
+                filas = cursor.fetchall()
             
-            # Definir rango de fechas según período
-            if periodo == 'custom' and fecha_desde and fecha_hasta:
-                fecha_inicio = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
-                fecha_fin = datetime.strptime(fecha_hasta, '%Y-%m-%d').date()
-            elif periodo == 'week':
-                fecha_inicio = hoy - timedelta(days=7)
-                fecha_fin = hoy
-            elif periodo == 'quarter':
-                fecha_inicio = hoy - timedelta(days=90)
-                fecha_fin = hoy
-            elif periodo == 'year':
-                fecha_inicio = hoy - timedelta(days=365)
-                fecha_fin = hoy
-            else:  # month (últimos 30 días)
-                fecha_inicio = hoy - timedelta(days=30)
-                fecha_fin = hoy
+            dias = np.array([(f['fecha'] - EPOCA).days for f in filas], dtype=np.int64)
+            usuarios = np.array([str(f['ID_usuario']) for f in filas])
+            pacientes = SnapshotAnaliticasModel.contar_distintos(dias, usuarios, fecha_inicio, fecha_fin, granularidad)
             
-            with conn.cursor(dictionary=True) as cursor:
-                # 1. Datos de ingresos por día/mes
-                if periodo in ['week', 'month', 'custom'] and (fecha_fin - fecha_inicio).days <= 90:
-                    # Agrupar por día
-                    query_ingresos = """
-                    SELECT 
-                        DATE(fecha_compra) as fecha,
-                        COALESCE(SUM(total), 0) as ingresos
-                    FROM compras_confirmadas
-                    WHERE fecha_compra BETWEEN %s AND %s
-                    GROUP BY DATE(fecha_compra)
-                    ORDER BY fecha
-                    """
-                else:
-                    # Agrupar por mes para períodos largos
-                    query_ingresos = """
-                    SELECT 
-                        DATE_FORMAT(fecha_compra, '%Y-%m') as mes,
-                        COALESCE(SUM(total), 0) as ingresos
-                    FROM compras_confirmadas
-                    WHERE fecha_compra BETWEEN %s AND %s
-                    GROUP BY DATE_FORMAT(fecha_compra, '%Y-%m')
-                    ORDER BY mes
-                    """
-                
-                cursor.execute(query_ingresos, (fecha_inicio, fecha_fin))
-                datos_ingresos = cursor.fetchall()
-                
-                # Procesar datos de ingresos
-                if periodo in ['week', 'month', 'custom'] and (fecha_fin - fecha_inicio).days <= 90:
-                    labels_ingresos = []
-                    data_ingresos = []
-                    
-                    # Crear datos para todos los días del rango
-                    current = fecha_inicio
-                    while current <= fecha_fin:
-                        labels_ingresos.append(current.strftime('%d/%m'))
-                        # Buscar ingresos para esta fecha
-                        ingresos_dia = 0
-                        for dato in datos_ingresos:
-                            if dato['fecha'] and dato['fecha'].date() == current:
-                                ingresos_dia = float(dato['ingresos'] or 0)
-                                break
-                        data_ingresos.append(ingresos_dia)
-                        current += timedelta(days=1)
-                else:
-                    labels_ingresos = [d['mes'] for d in datos_ingresos if d['mes']]
-                    data_ingresos = [float(d['ingresos'] or 0) for d in datos_ingresos]
-                
-                # 2. Datos de citas
-                if periodo in ['week', 'month', 'custom'] and (fecha_fin - fecha_inicio).days <= 90:
-                    query_citas = """
-                    SELECT 
-                        DATE(fecha_cita) as fecha,
-                        COUNT(*) as citas
-                    FROM cita
-                    WHERE fecha_cita BETWEEN %s AND %s
-                    GROUP BY DATE(fecha_cita)
-                    ORDER BY fecha
-                    """
-                else:
-                    query_citas = """
-                    SELECT 
-                        DATE_FORMAT(fecha_cita, '%Y-%m') as mes,
-                        COUNT(*) as citas
-                    FROM cita
-                    WHERE fecha_cita BETWEEN %s AND %s
-                    GROUP BY DATE_FORMAT(fecha_cita, '%Y-%m')
-                    ORDER BY mes
-                    """
-                
-                cursor.execute(query_citas, (fecha_inicio, fecha_fin))
-                datos_citas = cursor.fetchall()
-                
-                # Procesar datos de citas
-                if periodo in ['week', 'month', 'custom'] and (fecha_fin - fecha_inicio).days <= 90:
-                    labels_citas = []
-                    data_citas = []
-                    
-                    current = fecha_inicio
-                    while current <= fecha_fin:
-                        labels_citas.append(current.strftime('%d/%m'))
-                        citas_dia = 0
-                        for dato in datos_citas:
-                            if dato['fecha'] and dato['fecha'].date() == current:
-                                citas_dia = dato['citas'] or 0
-                                break
-                        data_citas.append(citas_dia)
-                        current += timedelta(days=1)
-                else:
-                    labels_citas = [d['mes'] for d in datos_citas if d['mes']]
-                    data_citas = [d['citas'] or 0 for d in datos_citas]
-                
-                # 3. Datos de pacientes nuevos
-                if periodo in ['week', 'month', 'custom'] and (fecha_fin - fecha_inicio).days <= 90:
-                    query_pacientes = """
-                    SELECT 
-                        DATE(fecha_creacion_reporte) as fecha,
-                        COUNT(DISTINCT ID_usuario) as pacientes
-                    FROM paciente
-                    WHERE fecha_creacion_reporte BETWEEN %s AND %s
-                    GROUP BY DATE(fecha_creacion_reporte)
-                    ORDER BY fecha
-                    """
-                else:
-                    query_pacientes = """
-                    SELECT 
-                        DATE_FORMAT(fecha_creacion_reporte, '%Y-%m') as mes,
-                        COUNT(DISTINCT ID_usuario) as pacientes
-                    FROM paciente
-                    WHERE fecha_creacion_reporte BETWEEN %s AND %s
-                    GROUP BY DATE_FORMAT(fecha_creacion_reporte, '%Y-%m')
-                    ORDER BY mes
-                    """
-                
-                cursor.execute(query_pacientes, (fecha_inicio, fecha_fin))
-                datos_pacientes = cursor.fetchall()
-                
-                # Procesar datos de pacientes
-                if periodo in ['week', 'month', 'custom'] and (fecha_fin - fecha_inicio).days <= 90:
-                    labels_pacientes = labels_citas.copy()
-                    data_pacientes = []
-                    
-                    # Crear diccionario para fácil búsqueda
-                    pacientes_dict = {}
-                    for dato in datos_pacientes:
-                        if dato['fecha']:
-                            pacientes_dict[dato['fecha'].date()] = dato['pacientes'] or 0
-                    
-                    # Mapear a las fechas del rango
-                    for i, label in enumerate(labels_pacientes):
-                        try:
-                            # Convertir label 'dd/mm' a fecha
-                            day, month = label.split('/')
-                            fecha_key = date(hoy.year, int(month), int(day))
-                            data_pacientes.append(pacientes_dict.get(fecha_key, 0))
-                        except:
-                            data_pacientes.append(0)
-                else:
-                    labels_pacientes = labels_citas.copy()
-                    data_pacientes = []
-                    
-                    pacientes_dict = {}
-                    for dato in datos_pacientes:
-                        if dato['mes']:
-                            pacientes_dict[dato['mes']] = dato['pacientes'] or 0
-                    
-                    for mes in labels_pacientes:
-                        data_pacientes.append(pacientes_dict.get(mes, 0))
-                
-                resultado = {
-                    'ingresos': {
-                        'labels': labels_ingresos,
-                        'data': data_ingresos
-                    },
-                    'citas': {
-                        'labels': labels_citas,
-                        'data': data_citas
-                    },
-                    'pacientes': {
-                        'labels': labels_pacientes,
-                        'data': data_pacientes
-                    },
-                    'periodo': periodo,
-                    'rango': {
-                        'fecha_inicio': fecha_inicio.strftime('%Y-%m-%d'),
-                        'fecha_fin': fecha_fin.strftime('%Y-%m-%d')
-                    }
+            resultado = {
+                'ingresos': ingresos,
+                'citas': citas,
+                'pacientes': pacientes,
+                'periodo': periodo,
+                'granularidad': granularidad,
+                'rango': {
+                    'fecha_inicio': fecha_inicio.strftime('%Y-%m-%d'),
+                    'fecha_fin': fecha_fin.strftime('%Y-%m-%d')
                 }
-                
-                return resultado, None
+            }
+            
+            return resultado, None
                 
         except Exception as e:
             print(f"Error en obtener_datos_grafico: {e}")
@@ -455,6 +353,7 @@ class AdminAnaliticasModel:
                 close_db_connection(conn)
     
     @staticmethod
+    @CacheAnaliticasModel.cacheado('servicios_populares', ttl=120, rango=_rango_mes_y_anterior)
     def obtener_servicios_populares() -> Tuple[List[Dict], str]:
         """
         Obtiene los servicios más populares usando datos reales de citas
@@ -464,7 +363,7 @@ class AdminAnaliticasModel:
             return [], "Error de conexión con la base de datos"
         
         try:
-            with conn.cursor(dictionary=True) as cursor:
+            with conn.cursor() as cursor:
                 hoy = date.today()
                 primer_dia_mes_actual = hoy.replace(day=1)
                 
@@ -474,17 +373,19 @@ class AdminAnaliticasModel:
                 else:
                     ultimo_dia_mes_actual = hoy.replace(month=hoy.month + 1, day=1) - timedelta(days=1)
                 
-                # Obtener servicios más solicitados en citas
-                query_servicios = """
+                # Obtener servicios más solicitados en citas, con sus ingresos
+                # al precio del catálogo (sin contar las canceladas)
+                query_servicios = f"""
                 SELECT 
-                    servicio as nombre,
-                    COUNT(*) as cantidad,
-                    'servicio' as tipo
-                FROM cita
-                WHERE fecha_cita BETWEEN %s AND %s
-                    AND servicio IS NOT NULL
-                    AND servicio != ''
-                GROUP BY servicio
+                    r.servicio as nombre,
+                    SUM(r.citas) as cantidad,
+                    'servicio' as tipo,
+                    {SQL_INGRESOS_SERVICIO} as ingresos
+                FROM resumen_citas_dia r
+                {SQL_PRECIO_SERVICIO}
+                WHERE r.fecha BETWEEN %s AND %s
+                    AND r.servicio != ''
+                GROUP BY r.servicio
                 ORDER BY cantidad DESC
                 LIMIT 10
                 """
@@ -495,10 +396,11 @@ class AdminAnaliticasModel:
                 query_productos = """
                 SELECT 
                     producto_nombre as nombre,
-                    COUNT(*) as cantidad,
-                    producto_tipo as tipo
-                FROM compras_confirmadas
-                WHERE fecha_compra BETWEEN %s AND %s
+                    SUM(unidades) as cantidad,
+                    producto_tipo as tipo,
+                    SUM(ingresos) as ingresos
+                FROM resumen_ventas_dia
+                WHERE fecha BETWEEN %s AND %s
                 GROUP BY producto_nombre, producto_tipo
                 ORDER BY cantidad DESC
                 LIMIT 10
@@ -506,52 +408,42 @@ class AdminAnaliticasModel:
                 cursor.execute(query_productos, (primer_dia_mes_actual, ultimo_dia_mes_actual))
                 productos_data = cursor.fetchall()
                 
+                # Crecimiento frente al mes anterior: una consulta por tipo, no por ítem
+                crecimiento_servicios = AdminAnaliticasModel._calcular_crecimientos(
+                    cursor, 'servicio', [s['nombre'] for s in servicios_data],
+                    primer_dia_mes_actual, ultimo_dia_mes_actual
+                )
+                crecimiento_productos = AdminAnaliticasModel._calcular_crecimientos(
+                    cursor, 'producto', [p['nombre'] for p in productos_data],
+                    primer_dia_mes_actual, ultimo_dia_mes_actual
+                )
+                
                 # Combinar y procesar datos
                 todos_los_items = []
                 
                 # Procesar servicios
                 for servicio in servicios_data:
-                    # Calcular ingresos estimados ($50 por cita promedio)
-                    ingresos_estimados = (servicio['cantidad'] or 0) * 50
-                    
-                    # Calcular crecimiento (comparar con mes anterior)
-                    crecimiento = AdminAnaliticasModel._calcular_crecimiento_servicio(
-                        servicio['nombre'], 'servicio', cursor,
-                        primer_dia_mes_actual, ultimo_dia_mes_actual
-                    )
+                    crecimiento = crecimiento_servicios.get(servicio['nombre'], "0%")
                     
                     todos_los_items.append({
                         'nombre': servicio['nombre'],
                         'tipo': servicio['tipo'],
-                        'cantidad': servicio['cantidad'] or 0,
-                        'ingresos': round(ingresos_estimados, 2),
+                        'cantidad': int(servicio['cantidad'] or 0),
+                        'ingresos': round(float(servicio['ingresos'] or 0), 2),
                         'crecimiento': crecimiento
                     })
                 
                 # Procesar productos
                 for producto in productos_data:
-                    # Obtener ingresos reales del producto
-                    query_ingresos_producto = """
-                    SELECT 
-                        COALESCE(SUM(total), 0) as ingresos
-                    FROM compras_confirmadas
-                    WHERE producto_nombre = %s
-                        AND fecha_compra BETWEEN %s AND %s
-                    """
-                    cursor.execute(query_ingresos_producto, (producto['nombre'], primer_dia_mes_actual, ultimo_dia_mes_actual))
-                    ingresos_data = cursor.fetchone()
-                    ingresos_reales = float(ingresos_data['ingresos'] or 0)
+                    # Ingresos reales del producto (ya vienen en la consulta agrupada)
+                    ingresos_reales = float(producto['ingresos'] or 0)
                     
-                    # Calcular crecimiento
-                    crecimiento = AdminAnaliticasModel._calcular_crecimiento_servicio(
-                        producto['nombre'], producto['tipo'], cursor,
-                        primer_dia_mes_actual, ultimo_dia_mes_actual
-                    )
+                    crecimiento = crecimiento_productos.get(producto['nombre'], "0%")
                     
                     todos_los_items.append({
                         'nombre': producto['nombre'],
                         'tipo': producto['tipo'],
-                        'cantidad': producto['cantidad'] or 0,
+                        'cantidad': int(producto['cantidad'] or 0),
                         'ingresos': round(ingresos_reales, 2),
                         'crecimiento': crecimiento
                     })
@@ -572,65 +464,64 @@ class AdminAnaliticasModel:
                 close_db_connection(conn)
     
     @staticmethod
-    def _calcular_crecimiento_servicio(nombre: str, tipo: str, cursor, fecha_inicio, fecha_fin):
+    def _formatear_crecimiento(cantidad_actual: int, cantidad_anterior: int) -> str:
+        """Variación porcentual respecto al mes anterior, como texto (+12.5%)"""
+        if cantidad_anterior > 0:
+            crecimiento = ((cantidad_actual - cantidad_anterior) / cantidad_anterior) * 100
+            return f"{'+' if crecimiento > 0 else ''}{round(crecimiento, 1)}%"
+        elif cantidad_actual > 0:
+            return "+100%"  # Nuevo servicio/producto
+        else:
+            return "0%"
+    
+    @staticmethod
+    def _calcular_crecimientos(cursor, tipo: str, nombres: List[str], fecha_inicio, fecha_fin) -> Dict[str, str]:
         """
-        Calcula el crecimiento de un servicio/producto comparando con el mes anterior
+        Calcula el crecimiento de varios servicios (tipo 'servicio') o productos
+        comparando con el mes anterior, en una sola consulta agrupada por nombre
         """
+        nombres = [n for n in dict.fromkeys(nombres) if n]
+        if not nombres:
+            return {}
+        
         try:
             # Calcular mes anterior
             primer_dia_mes_anterior = (fecha_inicio - timedelta(days=1)).replace(day=1)
-            ultimo_dia_mes_anterior = fecha_inicio - timedelta(days=1)
             
             if tipo == 'servicio':
-                query_actual = """
-                SELECT COUNT(*) as cantidad
-                FROM cita
-                WHERE servicio = %s
-                    AND fecha_cita BETWEEN %s AND %s
-                """
-                query_anterior = """
-                SELECT COUNT(*) as cantidad
-                FROM cita
-                WHERE servicio = %s
-                    AND fecha_cita BETWEEN %s AND %s
-                """
+                tabla, columna, medida = 'resumen_citas_dia', 'servicio', 'citas'
             else:
-                query_actual = """
-                SELECT COUNT(*) as cantidad
-                FROM compras_confirmadas
-                WHERE producto_nombre = %s
-                    AND fecha_compra BETWEEN %s AND %s
-                """
-                query_anterior = """
-                SELECT COUNT(*) as cantidad
-                FROM compras_confirmadas
-                WHERE producto_nombre = %s
-                    AND fecha_compra BETWEEN %s AND %s
-                """
-            
-            # Cantidad mes actual
-            cursor.execute(query_actual, (nombre, fecha_inicio, fecha_fin))
-            actual_data = cursor.fetchone()
-            cantidad_actual = actual_data['cantidad'] or 0 if actual_data else 0
+                tabla, columna, medida = 'resumen_ventas_dia', 'producto_nombre', 'unidades'
             
-            # Cantidad mes anterior
-            cursor.execute(query_anterior, (nombre, primer_dia_mes_anterior, ultimo_dia_mes_anterior))
-            anterior_data = cursor.fetchone()
-            cantidad_anterior = anterior_data['cantidad'] or 0 if anterior_data else 0
+            marcadores = ', '.join(['%s'] * len(nombres))
+            query = f"""
+            SELECT 
+                {columna} as nombre,
+                COALESCE(SUM(CASE WHEN fecha >= %s THEN {medida} END), 0) as actual,
+                COALESCE(SUM(CASE WHEN fecha < %s THEN {medida} END), 0) as anterior
+            FROM {tabla}
+            WHERE {columna} IN ({marcadores})
+                AND fecha BETWEEN %s AND %s
+            GROUP BY {columna}
+            """
+            cursor.execute(query, (fecha_inicio, fecha_inicio, *nombres, primer_dia_mes_anterior, fecha_fin))
+            cantidades = {fila['nombre']: fila for fila in cursor.fetchall()}
             
-            # Calcular crecimiento
-            if cantidad_anterior > 0:
-                crecimiento = ((cantidad_actual - cantidad_anterior) / cantidad_anterior) * 100
-                return f"{'+' if crecimiento > 0 else ''}{round(crecimiento, 1)}%"
-            elif cantidad_actual > 0:
-                return "+100%"  # Nuevo servicio/producto
-            else:
-                return "0%"
+            crecimientos = {}
+            for nombre in nombres:
+                fila = cantidades.get(nombre)
+                crecimientos[nombre] = AdminAnaliticasModel._formatear_crecimiento(
+                    int(fila['actual']) if fila else 0,
+                    int(fila['anterior']) if fila else 0
+                )
+            return crecimientos
                 
-        except Exception:
-            return "N/A"
+        except Exception as e:
+            print(f"Error en _calcular_crecimientos: {e}")
+            return {nombre: "N/A" for nombre in nombres}
     
     @staticmethod
+    @CacheAnaliticasModel.cacheado('rendimiento_terapeutas', ttl=120, rango=_rango_mes_actual)
     def obtener_rendimiento_terapeutas() -> Tuple[List[Dict], str]:
         """
         Obtiene el rendimiento real de los terapeutas basado en datos de la BD
@@ -640,7 +531,7 @@ class AdminAnaliticasModel:
             return [], "Error de conexión con la base de datos"
         
         try:
-            with conn.cursor(dictionary=True) as cursor:
+            with conn.cursor() as cursor:
                 hoy = date.today()
                 primer_dia_mes_actual = hoy.replace(day=1)
                 
@@ -667,32 +558,39 @@ class AdminAnaliticasModel:
                 if not terapeutas_base:
                     return [], None
                 
+                # Citas e ingresos del mes de todos los terapeutas activos: dos
+                # consultas agrupadas por el nombre del resumen (índice
+                # terapeuta, fecha), filtradas por los nombres activos
+                nombres = list(dict.fromkeys(t['nombre'] for t in terapeutas_base))
+                marcadores = ', '.join(['%s'] * len(nombres))
+                rango_mes = (primer_dia_mes_actual, ultimo_dia_mes_actual)
+                
+                query_citas = f"""
+                SELECT r.terapeuta, SUM(r.citas) as citas_atendidas
+                FROM resumen_citas_dia r
+                WHERE r.terapeuta IN ({marcadores})
+                    AND r.fecha BETWEEN %s AND %s
+                GROUP BY r.terapeuta
+                """
+                cursor.execute(query_citas, (*nombres, *rango_mes))
+                citas_por_terapeuta = {f['terapeuta']: int(f['citas_atendidas'] or 0) for f in cursor.fetchall()}
+                
+                query_ingresos = f"""
+                SELECT r.terapeuta, COALESCE(SUM(r.ingresos), 0) as ingresos
+                FROM resumen_planes_dia r
+                WHERE r.terapeuta IN ({marcadores})
+                    AND r.fecha BETWEEN %s AND %s
+                GROUP BY r.terapeuta
+                """
+                cursor.execute(query_ingresos, (*nombres, *rango_mes))
+                ingresos_por_terapeuta = {f['terapeuta']: float(f['ingresos'] or 0) for f in cursor.fetchall()}
+                
                 resultado = []
                 
                 for terapeuta in terapeutas_base:
                     nombre = terapeuta['nombre']
-                    
-                    # Contar citas del terapeuta en el mes actual
-                    query_citas = """
-                    SELECT COUNT(*) as citas_atendidas
-                    FROM cita 
-                    WHERE terapeuta_designado = %s 
-                        AND fecha_cita BETWEEN %s AND %s
-                    """
-                    cursor.execute(query_citas, (nombre, primer_dia_mes_actual, ultimo_dia_mes_actual))
-                    citas_data = cursor.fetchone()
-                    citas_atendidas = citas_data['citas_atendidas'] or 0 if citas_data else 0
-                    
-                    # Calcular ingresos generados por este terapeuta (de planes)
-                    query_ingresos = """
-                    SELECT COALESCE(SUM(p.precio_plan), 0) as ingresos
-                    FROM paciente p
-                    WHERE p.terapeuta_asignado = %s 
-                        AND p.fecha_creacion_reporte BETWEEN %s AND %s
-                    """
-                    cursor.execute(query_ingresos, (nombre, primer_dia_mes_actual, ultimo_dia_mes_actual))
-                    ingresos_data = cursor.fetchone()
-                    ingresos_generados = float(ingresos_data['ingresos'] or 0) if ingresos_data else 0.0
+                    citas_atendidas = citas_por_terapeuta.get(nombre, 0)
+                    ingresos_generados = ingresos_por_terapeuta.get(nombre, 0.0)
                     
                     # Calcular ocupación real
                     # Asumiendo horario de trabajo: 8 horas/día × 22 días/mes = 176 horas
@@ -746,6 +644,53 @@ class AdminAnaliticasModel:
             if conn:
                 close_db_connection(conn)
     
+    @staticmethod
+    @CacheAnaliticasModel.cacheado('top_terapeutas', ttl=120, rango=_rango_mes_actual)
+    def obtener_top_terapeutas(limite: int = 5) -> Tuple[List[Dict], str]:
+        """
+        Terapeutas activos con más citas en el mes actual
+        """
+        conn = AdminAnaliticasModel.get_db_connection()
+        if not conn:
+            return [], "Error de conexión con la base de datos"
+        
+        try:
+            with conn.cursor() as cursor:
+                primer_dia_mes_actual, ultimo_dia_mes_actual = AdminAnaliticasModel.rango_periodo('month')
+                
+                query = """
+                SELECT 
+                    t.nombre_completo as nombre,
+                    t.especialidad,
+                    COALESCE(SUM(r.citas), 0) as citas_atendidas
+                FROM terapeuta t
+                LEFT JOIN resumen_citas_dia r ON t.nombre_completo = r.terapeuta 
+                    AND r.fecha BETWEEN %s AND %s
+                WHERE t.estado = 'Activo'
+                GROUP BY t.nombre_completo, t.especialidad
+                HAVING citas_atendidas > 0
+                ORDER BY citas_atendidas DESC
+                LIMIT %s
+                """
+                cursor.execute(query, (primer_dia_mes_actual, ultimo_dia_mes_actual, limite))
+                
+                resultado = []
+                for terapeuta in cursor.fetchall():
+                    resultado.append({
+                        'nombre': terapeuta['nombre'],
+                        'especialidad': terapeuta['especialidad'],
+                        'citas_atendidas': int(terapeuta['citas_atendidas'])
+                    })
+                
+                return resultado, None
+                
+        except Exception as e:
+            print(f"Error en obtener_top_terapeutas: {e}")
+            return [], f"Error interno: {str(e)}"
+        finally:
+            if conn:
+                close_db_connection(conn)
+    
     @staticmethod
     def _calcular_calificacion_terapeuta(citas_atendidas: int) -> float:
         """
@@ -766,64 +711,200 @@ class AdminAnaliticasModel:
         else:
             return 2.0  # Base para terapeutas sin citas
     
+    # ===== PERÍODOS DE COMPARACIÓN =====
+    
+    PERIODOS_FINANCIEROS = ('month', 'quarter', 'year', 'custom')
+    
+    @staticmethod
+    def rango_grafico(periodo: str = 'month', fecha_desde: str = None,
+                      fecha_hasta: str = None) -> Tuple[date, date]:
+        """
+        Rango de los gráficos: últimos 7/30/90/365 días hasta hoy, o el rango
+        custom desde/hasta (YYYY-MM-DD). Lanza ValueError si las fechas no son
+        válidas o desde es posterior a hasta.
+        """
+        hoy = date.today()
+        if periodo == 'custom' and fecha_desde and fecha_hasta:
+            try:
+                inicio = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
+                fin = datetime.strptime(fecha_hasta, '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                raise ValueError("Las fechas deben tener formato YYYY-MM-DD")
+            if inicio > fin:
+                raise ValueError("La fecha desde no puede ser posterior a la fecha hasta")
+            return inicio, fin
+        dias = {'week': 7, 'quarter': 90, 'year': 365}.get(periodo, 30)
+        return hoy - timedelta(days=dias), hoy
+    
+    @staticmethod
+    def rango_periodo(periodo: str = 'month', fecha_desde: date = None, fecha_hasta: date = None,
+                      referencia: date = None) -> Tuple[date, date]:
+        """
+        Primer y último día del período: mes, trimestre o año natural que
+        contiene `referencia` (hoy por defecto), o el rango custom desde/hasta.
+        Lanza ValueError si el período o el rango no son válidos.
+        """
+        hoy = referencia or date.today()
+        if periodo == 'custom':
+            if not fecha_desde or not fecha_hasta:
+                raise ValueError("El período custom requiere fecha desde y hasta")
+            if fecha_desde > fecha_hasta:
+                raise ValueError("La fecha desde no puede ser posterior a la fecha hasta")
+            return fecha_desde, fecha_hasta
+        
+        if periodo == 'month':
+            inicio = hoy.replace(day=1)
+            meses = 1
+        elif periodo == 'quarter':
+            inicio = hoy.replace(month=3 * ((hoy.month - 1) // 3) + 1, day=1)
+            meses = 3
+        elif periodo == 'year':
+            inicio = hoy.replace(month=1, day=1)
+            meses = 12
+        else:
+            raise ValueError(f"Período no válido: {periodo}")
+        
+        return inicio, AdminAnaliticasModel._sumar_meses(inicio, meses) - timedelta(days=1)
+    
+    @staticmethod
+    def _sumar_meses(fecha: date, meses: int) -> date:
+        """Primer día del mes que está `meses` meses después (o antes) de `fecha`"""
+        indice = fecha.year * 12 + (fecha.month - 1) + meses
+        return date(indice // 12, indice % 12 + 1, 1)
+    
+    @staticmethod
+    def _meses_naturales(inicio: date, fin: date) -> Optional[int]:
+        """Número de meses si el rango son meses naturales completos; None si no"""
+        if inicio.day != 1 or (fin + timedelta(days=1)).day != 1:
+            return None
+        return (fin.year - inicio.year) * 12 + fin.month - inicio.month + 1
+    
+    @staticmethod
+    def rango_comparacion(inicio: date, fin: date, comparar: str = 'anterior') -> Tuple[date, date]:
+        """
+        Ventana con la que se compara [inicio, fin]:
+          • 'anterior': el período inmediatamente anterior de la misma duración
+            (mes, trimestre o año natural anterior si el rango lo es).
+          • 'anio_anterior': las mismas fechas un año antes.
+        """
+        if comparar == 'anio_anterior':
+            def un_anio_antes(fecha: date) -> date:
+                try:
+                    return fecha.replace(year=fecha.year - 1)
+                except ValueError:  # 29 de febrero
+                    return fecha.replace(year=fecha.year - 1, day=28)
+            return un_anio_antes(inicio), un_anio_antes(fin)
+        if comparar != 'anterior':
+            raise ValueError(f"Comparación no válida: {comparar}")
+        
+        meses = AdminAnaliticasModel._meses_naturales(inicio, fin)
+        if meses:
+            inicio_anterior = AdminAnaliticasModel._sumar_meses(inicio, -meses)
+            return inicio_anterior, inicio - timedelta(days=1)
+        dias = (fin - inicio).days + 1
+        return inicio - timedelta(days=dias), inicio - timedelta(days=1)
+    
+    @staticmethod
+    def _ingresos_periodo(cursor, inicio: date, fin: date) -> Dict:
+        """
+        Ingresos por planes, ingresos por productos, número de pedidos y de
+        citas entre inicio y fin (inclusive). Cada cifra es un rango sobre la
+        clave primaria (fecha, ...) de su tabla resumen o sobre el índice por
+        fecha de compras_lineas.
+        """
+        cursor.execute("""
+            SELECT COALESCE(SUM(ingresos), 0) as total
+            FROM resumen_planes_dia
+            WHERE fecha BETWEEN %s AND %s
+        """, (inicio, fin))
+        servicios = float(cursor.fetchone()['total'] or 0)
+        
+        cursor.execute("""
+            SELECT COALESCE(SUM(ingresos), 0) as total
+            FROM resumen_ventas_dia
+            WHERE fecha BETWEEN %s AND %s
+        """, (inicio, fin))
+        productos = float(cursor.fetchone()['total'] or 0)
+        ventas = LineasCompraModel.contar_pedidos(cursor, inicio, fin)
+        
+        cursor.execute("""
+            SELECT COALESCE(SUM(citas), 0) as total
+            FROM resumen_citas_dia
+            WHERE fecha BETWEEN %s AND %s
+        """, (inicio, fin))
+        citas = int(cursor.fetchone()['total'] or 0)
+        
+        return {
+            'servicios': servicios,
+            'productos': productos,
+            'total': servicios + productos,
+            'ventas': ventas,
+            'citas': citas,
+        }
+    
+    @staticmethod
+    def _variacion(actual: float, anterior: float) -> float:
+        """Crecimiento porcentual; +100 si el período anterior fue 0 y este no"""
+        if anterior > 0:
+            return (actual - anterior) / anterior * 100
+        return 100.0 if actual > 0 else 0.0
+    
     @staticmethod
-    def obtener_datos_financieros() -> Tuple[Dict, str]:
+    @CacheAnaliticasModel.cacheado('datos_financieros', ttl=120, rango=_rango_financiero)
+    def obtener_datos_financieros(periodo: str = 'month', fecha_desde: date = None, fecha_hasta: date = None,
+                                  comparar: str = 'anterior', comparar_desde: date = None,
+                                  comparar_hasta: date = None) -> Tuple[Dict, str]:
         """
-        Obtiene datos financieros reales de la BD
+        Obtiene datos financieros reales de la BD para un período (mes,
+        trimestre, año o rango custom) comparado con otra ventana: la anterior
+        de igual duración, la del año anterior o una explícita
+        (comparar_desde/comparar_hasta).
         """
+        try:
+            fecha_inicio, fecha_fin = AdminAnaliticasModel.rango_periodo(periodo, fecha_desde, fecha_hasta)
+            if comparar_desde and comparar_hasta:
+                inicio_anterior, fin_anterior = AdminAnaliticasModel.rango_periodo('custom', comparar_desde, comparar_hasta)
+            else:
+                inicio_anterior, fin_anterior = AdminAnaliticasModel.rango_comparacion(fecha_inicio, fecha_fin, comparar)
+        except ValueError as e:
+            return {}, str(e)
+        
         conn = AdminAnaliticasModel.get_db_connection()
         if not conn:
             return {}, "Error de conexión con la base de datos"
         
         try:
-            with conn.cursor(dictionary=True) as cursor:
-                hoy = date.today()
-                primer_dia_mes_actual = hoy.replace(day=1)
+            with conn.cursor() as cursor:
+                # 1. INGRESOS del período y de la ventana de comparación
+                actual = AdminAnaliticasModel._ingresos_periodo(cursor, fecha_inicio, fecha_fin)
+                anterior = AdminAnaliticasModel._ingresos_periodo(cursor, inicio_anterior, fin_anterior)
                 
-                # Calcular último día del mes actual
-                if hoy.month == 12:
-                    ultimo_dia_mes_actual = hoy.replace(year=hoy.year + 1, month=1, day=1) - timedelta(days=1)
-                else:
-                    ultimo_dia_mes_actual = hoy.replace(month=hoy.month + 1, day=1) - timedelta(days=1)
-                
-                # 1. INGRESOS
-                # Ingresos por servicios (planes de pacientes)
-                query_ingresos_servicios = """
-                SELECT COALESCE(SUM(precio_plan), 0) as total
-                FROM paciente
-                WHERE fecha_creacion_reporte BETWEEN %s AND %s
-                """
-                cursor.execute(query_ingresos_servicios, (primer_dia_mes_actual, ultimo_dia_mes_actual))
-                ingresos_servicios = float(cursor.fetchone()['total'] or 0)
-                
-                # Ingresos por productos
-                query_ingresos_productos = """
-                SELECT COALESCE(SUM(total), 0) as total
-                FROM compras_confirmadas
-                WHERE fecha_compra BETWEEN %s AND %s
-                """
-                cursor.execute(query_ingresos_productos, (primer_dia_mes_actual, ultimo_dia_mes_actual))
-                ingresos_productos = float(cursor.fetchone()['total'] or 0)
-                
-                total_ingresos = ingresos_servicios + ingresos_productos
+                ingresos_servicios = actual['servicios']
+                ingresos_productos = actual['productos']
+                total_ingresos = actual['total']
+                total_citas = actual['citas']
                 
                 # 2. GASTOS (simulados para este ejemplo)
-                # En un sistema real, estos vendrían de una tabla de gastos
+                # En un sistema real, estos vendrían de una tabla de gastos.
+                # Los gastos fijos mensuales se escalan a la duración del período.
+                meses_periodo = AdminAnaliticasModel._meses_naturales(fecha_inicio, fecha_fin)
+                if meses_periodo is None:
+                    meses_periodo = ((fecha_fin - fecha_inicio).days + 1) / 30.44
                 
-                # Gastos de salarios (estimado: $2000 por terapeuta activo)
+                # Gastos de salarios (estimado: $2000 por terapeuta activo al mes)
                 query_terapeutas_activos = "SELECT COUNT(*) as total FROM terapeuta WHERE estado = 'Activo'"
                 cursor.execute(query_terapeutas_activos)
                 num_terapeutas = cursor.fetchone()['total'] or 0
-                gastos_salarios = num_terapeutas * 2000  # $2000 por terapeuta
+                gastos_salarios = num_terapeutas * 2000 * meses_periodo
                 
                 # Gastos de insumos (estimado: 15% de ingresos por productos)
                 gastos_insumos = ingresos_productos * 0.15
                 
-                # Gastos de alquiler (fijo estimado)
-                gastos_alquiler = 1500  # $1500 mensuales
+                # Gastos de alquiler (fijo estimado: $1500 mensuales)
+                gastos_alquiler = 1500 * meses_periodo
                 
-                # Gastos de servicios (luz, agua, internet)
-                gastos_servicios = 300  # $300 mensuales
+                # Gastos de servicios (luz, agua, internet: $300 mensuales)
+                gastos_servicios = 300 * meses_periodo
                 
                 # Gastos de marketing (estimado: 10% de ingresos totales)
                 gastos_marketing = total_ingresos * 0.10
@@ -838,44 +919,13 @@ class AdminAnaliticasModel:
                 margen_beneficio = (resultado_neto / total_ingresos * 100) if total_ingresos > 0 else 0
                 
                 # Ingresos por cita (promedio)
-                query_total_citas = """
-                SELECT COUNT(*) as total
-                FROM cita
-                WHERE fecha_cita BETWEEN %s AND %s
-                """
-                cursor.execute(query_total_citas, (primer_dia_mes_actual, ultimo_dia_mes_actual))
-                total_citas = cursor.fetchone()['total'] or 0
-                
                 ingreso_por_cita = (ingresos_servicios / total_citas) if total_citas > 0 else 0
                 
                 # ROI Marketing
                 roi_marketing = ((total_ingresos - gastos_marketing) / gastos_marketing * 100) if gastos_marketing > 0 else 0
                 
-                # 5. TENDENCIA (comparar con mes anterior)
-                primer_dia_mes_anterior = (primer_dia_mes_actual - timedelta(days=1)).replace(day=1)
-                ultimo_dia_mes_anterior = primer_dia_mes_actual - timedelta(days=1)
-                
-                # Ingresos mes anterior
-                query_ingresos_anterior = """
-                SELECT 
-                    COALESCE(SUM(p.precio_plan), 0) as servicios,
-                    COALESCE(SUM(cc.total), 0) as productos
-                FROM paciente p
-                LEFT JOIN compras_confirmadas cc ON 1=1
-                WHERE (p.fecha_creacion_reporte BETWEEN %s AND %s)
-                    OR (cc.fecha_compra BETWEEN %s AND %s)
-                """
-                # Nota: Esta consulta necesita optimización para sistemas grandes
-                cursor.execute(query_ingresos_anterior, 
-                             (primer_dia_mes_anterior, ultimo_dia_mes_anterior,
-                              primer_dia_mes_anterior, ultimo_dia_mes_anterior))
-                ingresos_anterior_data = cursor.fetchone()
-                
-                # Simplificar para este ejemplo
-                ingresos_mes_anterior = total_ingresos * 0.85  # 85% del mes actual
-                
-                # Calcular crecimiento
-                crecimiento_ingresos = ((total_ingresos - ingresos_mes_anterior) / ingresos_mes_anterior * 100) if ingresos_mes_anterior > 0 else 0
+                # 5. TENDENCIA (comparación real con la otra ventana)
+                variacion = AdminAnaliticasModel._variacion
                 
                 resultado = {
                     'ingresos_servicios': round(ingresos_servicios, 2),
@@ -891,11 +941,25 @@ class AdminAnaliticasModel:
                     'margen_beneficio': round(margen_beneficio, 1),
                     'ingreso_por_cita': round(ingreso_por_cita, 2),
                     'roi_marketing': round(roi_marketing, 1),
-                    'crecimiento_ingresos': round(crecimiento_ingresos, 1),
+                    'crecimiento_ingresos': round(variacion(total_ingresos, anterior['total']), 1),
+                    'crecimiento_servicios': round(variacion(ingresos_servicios, anterior['servicios']), 1),
+                    'crecimiento_productos': round(variacion(ingresos_productos, anterior['productos']), 1),
+                    'crecimiento_citas': round(variacion(total_citas, anterior['citas']), 1),
                     'total_citas': total_citas,
+                    'total_ventas': actual['ventas'],
                     'num_terapeutas': num_terapeutas,
-                    'fecha_inicio': primer_dia_mes_actual.strftime('%Y-%m-%d'),
-                    'fecha_fin': ultimo_dia_mes_actual.strftime('%Y-%m-%d')
+                    'periodo': periodo,
+                    'fecha_inicio': fecha_inicio.strftime('%Y-%m-%d'),
+                    'fecha_fin': fecha_fin.strftime('%Y-%m-%d'),
+                    'comparacion': {
+                        'fecha_inicio': inicio_anterior.strftime('%Y-%m-%d'),
+                        'fecha_fin': fin_anterior.strftime('%Y-%m-%d'),
+                        'ingresos_servicios': round(anterior['servicios'], 2),
+                        'ingresos_productos': round(anterior['productos'], 2),
+                        'total_ingresos': round(anterior['total'], 2),
+                        'total_citas': anterior['citas'],
+                        'total_ventas': anterior['ventas']
+                    }
                 }
                 
                 return resultado, None
@@ -908,45 +972,45 @@ class AdminAnaliticasModel:
                 close_db_connection(conn)
     
     @staticmethod
-    def obtener_tendencias() -> Tuple[Dict, str]:
+    @CacheAnaliticasModel.cacheado('tendencias', ttl=600, rango=_rango_ultimo_anio)
+    def obtener_tendencias(periodos: int = 3, periodo: str = 'month') -> Tuple[Dict, str]:
         """
-        Obtiene tendencias y análisis predictivo basado en datos históricos
+        Obtiene tendencias y el pronóstico de citas, ingresos y ocupación
+        para los próximos `periodos` meses o semanas (periodo='month'|'week')
         """
+        hoy = date.today()
+        # Antes de abrir la conexión: el ajuste y el mapa de calor (si no están en caché) usan la suya
+        modelo, error = PronosticoAnaliticasModel.obtener_modelo(hoy)
+        if error:
+            return {}, error
+        periodo_reciente = MapaCalorAnaliticasModel.rango_por_defecto(hoy)
+        picos, error = MapaCalorAnaliticasModel.picos_periodo(*periodo_reciente)
+        if error:
+            return {}, error
+        horas_por_cita, error = MapaCalorAnaliticasModel.horas_por_cita(*periodo_reciente)
+        if error:
+            return {}, error
+        
         conn = AdminAnaliticasModel.get_db_connection()
         if not conn:
             return {}, "Error de conexión con la base de datos"
         
         try:
-            with conn.cursor(dictionary=True) as cursor:
-                hoy = date.today()
-                
-                # 1. HORAS PICO (días de la semana con más citas)
-                query_horas_pico = """
-                SELECT 
-                    DAYNAME(fecha_cita) as dia_semana,
-                    HOUR(hora_cita) as hora,
-                    COUNT(*) as citas
-                FROM cita
-                WHERE fecha_cita >= DATE_SUB(%s, INTERVAL 3 MONTH)
-                GROUP BY DAYNAME(fecha_cita), HOUR(hora_cita)
-                ORDER BY citas DESC
-                LIMIT 5
-                """
-                cursor.execute(query_horas_pico, (hoy,))
-                horas_pico_data = cursor.fetchall()
-                
-                horas_pico = []
-                for item in horas_pico_data:
-                    horas_pico.append(f"{item['dia_semana']} {item['hora']}:00 - {item['citas']} citas")
+            with conn.cursor() as cursor:
+                # 1. HORAS PICO: celdas día × hora con más horas ocupadas (duración real)
+                horas_pico = [
+                    f"{p['dia']} {p['hora']}:00 - {p['horas']} h ({p['citas']} citas)"
+                    for p in picos
+                ]
                 
                 # 2. DÍAS CON MÁS TRABAJO
                 query_dias_pico = """
                 SELECT 
-                    DAYNAME(fecha_cita) as dia_semana,
-                    COUNT(*) as citas
-                FROM cita
-                WHERE fecha_cita >= DATE_SUB(%s, INTERVAL 3 MONTH)
-                GROUP BY DAYNAME(fecha_cita)
+                    DAYNAME(fecha) as dia_semana,
+                    SUM(citas) as citas
+                FROM resumen_citas_dia
+                WHERE fecha >= DATE_SUB(%s, INTERVAL 3 MONTH)
+                GROUP BY DAYNAME(fecha)
                 ORDER BY citas DESC
                 LIMIT 3
                 """
@@ -955,16 +1019,16 @@ class AdminAnaliticasModel:
                 
                 dias_pico = []
                 for item in dias_pico_data:
-                    dias_pico.append(f"{item['dia_semana']} - {item['citas']} citas")
+                    dias_pico.append(f"{item['dia_semana']} - {int(item['citas'])} citas")
                 
                 # 3. MESES MÁS OCUPADOS (último año)
                 query_meses_pico = """
                 SELECT 
-                    MONTHNAME(fecha_cita) as mes,
-                    COUNT(*) as citas
-                FROM cita
-                WHERE fecha_cita >= DATE_SUB(%s, INTERVAL 12 MONTH)
-                GROUP BY MONTH(fecha_cita), MONTHNAME(fecha_cita)
+                    MONTHNAME(fecha) as mes,
+                    SUM(citas) as citas
+                FROM resumen_citas_dia
+                WHERE fecha >= DATE_SUB(%s, INTERVAL 12 MONTH)
+                GROUP BY MONTH(fecha), MONTHNAME(fecha)
                 ORDER BY citas DESC
                 LIMIT 3
                 """
@@ -973,53 +1037,40 @@ class AdminAnaliticasModel:
                 
                 meses_pico = []
                 for item in meses_pico_data:
-                    meses_pico.append(f"{item['mes']} - {item['citas']} citas")
-                
-                # 4. PREDICCIÓN PARA EL PRÓXIMO MES
-                # Calcular promedio de crecimiento mensual
-                query_crecimiento_mensual = """
-                SELECT 
-                    DATE_FORMAT(fecha_cita, '%Y-%m') as mes,
-                    COUNT(*) as citas
-                FROM cita
-                WHERE fecha_cita >= DATE_SUB(%s, INTERVAL 6 MONTH)
-                GROUP BY DATE_FORMAT(fecha_cita, '%Y-%m')
-                ORDER BY mes
-                """
-                cursor.execute(query_crecimiento_mensual, (hoy,))
-                crecimiento_data = cursor.fetchall()
-                
-                # Calcular tasa de crecimiento promedio
-                if len(crecimiento_data) >= 2:
-                    citas_actuales = crecimiento_data[-1]['citas'] if crecimiento_data else 0
-                    citas_anterior = crecimiento_data[-2]['citas'] if len(crecimiento_data) > 1 else 0
-                    
-                    if citas_anterior > 0:
-                        tasa_crecimiento = ((citas_actuales - citas_anterior) / citas_anterior) * 100
-                    else:
-                        tasa_crecimiento = 10  # 10% por defecto si no hay datos
+                    meses_pico.append(f"{item['mes']} - {int(item['citas'])} citas")
+                
+                # 4. PRONÓSTICO: tendencia + estacionalidad semanal y mensual; la
+                # ocupación usa la franja horaria de cada terapeuta activo y la
+                # duración media real de las citas de los últimos 3 meses
+                horas_semana = PronosticoAnaliticasModel.horas_semana(cursor)
+                
+                pronostico = PronosticoAnaliticasModel.proyectar(
+                    modelo, hoy, periodos, periodo, horas_semana, horas_por_cita
+                )
+                if periodo == 'month':
+                    proximo_mes = pronostico[0]
                 else:
-                    tasa_crecimiento = 10  # 10% por defecto
-                
-                # Calcular predicciones
-                query_citas_actual_mes = """
-                SELECT COUNT(*) as citas
-                FROM cita
-                WHERE MONTH(fecha_cita) = MONTH(%s)
-                    AND YEAR(fecha_cita) = YEAR(%s)
-                """
-                cursor.execute(query_citas_actual_mes, (hoy, hoy))
-                citas_actual_mes = cursor.fetchone()['citas'] or 0
-                
-                # Predicción para el próximo mes
-                citas_estimadas = int(citas_actual_mes * (1 + tasa_crecimiento/100))
-                
-                # Calcular ingresos estimados (promedio $50 por cita)
-                ingresos_por_cita_promedio = 50
-                ingresos_esperados = citas_estimadas * ingresos_por_cita_promedio
-                
-                # Estimación de pacientes nuevos (20% de las citas estimadas)
-                pacientes_nuevos_estimados = int(citas_estimadas * 0.20)
+                    proximo_mes = PronosticoAnaliticasModel.proyectar(
+                        modelo, hoy, 1, 'month', horas_semana, horas_por_cita
+                    )[0]
+                
+                citas_estimadas = proximo_mes['citas']['estimado']
+                tasa_crecimiento = PronosticoAnaliticasModel.tasa_crecimiento_mensual(modelo)
+                ocupacion_estimada = proximo_mes['ocupacion']['estimado']
+                
+                # 5. Pacientes nuevos: la proporción pacientes nuevos / citas de
+                # los últimos 3 meses aplicada a las citas estimadas
+                cursor.execute("""
+                SELECT
+                    (SELECT COUNT(DISTINCT ID_usuario) FROM paciente
+                     WHERE fecha_creacion_reporte >= %s AND fecha_creacion_reporte < %s) as nuevos,
+                    (SELECT COALESCE(SUM(citas), 0) FROM resumen_citas_dia
+                     WHERE fecha >= %s AND fecha < %s) as citas
+                """, periodo_reciente * 2)
+                historico = cursor.fetchone()
+                citas_recientes = int(historico['citas'] or 0)
+                proporcion_nuevos = int(historico['nuevos'] or 0) / citas_recientes if citas_recientes else 0.0
+                pacientes_nuevos_estimados = int(round(citas_estimadas * proporcion_nuevos))
                 
                 resultado = {
                     'horas_pico': horas_pico,
@@ -1027,13 +1078,23 @@ class AdminAnaliticasModel:
                     'meses_pico': meses_pico,
                     'prediccion_proximo_mes': {
                         'citas_estimadas': citas_estimadas,
-                        'ingresos_esperados': round(ingresos_esperados, 2),
+                        'citas_minimo': proximo_mes['citas']['minimo'],
+                        'citas_maximo': proximo_mes['citas']['maximo'],
+                        'ingresos_esperados': proximo_mes['ingresos']['estimado'],
+                        'ingresos_minimo': proximo_mes['ingresos']['minimo'],
+                        'ingresos_maximo': proximo_mes['ingresos']['maximo'],
+                        'ocupacion_estimada': ocupacion_estimada,
                         'pacientes_nuevos_estimados': pacientes_nuevos_estimados,
                         'tasa_crecimiento': round(tasa_crecimiento, 1)
                     },
+                    'pronostico': {
+                        'periodo': periodo,
+                        'periodos': pronostico,
+                        'modelo': PronosticoAnaliticasModel.resumen_modelo(modelo),
+                    },
                     'analisis': {
                         'tendencia': 'creciente' if tasa_crecimiento > 0 else 'decreciente',
-                        'nivel_ocupacion': 'alto' if citas_actual_mes > 100 else 'medio' if citas_actual_mes > 50 else 'bajo',
+                        'nivel_ocupacion': 'alto' if ocupacion_estimada >= 75 else 'medio' if ocupacion_estimada >= 40 else 'bajo',
                         'recomendaciones': [
                             'Aumentar personal en horas pico',
                             'Ofrecer promociones en días de baja demanda',
@@ -1052,6 +1113,7 @@ class AdminAnaliticasModel:
                 close_db_connection(conn)
     
     @staticmethod
+    @CacheAnaliticasModel.cacheado('usuarios_pacientes', ttl=300)
     def obtener_datos_usuario_paciente() -> Tuple[Dict, str]:
         """
         Obtiene datos para gráfico de usuarios vs pacientes
@@ -1061,7 +1123,7 @@ class AdminAnaliticasModel:
             return {}, "Error de conexión con la base de datos"
         
         try:
-            with conn.cursor(dictionary=True) as cursor:
+            with conn.cursor() as cursor:
                 # Total usuarios registrados
                 query_usuarios = "SELECT COUNT(*) as total FROM usuario"
                 cursor.execute(query_usuarios)
@@ -1097,11 +1159,11 @@ class AdminAnaliticasModel:
                 # Crecimiento de usuarios (últimos 6 meses)
                 query_crecimiento_usuarios = """
                 SELECT 
-                    DATE_FORMAT(fecha_registro, '%Y-%m') as mes,
+                    DATE_FORMAT(fecha_registro, '%%Y-%%m') as mes,
                     COUNT(*) as nuevos_usuarios
                 FROM usuario
                 WHERE fecha_registro >= DATE_SUB(%s, INTERVAL 6 MONTH)
-                GROUP BY DATE_FORMAT(fecha_registro, '%Y-%m')
+                GROUP BY DATE_FORMAT(fecha_registro, '%%Y-%%m')
                 ORDER BY mes
                 """
                 cursor.execute(query_crecimiento_usuarios, (date.today(),))
@@ -1134,6 +1196,7 @@ class AdminAnaliticasModel:
                 close_db_connection(conn)
     
     @staticmethod
+    @CacheAnaliticasModel.cacheado('productos_servicios_populares', ttl=120, rango=_rango_mes_actual)
     def obtener_productos_servicios_populares() -> Tuple[List[Dict], str]:
         """
         Obtiene productos y servicios más populares
@@ -1143,7 +1206,7 @@ class AdminAnaliticasModel:
             return [], "Error de conexión con la base de datos"
         
         try:
-            with conn.cursor(dictionary=True) as cursor:
+            with conn.cursor() as cursor:
                 hoy = date.today()
                 primer_dia_mes_actual = hoy.replace(day=1)
                 
@@ -1158,11 +1221,11 @@ class AdminAnaliticasModel:
                 SELECT 
                     producto_nombre as nombre,
                     'producto' as tipo,
-                    COUNT(*) as ventas,
-                    COALESCE(SUM(total), 0) as ingresos,
+                    SUM(unidades) as ventas,
+                    COALESCE(SUM(ingresos), 0) as ingresos,
                     producto_tipo as subtipo
-                FROM compras_confirmadas
-                WHERE fecha_compra BETWEEN %s AND %s
+                FROM resumen_ventas_dia
+                WHERE fecha BETWEEN %s AND %s
                 GROUP BY producto_nombre, producto_tipo
                 ORDER BY ventas DESC
                 LIMIT 10
@@ -1170,19 +1233,19 @@ class AdminAnaliticasModel:
                 cursor.execute(query_productos, (primer_dia_mes_actual, ultimo_dia_mes_actual))
                 productos_data = cursor.fetchall()
                 
-                # 2. SERVICIOS MÁS SOLICITADOS (de citas)
-                query_servicios = """
+                # 2. SERVICIOS MÁS SOLICITADOS (de citas), a precio de catálogo
+                query_servicios = f"""
                 SELECT 
-                    servicio as nombre,
+                    r.servicio as nombre,
                     'servicio' as tipo,
-                    COUNT(*) as ventas,
-                    COUNT(*) * 50 as ingresos_estimados,  # $50 promedio por servicio
+                    SUM(r.citas) as ventas,
+                    {SQL_INGRESOS_SERVICIO} as ingresos,
                     'consulta' as subtipo
-                FROM cita
-                WHERE fecha_cita BETWEEN %s AND %s
-                    AND servicio IS NOT NULL
-                    AND servicio != ''
-                GROUP BY servicio
+                FROM resumen_citas_dia r
+                {SQL_PRECIO_SERVICIO}
+                WHERE r.fecha BETWEEN %s AND %s
+                    AND r.servicio != ''
+                GROUP BY r.servicio
                 ORDER BY ventas DESC
                 LIMIT 10
                 """
@@ -1198,9 +1261,9 @@ class AdminAnaliticasModel:
                         'nombre': producto['nombre'],
                         'tipo': producto['tipo'],
                         'subtipo': producto['subtipo'] or 'general',
-                        'ventas': producto['ventas'],
+                        'ventas': int(producto['ventas'] or 0),
                         'ingresos': float(producto['ingresos'] or 0),
-                        'popularidad': producto['ventas']  # Para ordenar
+                        'popularidad': int(producto['ventas'] or 0)  # Para ordenar
                     })
                 
                 # Procesar servicios
@@ -1209,9 +1272,9 @@ class AdminAnaliticasModel:
                         'nombre': servicio['nombre'],
                         'tipo': servicio['tipo'],
                         'subtipo': servicio['subtipo'],
-                        'ventas': servicio['ventas'],
-                        'ingresos': float(servicio['ingresos_estimados'] or 0),
-                        'popularidad': servicio['ventas']
+                        'ventas': int(servicio['ventas'] or 0),
+                        'ingresos': float(servicio['ingresos'] or 0),
+                        'popularidad': int(servicio['ventas'] or 0)
                     })
                 
                 # Ordenar por popularidad (ventas)
@@ -3,6 +3,11 @@ import pymysql
 from bd.conexion_bd import get_db_connection, close_db_connection
 from typing import Dict, Any, Optional, List
 from decimal import Decimal
+from modelo.CodigoCitaModel import CodigoCitaModel
+from modelo.DisponibilidadModel import DisponibilidadModel
+from modelo.CitaModel import CitaModel, MENSAJE_HORARIO_OCUPADO
+from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
+from modelo.BusquedaModel import BusquedaModel
 
 class AdminCitaModel:
     
@@ -252,13 +257,7 @@ class AdminCitaModel:
                 else:
                     cita_id = cita_data['cita_id']
                 
-                # Verificar si el ID ya existe
-                sql_check = "SELECT cita_id FROM cita WHERE cita_id = %s"
-                cursor.execute(sql_check, (cita_id,))
-                if cursor.fetchone():
-                    return False, "El ID de cita ya existe", ""
-                
-                # Insertar nueva cita
+                # Insertar nueva cita (PK y restricción de reservas validan en el mismo INSERT)
                 sql_insert = """
                 INSERT INTO cita (
                     cita_id, nombre_paciente, servicio, terapeuta_designado,
@@ -282,10 +281,17 @@ class AdminCitaModel:
                 ))
                 
                 conn.commit()
+                DisponibilidadModel.invalidar()
+                ResumenAnaliticasModel.marcar_citas([cita_data['fecha_cita']])
+                BusquedaModel.marcar('citas', [cita_id])
                 return True, "Cita creada exitosamente", cita_id
                 
         except Exception as e:
             conn.rollback()
+            if CitaModel.es_conflicto_horario(e):
+                return False, MENSAJE_HORARIO_OCUPADO, ""
+            if isinstance(e, pymysql.err.IntegrityError) and e.args[0] == 1062:
+                return False, "El ID de cita ya existe", ""
             print(f"Error al crear cita: {e}")
             return False, str(e), ""
         finally:
@@ -305,9 +311,10 @@ class AdminCitaModel:
         try:
             with conn.cursor() as cursor:
                 # Verificar que la cita existe
-                sql_check = "SELECT cita_id FROM cita WHERE cita_id = %s"
+                sql_check = "SELECT cita_id, fecha_cita FROM cita WHERE cita_id = %s"
                 cursor.execute(sql_check, (cita_id,))
-                if not cursor.fetchone():
+                cita_actual = cursor.fetchone()
+                if not cita_actual:
                     return False, "Cita no encontrada"
                 
                 # Actualizar cita
@@ -341,10 +348,15 @@ class AdminCitaModel:
                 ))
                 
                 conn.commit()
+                DisponibilidadModel.invalidar()
+                ResumenAnaliticasModel.marcar_citas([cita_actual['fecha_cita'], cita_data['fecha_cita']])
+                BusquedaModel.marcar('citas', [cita_id])
                 return True, "Cita actualizada exitosamente"
                 
         except Exception as e:
             conn.rollback()
+            if CitaModel.es_conflicto_horario(e):
+                return False, MENSAJE_HORARIO_OCUPADO
             print(f"Error al actualizar cita: {e}")
             return False, str(e)
         finally:
@@ -364,9 +376,10 @@ class AdminCitaModel:
         try:
             with conn.cursor() as cursor:
                 # Verificar que la cita existe
-                sql_check = "SELECT cita_id FROM cita WHERE cita_id = %s"
+                sql_check = "SELECT cita_id, fecha_cita FROM cita WHERE cita_id = %s"
                 cursor.execute(sql_check, (cita_id,))
-                if not cursor.fetchone():
+                cita_actual = cursor.fetchone()
+                if not cita_actual:
                     return False, "Cita no encontrada"
                 
                 # Actualizar estado
@@ -374,6 +387,9 @@ class AdminCitaModel:
                 cursor.execute(sql_update, (nuevo_estado, cita_id))
                 
                 conn.commit()
+                DisponibilidadModel.invalidar()
+                ResumenAnaliticasModel.marcar_citas([cita_actual['fecha_cita']])
+                BusquedaModel.marcar('citas', [cita_id])
                 return True, f"Estado cambiado a '{nuevo_estado}' exitosamente"
                 
         except Exception as e:
@@ -397,16 +413,22 @@ class AdminCitaModel:
         try:
             with conn.cursor() as cursor:
                 # Verificar que la cita existe
-                sql_check = "SELECT cita_id FROM cita WHERE cita_id = %s"
+                sql_check = "SELECT cita_id, fecha_cita FROM cita WHERE cita_id = %s"
                 cursor.execute(sql_check, (cita_id,))
-                if not cursor.fetchone():
+                cita_actual = cursor.fetchone()
+                if not cita_actual:
                     return False, "Cita no encontrada"
                 
                 # Eliminar cita
                 sql_delete = "DELETE FROM cita WHERE cita_id = %s"
                 cursor.execute(sql_delete, (cita_id,))
+                CodigoCitaModel.liberar_codigo(cita_id, cursor)
                 
                 conn.commit()
+                CodigoCitaModel.marcar_ocupacion([cita_id], False)
+                DisponibilidadModel.invalidar()
+                ResumenAnaliticasModel.marcar_citas([cita_actual['fecha_cita']])
+                BusquedaModel.marcar('citas', [cita_id])
                 return True, "Cita eliminada exitosamente"
                 
         except Exception as e:
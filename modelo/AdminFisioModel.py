@@ -2,6 +2,7 @@ import pymysql
 from bd.conexion_bd import get_db_connection, close_db_connection
 from typing import Dict, Any, Optional, List
 from decimal import Decimal
+from modelo.BusquedaModel import BusquedaModel
 
 class AdminFisioModel:
     
@@ -228,6 +229,7 @@ class AdminFisioModel:
                 ))
                 
                 conn.commit()
+                BusquedaModel.marcar('terapeutas', [terapeuta_data['Codigo_trabajador']])
                 return True, "Terapeuta creado exitosamente", terapeuta_data['Codigo_trabajador']
                 
         except Exception as e:
@@ -283,6 +285,7 @@ class AdminFisioModel:
                 ))
                 
                 conn.commit()
+                BusquedaModel.marcar('terapeutas', [codigo])
                 return True, "Terapeuta actualizado exitosamente"
                 
         except Exception as e:
@@ -318,6 +321,7 @@ class AdminFisioModel:
                 cursor.execute(sql_update, (nuevo_estado, codigo))
                 
                 conn.commit()
+                BusquedaModel.marcar('terapeutas', [codigo])
                 return True, f"Estado cambiado a '{nuevo_estado}' exitosamente"
                 
         except Exception as e:
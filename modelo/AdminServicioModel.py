@@ -4,6 +4,7 @@ import pymysql
 from bd.conexion_bd import get_db_connection, close_db_connection
 from typing import Dict, Any, Optional, List
 from decimal import Decimal
+from modelo.CatalogoModel import CatalogoModel
 
 class AdminServicioModel:
     
@@ -259,6 +260,7 @@ class AdminServicioModel:
                 ))
                 
                 conn.commit()
+                CatalogoModel.invalidar()
                 return True, "Terapia creada exitosamente", terapia_data['codigo']
                 
         except Exception as e:
@@ -328,6 +330,7 @@ class AdminServicioModel:
                 ))
                 
                 conn.commit()
+                CatalogoModel.invalidar()
                 return True, "Terapia actualizada exitosamente"
                 
         except Exception as e:
@@ -499,6 +502,7 @@ class AdminServicioModel:
                 ))
                 
                 conn.commit()
+                CatalogoModel.invalidar()
                 return True, "Producto de nutrición creado exitosamente", nutricion_data['codigo']
                 
         except Exception as e:
@@ -570,6 +574,7 @@ class AdminServicioModel:
                 ))
                 
                 conn.commit()
+                CatalogoModel.invalidar()
                 return True, "Producto de nutrición actualizado exitosamente"
                 
         except Exception as e:
@@ -746,6 +751,7 @@ class AdminServicioModel:
                 ))
                 
                 conn.commit()
+                CatalogoModel.invalidar()
                 return True, "Implemento creado exitosamente", implemento_data['codigo']
                 
         except Exception as e:
@@ -819,6 +825,7 @@ class AdminServicioModel:
                 ))
                 
                 conn.commit()
+                CatalogoModel.invalidar()
                 return True, "Implemento actualizado exitosamente"
                 
         except Exception as e:
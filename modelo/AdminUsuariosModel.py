@@ -0,0 +1,695 @@
+# modelo/AdminUsuariosModel.py - LISTADO PAGINADO Y EXPORTACIÓN DE USUARIOS (PANEL ADMIN)
+import base64
+import binascii
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from bd.conexion_bd import get_db_connection, close_db_connection
+from modelo.BusquedaModel import BusquedaModel
+from modelo.CitaModel import CitaModel, MENSAJE_HORARIO_OCUPADO
+from modelo.CodigoCitaModel import CodigoCitaModel
+from modelo.DisponibilidadModel import DisponibilidadModel
+from modelo.ExportacionAnaliticasModel import ExportacionAnaliticasModel
+from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
+
+# Orden permitido -> columna de usuario. El ID desempata y hace el orden total
+ORDENES_USUARIOS = {
+    'id': 'ID',
+    'nombre': 'nombre',
+    'apellido': 'apellido',
+    'correo': 'correo',
+    'estado': 'estado',
+}
+DIRECCIONES = ('asc', 'desc')
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+
+# Índices que mantienen cada página en un rango del índice: los secundarios de
+# InnoDB ya incluyen la clave primaria, así que (columna) ordena por (columna, ID)
+INDICES_LISTADO = (
+    ('usuario', 'nombre', 'idx_usuario_nombre'),
+    ('usuario', 'apellido', 'idx_usuario_apellido'),
+    ('usuario', 'correo', 'idx_usuario_correo'),
+    ('usuario', 'estado', 'idx_usuario_estado'),
+    ('paciente', 'ID_usuario', 'idx_paciente_id_usuario'),
+    ('paciente', 'fecha_creacion_reporte', 'idx_paciente_fecha_reporte'),
+)
+
+# Exportaciones CSV: columna -> expresión (en el orden del CSV por defecto),
+# columna de fecha para desde/hasta y un orden que sigue un índice, para que
+# la primera fila salga sin ordenar antes toda la tabla
+EXPORTACIONES_USUARIOS = {
+    'usuarios': {
+        'columnas': {
+            'ID': 'u.ID',
+            'nombre': 'u.nombre',
+            'apellido': 'u.apellido',
+            'genero': 'u.genero',
+            'correo': 'u.correo',
+            'telefono': 'u.telefono',
+            'estado': 'u.estado',
+            'es_paciente': "IF(EXISTS (SELECT 1 FROM paciente p WHERE p.ID_usuario = u.ID), 'si', 'no')",
+        },
+        'por_defecto': ('ID', 'nombre', 'apellido', 'genero', 'correo', 'telefono', 'estado'),
+        'tablas': 'usuario u',
+        'fecha': None,
+        'orden': 'u.ID DESC',
+    },
+    'pacientes': {
+        'columnas': {
+            'codigo_cita': 'p.codigo_cita',
+            'usuario_id': 'u.ID',
+            'nombre': 'u.nombre',
+            'apellido': 'u.apellido',
+            'correo': 'u.correo',
+            'telefono': 'u.telefono',
+            'genero': 'u.genero',
+            'terapeuta_asignado': 'p.terapeuta_asignado',
+            'estado_cita': 'p.estado_cita',
+            'tipo_plan': 'p.tipo_plan',
+            'precio_plan': 'p.precio_plan',
+            'fecha_creacion_reporte': 'p.fecha_creacion_reporte',
+        },
+        'por_defecto': (
+            'codigo_cita', 'usuario_id', 'nombre', 'apellido', 'correo', 'telefono', 'genero',
+            'terapeuta_asignado', 'estado_cita', 'tipo_plan', 'precio_plan', 'fecha_creacion_reporte',
+        ),
+        'tablas': 'paciente p INNER JOIN usuario u ON p.ID_usuario = u.ID',
+        'fecha': 'p.fecha_creacion_reporte',
+        'orden': 'p.fecha_creacion_reporte DESC',
+    },
+}
+
+# Operaciones masivas del panel
+ACCIONES_USUARIOS = ('eliminar', 'estado', 'convertir_paciente')
+ACCIONES_PACIENTES = ('eliminar',)
+ESTADOS_USUARIO = ('Activo', 'Inactivo', 'Pendiente')
+MAX_LOTE = 500
+# Terapeutas que no ocupan horario (fuera de la restricción de reservas)
+TERAPEUTAS_SIN_RESERVA = ('', 'Por asignar')
+
+
+def _marcadores(valores: Sequence) -> str:
+    return ', '.join(['%s'] * len(valores))
+
+
+class AdminUsuariosModel:
+    """
+    Listado de usuarios con paginación por cursor (keyset): cada página
+    continúa desde el último (valor de orden, ID) de la anterior con un
+    WHERE sobre el índice, en lugar de un OFFSET que recorre y descarta todas
+    las filas previas. Así la página 500 cuesta lo mismo que la primera.
+
+    es_paciente se calcula en la misma consulta con EXISTS sobre paciente.
+    Las exportaciones CSV de usuarios y pacientes se envían en streaming.
+    Las operaciones masivas (eliminar, cambiar estado, convertir en
+    paciente) usan una sentencia por tabla con IN (...) dentro de una sola
+    transacción y devuelven el resultado de cada ID.
+    """
+
+    # ------------------------------------------------------------------
+    # Índices
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def asegurar_indices() -> bool:
+        """Crea los índices del listado que falten (desde bd/migraciones.py)"""
+        conn = get_db_connection()
+        if conn is None:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                for tabla, columna, indice in INDICES_LISTADO:
+                    cursor.execute("""
+                        SELECT COUNT(*) AS total FROM information_schema.statistics
+                        WHERE table_schema = DATABASE() AND table_name = %s
+                          AND column_name = %s AND seq_in_index = 1
+                    """, (tabla, columna))
+                    if cursor.fetchone()['total']:
+                        continue
+                    try:
+                        cursor.execute(f"ALTER TABLE {tabla} ADD INDEX {indice} ({columna})")
+                        print(f"🗂️ Índice {indice} creado en {tabla}")
+                    except Exception as e:
+                        # p. ej. columna TEXT sin longitud: el listado funciona, solo más lento
+                        print(f"⚠️ No se pudo crear el índice {indice}: {e}")
+            return True
+        except Exception as e:
+            print(f"Error al preparar los índices del listado de usuarios: {e}")
+            return False
+        finally:
+            close_db_connection(conn)
+
+    # ------------------------------------------------------------------
+    # Cursor
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _codificar_cursor(orden: str, direccion: str, valor, usuario_id: int) -> str:
+        datos = json.dumps([orden, direccion, valor, usuario_id], default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def _decodificar_cursor(cursor_pagina: str, orden: str, direccion: str) -> Tuple[Any, int]:
+        """(valor, ID) del último usuario de la página anterior; ValueError si no es válido"""
+        try:
+            relleno = '=' * (-len(cursor_pagina) % 4)
+            datos = json.loads(base64.urlsafe_b64decode(cursor_pagina + relleno).decode('utf-8'))
+            orden_cursor, direccion_cursor, valor, usuario_id = datos
+            usuario_id = int(usuario_id)
+        except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+            raise ValueError("cursor no válido")
+        if (orden_cursor, direccion_cursor) != (orden, direccion):
+            raise ValueError("el cursor corresponde a otro orden; vuelve a la primera página")
+        return valor, usuario_id
+
+    @staticmethod
+    def _condicion_cursor(columna: str, direccion: str, valor, usuario_id: int) -> Tuple[str, List]:
+        """
+        WHERE que empieza justo después de (valor, ID). MySQL ordena los NULL
+        primero en ASC y al final en DESC, así que se tratan aparte.
+        """
+        if columna == 'ID':
+            return ("u.ID > %s" if direccion == 'asc' else "u.ID < %s"), [usuario_id]
+        col = f"u.{columna}"
+        if direccion == 'asc':
+            if valor is None:
+                return f"(({col} IS NULL AND u.ID > %s) OR {col} IS NOT NULL)", [usuario_id]
+            return f"({col} > %s OR ({col} = %s AND u.ID > %s))", [valor, valor, usuario_id]
+        if valor is None:
+            return f"({col} IS NULL AND u.ID < %s)", [usuario_id]
+        return f"({col} < %s OR ({col} = %s AND u.ID < %s) OR {col} IS NULL)", [valor, valor, usuario_id]
+
+    # ------------------------------------------------------------------
+    # Listado
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def validar_listado(orden: str, direccion: str, limite: int):
+        """ValueError si el orden, la dirección o el límite no son válidos"""
+        if orden not in ORDENES_USUARIOS:
+            raise ValueError(f"orden debe ser uno de: {', '.join(ORDENES_USUARIOS)}")
+        if direccion not in DIRECCIONES:
+            raise ValueError(f"direccion debe ser uno de: {', '.join(DIRECCIONES)}")
+        if not 1 <= limite <= LIMITE_MAXIMO:
+            raise ValueError(f"limite debe estar entre 1 y {LIMITE_MAXIMO}")
+
+    @staticmethod
+    def _serializable(fila: Dict) -> Dict:
+        usuario = dict(fila)
+        usuario['es_paciente'] = bool(usuario.get('es_paciente'))
+        for clave, valor in usuario.items():
+            if isinstance(valor, Decimal):
+                usuario[clave] = float(valor)
+            elif hasattr(valor, 'strftime'):
+                usuario[clave] = valor.strftime('%Y-%m-%d')
+        return usuario
+
+    @staticmethod
+    def listar_usuarios(filtros: Dict[str, str], orden: str = 'id', direccion: str = 'desc',
+                        limite: int = LIMITE_POR_DEFECTO, cursor_pagina: Optional[str] = None
+                        ) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Una página de usuarios. filtros: nombre, correo (contienen), estado
+        (exacto) y es_paciente ('si' / 'no'). Retorna ({'usuarios',
+        'siguiente_cursor', 'hay_mas'}, error); ValueError si los parámetros
+        o el cursor no son válidos.
+        """
+        AdminUsuariosModel.validar_listado(orden, direccion, limite)
+        columna = ORDENES_USUARIOS[orden]
+
+        condiciones: List[str] = []
+        params: List[Any] = []
+
+        nombre = filtros.get('nombre')
+        if nombre:
+            condiciones.append("(u.nombre LIKE %s OR u.apellido LIKE %s OR CONCAT(u.nombre, ' ', u.apellido) LIKE %s)")
+            params.extend([f"%{nombre}%"] * 3)
+        estado = filtros.get('estado')
+        if estado and estado != "Todos los estados":
+            condiciones.append("u.estado = %s")
+            params.append(estado)
+        correo = filtros.get('correo')
+        if correo:
+            condiciones.append("u.correo LIKE %s")
+            params.append(f"%{correo}%")
+        es_paciente = (filtros.get('es_paciente') or '').lower()
+        if es_paciente in ('si', 'sí', 'true', '1'):
+            condiciones.append("EXISTS (SELECT 1 FROM paciente p WHERE p.ID_usuario = u.ID)")
+        elif es_paciente in ('no', 'false', '0'):
+            condiciones.append("NOT EXISTS (SELECT 1 FROM paciente p WHERE p.ID_usuario = u.ID)")
+
+        if cursor_pagina:
+            valor, usuario_id = AdminUsuariosModel._decodificar_cursor(cursor_pagina, orden, direccion)
+            condicion, valores = AdminUsuariosModel._condicion_cursor(columna, direccion, valor, usuario_id)
+            condiciones.append(condicion)
+            params.extend(valores)
+
+        sentido = 'ASC' if direccion == 'asc' else 'DESC'
+        orden_sql = f"u.ID {sentido}" if columna == 'ID' else f"u.{columna} {sentido}, u.ID {sentido}"
+        sql = f"""
+            SELECT u.ID, u.nombre, u.apellido,
+                   CONCAT(u.nombre, ' ', u.apellido) as nombre_completo,
+                   u.genero, u.correo, u.telefono, u.estado, u.historial_medico,
+                   EXISTS (SELECT 1 FROM paciente p WHERE p.ID_usuario = u.ID) as es_paciente
+            FROM usuario u
+            {'WHERE ' + ' AND '.join(condiciones) if condiciones else ''}
+            ORDER BY {orden_sql}
+            LIMIT %s
+        """
+        # Una fila de más indica si hay otra página
+        params.append(limite + 1)
+
+        conn = get_db_connection()
+        if conn is None:
+            return None, "Error de conexión con la base de datos"
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                filas = cursor.fetchall()
+        except Exception as e:
+            print(f"❌ Error en listar_usuarios: {e}")
+            return None, f"Error interno: {str(e)}"
+        finally:
+            close_db_connection(conn)
+
+        hay_mas = len(filas) > limite
+        filas = filas[:limite]
+        siguiente = None
+        if hay_mas:
+            ultima = filas[-1]
+            siguiente = AdminUsuariosModel._codificar_cursor(orden, direccion, ultima[columna], ultima['ID'])
+        return {
+            'usuarios': [AdminUsuariosModel._serializable(fila) for fila in filas],
+            'siguiente_cursor': siguiente,
+            'hay_mas': hay_mas,
+        }, None
+
+    # ------------------------------------------------------------------
+    # Exportación CSV
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def validar_exportacion(tipo: str, columnas: Optional[Sequence[str]] = None,
+                            desde: Optional[date] = None, hasta: Optional[date] = None) -> Tuple[str, ...]:
+        """Columnas a exportar (las pedidas o las de por defecto); ValueError si algo no es válido"""
+        definicion = EXPORTACIONES_USUARIOS.get(tipo)
+        if definicion is None:
+            raise ValueError(f"tipo debe ser uno de: {', '.join(EXPORTACIONES_USUARIOS)}")
+        if (desde or hasta) and not definicion['fecha']:
+            raise ValueError(f"{tipo} no tiene fecha; desde/hasta solo se aplican a pacientes")
+        if desde and hasta and desde > hasta:
+            raise ValueError("desde no puede ser posterior a hasta")
+        if not columnas:
+            return definicion['por_defecto']
+        desconocidas = [c for c in columnas if c not in definicion['columnas']]
+        if desconocidas:
+            raise ValueError(
+                f"columnas no válidas: {', '.join(desconocidas)} "
+                f"(disponibles: {', '.join(definicion['columnas'])})"
+            )
+        return tuple(dict.fromkeys(columnas))
+
+    @staticmethod
+    def nombre_exportacion(tipo: str, comprimido: bool = False) -> str:
+        nombre = f"{tipo}_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        return nombre + '.gz' if comprimido else nombre
+
+    @staticmethod
+    def generar_exportacion(cupo, tipo: str, columnas: Tuple[str, ...],
+                            desde: Optional[date] = None, hasta: Optional[date] = None) -> Iterator[bytes]:
+        """
+        CSV de usuarios o pacientes por bloques, leído con un cursor sin
+        buffer (la memoria no depende del tamaño de la tabla). `cupo` es el de
+        ExportacionAnaliticasModel.reservar(): las exportaciones del panel
+        comparten el mismo límite de conexiones ocupadas.
+        """
+        definicion = EXPORTACIONES_USUARIOS[tipo]
+        seleccion = ', '.join(f"{definicion['columnas'][c]} AS `{c}`" for c in columnas)
+
+        condiciones, params = [], []
+        if desde:
+            condiciones.append(f"{definicion['fecha']} >= %s")
+            params.append(desde)
+        if hasta:
+            condiciones.append(f"{definicion['fecha']} < %s")
+            params.append(hasta + timedelta(days=1))
+
+        sql = f"""
+            SELECT {seleccion}
+            FROM {definicion['tablas']}
+            {'WHERE ' + ' AND '.join(condiciones) if condiciones else ''}
+            ORDER BY {definicion['orden']}
+        """
+        return ExportacionAnaliticasModel.transmitir(cupo, sql, params, columnas, 'csv')
+
+    # ------------------------------------------------------------------
+    # Operaciones masivas
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def validar_lote(ids, numericos: bool = True) -> List:
+        """
+        IDs sin repetir, en el orden recibido (enteros, o códigos de cita si
+        numericos=False). ValueError si la lista está vacía, supera MAX_LOTE
+        o algún ID no es válido.
+        """
+        if not isinstance(ids, (list, tuple)) or not ids:
+            raise ValueError("ids debe ser una lista no vacía")
+        if len(ids) > MAX_LOTE:
+            raise ValueError(f"Como máximo {MAX_LOTE} registros por operación")
+        validos = []
+        for valor in ids:
+            if numericos:
+                if isinstance(valor, bool):
+                    raise ValueError(f"ID no válido: {valor!r}")
+                try:
+                    validos.append(int(valor))
+                except (TypeError, ValueError):
+                    raise ValueError(f"ID no válido: {valor!r}")
+            else:
+                codigo = str(valor).strip() if isinstance(valor, (str, int)) else ''
+                if not codigo:
+                    raise ValueError(f"Código de cita no válido: {valor!r}")
+                validos.append(codigo)
+        return list(dict.fromkeys(validos))
+
+    @staticmethod
+    def _informe(resultados: List[Dict]) -> Dict:
+        procesados = sum(1 for resultado in resultados if resultado['ok'])
+        return {
+            'resultados': resultados,
+            'procesados': procesados,
+            'omitidos': len(resultados) - procesados,
+        }
+
+    @staticmethod
+    def _en_transaccion(operacion: Callable, nombre: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Ejecuta operacion(conn, cursor) -> (informe, efectos) en una sola
+        transacción. `efectos` (resúmenes, disponibilidad, índice de
+        búsqueda) solo se ejecuta si se confirmó. Retorna (informe, error).
+        """
+        conn = get_db_connection()
+        if conn is None:
+            return None, "Error de conexión con la base de datos"
+        try:
+            conn.begin()
+            with conn.cursor() as cursor:
+                informe, efectos = operacion(conn, cursor)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            if CitaModel.es_conflicto_horario(e):
+                return None, MENSAJE_HORARIO_OCUPADO
+            print(f"❌ Error en {nombre}: {e}")
+            return None, f"Error interno: {str(e)}"
+        finally:
+            close_db_connection(conn)
+        efectos()
+        return informe, None
+
+    @staticmethod
+    def _borrar_pacientes(cursor, condicion: str, valores: List, codigos: List[str]):
+        """
+        Borra los registros de paciente que cumplen `condicion` y, por sus
+        códigos, acudientes y citas; los códigos vuelven al asignador.
+        """
+        if codigos:
+            try:
+                cursor.execute(f"DELETE FROM acudiente WHERE cita_id IN ({_marcadores(codigos)})", codigos)
+            except Exception as e:
+                # Solo se deshace esta sentencia; la transacción sigue
+                print(f"ℹ️ No se pudieron eliminar acudientes: {e}")
+        cursor.execute(f"DELETE FROM paciente WHERE {condicion}", valores)
+        if codigos:
+            cursor.execute(f"DELETE FROM cita WHERE cita_id IN ({_marcadores(codigos)})", codigos)
+            CodigoCitaModel.liberar_codigos(codigos, cursor)
+
+    @staticmethod
+    def eliminar_usuarios(ids) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Elimina usuarios y, si son pacientes, sus registros de paciente,
+        acudientes y citas. Retorna ({'resultados', 'procesados',
+        'omitidos'}, error); los IDs que no existen se informan y se omiten.
+        """
+        ids = AdminUsuariosModel.validar_lote(ids)
+
+        def operacion(conn, cursor):
+            cursor.execute(
+                f"SELECT ID, nombre, apellido FROM usuario WHERE ID IN ({_marcadores(ids)}) FOR UPDATE", ids
+            )
+            usuarios = {fila['ID']: fila for fila in cursor.fetchall()}
+            encontrados = [i for i in ids if i in usuarios]
+
+            pacientes = []
+            if encontrados:
+                en_usuarios = f"ID_usuario IN ({_marcadores(encontrados)})"
+                cursor.execute(f"""
+                    SELECT codigo_cita, ID_usuario, fecha_creacion_reporte
+                    FROM paciente WHERE {en_usuarios} FOR UPDATE
+                """, encontrados)
+                pacientes = cursor.fetchall()
+            codigos = [p['codigo_cita'] for p in pacientes if p['codigo_cita']]
+            fechas_citas = ResumenAnaliticasModel.fechas_de_citas(cursor, codigos)
+
+            if encontrados:
+                AdminUsuariosModel._borrar_pacientes(cursor, en_usuarios, encontrados, codigos)
+                cursor.execute(f"DELETE FROM usuario WHERE ID IN ({_marcadores(encontrados)})", encontrados)
+
+            citas_por_usuario = Counter(p['ID_usuario'] for p in pacientes)
+            resultados = []
+            for usuario_id in ids:
+                usuario = usuarios.get(usuario_id)
+                if usuario is None:
+                    resultados.append({'id': usuario_id, 'ok': False, 'error': 'Usuario no encontrado'})
+                    continue
+                resultados.append({
+                    'id': usuario_id,
+                    'ok': True,
+                    'nombre_completo': f"{usuario['nombre']} {usuario['apellido']}",
+                    'es_paciente': citas_por_usuario[usuario_id] > 0,
+                    'citas_eliminadas': citas_por_usuario[usuario_id],
+                })
+
+            def efectos():
+                if codigos:
+                    CodigoCitaModel.marcar_ocupacion(codigos, False)
+                    DisponibilidadModel.invalidar()
+                ResumenAnaliticasModel.marcar_citas(fechas_citas)
+                ResumenAnaliticasModel.marcar_planes([p['fecha_creacion_reporte'] for p in pacientes])
+                BusquedaModel.marcar('usuarios', encontrados)
+                BusquedaModel.marcar('citas', codigos)
+                BusquedaModel.marcar('pacientes', codigos)
+
+            return AdminUsuariosModel._informe(resultados), efectos
+
+        return AdminUsuariosModel._en_transaccion(operacion, 'eliminar_usuarios')
+
+    @staticmethod
+    def eliminar_pacientes(codigos) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Elimina pacientes por código de cita junto con su cita y acudientes
+        (el usuario se conserva). Mismo formato de retorno que eliminar_usuarios.
+        """
+        codigos = AdminUsuariosModel.validar_lote(codigos, numericos=False)
+
+        def operacion(conn, cursor):
+            cursor.execute(f"""
+                SELECT codigo_cita, ID_usuario, nombre_completo, fecha_creacion_reporte
+                FROM paciente WHERE codigo_cita IN ({_marcadores(codigos)}) FOR UPDATE
+            """, codigos)
+            pacientes = {fila['codigo_cita']: fila for fila in cursor.fetchall()}
+            encontrados = [c for c in codigos if c in pacientes]
+            fechas_citas = ResumenAnaliticasModel.fechas_de_citas(cursor, encontrados)
+
+            if encontrados:
+                AdminUsuariosModel._borrar_pacientes(
+                    cursor, f"codigo_cita IN ({_marcadores(encontrados)})", encontrados, encontrados
+                )
+
+            resultados = []
+            for codigo in codigos:
+                paciente = pacientes.get(codigo)
+                if paciente is None:
+                    resultados.append({'id': codigo, 'ok': False, 'error': 'Paciente no encontrado'})
+                    continue
+                resultados.append({
+                    'id': codigo,
+                    'ok': True,
+                    'usuario_id': paciente['ID_usuario'],
+                    'nombre_paciente': paciente['nombre_completo'],
+                })
+
+            def efectos():
+                if encontrados:
+                    CodigoCitaModel.marcar_ocupacion(encontrados, False)
+                    DisponibilidadModel.invalidar()
+                ResumenAnaliticasModel.marcar_citas(fechas_citas)
+                ResumenAnaliticasModel.marcar_planes([pacientes[c]['fecha_creacion_reporte'] for c in encontrados])
+                BusquedaModel.marcar('citas', encontrados)
+                BusquedaModel.marcar('pacientes', encontrados)
+
+            return AdminUsuariosModel._informe(resultados), efectos
+
+        return AdminUsuariosModel._en_transaccion(operacion, 'eliminar_pacientes')
+
+    @staticmethod
+    def cambiar_estado_usuarios(ids, estado: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """Activa o desactiva varios usuarios con un solo UPDATE"""
+        if estado not in ESTADOS_USUARIO:
+            raise ValueError(f"Estado inválido. Usa: {', '.join(ESTADOS_USUARIO)}")
+        ids = AdminUsuariosModel.validar_lote(ids)
+
+        def operacion(conn, cursor):
+            cursor.execute(
+                f"SELECT ID, estado FROM usuario WHERE ID IN ({_marcadores(ids)}) FOR UPDATE", ids
+            )
+            anteriores = {fila['ID']: fila['estado'] for fila in cursor.fetchall()}
+            encontrados = [i for i in ids if i in anteriores]
+            if encontrados:
+                cursor.execute(
+                    f"UPDATE usuario SET estado = %s WHERE ID IN ({_marcadores(encontrados)})",
+                    [estado, *encontrados]
+                )
+
+            resultados = [
+                {'id': i, 'ok': True, 'estado_anterior': anteriores[i], 'estado_nuevo': estado}
+                if i in anteriores else
+                {'id': i, 'ok': False, 'error': 'Usuario no encontrado'}
+                for i in ids
+            ]
+            return AdminUsuariosModel._informe(resultados), lambda: BusquedaModel.marcar('usuarios', encontrados)
+
+        return AdminUsuariosModel._en_transaccion(operacion, 'cambiar_estado_usuarios')
+
+    @staticmethod
+    def _datos_conversion(datos: Dict, cantidad: int) -> Dict:
+        """Valores de la cita y el plan (los mismos por defecto que convertir_a_paciente)"""
+        terapeuta = datos.get('terapeuta_designado', datos.get('terapeuta_asignado', 'Por asignar'))
+        if cantidad > 1 and terapeuta not in TERAPEUTAS_SIN_RESERVA:
+            # Todas las citas irían a la misma fecha y hora del mismo terapeuta
+            raise ValueError("Para convertir varios usuarios a la vez el terapeuta debe ser 'Por asignar'")
+        try:
+            precio_plan = float(datos.get('precio_plan', 0.0))
+        except (TypeError, ValueError):
+            raise ValueError("precio_plan debe ser un número")
+        return {
+            'servicio': datos.get('servicio', 'Consulta General'),
+            'terapeuta': terapeuta,
+            'fecha_cita': datos.get('fecha_cita', datetime.now().strftime('%Y-%m-%d')),
+            'hora_cita': datos.get('hora_cita', '09:00:00'),
+            'notas': datos.get('notas_adicionales', 'Usuario convertido automáticamente por administrador'),
+            'tipo_pago': datos.get('tipo_pago', 'Por definir'),
+            'estado_cita': datos.get('estado_cita', 'pendiente'),
+            'tipo_plan': datos.get('tipo_plan', 'Básico'),
+            'precio_plan': precio_plan,
+            'historial_medico': datos.get('historial_medico'),
+            'telefono': datos.get('telefono', '000-000-0000'),
+            'ID_acudiente': datos.get('ID_acudiente'),
+            'ejercicios_registrados': datos.get('ejercicios_registrados', ''),
+        }
+
+    @staticmethod
+    def convertir_a_pacientes(ids, datos: Optional[Dict] = None) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Convierte varios usuarios en pacientes: reserva todos los códigos de
+        cita (rango admin) de una vez y crea citas y pacientes con un
+        executemany cada uno. Los que ya son pacientes se omiten.
+        """
+        ids = AdminUsuariosModel.validar_lote(ids)
+        valores = AdminUsuariosModel._datos_conversion(datos or {}, len(ids))
+
+        def operacion(conn, cursor):
+            en_ids = _marcadores(ids)
+            cursor.execute(f"""
+                SELECT ID, nombre, apellido, correo, telefono, historial_medico
+                FROM usuario WHERE ID IN ({en_ids}) FOR UPDATE
+            """, ids)
+            usuarios = {fila['ID']: fila for fila in cursor.fetchall()}
+            cursor.execute(f"SELECT DISTINCT ID_usuario FROM paciente WHERE ID_usuario IN ({en_ids})", ids)
+            ya_pacientes = {fila['ID_usuario'] for fila in cursor.fetchall()}
+            convertibles = [i for i in ids if i in usuarios and i not in ya_pacientes]
+
+            codigos: List[str] = []
+            if convertibles:
+                codigos = CodigoCitaModel.asignar_codigos('admin', len(convertibles), conn=conn)
+                if len(codigos) != len(convertibles):
+                    raise RuntimeError("No hay códigos de cita disponibles en el rango admin")
+
+                filas_cita, filas_paciente = [], []
+                for codigo, usuario_id in zip(codigos, convertibles):
+                    usuario = usuarios[usuario_id]
+                    nombre_completo = f"{usuario['nombre']} {usuario['apellido']}"
+                    filas_cita.append((
+                        codigo, nombre_completo, valores['servicio'], valores['terapeuta'],
+                        usuario['telefono'] or valores['telefono'], usuario['correo'],
+                        valores['fecha_cita'], valores['hora_cita'], valores['notas'],
+                        valores['tipo_pago'], valores['estado_cita'],
+                    ))
+                    historial = valores['historial_medico']
+                    filas_paciente.append((
+                        codigo, usuario_id, nombre_completo, valores['ID_acudiente'],
+                        historial if historial is not None else (usuario.get('historial_medico') or ''),
+                        valores['terapeuta'], valores['ejercicios_registrados'],
+                        valores['estado_cita'], valores['tipo_plan'], valores['precio_plan'],
+                    ))
+                cursor.executemany("""
+                    INSERT INTO cita (
+                        cita_id, nombre_paciente, servicio, terapeuta_designado,
+                        telefono, correo, fecha_cita, hora_cita, notas_adicionales,
+                        tipo_pago, estado
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, filas_cita)
+                cursor.executemany("""
+                    INSERT INTO paciente (
+                        codigo_cita, ID_usuario, nombre_completo, ID_acudiente,
+                        historial_medico, terapeuta_asignado, ejercicios_registrados,
+                        estado_cita, tipo_plan, precio_plan, fecha_creacion_reporte
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURDATE())
+                """, filas_paciente)
+
+            codigo_de = dict(zip(convertibles, codigos))
+            resultados = []
+            for usuario_id in ids:
+                if usuario_id not in usuarios:
+                    resultados.append({'id': usuario_id, 'ok': False, 'error': 'Usuario no encontrado'})
+                elif usuario_id in ya_pacientes:
+                    resultados.append({'id': usuario_id, 'ok': False, 'error': 'Este usuario ya es paciente'})
+                else:
+                    usuario = usuarios[usuario_id]
+                    resultados.append({
+                        'id': usuario_id,
+                        'ok': True,
+                        'codigo_cita': codigo_de[usuario_id],
+                        'nombre_paciente': f"{usuario['nombre']} {usuario['apellido']}",
+                    })
+
+            def efectos():
+                if not codigos:
+                    return
+                CodigoCitaModel.marcar_ocupacion(codigos, True)
+                DisponibilidadModel.invalidar()
+                ResumenAnaliticasModel.marcar_citas([valores['fecha_cita']])
+                ResumenAnaliticasModel.marcar_planes([date.today()])
+                BusquedaModel.marcar('citas', codigos)
+                BusquedaModel.marcar('pacientes', codigos)
+
+            informe = AdminUsuariosModel._informe(resultados)
+            # Cita y plan comunes a todo el lote
+            informe['cita'] = {
+                'servicio': valores['servicio'],
+                'terapeuta': valores['terapeuta'],
+                'fecha_cita': valores['fecha_cita'],
+                'hora_cita': valores['hora_cita'],
+                'estado': valores['estado_cita'],
+                'tipo_plan': valores['tipo_plan'],
+                'precio_plan': valores['precio_plan'],
+            }
+            return informe, efectos
+
+        return AdminUsuariosModel._en_transaccion(operacion, 'convertir_a_pacientes')
@@ -0,0 +1,456 @@
+# modelo/BusquedaModel.py - BÚSQUEDA INSTANTÁNEA DE USUARIOS, PACIENTES, CITAS Y TERAPEUTAS
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np  # type: ignore
+
+from bd.conexion_bd import get_db_connection, close_db_connection
+from bd.unidad_trabajo import despues_de_confirmar
+
+# Cada fuente: consulta con las columnas id, nombre, correo y telefono (el
+# texto indexado) más las de detalle que se devuelven con cada resultado, y la
+# columna por la que se releen filas sueltas al cambiar
+FUENTES_BUSQUEDA = {
+    'usuarios': {
+        'sql': """
+            SELECT ID as id, CONCAT_WS(' ', nombre, apellido) as nombre, correo, telefono, estado
+            FROM usuario {filtro}
+        """,
+        'clave': 'ID',
+        'detalle': ('estado',),
+    },
+    'pacientes': {
+        'sql': """
+            SELECT p.codigo_cita as id,
+                   COALESCE(NULLIF(p.nombre_completo, ''), CONCAT_WS(' ', u.nombre, u.apellido)) as nombre,
+                   u.correo, u.telefono, p.ID_usuario as usuario_id,
+                   p.terapeuta_asignado as terapeuta, p.estado_cita as estado
+            FROM paciente p
+            LEFT JOIN usuario u ON u.ID = p.ID_usuario {filtro}
+        """,
+        'clave': 'p.codigo_cita',
+        'detalle': ('usuario_id', 'terapeuta', 'estado'),
+    },
+    'citas': {
+        'sql': """
+            SELECT cita_id as id, nombre_paciente as nombre, correo, telefono,
+                   fecha_cita as fecha, hora_cita as hora, terapeuta_designado as terapeuta,
+                   servicio, estado
+            FROM cita {filtro}
+        """,
+        'clave': 'cita_id',
+        'detalle': ('fecha', 'hora', 'terapeuta', 'servicio', 'estado'),
+    },
+    'terapeutas': {
+        'sql': """
+            SELECT Codigo_trabajador as id, nombre_completo as nombre, fisio_correo as correo,
+                   telefono, especializacion, estado
+            FROM terapeuta {filtro}
+        """,
+        'clave': 'Codigo_trabajador',
+        'detalle': ('especializacion', 'estado'),
+    },
+}
+TIPOS_BUSQUEDA = tuple(FUENTES_BUSQUEDA)
+
+MIN_CARACTERES = 2
+LIMITE_POR_DEFECTO = 5
+LIMITE_MAXIMO = 20
+# Consultas muy amplias (p. ej. dos letras): solo se puntúan, por tipo, los
+# candidatos con el texto más corto, que quedarían primero a igual puntuación
+MAX_CANDIDATOS = 500
+
+_TAMANIO_LOTE = 5000
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto) -> str:
+    """Minúsculas, sin acentos y con cualquier separador convertido en un espacio"""
+    if texto is None:
+        return ''
+    descompuesto = unicodedata.normalize('NFD', str(texto).lower())
+    sin_acentos = ''.join(c for c in descompuesto if unicodedata.category(c) != 'Mn')
+    return _NO_ALFANUMERICO.sub(' ', sin_acentos).strip()
+
+
+def _texto_documento(fila: Dict) -> str:
+    """' palabra palabra ... ' con el nombre, el correo y el teléfono (también sus dígitos juntos)"""
+    palabras = normalizar(fila.get('nombre')).split() + normalizar(fila.get('correo')).split()
+    telefono = normalizar(fila.get('telefono'))
+    palabras += telefono.split()
+    digitos = telefono.replace(' ', '')
+    if digitos and digitos not in palabras:
+        palabras.append(digitos)
+    return ' ' + ' '.join(palabras) + ' '
+
+
+def _trigramas_documento(texto: str) -> Set[str]:
+    """Trigramas de cada palabra con dos espacios delante, para poder buscar por prefijo corto"""
+    trigramas = set()
+    for palabra in texto.split():
+        relleno = '  ' + palabra + ' '
+        trigramas.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return trigramas
+
+
+def _trigramas_consulta(palabra: str) -> Set[str]:
+    """3+ letras: en cualquier parte de una palabra; 1-2 letras: al inicio de una palabra"""
+    if len(palabra) >= 3:
+        return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+    relleno = '  ' + palabra
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def _puntuacion(texto: str, palabras: Sequence[str]) -> int:
+    """0 si alguna palabra no aparece; si no, 3 por palabra exacta, 2 por prefijo y 1 por subcadena"""
+    total = 0
+    for palabra in palabras:
+        if f' {palabra} ' in texto:
+            total += 3
+        elif f' {palabra}' in texto:
+            total += 2
+        elif len(palabra) >= 3 and palabra in texto:
+            total += 1
+        else:
+            return 0
+    return total
+
+
+def _serializable(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, timedelta):
+        segundos = int(valor.total_seconds())
+        return f"{segundos // 3600:02d}:{segundos % 3600 // 60:02d}"
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return valor
+
+
+class _Indice:
+    """
+    Índice invertido de trigramas sobre todos los documentos cargados: para
+    cada trigrama, los números de documento que lo contienen (ordenados) en
+    un solo array int32. Los cambios posteriores a la carga van aparte: los
+    documentos reemplazados o borrados se ocultan y las versiones nuevas se
+    recorren una a una (son pocas hasta la siguiente recarga).
+    """
+
+    def __init__(self, tipos: List[str], ids: List[str], textos: List[str], resultados: List[Dict]):
+        self.tipos = np.array([TIPOS_BUSQUEDA.index(t) for t in tipos], dtype=np.int8)
+        self.ids = ids
+        self.textos = textos
+        self.resultados = resultados
+        self.longitudes = np.fromiter((len(t) for t in textos), dtype=np.int32, count=len(textos))
+        self.posiciones = {(t, i): n for n, (t, i) in enumerate(zip(tipos, ids))}
+        self.ocultos: Set[int] = set()
+        self.extra: Dict[Tuple[str, str], Tuple[str, Dict]] = {}
+
+        vocabulario: Dict[str, int] = {}
+        trigramas, documentos = array('i'), array('i')
+        for n, texto in enumerate(textos):
+            codigos = [vocabulario.setdefault(t, len(vocabulario)) for t in _trigramas_documento(texto)]
+            trigramas.extend(codigos)
+            documentos.extend([n] * len(codigos))
+        t = np.frombuffer(trigramas, dtype=np.int32) if trigramas else np.zeros(0, dtype=np.int32)
+        d = np.frombuffer(documentos, dtype=np.int32) if documentos else np.zeros(0, dtype=np.int32)
+        orden = np.lexsort((d, t))
+        self.vocabulario = vocabulario
+        self.documentos = d[orden]
+        self.inicios = np.searchsorted(t[orden], np.arange(len(vocabulario) + 1))
+
+    def candidatos(self, palabras: Sequence[str]) -> np.ndarray:
+        """Documentos cargados que contienen todos los trigramas de la consulta"""
+        listas = []
+        for palabra in palabras:
+            for trigrama in _trigramas_consulta(palabra):
+                codigo = self.vocabulario.get(trigrama)
+                if codigo is None:
+                    return np.zeros(0, dtype=np.int32)
+                listas.append(self.documentos[self.inicios[codigo]:self.inicios[codigo + 1]])
+        if not listas:
+            return np.zeros(0, dtype=np.int32)
+        listas.sort(key=len)
+        resultado = listas[0]
+        for lista in listas[1:]:
+            resultado = np.intersect1d(resultado, lista, assume_unique=True)
+            if not resultado.size:
+                break
+        return resultado
+
+
+class BusquedaModel:
+    """
+    Búsqueda instantánea (type-ahead) por nombre, correo o teléfono, sin
+    acentos ni mayúsculas, con un índice de trigramas en memoria. Una
+    búsqueda es una intersección de arrays ordenados más la verificación de
+    los candidatos, así que no recorre las tablas.
+
+    El índice se carga entero al arrancar y se recarga en segundo plano cada
+    BUSQUEDA_RECARGA segundos (300 por defecto). Los modelos que crean,
+    renombran o borran usuarios, pacientes, citas o terapeutas llaman a
+    marcar() con los IDs afectados y esas filas se releen enseguida.
+    """
+
+    _indice: Optional[_Indice] = None
+    _cargado_en = 0.0
+    _recargando = False
+    _pendientes: Dict[str, Set[str]] = {tipo: set() for tipo in FUENTES_BUSQUEDA}
+    _procesando = False
+    _lock = threading.Lock()
+    _lock_escritura = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _intervalo_recarga() -> float:
+        try:
+            return float(os.environ.get('BUSQUEDA_RECARGA', '300'))
+        except ValueError:
+            return 300.0
+
+    @staticmethod
+    def _documento(fila: Dict, tipo: str) -> Tuple[str, str, Dict]:
+        """(id, texto normalizado, resultado para la respuesta) de una fila"""
+        identificador = str(fila['id'])
+        resultado = {'tipo': tipo, 'id': _serializable(fila['id']), 'nombre': fila.get('nombre') or ''}
+        for campo in ('correo', 'telefono') + FUENTES_BUSQUEDA[tipo]['detalle']:
+            resultado[campo] = _serializable(fila.get(campo))
+        return identificador, _texto_documento(fila), resultado
+
+    @staticmethod
+    def cargar() -> bool:
+        """Carga completa del índice (al arrancar y cada BUSQUEDA_RECARGA)"""
+        with BusquedaModel._lock_escritura:
+            conn = get_db_connection()
+            if conn is None:
+                print("⚠️ Sin conexión para cargar el índice de búsqueda")
+                return False
+            try:
+                inicio = time.perf_counter()
+                tipos, ids, textos, resultados = [], [], [], []
+                with conn.cursor() as cursor:
+                    for tipo, fuente in FUENTES_BUSQUEDA.items():
+                        cursor.execute(fuente['sql'].format(filtro=''))
+                        while True:
+                            filas = cursor.fetchmany(_TAMANIO_LOTE)
+                            if not filas:
+                                break
+                            for fila in filas:
+                                identificador, texto, resultado = BusquedaModel._documento(fila, tipo)
+                                tipos.append(tipo)
+                                ids.append(identificador)
+                                textos.append(texto)
+                                resultados.append(resultado)
+                BusquedaModel._indice = _Indice(tipos, ids, textos, resultados)
+                BusquedaModel._cargado_en = time.monotonic()
+                print(f"🔎 Índice de búsqueda cargado ({len(ids)} documentos) en {time.perf_counter() - inicio:.2f}s")
+                return True
+            except Exception as e:
+                print(f"❌ Error al cargar el índice de búsqueda: {e}")
+                return False
+            finally:
+                close_db_connection(conn)
+
+    @staticmethod
+    def _recargar_en_fondo():
+        try:
+            BusquedaModel.cargar()
+        finally:
+            with BusquedaModel._lock:
+                BusquedaModel._recargando = False
+
+    @staticmethod
+    def _obtener_indice() -> Optional[_Indice]:
+        """Índice actual; la primera lectura carga y los índices viejos se recargan en segundo plano"""
+        indice = BusquedaModel._indice
+        if indice is None:
+            BusquedaModel.cargar()
+            return BusquedaModel._indice
+
+        if time.monotonic() - BusquedaModel._cargado_en > BusquedaModel._intervalo_recarga():
+            with BusquedaModel._lock:
+                lanzar = not BusquedaModel._recargando
+                BusquedaModel._recargando = True
+            if lanzar:
+                from bd.ejecutor_bd import obtener_ejecutor
+                try:
+                    obtener_ejecutor().submit(BusquedaModel._recargar_en_fondo)
+                except RuntimeError:
+                    with BusquedaModel._lock:
+                        BusquedaModel._recargando = False
+        return indice
+
+    # ------------------------------------------------------------------
+    # Cambios
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def marcar(tipo: str, ids: Iterable, conn=None):
+        """
+        Relee en segundo plano las filas `ids` de `tipo` (creadas, cambiadas
+        o borradas). Si se pasa la conexión de una unidad de trabajo, se
+        espera a que confirme.
+        """
+        claves = {str(i) for i in ids if i is not None and i != ''}
+        if claves:
+            despues_de_confirmar(conn, lambda: BusquedaModel._encolar(tipo, claves))
+
+    @staticmethod
+    def _encolar(tipo: str, claves: Set[str]):
+        with BusquedaModel._lock:
+            BusquedaModel._pendientes[tipo].update(claves)
+            if BusquedaModel._procesando:
+                return
+            BusquedaModel._procesando = True
+
+        from bd.ejecutor_bd import obtener_ejecutor
+        try:
+            obtener_ejecutor().submit(BusquedaModel._procesar_pendientes)
+        except RuntimeError:
+            # Ejecutor cerrado (apagado): la próxima carga completa lo recoge
+            with BusquedaModel._lock:
+                BusquedaModel._procesando = False
+
+    @staticmethod
+    def _procesar_pendientes():
+        """Un solo hilo relee a la vez; los IDs que llegan mientras tanto se acumulan"""
+        while True:
+            with BusquedaModel._lock:
+                lote = {tipo: claves for tipo, claves in BusquedaModel._pendientes.items() if claves}
+                if not lote:
+                    BusquedaModel._procesando = False
+                    return
+                BusquedaModel._pendientes = {tipo: set() for tipo in FUENTES_BUSQUEDA}
+            try:
+                for tipo, claves in lote.items():
+                    BusquedaModel.refrescar(tipo, claves)
+            except Exception as e:
+                print(f"❌ Error al actualizar el índice de búsqueda: {e}")
+
+    @staticmethod
+    def refrescar(tipo: str, claves: Iterable[str]):
+        """Relee las filas indicadas y sustituye (u oculta, si ya no existen) sus documentos"""
+        claves = list(claves)
+        with BusquedaModel._lock_escritura:
+            indice = BusquedaModel._indice
+            if indice is None or not claves:
+                return  # aún no cargado: la carga completa ya verá el cambio
+            fuente = FUENTES_BUSQUEDA[tipo]
+            conn = get_db_connection()
+            if conn is None:
+                BusquedaModel._cargado_en = 0.0
+                return
+            try:
+                marcadores = ', '.join(['%s'] * len(claves))
+                with conn.cursor() as cursor:
+                    cursor.execute(fuente['sql'].format(filtro=f"WHERE {fuente['clave']} IN ({marcadores})"), claves)
+                    filas = cursor.fetchall()
+            except Exception as e:
+                print(f"⚠️ Error al releer {tipo} para el índice de búsqueda: {e}")
+                BusquedaModel._cargado_en = 0.0
+                return
+            finally:
+                close_db_connection(conn)
+
+            # Copias nuevas: las búsquedas en curso siguen con las anteriores
+            ocultos = set(indice.ocultos)
+            extra = dict(indice.extra)
+            for clave in claves:
+                posicion = indice.posiciones.get((tipo, clave))
+                if posicion is not None:
+                    ocultos.add(posicion)
+                extra.pop((tipo, clave), None)
+            for fila in filas:
+                identificador, texto, resultado = BusquedaModel._documento(fila, tipo)
+                extra[(tipo, identificador)] = (texto, resultado)
+            indice.ocultos, indice.extra = ocultos, extra
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def validar(consulta: str, tipos: Optional[Sequence[str]], limite: int) -> Tuple[str, ...]:
+        """Tipos a buscar; ValueError si la consulta, los tipos o el límite no son válidos"""
+        if len(normalizar(consulta).replace(' ', '')) < MIN_CARACTERES:
+            raise ValueError(f"q debe tener al menos {MIN_CARACTERES} letras o números")
+        if not 1 <= limite <= LIMITE_MAXIMO:
+            raise ValueError(f"limite debe estar entre 1 y {LIMITE_MAXIMO}")
+        if not tipos:
+            return TIPOS_BUSQUEDA
+        desconocidos = [t for t in tipos if t not in FUENTES_BUSQUEDA]
+        if desconocidos:
+            raise ValueError(f"tipos debe contener solo: {', '.join(TIPOS_BUSQUEDA)}")
+        return tuple(dict.fromkeys(tipos))
+
+    @staticmethod
+    def _coincidencias(indice: _Indice, palabras: List[str], tipos: Sequence[str],
+                       maximo_candidatos: Optional[int] = None) -> Dict[str, List[Tuple[int, str, Dict]]]:
+        """(puntuación, texto, resultado) de cada documento que cumple todas las palabras, por tipo"""
+        encontrados: Dict[str, List[Tuple[int, str, Dict]]] = {tipo: [] for tipo in tipos}
+        candidatos = indice.candidatos(palabras)
+        tipos_candidatos = indice.tipos[candidatos]
+        ocultos = indice.ocultos
+        for tipo in tipos:
+            del_tipo = candidatos[tipos_candidatos == TIPOS_BUSQUEDA.index(tipo)]
+            if maximo_candidatos and del_tipo.size > maximo_candidatos:
+                cortos = np.argpartition(indice.longitudes[del_tipo], maximo_candidatos)[:maximo_candidatos]
+                del_tipo = del_tipo[cortos]
+            lista = encontrados[tipo]
+            for n in del_tipo.tolist():
+                if n in ocultos:
+                    continue
+                texto = indice.textos[n]
+                puntos = _puntuacion(texto, palabras)
+                if puntos:
+                    lista.append((puntos, texto, indice.resultados[n]))
+        for (tipo, _), (texto, resultado) in indice.extra.items():
+            if tipo in encontrados:
+                puntos = _puntuacion(texto, palabras)
+                if puntos:
+                    encontrados[tipo].append((puntos, texto, resultado))
+        return encontrados
+
+    @staticmethod
+    def buscar(consulta: str, tipos: Optional[Sequence[str]] = None,
+               limite: int = LIMITE_POR_DEFECTO) -> Tuple[Optional[Dict[str, List[Dict]]], Optional[str]]:
+        """
+        Los `limite` mejores resultados de cada tipo: primero los que tienen
+        las palabras completas, luego por prefijo y luego por subcadena; a
+        igual puntuación, los nombres más cortos. ValueError si los
+        parámetros no son válidos.
+        """
+        tipos = BusquedaModel.validar(consulta, tipos, limite)
+        indice = BusquedaModel._obtener_indice()
+        if indice is None:
+            return None, "El índice de búsqueda no está disponible"
+
+        palabras = normalizar(consulta).split()
+        encontrados = BusquedaModel._coincidencias(indice, palabras, tipos, MAX_CANDIDATOS)
+        return {
+            tipo: [r for _, _, r in heapq.nsmallest(limite, lista, key=lambda e: (-e[0], len(e[1])))]
+            for tipo, lista in encontrados.items()
+        }, None
+
+    @staticmethod
+    def estado() -> Dict[str, Any]:
+        """Documentos indexados, cambios pendientes de la próxima recarga y antigüedad"""
+        indice = BusquedaModel._indice
+        if indice is None:
+            return {'documentos': 0, 'cambios': 0, 'segundos_desde_carga': None}
+        return {
+            'documentos': len(indice.ids) - len(indice.ocultos) + len(indice.extra),
+            'cambios': len(indice.ocultos) + len(indice.extra),
+            'segundos_desde_carga': round(time.monotonic() - BusquedaModel._cargado_en, 1),
+        }
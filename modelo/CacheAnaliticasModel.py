@@ -0,0 +1,296 @@
+# modelo/CacheAnaliticasModel.py - CACHÉ DE RESULTADOS DEL PANEL DE ANALÍTICAS
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import date
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# (desde, hasta) de las fechas de las que depende un resultado; None = abierto
+Rango = Tuple[Optional[date], Optional[date]]
+
+
+def _se_solapan(a: Optional[Rango], b: Optional[Rango]) -> bool:
+    """¿Comparten algún día? Un rango None depende de cualquier fecha"""
+    if a is None or b is None:
+        return True
+    return (a[0] is None or b[1] is None or a[0] <= b[1]) and \
+           (b[0] is None or a[1] is None or b[0] <= a[1])
+
+
+class _CalculoEnCurso:
+    """Cálculo que comparten varias peticiones idénticas: resultado o excepción del primero"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.error: Optional[BaseException] = None
+
+
+class CacheAnaliticasModel:
+    """
+    Guarda el resultado de las funciones de AdminAnaliticasModel por
+    (función, parámetros), con un TTL por tipo y el rango de fechas del que
+    depende cada entrada.
+
+      • Varias peticiones iguales a la vez comparten un único cálculo.
+      • Una entrada vencida se sigue sirviendo (hasta ANALITICAS_CACHE_MAX_STALE
+        segundos) mientras se recalcula en segundo plano.
+      • ResumenAnaliticasModel llama a invalidar(desde, hasta) cuando una cita,
+        compra o plan cambia esos días: solo vencen las entradas cuyo período
+        se solapa.
+      • Como mucho ANALITICAS_CACHE_MAX_ENTRADAS entradas (512): al guardar se
+        descartan las caducadas y, si sigue llena, las menos usadas.
+
+    TTL por tipo: ANALITICAS_CACHE_TTL_<TIPO> (p. ej. ANALITICAS_CACHE_TTL_TENDENCIAS).
+    ANALITICAS_CACHE_TTL=0 desactiva la caché.
+    """
+
+    _entradas: 'OrderedDict[Tuple, Dict[str, Any]]' = OrderedDict()
+    _en_curso: Dict[Tuple, _CalculoEnCurso] = {}
+    _refrescando: set = set()
+    _version = 0
+    _invalidaciones: deque = deque(maxlen=256)
+    _contadores: Dict[str, Dict[str, int]] = {}
+    _lock = threading.Lock()
+
+    ESPERA_MAXIMA = 30
+
+    # ------------------------------------------------------------------
+    # Configuración
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _leer_segundos(variable: str, por_defecto: float) -> float:
+        try:
+            return max(0.0, float(os.environ.get(variable, por_defecto)))
+        except ValueError:
+            return por_defecto
+
+    @staticmethod
+    def _ttl(tipo: str, por_defecto: float) -> float:
+        if CacheAnaliticasModel._leer_segundos('ANALITICAS_CACHE_TTL', 1) == 0:
+            return 0.0
+        return CacheAnaliticasModel._leer_segundos(f'ANALITICAS_CACHE_TTL_{tipo.upper()}', por_defecto)
+
+    @staticmethod
+    def _max_stale() -> float:
+        return CacheAnaliticasModel._leer_segundos('ANALITICAS_CACHE_MAX_STALE', 600)
+
+    @staticmethod
+    def _max_entradas() -> int:
+        try:
+            return max(1, int(os.environ.get('ANALITICAS_CACHE_MAX_ENTRADAS', '512')))
+        except ValueError:
+            return 512
+
+    # ------------------------------------------------------------------
+    # Contadores
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _contar(tipo: str, evento: str):
+        """Llamar con _lock tomado"""
+        contadores = CacheAnaliticasModel._contadores.setdefault(tipo, {
+            'aciertos': 0, 'fallos': 0, 'obsoletos': 0, 'esperas': 0,
+            'refrescos': 0, 'invalidaciones': 0, 'expulsiones': 0,
+        })
+        contadores[evento] += 1
+
+    @staticmethod
+    def estadisticas() -> Dict[str, Any]:
+        """Contadores por tipo y totales, más el número de entradas guardadas"""
+        with CacheAnaliticasModel._lock:
+            por_tipo = {tipo: dict(c) for tipo, c in CacheAnaliticasModel._contadores.items()}
+            entradas = len(CacheAnaliticasModel._entradas)
+        totales: Dict[str, int] = {}
+        for contadores in por_tipo.values():
+            for evento, valor in contadores.items():
+                totales[evento] = totales.get(evento, 0) + valor
+        # Las esperas también se sirven sin calcular: comparten el cálculo en curso
+        consultas = sum(totales.get(evento, 0) for evento in ('aciertos', 'obsoletos', 'esperas', 'fallos'))
+        return {
+            'entradas': entradas,
+            'totales': totales,
+            'tasa_aciertos': round((consultas - totales.get('fallos', 0)) / consultas * 100, 1) if consultas else 0,
+            'por_tipo': por_tipo,
+        }
+
+    # ------------------------------------------------------------------
+    # Invalidación
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def invalidar(desde: Optional[date] = None, hasta: Optional[date] = None):
+        """Vence las entradas que dependen de algún día entre desde y hasta (todas si no se indica)"""
+        rango = None if desde is None and hasta is None else (desde, hasta)
+        with CacheAnaliticasModel._lock:
+            CacheAnaliticasModel._version += 1
+            CacheAnaliticasModel._invalidaciones.append((CacheAnaliticasModel._version, rango))
+            for entrada in CacheAnaliticasModel._entradas.values():
+                if entrada['vence'] > 0 and _se_solapan(entrada['rango'], rango):
+                    entrada['vence'] = 0
+                    CacheAnaliticasModel._contar(entrada['tipo'], 'invalidaciones')
+
+    @staticmethod
+    def limpiar():
+        """Descarta todas las entradas (los contadores se conservan)"""
+        with CacheAnaliticasModel._lock:
+            CacheAnaliticasModel._version += 1
+            CacheAnaliticasModel._invalidaciones.append((CacheAnaliticasModel._version, None))
+            CacheAnaliticasModel._entradas.clear()
+
+    @staticmethod
+    def _invalidada_desde(version: int, rango: Optional[Rango]) -> bool:
+        """¿Hubo una invalidación que afecte a `rango` después de `version`? (con _lock)"""
+        invalidaciones = CacheAnaliticasModel._invalidaciones
+        if invalidaciones and invalidaciones[0][0] > version + 1:
+            return True  # el registro ya no llega tan atrás: suponer que sí
+        return any(v > version and _se_solapan(rango, r) for v, r in invalidaciones)
+
+    # ------------------------------------------------------------------
+    # Cálculo
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _es_cacheable(resultado) -> bool:
+        """Las funciones del panel devuelven (datos, error): no guardar errores"""
+        return not (isinstance(resultado, tuple) and len(resultado) == 2 and resultado[1])
+
+    @staticmethod
+    def _guardar(clave: Tuple, entrada: Dict[str, Any]):
+        """Guarda la entrada como la más reciente y aplica el límite de tamaño (con _lock)"""
+        entradas = CacheAnaliticasModel._entradas
+        entradas[clave] = entrada
+        entradas.move_to_end(clave)
+
+        # Las que ya no se pueden servir ni como obsoletas sobran
+        ahora = entrada['calculado']
+        max_stale = CacheAnaliticasModel._max_stale()
+        for vieja in [c for c, e in entradas.items() if ahora - e['calculado'] >= e['ttl'] + max_stale]:
+            del entradas[vieja]
+
+        # Si sigue llena, fuera las menos usadas
+        exceso = len(entradas) - CacheAnaliticasModel._max_entradas()
+        for _ in range(max(0, exceso)):
+            _, expulsada = entradas.popitem(last=False)
+            CacheAnaliticasModel._contar(expulsada['tipo'], 'expulsiones')
+
+    @staticmethod
+    def _calcular_y_guardar(clave: Tuple, tipo: str, ttl: float, rango: Optional[Rango],
+                            funcion: Callable, args: tuple, kwargs: dict):
+        with CacheAnaliticasModel._lock:
+            version = CacheAnaliticasModel._version
+        resultado = funcion(*args, **kwargs)
+        if CacheAnaliticasModel._es_cacheable(resultado):
+            ahora = time.monotonic()
+            with CacheAnaliticasModel._lock:
+                # Si los datos cambiaron mientras se calculaba, se guarda ya vencida
+                vence = 0 if CacheAnaliticasModel._invalidada_desde(version, rango) else ahora + ttl
+                CacheAnaliticasModel._guardar(clave, {
+                    'tipo': tipo, 'rango': rango, 'resultado': resultado,
+                    'calculado': ahora, 'vence': vence, 'ttl': ttl,
+                })
+        return resultado
+
+    @staticmethod
+    def _refrescar_en_fondo(clave, tipo, ttl, rango, funcion, args, kwargs):
+        try:
+            CacheAnaliticasModel._calcular_y_guardar(clave, tipo, ttl, rango, funcion, args, kwargs)
+        except Exception as e:
+            print(f"⚠️ Error al refrescar la caché de analíticas ({tipo}): {e}")
+        finally:
+            with CacheAnaliticasModel._lock:
+                CacheAnaliticasModel._refrescando.discard(clave)
+
+    @staticmethod
+    def obtener(tipo: str, ttl_por_defecto: float, rango: Optional[Rango],
+                funcion: Callable, args: tuple = (), kwargs: Optional[dict] = None):
+        """Resultado de funcion(*args, **kwargs) desde la caché o calculado una sola vez"""
+        kwargs = kwargs or {}
+        ttl = CacheAnaliticasModel._ttl(tipo, ttl_por_defecto)
+        if ttl <= 0:
+            return funcion(*args, **kwargs)
+
+        clave = (tipo, args, tuple(sorted(kwargs.items())))
+        ahora = time.monotonic()
+        with CacheAnaliticasModel._lock:
+            entrada = CacheAnaliticasModel._entradas.get(clave)
+            if entrada and ahora < entrada['vence']:
+                CacheAnaliticasModel._entradas.move_to_end(clave)
+                CacheAnaliticasModel._contar(tipo, 'aciertos')
+                return entrada['resultado']
+
+            obsoleto = entrada is not None and ahora - entrada['calculado'] < ttl + CacheAnaliticasModel._max_stale()
+            if obsoleto:
+                # Servir lo que hay y recalcular en segundo plano (una sola vez)
+                CacheAnaliticasModel._contar(tipo, 'obsoletos')
+                CacheAnaliticasModel._entradas.move_to_end(clave)
+                lanzar = clave not in CacheAnaliticasModel._refrescando
+                if lanzar:
+                    CacheAnaliticasModel._refrescando.add(clave)
+                    CacheAnaliticasModel._contar(tipo, 'refrescos')
+                resultado = entrada['resultado']
+            else:
+                calculo = CacheAnaliticasModel._en_curso.get(clave)
+                if calculo is None:
+                    calculo = _CalculoEnCurso()
+                    CacheAnaliticasModel._en_curso[clave] = calculo
+                    CacheAnaliticasModel._contar(tipo, 'fallos')
+                    calcular = True
+                else:
+                    CacheAnaliticasModel._contar(tipo, 'esperas')
+                    calcular = False
+
+        if obsoleto:
+            if lanzar:
+                from bd.ejecutor_bd import obtener_ejecutor
+                try:
+                    obtener_ejecutor().submit(
+                        CacheAnaliticasModel._refrescar_en_fondo, clave, tipo, ttl, rango, funcion, args, kwargs
+                    )
+                except RuntimeError:
+                    # Ejecutor cerrado (apagado)
+                    with CacheAnaliticasModel._lock:
+                        CacheAnaliticasModel._refrescando.discard(clave)
+            return resultado
+
+        if calcular:
+            try:
+                calculo.resultado = CacheAnaliticasModel._calcular_y_guardar(
+                    clave, tipo, ttl, rango, funcion, args, kwargs
+                )
+                return calculo.resultado
+            except BaseException as e:
+                calculo.error = e
+                raise
+            finally:
+                with CacheAnaliticasModel._lock:
+                    CacheAnaliticasModel._en_curso.pop(clave, None)
+                calculo.evento.set()
+
+        # Otra petición idéntica está calculando: compartir su resultado o su error
+        if not calculo.evento.wait(CacheAnaliticasModel.ESPERA_MAXIMA):
+            return funcion(*args, **kwargs)
+        if calculo.error is not None:
+            raise calculo.error
+        return calculo.resultado
+
+    @staticmethod
+    def cacheado(tipo: str, ttl: float, rango: Optional[Callable[..., Optional[Rango]]] = None):
+        """
+        Decorador para las funciones del panel. `rango(*args, **kwargs)`
+        devuelve los días de los que depende el resultado (None = cualquiera).
+        """
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                try:
+                    dependencia = rango(*args, **kwargs) if rango else None
+                except Exception:
+                    dependencia = None
+                return CacheAnaliticasModel.obtener(tipo, ttl, dependencia, funcion, args, kwargs)
+            envoltura.sin_cache = funcion
+            return envoltura
+        return decorador
@@ -3,6 +3,8 @@ import json
 import uuid
 from bd.conexion_bd import get_db_connection, close_db_connection
 from datetime import datetime
+from modelo.LineasCompraModel import LineasCompraModel
+from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
 
 class CarritoModel:
     
@@ -204,13 +206,22 @@ class CarritoModel:
     @staticmethod
     def confirmar_compra(usuario_id, direccion_envio, ciudad, codigo_postal, metodo_pago):
         """
-        Confirma la compra y guarda toda la información en una sola tabla
+        Confirma la compra: la guarda en compras_confirmadas y sus líneas en
+        compras_lineas, en una sola transacción
         """
+        try:
+            # Antes de abrir la transacción: el DDL hace commit implícito
+            LineasCompraModel.asegurar_tabla()
+        except Exception as e:
+            print(f"Error en modelo confirmar_compra: {e}")
+            return False, "Error interno al confirmar la compra", None
+
         conn = get_db_connection()
         if not conn:
             return False, "Error de conexión con la base de datos", None
 
         try:
+            conn.begin()
             with conn.cursor() as cursor:
                 # 1. Obtener todos los items del carrito del usuario con información completa
                 cursor.execute("""
@@ -292,11 +303,15 @@ class CarritoModel:
                     fecha_actual
                 ))
                 
-                # 6. Vaciar el carrito
+                # 6. Una línea por producto (las analíticas agregan sobre estas)
+                LineasCompraModel.insertar(cursor, orden_id, fecha_actual, items_detalle)
+                
+                # 7. Vaciar el carrito
                 cursor.execute("DELETE FROM carrito WHERE usuario_id = %s", (usuario_id,))
                 
-                # 7. Confirmar transacción
+                # 8. Confirmar transacción
                 conn.commit()
+                ResumenAnaliticasModel.marcar_ventas([fecha_actual])
                 
                 return True, "Compra confirmada exitosamente", {
                     "orden_id": orden_id,
@@ -0,0 +1,301 @@
+# modelo/CatalogoModel.py - CATÁLOGO DE SERVICIOS EN MEMORIA (TERAPIA, NUTRICIÓN, IMPLEMENTOS)
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from bd.conexion_bd import get_db_connection, close_db_connection
+
+# Columnas que usa el formulario de citas (/cita y /api/servicios-terapia)
+CAMPOS_SERVICIO_CITA = [
+    'codigo', 'nombre', 'descripcion', 'terapeuta_disponible',
+    'inicio_jornada', 'final_jornada', 'duracion', 'modalidad',
+    'precio', 'beneficios', 'recomendacion_precita',
+    'condiciones_tratar', 'requisitos', 'consideraciones',
+]
+
+CAMPOS_DECIMALES_NUTRICION = [
+    'precio', 'porciones',
+    'proteina/porcion', 'valor_energetico',
+    'proteinas', 'carbohidratos', 'grasas',
+]
+
+CAMPOS_DECIMALES_IMPLEMENTOS = ['precio', 'peso', 'peso_total_set', 'dificultad']
+
+
+class CatalogoModel:
+    """
+    Copia en memoria de servicio_terapia, servicio_nutricion y
+    servicio_implementos, con las filas ya formateadas e indexadas por código
+    (y categoría en terapia). Las páginas públicas y el formulario de citas
+    leen de aquí sin tocar MySQL.
+
+    Las altas y ediciones de AdminServicioModel llaman a `invalidar()`, que
+    recarga en segundo plano; mientras tanto se sigue sirviendo la copia
+    anterior. Además main.py recarga cada CATALOGO_REFRESCO_SEGUNDOS (600 por
+    defecto) por si las tablas se modifican fuera de la aplicación.
+    """
+
+    _datos: Dict[str, Any] = {}
+    _cargado_en: Optional[float] = None
+    _version = 0
+    _recargando = False
+    _lock = threading.Lock()
+    _carga_lock = threading.Lock()
+
+    @staticmethod
+    def intervalo_refresco() -> int:
+        try:
+            return max(60, int(os.environ.get('CATALOGO_REFRESCO_SEGUNDOS', '600')))
+        except ValueError:
+            return 600
+
+    # ------------------------------------------------------------------
+    # Formateo (se hace una vez por carga, no por petición)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _formatear_servicio_cita(fila: Dict[str, Any]) -> Dict[str, Any]:
+        """Fila de servicio_terapia tal como la espera el formulario de citas"""
+        servicio_dict = {campo: fila.get(campo) for campo in CAMPOS_SERVICIO_CITA}
+
+        # Duración: puede ser int, timedelta o None
+        duracion = servicio_dict.get('duracion')
+        if isinstance(duracion, timedelta):
+            total_minutes = int(duracion.total_seconds() / 60)
+        elif isinstance(duracion, (int, float)):
+            total_minutes = int(duracion)
+        else:
+            total_minutes = 0
+
+        horas = total_minutes // 60
+        minutos = total_minutes % 60
+        if horas > 0:
+            servicio_dict['duracion'] = f"{horas}h {minutos}min"
+        elif minutos > 0:
+            servicio_dict['duracion'] = f"{minutos} min"
+        else:
+            servicio_dict['duracion'] = "No especificada"
+
+        # Horas de jornada como texto
+        for time_field in ['inicio_jornada', 'final_jornada']:
+            time_val = servicio_dict.get(time_field)
+            if time_val:
+                if hasattr(time_val, 'strftime'):
+                    servicio_dict[time_field] = time_val.strftime('%H:%M')
+                elif not isinstance(time_val, str):
+                    servicio_dict[time_field] = str(time_val)
+
+        try:
+            servicio_dict['precio'] = float(servicio_dict['precio']) if servicio_dict.get('precio') is not None else 0.0
+        except (ValueError, TypeError):
+            servicio_dict['precio'] = 0.0
+
+        # Recomendaciones precita en viñetas si el texto es largo
+        recomendaciones = servicio_dict.get('recomendacion_precita')
+        if recomendaciones:
+            if isinstance(recomendaciones, str):
+                recomendaciones = recomendaciones.strip()
+                if len(recomendaciones) > 100 and '.' in recomendaciones:
+                    recomendaciones = recomendaciones.replace('. ', '.<br>• ')
+                    recomendaciones = '• ' + recomendaciones
+                servicio_dict['recomendacion_precita'] = recomendaciones
+        else:
+            servicio_dict['recomendacion_precita'] = ""
+
+        for campo in ['descripcion', 'beneficios', 'condiciones_tratar',
+                      'requisitos', 'consideraciones', 'terapeuta_disponible']:
+            if servicio_dict.get(campo) is None:
+                servicio_dict[campo] = ""
+
+        return servicio_dict
+
+    @staticmethod
+    def _formatear_servicio(fila: Dict[str, Any]) -> Dict[str, Any]:
+        """Fila de servicio_terapia para las páginas de servicios (/servicios)"""
+        servicio_dict = dict(fila)
+        for campo in ['inicio_jornada', 'final_jornada']:
+            if servicio_dict.get(campo):
+                servicio_dict[f'{campo}_str'] = str(servicio_dict[campo])[:5]
+        if servicio_dict.get('terapeuta_disponible'):
+            servicio_dict['terapeutas_count'] = len(servicio_dict['terapeuta_disponible'].split('|'))
+        return servicio_dict
+
+    @staticmethod
+    def _formatear_decimales(fila: Dict[str, Any], campos: List[str]) -> Dict[str, Any]:
+        producto = dict(fila)
+        for campo in campos:
+            if campo in producto and producto[campo] is not None:
+                producto[campo] = float(producto[campo])
+        return producto
+
+    # ------------------------------------------------------------------
+    # Carga e invalidación
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def recargar() -> bool:
+        """Lee las tres tablas y reemplaza el catálogo de una sola vez"""
+        conn = get_db_connection()
+        if conn is None:
+            return False
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT * FROM servicio_terapia")
+                terapias = cursor.fetchall()
+                cursor.execute("SELECT * FROM servicio_nutricion")
+                nutricion = cursor.fetchall()
+                cursor.execute("SELECT * FROM servicio_implementos")
+                implementos = cursor.fetchall()
+
+            servicios = [CatalogoModel._formatear_servicio(fila) for fila in terapias]
+            por_categoria: Dict[Any, List[Dict[str, Any]]] = {}
+            for servicio in servicios:
+                por_categoria.setdefault(servicio.get('categoria'), []).append(servicio)
+
+            servicios_cita = [
+                CatalogoModel._formatear_servicio_cita(fila)
+                for fila in terapias if fila.get('codigo') is not None
+            ]
+
+            productos_nutricion = [
+                CatalogoModel._formatear_decimales(fila, CAMPOS_DECIMALES_NUTRICION) for fila in nutricion
+            ]
+            productos_implementos = [
+                CatalogoModel._formatear_decimales(fila, CAMPOS_DECIMALES_IMPLEMENTOS) for fila in implementos
+            ]
+
+            datos = {
+                'servicios': servicios,
+                'servicios_por_codigo': {str(s['codigo']): s for s in servicios if s.get('codigo') is not None},
+                'servicios_por_categoria': por_categoria,
+                'servicios_cita': servicios_cita,
+                'nutricion': productos_nutricion,
+                'nutricion_por_codigo': {str(p['codigo']): p for p in productos_nutricion if p.get('codigo') is not None},
+                'implementos': productos_implementos,
+                'implementos_por_codigo': {str(p['codigo']): p for p in productos_implementos if p.get('codigo') is not None},
+                'grupos_musculares': list(dict.fromkeys(
+                    p['grupo_muscular'] for p in productos_implementos if p.get('grupo_muscular')
+                )),
+                'niveles_dificultad': sorted(set(
+                    p['dificultad'] for p in productos_implementos if p.get('dificultad') is not None
+                )),
+            }
+
+            with CatalogoModel._lock:
+                CatalogoModel._datos = datos
+                CatalogoModel._cargado_en = time.time()
+            print(f"📚 Catálogo cargado: {len(servicios)} terapias, "
+                  f"{len(productos_nutricion)} nutrición, {len(productos_implementos)} implementos")
+            return True
+
+        except Exception as e:
+            print(f"❌ Error al cargar el catálogo: {e}")
+            return False
+        finally:
+            close_db_connection(conn)
+
+    @staticmethod
+    def invalidar():
+        """Marca el catálogo como desactualizado y lo recarga en segundo plano"""
+        with CatalogoModel._lock:
+            CatalogoModel._version += 1
+            if CatalogoModel._recargando:
+                return
+            CatalogoModel._recargando = True
+
+        from bd.ejecutor_bd import obtener_ejecutor
+        try:
+            obtener_ejecutor().submit(CatalogoModel._recargar_en_fondo)
+        except RuntimeError:
+            # Ejecutor cerrado (apagado): se recarga en el próximo arranque
+            with CatalogoModel._lock:
+                CatalogoModel._recargando = False
+
+    @staticmethod
+    def _recargar_en_fondo():
+        """Recarga hasta que ninguna invalidación llegue durante la lectura"""
+        while True:
+            with CatalogoModel._lock:
+                version = CatalogoModel._version
+            exito = CatalogoModel.recargar()
+            with CatalogoModel._lock:
+                if not exito or CatalogoModel._version == version:
+                    CatalogoModel._recargando = False
+                    return
+
+    @staticmethod
+    def _obtener(clave: str):
+        """Dato del catálogo; solo la primera lectura del proceso va a la BD"""
+        if CatalogoModel._cargado_en is None:
+            with CatalogoModel._carga_lock:
+                if CatalogoModel._cargado_en is None:
+                    CatalogoModel.recargar()
+        return CatalogoModel._datos.get(clave)
+
+    @staticmethod
+    def disponible() -> bool:
+        """¿Hay catálogo cargado? (lo carga si es la primera lectura)"""
+        return CatalogoModel._obtener('servicios') is not None
+
+    # ------------------------------------------------------------------
+    # Lecturas (copias: los llamadores pueden modificar lo que reciben)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _copiar_lista(clave: str) -> Optional[List[Dict[str, Any]]]:
+        lista = CatalogoModel._obtener(clave)
+        return None if lista is None else [dict(fila) for fila in lista]
+
+    @staticmethod
+    def _copiar_fila(clave: str, codigo) -> Optional[Dict[str, Any]]:
+        indice = CatalogoModel._obtener(clave)
+        fila = indice.get(str(codigo)) if indice else None
+        return dict(fila) if fila else None
+
+    @staticmethod
+    def servicios_cita() -> Optional[List[Dict[str, Any]]]:
+        return CatalogoModel._copiar_lista('servicios_cita')
+
+    @staticmethod
+    def servicios_terapia() -> Optional[List[Dict[str, Any]]]:
+        return CatalogoModel._copiar_lista('servicios')
+
+    @staticmethod
+    def servicios_por_categoria(categoria: str) -> Optional[List[Dict[str, Any]]]:
+        indice = CatalogoModel._obtener('servicios_por_categoria')
+        if indice is None:
+            return None
+        return [dict(fila) for fila in indice.get(categoria, [])]
+
+    @staticmethod
+    def servicio_terapia(codigo: str) -> Optional[Dict[str, Any]]:
+        return CatalogoModel._copiar_fila('servicios_por_codigo', codigo)
+
+    @staticmethod
+    def productos_nutricion() -> Optional[List[Dict[str, Any]]]:
+        return CatalogoModel._copiar_lista('nutricion')
+
+    @staticmethod
+    def producto_nutricion(codigo) -> Optional[Dict[str, Any]]:
+        return CatalogoModel._copiar_fila('nutricion_por_codigo', codigo)
+
+    @staticmethod
+    def implementos() -> Optional[List[Dict[str, Any]]]:
+        return CatalogoModel._copiar_lista('implementos')
+
+    @staticmethod
+    def implemento(codigo) -> Optional[Dict[str, Any]]:
+        return CatalogoModel._copiar_fila('implementos_por_codigo', codigo)
+
+    @staticmethod
+    def grupos_musculares() -> Optional[List[str]]:
+        grupos = CatalogoModel._obtener('grupos_musculares')
+        return None if grupos is None else list(grupos)
+
+    @staticmethod
+    def niveles_dificultad() -> Optional[List[float]]:
+        niveles = CatalogoModel._obtener('niveles_dificultad')
+        return None if niveles is None else list(niveles)
@@ -3,6 +3,10 @@ import pymysql
 from typing import Dict, List, Optional, Any
 from datetime import datetime, date, timedelta
 import json
+from modelo.CodigoCitaModel import CodigoCitaModel
+from modelo.DisponibilidadModel import DisponibilidadModel
+from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
+from modelo.BusquedaModel import BusquedaModel
 
 class CitaFisioModel:
     
@@ -281,7 +285,7 @@ class CitaFisioModel:
             with connection.cursor() as cursor:
                 # 1. Verificar que la cita pertenece al terapeutacitas
                 sql_verificar = """
-                SELECT cita_id, estado, nombre_paciente, telefono, correo 
+                SELECT cita_id, estado, nombre_paciente, telefono, correo, fecha_cita 
                 FROM cita 
                 WHERE cita_id = %s AND terapeuta_designado = %s
                 """
@@ -313,8 +317,13 @@ class CitaFisioModel:
                     # Eliminar cita
                     sql_eliminar_cita = "DELETE FROM cita WHERE cita_id = %s"
                     cursor.execute(sql_eliminar_cita, (cita_id,))
+                    CodigoCitaModel.liberar_codigo(cita_id, cursor)
                     
                     connection.commit()
+                    CodigoCitaModel.marcar_ocupacion([cita_id], False)
+                    DisponibilidadModel.invalidar()
+                    ResumenAnaliticasModel.marcar_citas([cita_existente['fecha_cita']])
+                    BusquedaModel.marcar('citas', [cita_id])
                     
                     return {
                         'success': True,
@@ -456,6 +465,12 @@ class CitaFisioModel:
                     
                     cursor.execute(sql_insert_paciente, valores_paciente)
                     connection.commit()
+                    DisponibilidadModel.invalidar()
+                    ResumenAnaliticasModel.marcar_citas([cita_existente['fecha_cita']])
+                    ResumenAnaliticasModel.marcar_planes([date.today()])
+                    BusquedaModel.marcar('citas', [cita_id])
+                    BusquedaModel.marcar('pacientes', [cita_id])
+                    BusquedaModel.marcar('usuarios', [ID_usuario])
                     
                     return {
                         'success': True,
@@ -476,6 +491,9 @@ class CitaFisioModel:
                     """
                     cursor.execute(sql_actualizar, (nuevo_estado, cita_id, terapeuta_nombre))
                     connection.commit()
+                    DisponibilidadModel.invalidar()
+                    ResumenAnaliticasModel.marcar_citas([cita_existente['fecha_cita']])
+                    BusquedaModel.marcar('citas', [cita_id])
                     
                     return {
                         'success': True,
@@ -539,7 +557,7 @@ class CitaFisioModel:
                 
                 # 2. Verificar si existe paciente relacionado
                 sql_verificar_paciente = """
-                SELECT codigo_cita, ID_usuario 
+                SELECT codigo_cita, ID_usuario, fecha_creacion_reporte 
                 FROM paciente 
                 WHERE codigo_cita = %s
                 """
@@ -650,6 +668,7 @@ class CitaFisioModel:
                 try:
                     sql_eliminar_cita = "DELETE FROM cita WHERE cita_id = %s"
                     cursor.execute(sql_eliminar_cita, (cita_id,))
+                    CodigoCitaModel.liberar_codigo(cita_id, cursor)
                     print(f"✅ Eliminada cita {cita_id}")
                 except Exception as e:
                     print(f"❌ Error eliminando cita: {e}")
@@ -660,6 +679,14 @@ class CitaFisioModel:
                     }
                 
                 connection.commit()
+                CodigoCitaModel.marcar_ocupacion([cita_id], False)
+                DisponibilidadModel.invalidar()
+                ResumenAnaliticasModel.marcar_citas([fecha_cita])
+                BusquedaModel.marcar('citas', [cita_id])
+                if paciente_existente:
+                    ResumenAnaliticasModel.marcar_planes([paciente_existente.get('fecha_creacion_reporte')])
+                    BusquedaModel.marcar('pacientes', [cita_id])
+                    BusquedaModel.marcar('usuarios', [usuario_id])
                 print(f"✅ Commit realizado - Transacción exitosa")
                 
                 # 6. Preparar datos para el correo
@@ -1,11 +1,39 @@
 import pymysql
 from bd.conexion_bd import get_db_connection, close_db_connection
-from typing import List, Dict, Any, Optional
-from datetime import timedelta, datetime
-import random
+from bd.unidad_trabajo import despues_de_confirmar
+from typing import List, Dict, Any, Optional, Set
+from datetime import timedelta, datetime, date
+from modelo.CodigoCitaModel import CodigoCitaModel
+from modelo.DisponibilidadModel import DisponibilidadModel
+from modelo.CatalogoModel import CatalogoModel
+from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
+from modelo.BusquedaModel import BusquedaModel
+
+# Índice único sobre la columna generada `reserva_activa` (terapeuta|fecha|hora)
+INDICE_RESERVA_ACTIVA = 'uq_cita_reserva_activa'
+CONDICION_RESERVA_ACTIVA = (
+    "(estado IS NULL OR LOWER(estado) NOT IN ('cancelada', 'cancelado')) "
+    "AND terapeuta_designado NOT IN ('', 'Por asignar')"
+)
+MENSAJE_HORARIO_OCUPADO = "El horario seleccionado ya no está disponible para este terapeuta"
+
+
+class HorarioOcupadoError(Exception):
+    """El terapeuta ya tiene una cita activa en esa fecha y hora"""
+
+    def __init__(self, mensaje: str = MENSAJE_HORARIO_OCUPADO, fechas: Optional[List[str]] = None):
+        super().__init__(mensaje)
+        self.fechas = fechas or []
+
 
 class CitaModel:
     
+    # None: sin comprobar; True: la BD impide las reservas dobles
+    _restriccion_reservas: Optional[bool] = None
+    
+    # Máximo de sesiones por serie (un año de sesiones semanales)
+    MAX_SESIONES_SERIE = 52
+    
     # Rangos de códigos según tipo de usuario
     RANGOS_CODIGOS = {
         'usuario': ('FS-0001', 'FS-0500'),      # Usuario autogestionado
@@ -13,342 +41,165 @@ class CitaModel:
         'fisio': ('FS-1001', 'FS-2000')         # Fisioterapeuta
     }
     
-    # Cache para códigos disponibles
-    _codigos_cache = {
-        'usuario': None,
-        'admin': None,
-        'fisio': None
-    }
-    
     @staticmethod
-    def obtener_siguiente_codigo_usuario() -> str:
+    def obtener_codigo_por_tipo(tipo_usuario: str, conn=None) -> str:
         """
-        Obtiene el siguiente código disponible en el pool de usuario (FS-0001 a FS-0500)
+        Obtiene código según el tipo de usuario (ver CodigoCitaModel)
         """
-        # Primero intentar con cache
-        if CitaModel._codigos_cache['usuario']:
-            codigo = CitaModel._codigos_cache['usuario']
-            CitaModel._codigos_cache['usuario'] = None
-            return codigo
-        
-        conn = get_db_connection()
-        if conn is None:
-            return ""
-        
-        try:
-            with conn.cursor() as cursor:
-                # Obtener todos los códigos de cita existentes en el rango de usuario
-                inicio_rango, fin_rango = CitaModel.RANGOS_CODIGOS['usuario']
-                
-                # Extraer números de los rangos
-                inicio_num = int(inicio_rango.split('-')[1])
-                fin_num = int(fin_rango.split('-')[1])
-                
-                # Buscar todos los códigos existentes
-                sql = """
-                SELECT cita_id 
-                FROM cita 
-                WHERE cita_id LIKE 'FS-%'
-                """
-                cursor.execute(sql)
-                todos_codigos = cursor.fetchall()
-                
-                # Convertir a conjunto de números usados
-                numeros_usados = set()
-                for codigo in todos_codigos:
-                    try:
-                        if codigo['cita_id'].startswith('FS-'):
-                            num = int(codigo['cita_id'].split('-')[1])
-                            if inicio_num <= num <= fin_num:
-                                numeros_usados.add(num)
-                    except (ValueError, IndexError):
-                        continue
-                
-                # Encontrar el primer número disponible
-                for num in range(inicio_num, fin_num + 1):
-                    if num not in numeros_usados:
-                        codigo_disponible = f"FS-{num:04d}"
-                        print(f"Código disponible encontrado para usuario: {codigo_disponible}")
-                        return codigo_disponible
-                
-                # Si no hay números disponibles en el rango de usuario
-                print("ADVERTENCIA: No hay códigos disponibles en el rango de usuario (0001-0500)")
-                
-                # Intentar con rango extendido
-                return CitaModel.buscar_codigo_en_rango_extendido('usuario')
-                
-        except Exception as e:
-            print(f"Error al obtener siguiente código de usuario: {e}")
-            return f"FS-{random.randint(1, 500):04d}"  # Fallback aleatorio
-        finally:
-            close_db_connection(conn)
+        if tipo_usuario not in CitaModel.RANGOS_CODIGOS:
+            tipo_usuario = 'usuario'  # Default
+        return CodigoCitaModel.asignar_codigo(tipo_usuario, conn=conn)
     
     @staticmethod
-    def buscar_codigo_en_rango_extendido(tipo_usuario: str) -> str:
+    def generar_codigo_cita(tipo_usuario: str = 'usuario', conn=None) -> str:
         """
-        Busca un código disponible en rangos extendidos
+        Genera un código único para la cita según el tipo de usuario
         """
-        try:
-            # Para usuarios, probar rangos alternativos
-            if tipo_usuario == 'usuario':
-                rangos_extendidos = [
-                    ('FS-5001', 'FS-6000'),
-                    ('FS-6001', 'FS-7000'),
-                    ('FS-7001', 'FS-8000')
-                ]
-            elif tipo_usuario == 'admin':
-                rangos_extendidos = [
-                    ('FS-2001', 'FS-3000'),
-                    ('FS-3001', 'FS-4000')
-                ]
-            elif tipo_usuario == 'fisio':
-                rangos_extendidos = [
-                    ('FS-4001', 'FS-5000'),
-                    ('FS-8001', 'FS-9000')
-                ]
-            else:
-                rangos_extendidos = [('FS-9001', 'FS-9999')]
-            
-            conn = get_db_connection()
-            if conn is None:
-                return f"FS-{random.randint(5001, 9999):04d}"
-            
-            try:
-                with conn.cursor() as cursor:
-                    # Obtener todos los códigos existentes
-                    sql = "SELECT cita_id FROM cita WHERE cita_id LIKE 'FS-%'"
-                    cursor.execute(sql)
-                    todos_codigos = cursor.fetchall()
-                    
-                    # Convertir a conjunto de números usados
-                    numeros_usados = set()
-                    for codigo in todos_codigos:
-                        try:
-                            if codigo['cita_id'].startswith('FS-'):
-                                num = int(codigo['cita_id'].split('-')[1])
-                                numeros_usados.add(num)
-                        except (ValueError, IndexError):
-                            continue
-                    
-                    # Buscar en cada rango extendido
-                    for inicio_rango, fin_rango in rangos_extendidos:
-                        inicio_num = int(inicio_rango.split('-')[1])
-                        fin_num = int(fin_rango.split('-')[1])
-                        
-                        for num in range(inicio_num, fin_num + 1):
-                            if num not in numeros_usados:
-                                codigo_disponible = f"FS-{num:04d}"
-                                print(f"Código encontrado en rango extendido: {codigo_disponible}")
-                                return codigo_disponible
-                    
-                    # Si no hay en rangos extendidos, generar aleatorio fuera de rangos principales
-                    return f"FS-{random.randint(9001, 9999):04d}"
-                    
-            finally:
-                close_db_connection(conn)
-                
-        except Exception as e:
-            print(f"Error al buscar en rango extendido: {e}")
-            return f"FS-{random.randint(9001, 9999):04d}"
+        return CitaModel.obtener_codigo_por_tipo(tipo_usuario, conn=conn)
     
     @staticmethod
-    def obtener_codigo_por_tipo(tipo_usuario: str) -> str:
-        """
-        Obtiene código según el tipo de usuario
-        """
-        if tipo_usuario not in CitaModel.RANGOS_CODIGOS:
-            tipo_usuario = 'usuario'  # Default
-        
-        if tipo_usuario == 'usuario':
-            return CitaModel.obtener_siguiente_codigo_usuario()
-        else:
-            # Para admin y fisio, buscar en su rango específico
-            return CitaModel.buscar_codigo_en_rango_especifico(tipo_usuario)
-    
+    def obtener_servicios_terapia() -> List[Dict[str, Any]]:
+        """Obtiene todos los servicios de terapia disponibles incluyendo recomendaciones"""
+        return CatalogoModel.servicios_cita() or []
+
     @staticmethod
-    def buscar_codigo_en_rango_especifico(tipo_usuario: str) -> str:
+    def _indice_reservas_instalado(cursor) -> bool:
+        cursor.execute("""
+            SELECT COUNT(*) AS total FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = 'cita' AND index_name = %s
+        """, (INDICE_RESERVA_ACTIVA,))
+        return bool(cursor.fetchone()['total'])
+
+    @staticmethod
+    def comprobar_restriccion_reservas() -> bool:
         """
-        Busca código en el rango específico para admin o fisio
+        Comprueba al arrancar, sin cambiar el esquema, si el índice de reservas
+        únicas está instalado. Si no lo está, crear_cita verifica el horario
+        antes de insertar hasta que se ejecute `python -m bd.migraciones`.
         """
-        if tipo_usuario not in CitaModel.RANGOS_CODIGOS:
-            return CitaModel.obtener_siguiente_codigo_usuario()
-        
-        inicio_rango, fin_rango = CitaModel.RANGOS_CODIGOS[tipo_usuario]
-        inicio_num = int(inicio_rango.split('-')[1])
-        fin_num = int(fin_rango.split('-')[1])
-        
         conn = get_db_connection()
         if conn is None:
-            return f"FS-{random.randint(inicio_num, fin_num):04d}"
+            return False
         
         try:
             with conn.cursor() as cursor:
-                # Buscar todos los códigos existentes en este rango
-                sql = """
-                SELECT cita_id 
-                FROM cita 
-                WHERE cita_id LIKE 'FS-%'
-                """
-                cursor.execute(sql)
-                todos_codigos = cursor.fetchall()
-                
-                # Convertir a conjunto de números usados en este rango
-                numeros_usados = set()
-                for codigo in todos_codigos:
-                    try:
-                        if codigo['cita_id'].startswith('FS-'):
-                            num = int(codigo['cita_id'].split('-')[1])
-                            if inicio_num <= num <= fin_num:
-                                numeros_usados.add(num)
-                    except (ValueError, IndexError):
-                        continue
-                
-                # Encontrar el primer número disponible
-                for num in range(inicio_num, fin_num + 1):
-                    if num not in numeros_usados:
-                        codigo_disponible = f"FS-{num:04d}"
-                        print(f"Código encontrado para {tipo_usuario}: {codigo_disponible}")
-                        return codigo_disponible
-                
-                # Si no hay en este rango, buscar en rango extendido
-                return CitaModel.buscar_codigo_en_rango_extendido(tipo_usuario)
-                
+                CitaModel._restriccion_reservas = CitaModel._indice_reservas_instalado(cursor)
+            if not CitaModel._restriccion_reservas:
+                print("⚠️ Falta la restricción de reservas únicas en cita: ejecuta python -m bd.migraciones")
+            return CitaModel._restriccion_reservas
         except Exception as e:
-            print(f"Error al buscar código para {tipo_usuario}: {e}")
-            return f"FS-{random.randint(inicio_num, fin_num):04d}"
+            print(f"Error al comprobar la restricción de reservas: {e}")
+            CitaModel._restriccion_reservas = False
+            return False
         finally:
             close_db_connection(conn)
-    
+
     @staticmethod
-    def generar_codigo_cita(tipo_usuario: str = 'usuario') -> str:
+    def asegurar_restriccion_reservas() -> bool:
         """
-        Genera un código único para la cita según el tipo de usuario
+        Instala (una sola vez, desde bd/migraciones.py) el índice único que
+        impide dos citas activas del mismo terapeuta en la misma fecha y hora.
+        MySQL no tiene índices parciales, así que se indexa una columna
+        generada que vale NULL para las citas canceladas o sin terapeuta. Si ya
+        hay reservas duplicadas no se instala y crear_cita sigue verificando
+        antes de insertar.
         """
-        return CitaModel.obtener_codigo_por_tipo(tipo_usuario)
-    
-    @staticmethod
-    def obtener_servicios_terapia() -> List[Dict[str, Any]]:
-        """Obtiene todos los servicios de terapia disponibles incluyendo recomendaciones"""
         conn = get_db_connection()
         if conn is None:
-            return []
+            return False
         
         try:
             with conn.cursor() as cursor:
-                sql = """
-                SELECT codigo, nombre, descripcion, terapeuta_disponible, 
-                    inicio_jornada, final_jornada, duracion, modalidad, 
-                    precio, beneficios, recomendacion_precita,
-                    condiciones_tratar, requisitos, consideraciones
-                FROM servicio_terapia 
-                WHERE codigo IS NOT NULL
-                """
-                cursor.execute(sql)
-                servicios = cursor.fetchall()
-                
-                # Convertir a diccionarios y formatear datos
-                servicios_formateados = []
-                for servicio in servicios:
-                    servicio_dict = dict(servicio)
-                    
-                    # CORRECCIÓN: Manejar duración (puede ser int, timedelta, o None)
-                    duracion = servicio_dict.get('duracion')
-                    if isinstance(duracion, timedelta):
-                        # Convertir timedelta a minutos enteros
-                        total_minutes = int(duracion.total_seconds() / 60)
-                    elif isinstance(duracion, (int, float)):
-                        total_minutes = int(duracion)
-                    else:
-                        total_minutes = 0
-                    
-                    # Formatear duración como string
-                    horas = total_minutes // 60
-                    minutos = total_minutes % 60
-                    if horas > 0:
-                        servicio_dict['duracion'] = f"{horas}h {minutos}min"
-                    elif minutos > 0:
-                        servicio_dict['duracion'] = f"{minutos} min"
-                    else:
-                        servicio_dict['duracion'] = "No especificada"
-                    
-                    # CORRECCIÓN: Convertir time objects a strings
-                    for time_field in ['inicio_jornada', 'final_jornada']:
-                        time_val = servicio_dict.get(time_field)
-                        if time_val:
-                            if hasattr(time_val, 'strftime'):
-                                servicio_dict[time_field] = time_val.strftime('%H:%M')
-                            elif isinstance(time_val, str):
-                                # Ya es string, mantenerlo
-                                pass
-                            else:
-                                servicio_dict[time_field] = str(time_val)
-                    
-                    # Asegurar que el precio sea float
-                    if servicio_dict.get('precio') is not None:
-                        try:
-                            servicio_dict['precio'] = float(servicio_dict['precio'])
-                        except (ValueError, TypeError):
-                            servicio_dict['precio'] = 0.0
-                    else:
-                        servicio_dict['precio'] = 0.0
-                    
-                    # Procesar recomendaciones precita (puede ser None)
-                    recomendaciones = servicio_dict.get('recomendacion_precita')
-                    if recomendaciones:
-                        if isinstance(recomendaciones, str):
-                            # Limpiar y formatear
-                            recomendaciones = recomendaciones.strip()
-                            # Separar por puntos si es un texto largo
-                            if len(recomendaciones) > 100 and '.' in recomendaciones:
-                                recomendaciones = recomendaciones.replace('. ', '.<br>• ')
-                                recomendaciones = '• ' + recomendaciones
-                            servicio_dict['recomendacion_precita'] = recomendaciones
-                    else:
-                        servicio_dict['recomendacion_precita'] = ""
-                    
-                    # Asegurar que todos los campos de texto sean strings
-                    campos_texto = ['descripcion', 'beneficios', 'condiciones_tratar', 
-                                'requisitos', 'consideraciones', 'terapeuta_disponible']
-                    for campo in campos_texto:
-                        if servicio_dict.get(campo) is None:
-                            servicio_dict[campo] = ""
-                    
-                    servicios_formateados.append(servicio_dict)
+                if CitaModel._indice_reservas_instalado(cursor):
+                    CitaModel._restriccion_reservas = True
+                    return True
+                
+                cursor.execute(f"""
+                    SELECT terapeuta_designado, fecha_cita, hora_cita, COUNT(*) AS total
+                    FROM cita
+                    WHERE {CONDICION_RESERVA_ACTIVA}
+                    GROUP BY terapeuta_designado, fecha_cita, hora_cita
+                    HAVING COUNT(*) > 1
+                    LIMIT 20
+                """)
+                duplicadas = cursor.fetchall()
+                if duplicadas:
+                    print("⚠️ ADVERTENCIA: Hay reservas duplicadas; no se instala la restricción única:")
+                    for fila in duplicadas:
+                        print(f"   - {fila['terapeuta_designado']} {fila['fecha_cita']} {fila['hora_cita']} ({fila['total']} citas)")
+                    CitaModel._restriccion_reservas = False
+                    return False
                 
-                return servicios_formateados
+                cursor.execute("""
+                    SELECT COUNT(*) AS total FROM information_schema.columns
+                    WHERE table_schema = DATABASE() AND table_name = 'cita' AND column_name = 'reserva_activa'
+                """)
+                if not cursor.fetchone()['total']:
+                    cursor.execute(f"""
+                        ALTER TABLE cita ADD COLUMN reserva_activa VARCHAR(255)
+                        GENERATED ALWAYS AS (
+                            CASE WHEN {CONDICION_RESERVA_ACTIVA}
+                            THEN CONCAT(terapeuta_designado, '|', fecha_cita, '|', hora_cita) END
+                        ) VIRTUAL
+                    """)
+                cursor.execute(f"ALTER TABLE cita ADD UNIQUE INDEX {INDICE_RESERVA_ACTIVA} (reserva_activa)")
+                CitaModel._restriccion_reservas = True
+                print("🔒 Restricción de reservas únicas instalada en cita")
+                return True
                 
         except Exception as e:
-            print(f"Error al obtener servicios de terapia: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
+            print(f"Error al instalar la restricción de reservas: {e}")
+            CitaModel._restriccion_reservas = False
+            return False
         finally:
             close_db_connection(conn)
 
     @staticmethod
-    def crear_cita(datos_cita: Dict[str, Any], tipo_usuario: str = 'usuario') -> str:
+    def es_conflicto_horario(error: Exception) -> bool:
+        """¿El error es la violación del índice de reservas activas?"""
+        return (
+            isinstance(error, pymysql.err.IntegrityError)
+            and error.args and error.args[0] == 1062
+            and INDICE_RESERVA_ACTIVA in str(error.args[1] if len(error.args) > 1 else '')
+        )
+
+    @staticmethod
+    def _horario_ocupado(cursor, terapeuta: str, fecha: str, hora: str) -> bool:
+        """Verificación previa, solo si la restricción única no está instalada"""
+        cursor.execute(f"""
+            SELECT 1 FROM cita
+            WHERE terapeuta_designado = %s AND fecha_cita = %s AND hora_cita = %s
+            AND {CONDICION_RESERVA_ACTIVA}
+            LIMIT 1
+        """, (terapeuta, fecha, hora))
+        return cursor.fetchone() is not None
+
+    @staticmethod
+    def crear_cita(datos_cita: Dict[str, Any], tipo_usuario: str = 'usuario', conn=None) -> str:
         """
         Crea una nueva cita y retorna el código de la cita creada
         tipo_usuario: 'usuario', 'admin', o 'fisio'
+        
+        Un solo INSERT: la restricción única de la tabla decide si el horario
+        sigue libre. Lanza HorarioOcupadoError si el terapeuta ya tiene una
+        cita activa en esa fecha y hora. El código y la cita van en la misma
+        transacción: si la cita no se guarda, el código vuelve al asignador.
         """
-        conn = get_db_connection()
+        conexion_propia = conn is None
+        if conexion_propia:
+            conn = get_db_connection()
         if conn is None:
             return ""
         
         try:
+            if not CodigoCitaModel._en_transaccion(conn):
+                conn.begin()
+            
             with conn.cursor() as cursor:
-                # Generar código único para la cita según tipo de usuario
-                codigo_cita = CitaModel.generar_codigo_cita(tipo_usuario)
-                
-                if not codigo_cita:
-                    raise Exception("No se pudo generar el código de cita")
-                
-                # Validar que el código no exista ya (doble verificación)
-                cursor.execute("SELECT cita_id FROM cita WHERE cita_id = %s", (codigo_cita,))
-                if cursor.fetchone():
-                    print(f"ADVERTENCIA: El código {codigo_cita} ya existe. Generando alternativo...")
-                    # Generar código alternativo
-                    codigo_cita = f"FS-{random.randint(9001, 9999):04d}"
+                if not CitaModel._restriccion_reservas and CitaModel._horario_ocupado(
+                    cursor, datos_cita['terapeuta_designado'], datos_cita['fecha_cita'], datos_cita['hora_cita']
+                ):
+                    raise HorarioOcupadoError(MENSAJE_HORARIO_OCUPADO)
                 
                 # Estado por defecto para citas de usuario
                 estado_cita = 'pendiente' if tipo_usuario == 'usuario' else 'confirmada'
@@ -360,44 +211,181 @@ class CitaModel:
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """
                 
-                cursor.execute(sql, (
-                    codigo_cita,
-                    datos_cita['servicio'],
-                    datos_cita['terapeuta_designado'],
-                    datos_cita['nombre_paciente'],
-                    datos_cita['telefono'],
-                    datos_cita['correo'],
-                    datos_cita['fecha_cita'],
-                    datos_cita['hora_cita'],
-                    datos_cita.get('notas_adicionales', ''),
-                    datos_cita['tipo_pago'],
-                    estado_cita
-                ))
+                for _ in range(3):
+                    # Generar código único para la cita según tipo de usuario
+                    codigo_cita = CitaModel.generar_codigo_cita(tipo_usuario, conn=conn)
+                    if not codigo_cita:
+                        raise Exception("No se pudo generar el código de cita")
+                    
+                    try:
+                        cursor.execute(sql, (
+                            codigo_cita,
+                            datos_cita['servicio'],
+                            datos_cita['terapeuta_designado'],
+                            datos_cita['nombre_paciente'],
+                            datos_cita['telefono'],
+                            datos_cita['correo'],
+                            datos_cita['fecha_cita'],
+                            datos_cita['hora_cita'],
+                            datos_cita.get('notas_adicionales', ''),
+                            datos_cita['tipo_pago'],
+                            estado_cita
+                        ))
+                        break
+                    except pymysql.err.IntegrityError as e:
+                        if CitaModel.es_conflicto_horario(e):
+                            raise HorarioOcupadoError(MENSAJE_HORARIO_OCUPADO) from e
+                        if e.args[0] != 1062:
+                            raise
+                        # Código ocupado por una cita insertada con código manual
+                        print(f"ADVERTENCIA: El código {codigo_cita} ya existe. Asignando el siguiente...")
+                else:
+                    raise Exception("No se encontró un código de cita libre")
                 
                 conn.commit()
-                
-                # Verificar que se insertó correctamente
-                cursor.execute("SELECT cita_id FROM cita WHERE cita_id = %s", (codigo_cita,))
-                cita_verificada = cursor.fetchone()
-                
-                if cita_verificada:
-                    print(f"Cita creada exitosamente por {tipo_usuario}: {codigo_cita}")
-                    return codigo_cita
-                else:
-                    raise Exception("No se pudo verificar la creación de la cita")
+                despues_de_confirmar(conn, lambda: CodigoCitaModel.marcar_ocupacion([codigo_cita], True))
+                despues_de_confirmar(conn, DisponibilidadModel.invalidar)
+                ResumenAnaliticasModel.marcar_citas([datos_cita['fecha_cita']], conn=conn)
+                BusquedaModel.marcar('citas', [codigo_cita], conn=conn)
+                print(f"Cita creada exitosamente por {tipo_usuario}: {codigo_cita}")
+                return codigo_cita
                     
+        except HorarioOcupadoError:
+            print(f"Horario ocupado: {datos_cita['terapeuta_designado']} {datos_cita['fecha_cita']} {datos_cita['hora_cita']}")
+            conn.rollback()
+            raise
         except Exception as e:
             print(f"Error al crear cita: {e}")
             if conn:
                 conn.rollback()
             return ""
         finally:
-            close_db_connection(conn)
+            if conexion_propia:
+                close_db_connection(conn)
+
+    @staticmethod
+    def fechas_serie(fecha_inicio: date, sesiones: int, cada_semanas: int = 1,
+                     dias_semana: Optional[Set[int]] = None) -> List[date]:
+        """
+        Fechas de una serie semanal: `sesiones` citas a partir de fecha_inicio,
+        en los días de la semana indicados (0=lunes; por defecto el de
+        fecha_inicio), repitiendo cada `cada_semanas` semanas.
+        """
+        dias = sorted(dias_semana) if dias_semana else [fecha_inicio.weekday()]
+        cada_semanas = max(1, cada_semanas)
+        lunes = fecha_inicio - timedelta(days=fecha_inicio.weekday())
+        fechas: List[date] = []
+        semana = 0
+        while len(fechas) < sesiones:
+            for dia in dias:
+                fecha = lunes + timedelta(weeks=semana, days=dia)
+                if fecha >= fecha_inicio:
+                    fechas.append(fecha)
+                    if len(fechas) == sesiones:
+                        break
+            semana += cada_semanas
+        return fechas
+
+    @staticmethod
+    def crear_serie_citas(datos_cita: Dict[str, Any], fechas: List[str], tipo_usuario: str = 'usuario', conn=None) -> List[str]:
+        """
+        Crea todas las sesiones de un plan de tratamiento (misma hora y
+        terapeuta, una cita por fecha) en una sola transacción: una consulta
+        para los horarios, una reserva de códigos y un único INSERT múltiple.
+        Lanza HorarioOcupadoError con las fechas en conflicto; si falla
+        cualquier otra cosa no se guarda ninguna sesión y retorna [].
+        """
+        if not fechas:
+            return []
+        conexion_propia = conn is None
+        if conexion_propia:
+            conn = get_db_connection()
+        if conn is None:
+            return []
+        
+        terapeuta = datos_cita['terapeuta_designado']
+        hora = datos_cita['hora_cita']
+        try:
+            if not CodigoCitaModel._en_transaccion(conn):
+                conn.begin()
+            
+            with conn.cursor() as cursor:
+                # 1. Todos los horarios de la serie en una consulta
+                marcadores = ', '.join(['%s'] * len(fechas))
+                cursor.execute(f"""
+                    SELECT fecha_cita FROM cita
+                    WHERE terapeuta_designado = %s AND hora_cita = %s
+                    AND fecha_cita IN ({marcadores})
+                    AND {CONDICION_RESERVA_ACTIVA}
+                """, [terapeuta, hora, *fechas])
+                ocupadas = sorted(str(fila['fecha_cita']) for fila in cursor.fetchall())
+                if ocupadas:
+                    raise HorarioOcupadoError(
+                        f"{MENSAJE_HORARIO_OCUPADO} en: {', '.join(ocupadas)}", fechas=ocupadas
+                    )
+                
+                # 2. Todos los códigos de una vez
+                codigos = CodigoCitaModel.asignar_codigos(tipo_usuario, len(fechas), conn=conn)
+                if len(codigos) != len(fechas):
+                    raise Exception("No se pudieron generar los códigos de la serie")
+                
+                # 3. Un solo INSERT para todas las sesiones
+                estado_cita = 'pendiente' if tipo_usuario == 'usuario' else 'confirmada'
+                filas = [
+                    (
+                        codigo,
+                        datos_cita['servicio'],
+                        terapeuta,
+                        datos_cita['nombre_paciente'],
+                        datos_cita['telefono'],
+                        datos_cita['correo'],
+                        fecha,
+                        hora,
+                        datos_cita.get('notas_adicionales', ''),
+                        datos_cita['tipo_pago'],
+                        estado_cita
+                    )
+                    for codigo, fecha in zip(codigos, fechas)
+                ]
+                try:
+                    cursor.executemany("""
+                    INSERT INTO cita (cita_id, servicio, terapeuta_designado, nombre_paciente, 
+                                    telefono, correo, fecha_cita, hora_cita, 
+                                    notas_adicionales, tipo_pago, estado)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """, filas)
+                except pymysql.err.IntegrityError as e:
+                    if CitaModel.es_conflicto_horario(e):
+                        # Otra reserva ganó alguno de los horarios entre la consulta y el INSERT
+                        raise HorarioOcupadoError(MENSAJE_HORARIO_OCUPADO) from e
+                    raise
+                
+                conn.commit()
+                despues_de_confirmar(conn, lambda: CodigoCitaModel.marcar_ocupacion(codigos, True))
+                despues_de_confirmar(conn, DisponibilidadModel.invalidar)
+                ResumenAnaliticasModel.marcar_citas(fechas, conn=conn)
+                BusquedaModel.marcar('citas', codigos, conn=conn)
+                print(f"Serie de {len(codigos)} citas creada por {tipo_usuario}: {codigos[0]} ... {codigos[-1]}")
+                return codigos
+                
+        except HorarioOcupadoError:
+            print(f"Horario ocupado en la serie: {terapeuta} {hora}")
+            conn.rollback()
+            raise
+        except Exception as e:
+            print(f"Error al crear serie de citas: {e}")
+            conn.rollback()
+            return []
+        finally:
+            if conexion_propia:
+                close_db_connection(conn)
 
     @staticmethod
-    def crear_acudiente(codigo_cita: str, datos_acudiente: Dict[str, Any]) -> bool:
+    def crear_acudiente(codigo_cita: str, datos_acudiente: Dict[str, Any], conn=None) -> bool:
         """Crea un nuevo registro de acudiente vinculado a una cita"""
-        conn = get_db_connection()
+        conexion_propia = conn is None
+        if conexion_propia:
+            conn = get_db_connection()
         if conn is None:
             return False
         
@@ -430,12 +418,15 @@ class CitaModel:
                 conn.rollback()
             return False
         finally:
-            close_db_connection(conn)
+            if conexion_propia:
+                close_db_connection(conn)
 
     @staticmethod
-    def verificar_disponibilidad_cita(fecha: str, hora: str, terapeuta: str) -> bool:
+    def verificar_disponibilidad_cita(fecha: str, hora: str, terapeuta: str, conn=None) -> bool:
         """Verifica si la hora y fecha están disponibles para el terapeuta"""
-        conn = get_db_connection()
+        conexion_propia = conn is None
+        if conexion_propia:
+            conn = get_db_connection()
         if conn is None:
             return False
         
@@ -445,6 +436,7 @@ class CitaModel:
                 SELECT COUNT(*) as count 
                 FROM cita 
                 WHERE fecha_cita = %s AND hora_cita = %s AND terapeuta_designado = %s
+                AND (estado IS NULL OR LOWER(estado) NOT IN ('cancelada', 'cancelado'))
                 """
                 cursor.execute(sql, (fecha, hora, terapeuta))
                 resultado = cursor.fetchone()
@@ -456,88 +448,30 @@ class CitaModel:
             print(f"Error al verificar disponibilidad: {e}")
             return False
         finally:
-            close_db_connection(conn)
+            if conexion_propia:
+                close_db_connection(conn)
     
     @staticmethod
-    def verificar_estado_pool_usuario() -> Dict[str, Any]:
+    def verificar_estado_pool_usuario(siguientes: int = 1) -> Dict[str, Any]:
         """
-        Verifica el estado del pool de códigos para usuarios
+        Verifica el estado del pool de códigos para usuarios (lectura de los
+        contadores en memoria, sin recorrer la tabla cita)
         """
-        conn = get_db_connection()
-        if conn is None:
-            return {"error": "No hay conexión"}
-        
-        try:
-            with conn.cursor() as cursor:
-                inicio_rango, fin_rango = CitaModel.RANGOS_CODIGOS['usuario']
-                inicio_num = int(inicio_rango.split('-')[1])
-                fin_num = int(fin_rango.split('-')[1])
-                total_codigos = fin_num - inicio_num + 1
-                
-                # Obtener todos los códigos
-                sql = "SELECT cita_id FROM cita WHERE cita_id LIKE 'FS-%'"
-                cursor.execute(sql)
-                todos_codigos = cursor.fetchall()
-                
-                # Contar códigos usados en el rango de usuario
-                codigos_usados = 0
-                numeros_usados = []
-                
-                for codigo in todos_codigos:
-                    try:
-                        if codigo['cita_id'].startswith('FS-'):
-                            num = int(codigo['cita_id'].split('-')[1])
-                            if inicio_num <= num <= fin_num:
-                                codigos_usados += 1
-                                numeros_usados.append(num)
-                    except (ValueError, IndexError):
-                        continue
-                
-                # Buscar el siguiente disponible
-                siguiente_disponible = None
-                for num in range(inicio_num, fin_num + 1):
-                    if num not in numeros_usados:
-                        siguiente_disponible = f"FS-{num:04d}"
-                        break
-                
-                # Verificar si hay códigos disponibles
-                if siguiente_disponible:
-                    # Precachear el siguiente código
-                    CitaModel._codigos_cache['usuario'] = siguiente_disponible
-                    # Buscar el siguiente después de ese
-                    for num in range(int(siguiente_disponible.split('-')[1]) + 1, fin_num + 1):
-                        if num not in numeros_usados:
-                            # Guardar como siguiente en caché
-                            pass
-                
-                porcentaje_uso = (codigos_usados / total_codigos * 100) if total_codigos > 0 else 0
-                
-                return {
-                    "rango": f"{inicio_rango} - {fin_rango}",
-                    "total_codigos": total_codigos,
-                    "codigos_usados": codigos_usados,
-                    "codigos_disponibles": total_codigos - codigos_usados,
-                    "siguiente_disponible": siguiente_disponible,
-                    "porcentaje_uso": round(porcentaje_uso, 2),
-                    "alerta": "BAJO" if codigos_usados < 400 else "MEDIO" if codigos_usados < 450 else "ALTO"
-                }
-                
-        except Exception as e:
-            print(f"Error al verificar estado del pool: {e}")
-            return {"error": str(e)}
-        finally:
-            close_db_connection(conn)
+        from modelo.OcupacionCodigosModel import OcupacionCodigosModel
+        estado = OcupacionCodigosModel.estado('usuario', siguientes)
+        if 'error' not in estado:
+            codigos_usados = estado['codigos_usados']
+            estado['alerta'] = "BAJO" if codigos_usados < 400 else "MEDIO" if codigos_usados < 450 else "ALTO"
+        return estado
     
     @staticmethod
     def inicializar_cache_codigos():
-        """Inicializa la caché con algunos códigos disponibles"""
+        """Prepara el asignador de códigos (tablas y siembra inicial)"""
         try:
-            estado = CitaModel.verificar_estado_pool_usuario()
-            if estado.get('siguiente_disponible'):
-                CitaModel._codigos_cache['usuario'] = estado['siguiente_disponible']
-                print(f"Caché inicializada con código: {estado['siguiente_disponible']}")
+            CodigoCitaModel.inicializar()
+            print("Asignador de códigos de cita inicializado")
         except Exception as e:
-            print(f"Error al inicializar caché: {e}")
+            print(f"Error al inicializar el asignador de códigos: {e}")
 
     
     
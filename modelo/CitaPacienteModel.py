@@ -2,6 +2,10 @@
 from bd.conexion_bd import get_db_connection, close_db_connection
 from datetime import datetime, date
 import uuid
+from modelo.DisponibilidadModel import DisponibilidadModel
+from modelo.CitaModel import CitaModel
+from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
+from modelo.BusquedaModel import BusquedaModel
 
 class CitaPacienteModel:
     
@@ -19,21 +23,13 @@ class CitaPacienteModel:
         
         try:
             with conn.cursor() as cursor:
-                # Verificar disponibilidad del terapeuta
-                check_query = """
-                SELECT cita_id FROM cita 
-                WHERE terapeuta_designado = %s AND fecha_cita = %s AND hora_cita = %s AND estado != 'cancelada'
-                """
-                cursor.execute(check_query, (
-                    datos_cita['terapeuta_designado'],
-                    datos_cita['fecha_cita'],
-                    datos_cita['hora_cita']
-                ))
-                
-                if cursor.fetchone():
+                # Verificar disponibilidad solo si la BD no tiene la restricción única
+                if not CitaModel._restriccion_reservas and CitaModel._horario_ocupado(
+                    cursor, datos_cita['terapeuta_designado'], datos_cita['fecha_cita'], datos_cita['hora_cita']
+                ):
                     return None, "El terapeuta ya tiene una cita programada en ese horario"
                 
-                # Insertar nueva cita
+                # Insertar nueva cita (la restricción única rechaza el horario ocupado)
                 cita_id = CitaPacienteModel.generar_id_cita()
                 sql = """
                 INSERT INTO cita (
@@ -56,9 +52,14 @@ class CitaPacienteModel:
                     datos_cita['tipo_pago']
                 ))
                 conn.commit()
+                DisponibilidadModel.invalidar()
+                ResumenAnaliticasModel.marcar_citas([datos_cita['fecha_cita']])
+                BusquedaModel.marcar('citas', [cita_id])
                 return cita_id, "Cita creada exitosamente"
                 
         except Exception as e:
+            if CitaModel.es_conflicto_horario(e):
+                return None, "El terapeuta ya tiene una cita programada en ese horario"
             print(f"Error en modelo crear_cita: {e}")
             return None, "Error interno al crear cita"
         finally:
@@ -138,9 +139,13 @@ class CitaPacienteModel:
         
         try:
             with conn.cursor() as cursor:
+                fechas = ResumenAnaliticasModel.fechas_de_citas(cursor, [cita_id])
                 query = "UPDATE cita SET estado = %s WHERE cita_id = %s"
                 cursor.execute(query, (nuevo_estado, cita_id))
                 conn.commit()
+                DisponibilidadModel.invalidar()
+                ResumenAnaliticasModel.marcar_citas(fechas)
+                BusquedaModel.marcar('citas', [cita_id])
                 return True, "Estado actualizado exitosamente"
         except Exception as e:
             print(f"Error en modelo actualizar_estado_cita: {e}")
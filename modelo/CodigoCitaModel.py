@@ -0,0 +1,318 @@
+# modelo/CodigoCitaModel.py - ASIGNADOR DE CÓDIGOS DE CITA (FS-xxxx)
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from pymysql.constants import SERVER_STATUS
+
+from bd.conexion_bd import get_db_connection, close_db_connection
+
+
+class CodigoCitaModel:
+    """
+    Reparte los códigos FS-xxxx sin leer la tabla `cita`.
+
+    Por cada tipo de usuario hay una fila en `codigo_cita_secuencia` con el
+    siguiente número nunca usado, y en `codigo_cita_libre` quedan los números
+    devueltos por citas eliminadas. Asignar un código es tomar el menor libre
+    o avanzar la secuencia, ambas cosas con bloqueo de fila (SELECT ... FOR
+    UPDATE), así que dos reservas simultáneas nunca reciben el mismo código.
+
+    Si se llama dentro de una transacción (p. ej. la unidad de trabajo de la
+    petición) la asignación forma parte de ella: si la cita no llega a
+    guardarse, el código tampoco se consume; en ese caso es el llamador quien,
+    tras confirmar, refleja los códigos en el mapa de ocupación con
+    marcar_ocupacion (si se deshace, el mapa no debe cambiar).
+    """
+
+    # Tramos por tipo de usuario, en orden de preferencia (principal + extendidos)
+    TRAMOS = {
+        'usuario': [(1, 500), (5001, 6000), (6001, 7000), (7001, 8000)],
+        'admin': [(501, 1000), (2001, 3000), (3001, 4000)],
+        'fisio': [(1001, 2000), (4001, 5000), (8001, 9000)],
+    }
+
+    _tablas_listas = False
+    _tipos_sembrados = set()
+    _lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Utilidades
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def formatear(numero: int) -> str:
+        return f"FS-{numero:04d}"
+
+    @staticmethod
+    def numero_de_codigo(codigo: str) -> Optional[int]:
+        """'FS-0123' -> 123; None si no es un código FS válido"""
+        if not codigo or not codigo.startswith('FS-'):
+            return None
+        try:
+            return int(codigo.split('-')[1])
+        except (ValueError, IndexError):
+            return None
+
+    @staticmethod
+    def tipo_de_numero(numero: int) -> Optional[str]:
+        """Tipo de usuario dueño del número, según los tramos"""
+        for tipo, tramos in CodigoCitaModel.TRAMOS.items():
+            for inicio, fin in tramos:
+                if inicio <= numero <= fin:
+                    return tipo
+        return None
+
+    @staticmethod
+    def _normalizar(numero: int, tramos: List[Tuple[int, int]]) -> Optional[int]:
+        """Primer número >= `numero` que cae dentro de algún tramo (None si se agotaron)"""
+        for inicio, fin in tramos:
+            if numero <= fin:
+                return max(numero, inicio)
+        return None
+
+    @staticmethod
+    def _en_transaccion(conn) -> bool:
+        return bool(conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS)
+
+    # ------------------------------------------------------------------
+    # Esquema y siembra inicial
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _asegurar_tablas():
+        """
+        Crea las tablas del asignador si no existen. Usa su propia conexión:
+        el DDL hace commit implícito y no debe tocar la transacción del llamador.
+        """
+        if CodigoCitaModel._tablas_listas:
+            return
+        with CodigoCitaModel._lock:
+            if CodigoCitaModel._tablas_listas:
+                return
+            conn = get_db_connection()
+            if conn is None:
+                raise RuntimeError("Sin conexión para preparar el asignador de códigos")
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS codigo_cita_secuencia (
+                        tipo VARCHAR(10) NOT NULL PRIMARY KEY,
+                        siguiente INT NOT NULL
+                    ) ENGINE=InnoDB
+                    """)
+                    cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS codigo_cita_libre (
+                        numero INT NOT NULL PRIMARY KEY,
+                        tipo VARCHAR(10) NOT NULL,
+                        KEY idx_codigo_libre_tipo (tipo, numero)
+                    ) ENGINE=InnoDB
+                    """)
+                CodigoCitaModel._tablas_listas = True
+            finally:
+                close_db_connection(conn)
+
+    @staticmethod
+    def _sembrar_tipo(tipo: str):
+        """
+        Primera vez que se usa un tipo: recorre `cita` UNA sola vez para fijar la
+        secuencia tras el mayor código usado y pasar los huecos a la lista libre.
+        Si otro proceso ya sembró, no hace nada (INSERT IGNORE sobre la PK).
+        """
+        if tipo in CodigoCitaModel._tipos_sembrados:
+            return
+        CodigoCitaModel._asegurar_tablas()
+
+        conn = get_db_connection()
+        if conn is None:
+            raise RuntimeError("Sin conexión para sembrar el asignador de códigos")
+        try:
+            conn.begin()
+            with conn.cursor() as cursor:
+                tramos = CodigoCitaModel.TRAMOS[tipo]
+                cursor.execute(
+                    "INSERT IGNORE INTO codigo_cita_secuencia (tipo, siguiente) VALUES (%s, %s)",
+                    (tipo, tramos[0][0])
+                )
+                if cursor.rowcount == 0:
+                    conn.rollback()
+                    CodigoCitaModel._tipos_sembrados.add(tipo)
+                    return
+
+                cursor.execute("SELECT cita_id FROM cita WHERE cita_id LIKE 'FS-%'")
+                usados = set()
+                for fila in cursor.fetchall():
+                    numero = CodigoCitaModel.numero_de_codigo(fila['cita_id'])
+                    if numero is not None and CodigoCitaModel.tipo_de_numero(numero) == tipo:
+                        usados.add(numero)
+
+                if usados:
+                    mayor = max(usados)
+                    libres = [
+                        (numero, tipo)
+                        for inicio, fin in tramos
+                        for numero in range(inicio, min(fin, mayor) + 1)
+                        if numero not in usados
+                    ]
+                    cursor.execute(
+                        "UPDATE codigo_cita_secuencia SET siguiente = %s WHERE tipo = %s",
+                        (mayor + 1, tipo)
+                    )
+                    if libres:
+                        cursor.executemany(
+                            "INSERT IGNORE INTO codigo_cita_libre (numero, tipo) VALUES (%s, %s)",
+                            libres
+                        )
+                    print(f"🌱 Asignador de códigos '{tipo}': {len(usados)} usados, {len(libres)} huecos libres")
+            conn.commit()
+            CodigoCitaModel._tipos_sembrados.add(tipo)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            close_db_connection(conn)
+
+    @staticmethod
+    def inicializar():
+        """Prepara tablas y siembra todos los tipos (opcional, p. ej. al arrancar)"""
+        for tipo in CodigoCitaModel.TRAMOS:
+            CodigoCitaModel._sembrar_tipo(tipo)
+
+    # ------------------------------------------------------------------
+    # Asignación y liberación
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def marcar_ocupacion(codigos: List[str], usados: bool):
+        """Refleja en OcupacionCodigosModel códigos asignados o liberados, ya confirmados"""
+        from modelo.OcupacionCodigosModel import OcupacionCodigosModel
+        for codigo in codigos:
+            OcupacionCodigosModel.marcar(codigo, usados)
+
+    @staticmethod
+    def asignar_codigo(tipo_usuario: str = 'usuario', conn=None) -> str:
+        """
+        Reserva el siguiente código del tipo indicado en tiempo constante.
+        Retorna "" si no hay conexión, si hubo error o si el tipo agotó sus tramos.
+        """
+        codigos = CodigoCitaModel.asignar_codigos(tipo_usuario, 1, conn=conn)
+        return codigos[0] if codigos else ""
+
+    @staticmethod
+    def asignar_codigos(tipo_usuario: str = 'usuario', cantidad: int = 1, conn=None) -> List[str]:
+        """
+        Reserva `cantidad` códigos de una vez (series de citas): primero los
+        menores de la lista libre y el resto avanzando la secuencia, con un
+        solo bloqueo de cada tabla. Retorna [] si no se pudieron reservar todos.
+        """
+        if tipo_usuario not in CodigoCitaModel.TRAMOS:
+            tipo_usuario = 'usuario'
+        if cantidad < 1:
+            return []
+
+        try:
+            CodigoCitaModel._sembrar_tipo(tipo_usuario)
+        except Exception as e:
+            print(f"❌ Error preparando el asignador de códigos: {e}")
+            return []
+
+        conexion_propia = conn is None
+        if conexion_propia:
+            conn = get_db_connection()
+        if conn is None:
+            return []
+
+        transaccion_propia = False
+        try:
+            transaccion_propia = not CodigoCitaModel._en_transaccion(conn)
+            if transaccion_propia:
+                conn.begin()
+
+            with conn.cursor() as cursor:
+                # 1. Reutilizar los menores códigos liberados
+                cursor.execute(
+                    "SELECT numero FROM codigo_cita_libre WHERE tipo = %s ORDER BY numero LIMIT %s FOR UPDATE",
+                    (tipo_usuario, cantidad)
+                )
+                numeros = [fila['numero'] for fila in cursor.fetchall()]
+                if numeros:
+                    marcadores = ', '.join(['%s'] * len(numeros))
+                    cursor.execute(f"DELETE FROM codigo_cita_libre WHERE numero IN ({marcadores})", numeros)
+
+                # 2. Avanzar la secuencia del tipo por lo que falte
+                faltan = cantidad - len(numeros)
+                if faltan:
+                    cursor.execute(
+                        "SELECT siguiente FROM codigo_cita_secuencia WHERE tipo = %s FOR UPDATE",
+                        (tipo_usuario,)
+                    )
+                    fila = cursor.fetchone()
+                    siguiente = fila['siguiente'] if fila else None
+                    for _ in range(faltan):
+                        numero = CodigoCitaModel._normalizar(siguiente, CodigoCitaModel.TRAMOS[tipo_usuario]) if siguiente is not None else None
+                        if numero is None:
+                            print(f"⚠️ ADVERTENCIA: No quedan códigos disponibles para '{tipo_usuario}'")
+                            if transaccion_propia:
+                                conn.rollback()
+                            return []
+                        numeros.append(numero)
+                        siguiente = numero + 1
+                    cursor.execute(
+                        "UPDATE codigo_cita_secuencia SET siguiente = %s WHERE tipo = %s",
+                        (siguiente, tipo_usuario)
+                    )
+
+            codigos = [CodigoCitaModel.formatear(numero) for numero in numeros]
+            if transaccion_propia:
+                conn.commit()
+                CodigoCitaModel.marcar_ocupacion(codigos, True)
+            if len(codigos) == 1:
+                print(f"🔢 Código asignado para {tipo_usuario}: {codigos[0]}")
+            else:
+                print(f"🔢 {len(codigos)} códigos asignados para {tipo_usuario}: {codigos[0]} ... {codigos[-1]}")
+            return codigos
+
+        except Exception as e:
+            print(f"❌ Error al asignar código de cita: {e}")
+            if transaccion_propia:
+                conn.rollback()
+            return []
+        finally:
+            if conexion_propia:
+                close_db_connection(conn)
+
+    @staticmethod
+    def liberar_codigos(codigos: List[str], cursor) -> int:
+        """
+        Devuelve a la lista libre los códigos de citas eliminadas. Se ejecuta con
+        el cursor del llamador para quedar en la misma transacción que el DELETE.
+        Solo se liberan números que la secuencia ya había repartido. El
+        llamador marca los códigos como libres (marcar_ocupacion) al confirmar.
+        """
+        valores = []
+        for codigo in codigos:
+            numero = CodigoCitaModel.numero_de_codigo(codigo)
+            tipo = CodigoCitaModel.tipo_de_numero(numero) if numero is not None else None
+            if tipo:
+                valores.extend((numero, tipo))
+        if not valores:
+            return 0
+
+        try:
+            CodigoCitaModel._asegurar_tablas()
+            # Una sola sentencia para todo el lote
+            numeros = " UNION ALL ".join(["SELECT %s AS numero, %s AS tipo"] * (len(valores) // 2))
+            cursor.execute(f"""
+                INSERT IGNORE INTO codigo_cita_libre (numero, tipo)
+                SELECT n.numero, n.tipo
+                FROM ({numeros}) n
+                JOIN codigo_cita_secuencia s ON s.tipo = n.tipo AND s.siguiente > n.numero
+            """, valores)
+            return cursor.rowcount
+        except Exception as e:
+            # Un código sin liberar solo se pierde; la eliminación sigue adelante
+            print(f"⚠️ No se pudieron liberar códigos {codigos}: {e}")
+            return 0
+
+    @staticmethod
+    def liberar_codigo(codigo: str, cursor) -> int:
+        return CodigoCitaModel.liberar_codigos([codigo], cursor)
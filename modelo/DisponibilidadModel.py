@@ -0,0 +1,371 @@
+# modelo/DisponibilidadModel.py - HORARIOS LIBRES POR TERAPEUTA / SERVICIO
+import bisect
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from bd.conexion_bd import get_db_connection, close_db_connection
+
+
+def _sin_acentos(texto: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn').lower()
+
+
+class _IndiceIntervalos:
+    """Intervalos ocupados [inicio, fin) en minutos de un terapeuta en un día, ordenados"""
+
+    def __init__(self):
+        self.inicios: List[int] = []
+        self.fines: List[int] = []
+        self._max_fin: Optional[List[int]] = None
+
+    def agregar(self, inicio: int, fin: int):
+        posicion = bisect.bisect_left(self.inicios, inicio)
+        self.inicios.insert(posicion, inicio)
+        self.fines.insert(posicion, fin)
+        self._max_fin = None
+
+    def ocupado(self, inicio: int, fin: int) -> bool:
+        """¿Algún intervalo se cruza con [inicio, fin)? O(log n)"""
+        if self._max_fin is None:
+            # Máximo fin acumulado: admite citas solapadas (dobles reservas antiguas)
+            self._max_fin, maximo = [], -1
+            for f in self.fines:
+                maximo = max(maximo, f)
+                self._max_fin.append(maximo)
+        # Solo pueden cruzarse los que empiezan antes de `fin`
+        posicion = bisect.bisect_left(self.inicios, fin)
+        return posicion > 0 and self._max_fin[posicion - 1] > inicio
+
+
+class DisponibilidadModel:
+    """
+    Calcula los horarios libres combinando:
+      • franja_horaria_dias / franja_horaria_horas de cada terapeuta,
+      • inicio_jornada / final_jornada / duracion del servicio,
+      • las citas ya reservadas del rango, leídas con UNA consulta.
+
+    Los resultados se guardan DISPONIBILIDAD_CACHE_TTL segundos (30 por
+    defecto) y se descartan en cuanto se crea, cambia o elimina una cita
+    (invalidar()). La verificación final al reservar sigue siendo contra la BD.
+
+    Los errores de la petición se devuelven como {"error": ...}; los fallos
+    internos añaden además "interno" ('conexion' o 'calculo') para que el
+    controlador no los confunda con un rango o un terapeuta inválidos.
+    """
+
+    DURACION_POR_DEFECTO = 60
+    HORARIO_POR_DEFECTO = (8 * 60, 18 * 60)
+    DIAS_POR_DEFECTO = {0, 1, 2, 3, 4}
+    MAX_DIAS = 31
+    MAX_CACHE = 256
+
+    DIAS_SEMANA = {
+        'lunes': 0, 'martes': 1, 'miercoles': 2, 'jueves': 3,
+        'viernes': 4, 'sabado': 5, 'domingo': 6,
+        'lun': 0, 'mar': 1, 'mie': 2, 'jue': 3, 'vie': 4, 'sab': 5, 'dom': 6,
+    }
+
+    _cache: Dict[Tuple, Tuple[float, int, Dict[str, Any]]] = {}
+    _version = 0
+    _lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Caché
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _ttl() -> float:
+        try:
+            return float(os.environ.get('DISPONIBILIDAD_CACHE_TTL', '30'))
+        except ValueError:
+            return 30.0
+
+    @staticmethod
+    def _guardar(clave: Tuple, version: int, resultado: Dict[str, Any]):
+        """Guarda en caché descartando lo caducado y, si aún sobra, lo más antiguo (con _lock tomado)"""
+        cache = DisponibilidadModel._cache
+        ahora, ttl = time.monotonic(), DisponibilidadModel._ttl()
+        for vieja in [c for c, (instante, _, _) in cache.items() if ahora - instante >= ttl]:
+            del cache[vieja]
+        cache.pop(clave, None)
+        while len(cache) >= DisponibilidadModel.MAX_CACHE:
+            del cache[next(iter(cache))]
+        cache[clave] = (ahora, version, resultado)
+
+    @staticmethod
+    def invalidar():
+        """Descarta todo lo calculado (llamar tras crear, cambiar o eliminar citas)"""
+        with DisponibilidadModel._lock:
+            DisponibilidadModel._version += 1
+            DisponibilidadModel._cache.clear()
+
+    # ------------------------------------------------------------------
+    # Interpretación de horarios (texto libre del panel de fisioterapeutas)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def a_minutos(valor) -> Optional[int]:
+        """TIME de MySQL (timedelta), time, 'HH:MM[:SS]' o minutos -> minutos desde medianoche"""
+        if valor is None:
+            return None
+        if isinstance(valor, timedelta):
+            return int(valor.total_seconds() // 60)
+        if hasattr(valor, 'hour') and hasattr(valor, 'minute'):
+            return valor.hour * 60 + valor.minute
+        if isinstance(valor, (int, float)):
+            return int(valor)
+        return DisponibilidadModel._parsear_hora(str(valor))
+
+    @staticmethod
+    def _parsear_hora(texto: str) -> Optional[int]:
+        """'8:00 AM', '17:30', '5pm', '08:00:00' -> minutos"""
+        m = re.match(r'\s*(\d{1,2})(?::(\d{2}))?(?::\d{2})?\s*([ap])?\.?\s*m?\.?\s*$', texto.strip().lower())
+        if not m:
+            return None
+        hora, minuto, sufijo = int(m.group(1)), int(m.group(2) or 0), m.group(3)
+        if sufijo == 'p' and hora < 12:
+            hora += 12
+        elif sufijo == 'a' and hora == 12:
+            hora = 0
+        if hora > 24 or minuto > 59:
+            return None
+        return hora * 60 + minuto
+
+    @staticmethod
+    def parsear_horas(texto: Optional[str]) -> Optional[Tuple[int, int]]:
+        """'8:00 AM - 5:00 PM' / '08:00-17:00' / '8am a 6pm' -> (480, 1020)"""
+        if not texto:
+            return None
+        partes = re.split(r'\s*[-–]\s*|\s+(?:a|hasta)\s+', texto.strip().lower(), maxsplit=1)
+        if len(partes) != 2:
+            return None
+        inicio = DisponibilidadModel._parsear_hora(partes[0])
+        fin = DisponibilidadModel._parsear_hora(partes[1])
+        if inicio is None or fin is None or fin <= inicio:
+            return None
+        return inicio, fin
+
+    @staticmethod
+    def parsear_dias(texto: Optional[str]) -> Optional[Set[int]]:
+        """'Lunes a Viernes' / 'Lunes, Miércoles y Viernes' / 'Lun-Sáb' -> {0..6}"""
+        if not texto:
+            return None
+        limpio = _sin_acentos(texto)
+        if 'todos' in limpio:
+            return set(range(7))
+        tokens = re.findall(r'[a-z]+|-|–', limpio)
+        dias: Set[int] = set()
+        anterior = None
+        en_rango = False
+        for token in tokens:
+            if token in ('a', 'al', 'hasta', '-', '–'):
+                en_rango = anterior is not None
+                continue
+            dia = DisponibilidadModel.DIAS_SEMANA.get(token)
+            if dia is None:
+                continue
+            if en_rango:
+                actual = anterior
+                while actual != dia:
+                    actual = (actual + 1) % 7
+                    dias.add(actual)
+                en_rango = False
+            dias.add(dia)
+            anterior = dia
+        return dias or None
+
+    # ------------------------------------------------------------------
+    # Lectura de datos
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _cargar_servicios(cursor) -> Dict[str, Dict[str, Any]]:
+        """Servicios por nombre (las citas guardan el nombre del servicio)"""
+        cursor.execute("""
+            SELECT codigo, nombre, terapeuta_disponible, inicio_jornada, final_jornada, duracion
+            FROM servicio_terapia
+            WHERE codigo IS NOT NULL
+        """)
+        servicios = {}
+        for fila in cursor.fetchall():
+            duracion = DisponibilidadModel.a_minutos(fila.get('duracion')) or DisponibilidadModel.DURACION_POR_DEFECTO
+            inicio = DisponibilidadModel.a_minutos(fila.get('inicio_jornada'))
+            fin = DisponibilidadModel.a_minutos(fila.get('final_jornada'))
+            terapeutas = [
+                t.strip() for t in re.split(r',|;|\s+y\s+', fila.get('terapeuta_disponible') or '') if t.strip()
+            ]
+            servicios[fila['nombre']] = {
+                'codigo': fila['codigo'],
+                'nombre': fila['nombre'],
+                'duracion': duracion,
+                'jornada': (inicio, fin) if inicio is not None and fin is not None and fin > inicio else None,
+                'terapeutas': terapeutas,
+            }
+        return servicios
+
+    @staticmethod
+    def _cargar_terapeutas(cursor, nombres: Optional[List[str]]) -> Dict[str, Dict[str, Any]]:
+        sql = """
+            SELECT nombre_completo, franja_horaria_dias, franja_horaria_horas
+            FROM terapeuta
+            WHERE (estado = 'Activo' OR estado IS NULL)
+        """
+        parametros: List[Any] = []
+        if nombres:
+            sql += f" AND nombre_completo IN ({','.join(['%s'] * len(nombres))})"
+            parametros.extend(nombres)
+        cursor.execute(sql, parametros)
+        terapeutas = {}
+        for fila in cursor.fetchall():
+            terapeutas[fila['nombre_completo']] = {
+                'dias': DisponibilidadModel.parsear_dias(fila.get('franja_horaria_dias')) or DisponibilidadModel.DIAS_POR_DEFECTO,
+                'horas': DisponibilidadModel.parsear_horas(fila.get('franja_horaria_horas')) or DisponibilidadModel.HORARIO_POR_DEFECTO,
+            }
+        return terapeutas
+
+    @staticmethod
+    def _cargar_ocupacion(cursor, terapeutas: List[str], desde: date, hasta: date,
+                          servicios: Dict[str, Dict[str, Any]]) -> Dict[Tuple[str, date], _IndiceIntervalos]:
+        """Una sola consulta por rango de fechas -> índice de intervalos por (terapeuta, día)"""
+        from modelo.CitaModel import CONDICION_RESERVA_ACTIVA  # CitaModel importa este módulo
+        indice: Dict[Tuple[str, date], _IndiceIntervalos] = {}
+        if not terapeutas:
+            return indice
+        cursor.execute(f"""
+            SELECT terapeuta_designado, fecha_cita, hora_cita, servicio
+            FROM cita
+            WHERE fecha_cita BETWEEN %s AND %s
+            AND terapeuta_designado IN ({','.join(['%s'] * len(terapeutas))})
+            AND {CONDICION_RESERVA_ACTIVA}
+        """, [desde, hasta] + terapeutas)
+        for fila in cursor.fetchall():
+            inicio = DisponibilidadModel.a_minutos(fila.get('hora_cita'))
+            fecha = fila.get('fecha_cita')
+            if inicio is None or fecha is None:
+                continue
+            if isinstance(fecha, datetime):
+                fecha = fecha.date()
+            elif isinstance(fecha, str):
+                try:
+                    fecha = datetime.strptime(fecha[:10], '%Y-%m-%d').date()
+                except ValueError:
+                    continue
+            servicio = servicios.get(fila.get('servicio'))
+            duracion = servicio['duracion'] if servicio else DisponibilidadModel.DURACION_POR_DEFECTO
+            clave = (fila['terapeuta_designado'], fecha)
+            indice.setdefault(clave, _IndiceIntervalos()).agregar(inicio, inicio + duracion)
+        return indice
+
+    # ------------------------------------------------------------------
+    # Cálculo
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _calcular(terapeuta: Optional[str], servicio: Optional[str], desde: date, hasta: date, conn) -> Dict[str, Any]:
+        with conn.cursor() as cursor:
+            servicios = DisponibilidadModel._cargar_servicios(cursor)
+
+            info_servicio = None
+            if servicio:
+                info_servicio = servicios.get(servicio) or next(
+                    (s for s in servicios.values() if s['codigo'] == servicio), None
+                )
+                if info_servicio is None:
+                    return {"error": "Servicio no encontrado"}
+
+            if terapeuta:
+                nombres = [terapeuta]
+            elif info_servicio and info_servicio['terapeutas']:
+                nombres = info_servicio['terapeutas']
+            else:
+                nombres = None  # Todos los terapeutas activos
+
+            terapeutas = DisponibilidadModel._cargar_terapeutas(cursor, nombres)
+            if not terapeutas:
+                return {"error": "Terapeuta no encontrado"}
+
+            ocupacion = DisponibilidadModel._cargar_ocupacion(cursor, list(terapeutas), desde, hasta, servicios)
+
+        duracion = info_servicio['duracion'] if info_servicio else DisponibilidadModel.DURACION_POR_DEFECTO
+        jornada = info_servicio['jornada'] if info_servicio else None
+        ahora = datetime.now()
+        minutos_ahora = ahora.hour * 60 + ahora.minute
+
+        slots: Dict[str, Dict[str, List[str]]] = {}
+        total = 0
+        dia = desde
+        while dia <= hasta:
+            for nombre, horario in terapeutas.items():
+                if dia.weekday() not in horario['dias']:
+                    continue
+                inicio, fin = horario['horas']
+                if jornada:
+                    inicio, fin = max(inicio, jornada[0]), min(fin, jornada[1])
+                ocupados = ocupacion.get((nombre, dia))
+                libres = []
+                minuto = inicio
+                while minuto + duracion <= fin:
+                    pasado = dia < ahora.date() or (dia == ahora.date() and minuto <= minutos_ahora)
+                    if not pasado and not (ocupados and ocupados.ocupado(minuto, minuto + duracion)):
+                        libres.append(f"{minuto // 60:02d}:{minuto % 60:02d}")
+                    minuto += duracion
+                if libres:
+                    slots.setdefault(dia.isoformat(), {})[nombre] = libres
+                    total += len(libres)
+            dia += timedelta(days=1)
+
+        return {
+            "desde": desde.isoformat(),
+            "hasta": hasta.isoformat(),
+            "servicio": info_servicio['nombre'] if info_servicio else None,
+            "duracion_minutos": duracion,
+            "terapeutas": sorted(terapeutas),
+            "slots": slots,
+            "total_slots": total,
+        }
+
+    @staticmethod
+    def obtener_slots_libres(desde: date, hasta: date, terapeuta: Optional[str] = None,
+                             servicio: Optional[str] = None, conn=None) -> Dict[str, Any]:
+        """
+        Horarios libres de un terapeuta o de un servicio (sus terapeutas) entre
+        `desde` y `hasta` inclusive, agrupados por día y terapeuta.
+        """
+        if hasta < desde:
+            return {"error": "El rango de fechas es inválido"}
+        if (hasta - desde).days >= DisponibilidadModel.MAX_DIAS:
+            return {"error": f"El rango máximo es de {DisponibilidadModel.MAX_DIAS} días"}
+
+        clave = (terapeuta, servicio, desde, hasta)
+        with DisponibilidadModel._lock:
+            en_cache = DisponibilidadModel._cache.get(clave)
+            version = DisponibilidadModel._version
+        if en_cache and en_cache[1] == version and time.monotonic() - en_cache[0] < DisponibilidadModel._ttl():
+            return en_cache[2]
+
+        conexion_propia = conn is None
+        if conexion_propia:
+            conn = get_db_connection()
+        if conn is None:
+            return {"error": "No hay conexión", "interno": "conexion"}
+
+        try:
+            resultado = DisponibilidadModel._calcular(terapeuta, servicio, desde, hasta, conn)
+        except Exception as e:
+            print(f"❌ Error al calcular disponibilidad: {e}")
+            return {"error": "Error al calcular la disponibilidad", "interno": "calculo"}
+        finally:
+            if conexion_propia:
+                close_db_connection(conn)
+
+        if "error" not in resultado:
+            with DisponibilidadModel._lock:
+                # Si hubo una escritura mientras se calculaba, no se guarda
+                if DisponibilidadModel._version == version:
+                    DisponibilidadModel._guardar(clave, version, resultado)
+        return resultado
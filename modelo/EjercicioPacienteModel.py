@@ -6,9 +6,17 @@ import json
 class EjercicioPacienteModel:
     
     @staticmethod
-    def obtener_ejercicios_por_paciente(id_usuario):
+    def _filtrar_pendientes(ejercicios_asignados, ejercicios_completados):
+        """Asignados cuyo código no aparece entre los completados"""
+        codigos_completados = {ej['codigo_ejercicio'] for ej in ejercicios_completados}
+        return [ej for ej in ejercicios_asignados if ej['codigo_ejercicio'] not in codigos_completados]
+    
+    @staticmethod
+    def obtener_ejercicios_por_paciente(id_usuario, conn=None):
         """Obtiene todos los ejercicios asignados a un paciente"""
-        conn = get_db_connection()
+        conexion_propia = conn is None
+        if conexion_propia:
+            conn = get_db_connection()
         if not conn:
             print("❌ No se pudo conectar a la BD")
             return []
@@ -72,14 +80,17 @@ class EjercicioPacienteModel:
             print(traceback.format_exc())
             return []
         finally:
-            close_db_connection(conn)
+            if conexion_propia:
+                close_db_connection(conn)
     
     
     
     @staticmethod
-    def obtener_ejercicios_completados(id_usuario):
+    def obtener_ejercicios_completados(id_usuario, conn=None):
         """Obtiene ejercicios marcados como completados por el paciente"""
-        conn = get_db_connection()
+        conexion_propia = conn is None
+        if conexion_propia:
+            conn = get_db_connection()
         if not conn:
             return []
         
@@ -98,41 +109,41 @@ class EjercicioPacienteModel:
             print(f"Error en modelo obtener_ejercicios_completados: {e}")
             return []
         finally:
-            close_db_connection(conn)
+            if conexion_propia:
+                close_db_connection(conn)
     
     @staticmethod
-    def obtener_ejercicios_pendientes(id_usuario):
+    def obtener_ejercicios_pendientes(id_usuario, conn=None):
         """Obtiene ejercicios asignados pero no completados"""
-        conn = get_db_connection()
+        conexion_propia = conn is None
+        if conexion_propia:
+            conn = get_db_connection()
         if not conn:
             return []
         
         try:
-            with conn.cursor() as cursor:
-                # Primero obtenemos todos los ejercicios asignados
-                ejercicios_asignados = EjercicioPacienteModel.obtener_ejercicios_por_paciente(id_usuario)
-                if not ejercicios_asignados:
-                    return []
-                
-                # Luego obtenemos los completados
-                ejercicios_completados = EjercicioPacienteModel.obtener_ejercicios_completados(id_usuario)
-                codigos_completados = [ej['codigo_ejercicio'] for ej in ejercicios_completados]
-                
-                # Filtramos los no completados
-                ejercicios_pendientes = [ej for ej in ejercicios_asignados if ej['codigo_ejercicio'] not in codigos_completados]
-                
-                return ejercicios_pendientes
+            # Primero obtenemos todos los ejercicios asignados (misma conexión)
+            ejercicios_asignados = EjercicioPacienteModel.obtener_ejercicios_por_paciente(id_usuario, conn=conn)
+            if not ejercicios_asignados:
+                return []
+            
+            # Luego obtenemos los completados
+            ejercicios_completados = EjercicioPacienteModel.obtener_ejercicios_completados(id_usuario, conn=conn)
+            return EjercicioPacienteModel._filtrar_pendientes(ejercicios_asignados, ejercicios_completados)
                 
         except Exception as e:
             print(f"Error en modelo obtener_ejercicios_pendientes: {e}")
             return []
         finally:
-            close_db_connection(conn)
+            if conexion_propia:
+                close_db_connection(conn)
     
     @staticmethod
-    def marcar_como_completado(id_usuario, codigo_ejercicio, feedback=None, nivel_dificultad=None):
+    def marcar_como_completado(id_usuario, codigo_ejercicio, feedback=None, nivel_dificultad=None, conn=None):
         """Marca un ejercicio como completado por el paciente"""
-        conn = get_db_connection()
+        conexion_propia = conn is None
+        if conexion_propia:
+            conn = get_db_connection()
         if not conn:
             return False, "Error de conexión"
         
@@ -161,29 +172,33 @@ class EjercicioPacienteModel:
                 
         except Exception as e:
             print(f"Error en modelo marcar_como_completado: {e}")
+            conn.rollback()
             return False, "Error interno al marcar ejercicio como completado"
         finally:
-            close_db_connection(conn)
+            if conexion_propia:
+                close_db_connection(conn)
     
     @staticmethod
-    def obtener_estadisticas_ejercicios(id_usuario):
+    def obtener_estadisticas_ejercicios(id_usuario, conn=None):
         """Obtiene estadísticas de ejercicios del paciente"""
-        conn = get_db_connection()
+        conexion_propia = conn is None
+        if conexion_propia:
+            conn = get_db_connection()
         if not conn:
             return {}
         
         try:
             with conn.cursor() as cursor:
-                # Obtener ejercicios asignados
-                ejercicios_asignados = EjercicioPacienteModel.obtener_ejercicios_por_paciente(id_usuario)
+                # Obtener ejercicios asignados (misma conexión)
+                ejercicios_asignados = EjercicioPacienteModel.obtener_ejercicios_por_paciente(id_usuario, conn=conn)
                 total_asignados = len(ejercicios_asignados)
                 
                 # Obtener ejercicios completados
-                ejercicios_completados = EjercicioPacienteModel.obtener_ejercicios_completados(id_usuario)
+                ejercicios_completados = EjercicioPacienteModel.obtener_ejercicios_completados(id_usuario, conn=conn)
                 total_completados = len(ejercicios_completados)
                 
-                # Obtener ejercicios pendientes para hoy (todos los pendientes)
-                ejercicios_pendientes = EjercicioPacienteModel.obtener_ejercicios_pendientes(id_usuario)
+                # Pendientes para hoy (todos los pendientes), a partir de lo ya consultado
+                ejercicios_pendientes = EjercicioPacienteModel._filtrar_pendientes(ejercicios_asignados, ejercicios_completados)
                 pendientes_hoy = len(ejercicios_pendientes)
                 
                 # Calcular días seguidos (simplificado)
@@ -213,12 +228,15 @@ class EjercicioPacienteModel:
                 'dias_seguidos': 0
             }
         finally:
-            close_db_connection(conn)
+            if conexion_propia:
+                close_db_connection(conn)
     
     @staticmethod
-    def obtener_ejercicio_por_codigo(codigo_ejercicio):
+    def obtener_ejercicio_por_codigo(codigo_ejercicio, conn=None):
         """Obtiene un ejercicio específico por su código"""
-        conn = get_db_connection()
+        conexion_propia = conn is None
+        if conexion_propia:
+            conn = get_db_connection()
         if not conn:
             return None
         
@@ -231,4 +249,5 @@ class EjercicioPacienteModel:
             print(f"Error en modelo obtener_ejercicio_por_codigo: {e}")
             return None
         finally:
-            close_db_connection(conn)
\ No newline at end of file
+            if conexion_propia:
+                close_db_connection(conn)
\ No newline at end of file
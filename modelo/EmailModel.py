@@ -1029,6 +1029,151 @@ class EmailModel:
             "detalles": resultados
         }
     
+    @staticmethod
+    def enviar_correo_confirmacion_serie(datos_serie: Dict[str, Any], emails_destinatarios: List[str]) -> Dict[str, Any]:
+        """
+        Envía un único correo de confirmación para una serie de citas (plan de
+        tratamiento) con todas las sesiones, en lugar de un correo por sesión.
+        datos_serie['sesiones'] es una lista de {'codigo_cita', 'fecha_cita'}.
+        """
+        resultados = []
+        emails_exitosos = 0
+        sesiones = datos_serie.get('sesiones', [])
+        
+        hora_formateada = datos_serie.get('hora_cita', '')
+        try:
+            hora_formateada = datetime.datetime.strptime(hora_formateada, '%H:%M').strftime('%I:%M %p').lstrip('0')
+        except (TypeError, ValueError):
+            pass
+        
+        filas_html = []
+        filas_texto = []
+        for numero, sesion in enumerate(sesiones, start=1):
+            try:
+                fecha = datetime.datetime.strptime(sesion['fecha_cita'], '%Y-%m-%d').strftime('%d/%m/%Y')
+            except (TypeError, ValueError):
+                fecha = sesion.get('fecha_cita', '')
+            filas_html.append(f"""
+                <tr>
+                    <td style="padding: 8px 12px; border-bottom: 1px solid #E2E8F0;">{numero}</td>
+                    <td style="padding: 8px 12px; border-bottom: 1px solid #E2E8F0; font-weight: 600;">{sesion['codigo_cita']}</td>
+                    <td style="padding: 8px 12px; border-bottom: 1px solid #E2E8F0;">{fecha}</td>
+                    <td style="padding: 8px 12px; border-bottom: 1px solid #E2E8F0;">{hora_formateada}</td>
+                </tr>""")
+            filas_texto.append(f"        {numero:>2}. {sesion['codigo_cita']}  {fecha}  {hora_formateada}")
+        
+        indicaciones_html = ""
+        if datos_serie.get('recomendaciones_precita'):
+            indicaciones_html = f"<p><strong>Indicaciones:</strong> {datos_serie['recomendaciones_precita']}</p>"
+        
+        html_template = f"""
+        <!DOCTYPE html>
+        <html lang="es">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>Confirmación de Plan de Sesiones | FisioSalud</title>
+        </head>
+        <body style="margin: 0; padding: 24px; background-color: #fafafa; font-family: 'Inter', -apple-system, 'Segoe UI', Roboto, sans-serif; color: #0F172A;">
+            <div style="max-width: 620px; margin: 0 auto; background: #FFFFFF; border-radius: 8px; overflow: hidden; box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);">
+                <div style="background: #0A2540; color: #FFFFFF; padding: 32px; border-bottom: 4px solid #00A3FF;">
+                    <h1 style="margin: 0; font-size: 22px;">FisioSalud</h1>
+                    <p style="margin: 8px 0 0; opacity: 0.85;">Confirmación de plan de sesiones</p>
+                </div>
+                <div style="padding: 32px;">
+                    <p>Estimado/a <strong>{datos_serie.get('nombre_paciente', '')}</strong>,</p>
+                    <p>Su plan de <strong>{len(sesiones)} sesiones</strong> de <strong>{datos_serie.get('servicio', '')}</strong>
+                    con <strong>{datos_serie.get('terapeuta_designado', '')}</strong> ha sido registrado.</p>
+                    <table style="width: 100%; border-collapse: collapse; margin: 24px 0; font-size: 14px;">
+                        <thead>
+                            <tr style="background: #F8FAFC; color: #64748B; text-align: left;">
+                                <th style="padding: 8px 12px;">#</th>
+                                <th style="padding: 8px 12px;">Código</th>
+                                <th style="padding: 8px 12px;">Fecha</th>
+                                <th style="padding: 8px 12px;">Hora</th>
+                            </tr>
+                        </thead>
+                        <tbody>{''.join(filas_html)}
+                        </tbody>
+                    </table>
+                    <p><strong>Modalidad:</strong> {datos_serie.get('modalidad', 'Presencial')}<br>
+                    <strong>Precio por sesión:</strong> {datos_serie.get('precio', 'Consultar')}<br>
+                    <strong>Método de pago:</strong> {datos_serie.get('tipo_pago', '')}</p>
+                    {indicaciones_html}
+                    <p style="color: #64748B; font-size: 13px;">Las cancelaciones requieren 24 horas de anticipación. Conserve los códigos de cada sesión para cualquier consulta.</p>
+                </div>
+                <div style="background: #F8FAFC; padding: 16px 32px; color: #64748B; font-size: 12px;">
+                    Av. Salud 123, Ciudad · (123) 456-7890 · contacto@fisiosalud.com<br>
+                    © {datetime.datetime.now().year} FisioSalud. Todos los derechos reservados.
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        text_template = f"""
+        FISIOSALUD - CONFIRMACIÓN DE PLAN DE SESIONES
+        ================================================================================
+
+        Paciente: {datos_serie.get('nombre_paciente', '')}
+        Servicio: {datos_serie.get('servicio', '')}
+        Terapeuta: {datos_serie.get('terapeuta_designado', '')}
+        Modalidad: {datos_serie.get('modalidad', 'Presencial')}
+        Precio por sesión: {datos_serie.get('precio', 'Consultar')}
+        Método de pago: {datos_serie.get('tipo_pago', '')}
+
+        SESIONES ({len(sesiones)})
+        --------------------------------------------------------------------------------
+{chr(10).join(filas_texto)}
+
+        Las cancelaciones requieren 24 horas de anticipación.
+
+        --------------------------------------------------------------------------------
+        FisioSalud - Centro Especializado en Rehabilitación Integral
+        © {datetime.datetime.now().year} FisioSalud. Todos los derechos reservados.
+        ================================================================================
+        """
+        
+        primer_codigo = sesiones[0]['codigo_cita'] if sesiones else ''
+        for email in emails_destinatarios:
+            try:
+                msg = MIMEMultipart('alternative')
+                msg['Subject'] = f'Confirmación Plan de {len(sesiones)} Sesiones ({primer_codigo}) | FisioSalud'
+                msg['From'] = f'{EmailModel.FROM_NAME} <{EmailModel.FROM_EMAIL}>'
+                msg['To'] = email
+                
+                msg.attach(MIMEText(text_template, 'plain', 'utf-8'))
+                msg.attach(MIMEText(html_template, 'html', 'utf-8'))
+                
+                with smtplib.SMTP(EmailModel.SMTP_SERVER, EmailModel.SMTP_PORT) as server:
+                    server.starttls()
+                    server.login(EmailModel.SMTP_USERNAME, EmailModel.SMTP_PASSWORD)
+                    server.send_message(msg)
+                
+                resultados.append({
+                    "email": email,
+                    "estado": "enviado",
+                    "timestamp": datetime.datetime.now().isoformat()
+                })
+                emails_exitosos += 1
+                logger.info(f"✅ Correo de plan de sesiones enviado a: {email}")
+                
+            except Exception as e:
+                resultados.append({
+                    "email": email,
+                    "estado": "error",
+                    "error": str(e),
+                    "timestamp": datetime.datetime.now().isoformat()
+                })
+                logger.error(f"❌ Error enviando correo de plan de sesiones a {email}: {e}")
+        
+        return {
+            "total_enviados": len(emails_destinatarios),
+            "exitosos": emails_exitosos,
+            "fallidos": len(emails_destinatarios) - emails_exitosos,
+            "detalles": resultados
+        }
+    
     @staticmethod
     def enviar_correo_simple(destinatario: str, asunto: str, cuerpo_html: str, cuerpo_texto: str = "") -> bool:
         """
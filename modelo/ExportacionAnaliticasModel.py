@@ -0,0 +1,232 @@
+# modelo/ExportacionAnaliticasModel.py - EXPORTACIÓN EN STREAMING DE LAS ANALÍTICAS
+import csv
+import io
+import json
+import os
+import threading
+import zlib
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+import pymysql
+
+from bd.conexion_bd import get_db_connection, close_db_connection
+
+# Cada exportación: columnas (orden del CSV) y consulta con el rango
+# [desde, hasta) repetido `rangos` veces en los parámetros
+EXPORTACIONES = {
+    'citas': {
+        'columnas': ('cita_id', 'fecha', 'hora', 'terapeuta', 'servicio', 'estado', 'tipo_pago'),
+        'sql': """
+            SELECT cita_id, fecha_cita as fecha, hora_cita as hora,
+                   terapeuta_designado as terapeuta, servicio, estado, tipo_pago
+            FROM cita
+            WHERE fecha_cita >= %s AND fecha_cita < %s
+            ORDER BY fecha_cita, hora_cita
+        """,
+        'rangos': 1,
+    },
+    'ingresos': {
+        'columnas': ('fecha', 'origen', 'referencia', 'concepto', 'tipo', 'terapeuta', 'cantidad', 'importe', 'estado'),
+        'sql': """
+            SELECT l.fecha_compra as fecha, 'producto' as origen, l.orden_id as referencia,
+                   l.producto_nombre as concepto, l.producto_tipo as tipo, NULL as terapeuta,
+                   l.cantidad as cantidad, l.subtotal as importe, c.estado as estado
+            FROM compras_lineas l
+            JOIN compras_confirmadas c ON c.orden_id = l.orden_id
+            WHERE l.fecha_compra >= %s AND l.fecha_compra < %s
+            UNION ALL
+            SELECT fecha_creacion_reporte, 'plan', codigo_cita,
+                   tipo_plan, NULL, terapeuta_asignado,
+                   1, precio_plan, estado_cita
+            FROM paciente
+            WHERE fecha_creacion_reporte >= %s AND fecha_creacion_reporte < %s
+            ORDER BY fecha
+        """,
+        'rangos': 2,
+    },
+    'terapeutas': {
+        'columnas': ('fecha', 'terapeuta', 'citas', 'canceladas', 'planes', 'ingresos'),
+        'sql': """
+            SELECT fecha, terapeuta, SUM(citas) as citas, SUM(canceladas) as canceladas,
+                   SUM(planes) as planes, SUM(ingresos) as ingresos
+            FROM (
+                SELECT fecha, terapeuta, citas,
+                       CASE WHEN estado = 'cancelada' THEN citas ELSE 0 END as canceladas,
+                       0 as planes, 0 as ingresos
+                FROM resumen_citas_dia
+                WHERE fecha >= %s AND fecha < %s
+                UNION ALL
+                SELECT fecha, terapeuta, 0, 0, planes, ingresos
+                FROM resumen_planes_dia
+                WHERE fecha >= %s AND fecha < %s
+            ) t
+            GROUP BY fecha, terapeuta
+            ORDER BY fecha, terapeuta
+        """,
+        'rangos': 2,
+    },
+}
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# Filas por bloque enviado al cliente
+FILAS_POR_BLOQUE = 500
+
+
+def _maximo_simultaneas() -> int:
+    try:
+        return max(1, int(os.environ.get('ANALITICAS_EXPORTACIONES_MAX', '2')))
+    except ValueError:
+        return 2
+
+
+def _valor(valor):
+    """Valor de MySQL -> texto/número serializable"""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, timedelta):
+        segundos = int(valor.total_seconds())
+        return f"{segundos // 3600:02d}:{segundos % 3600 // 60:02d}:{segundos % 60:02d}"
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (bytes, bytearray)):
+        return valor.decode('utf-8', errors='ignore')
+    return valor
+
+
+class _Cupo:
+    """Cupo de exportación reservado; se libera una sola vez"""
+
+    def __init__(self, semaforo: threading.BoundedSemaphore):
+        self._semaforo = semaforo
+        self._liberado = False
+
+    def liberar(self):
+        if not self._liberado:
+            self._liberado = True
+            self._semaforo.release()
+
+    def __del__(self):
+        # Red de seguridad: una respuesta que nunca empezó a enviarse
+        try:
+            self.liberar()
+        except Exception:
+            pass
+
+
+class ExportacionAnaliticasModel:
+    """
+    Exporta filas de detalle (citas, ingresos, rendimiento diario por
+    terapeuta) en CSV o JSON Lines sin cargarlas en memoria: la consulta se
+    lee con un cursor sin buffer (SSDictCursor) y se codifica por bloques de
+    FILAS_POR_BLOQUE filas, así que la memoria no depende del rango de fechas.
+
+    Cada exportación ocupa una conexión del pool mientras dura; como mucho
+    ANALITICAS_EXPORTACIONES_MAX (2 por defecto) a la vez.
+    """
+
+    _simultaneas = threading.BoundedSemaphore(_maximo_simultaneas())
+
+    @staticmethod
+    def validar(tipo: str, formato: str):
+        """ValueError si el tipo o el formato no existen"""
+        if tipo not in EXPORTACIONES:
+            raise ValueError(f"tipo debe ser uno de: {', '.join(EXPORTACIONES)}")
+        if formato not in FORMATOS:
+            raise ValueError(f"formato debe ser uno de: {', '.join(FORMATOS)}")
+
+    @staticmethod
+    def reservar() -> Optional['_Cupo']:
+        """Ocupa un cupo de exportación; None si ya hay demasiadas en curso"""
+        if not ExportacionAnaliticasModel._simultaneas.acquire(blocking=False):
+            return None
+        return _Cupo(ExportacionAnaliticasModel._simultaneas)
+
+    @staticmethod
+    def nombre_archivo(tipo: str, formato: str, desde: date, hasta: date) -> str:
+        return f"analiticas_{tipo}_{desde.isoformat()}_{hasta.isoformat()}.{formato}"
+
+    @staticmethod
+    def _codificar_csv(columnas: Tuple[str, ...], filas) -> bytes:
+        salida = io.StringIO()
+        csv.writer(salida).writerows([_valor(fila.get(c)) for c in columnas] for fila in filas)
+        return salida.getvalue().encode('utf-8')
+
+    @staticmethod
+    def _codificar_jsonl(columnas: Tuple[str, ...], filas) -> bytes:
+        return ''.join(
+            json.dumps({c: _valor(fila.get(c)) for c in columnas}, ensure_ascii=False) + '\n'
+            for fila in filas
+        ).encode('utf-8')
+
+    @staticmethod
+    def transmitir(cupo: '_Cupo', sql: str, params: Sequence, columnas: Tuple[str, ...],
+                   formato: str) -> Iterator[bytes]:
+        """
+        Bloques de bytes (CSV o JSON Lines) con el resultado de `sql`, leído
+        con un cursor sin buffer. El cupo (de reservar()) se libera al
+        terminar o al cerrar el generador.
+        """
+        conn = None
+        completa = False
+        try:
+            conn = get_db_connection()
+            if conn is None:
+                raise RuntimeError("Error de conexión con la base de datos")
+
+            # Sin `with`: cerrar un SSCursor lee antes todo lo que quede
+            cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+            cursor.execute(sql, params)
+            if formato == 'csv':
+                # BOM para que Excel reconozca el UTF-8 (acentos en nombres)
+                yield ('\ufeff' + ','.join(columnas) + '\r\n').encode('utf-8')
+
+            codificar = ExportacionAnaliticasModel._codificar_csv if formato == 'csv' else ExportacionAnaliticasModel._codificar_jsonl
+            while True:
+                filas = cursor.fetchmany(FILAS_POR_BLOQUE)
+                if not filas:
+                    break
+                yield codificar(columnas, filas)
+            cursor.close()
+            completa = True
+        finally:
+            if conn is not None:
+                if completa:
+                    close_db_connection(conn)
+                else:
+                    # Resultado sin leer entero: no se puede devolver al pool
+                    conn.descartar()
+            cupo.liberar()
+
+    @staticmethod
+    def generar(cupo: '_Cupo', tipo: str, formato: str, desde: date, hasta: date) -> Iterator[bytes]:
+        """
+        Bloques de bytes con las filas de `tipo` entre desde y hasta
+        (inclusive). El cupo (de reservar()) se libera al terminar o al
+        cerrar el generador.
+        """
+        definicion = EXPORTACIONES[tipo]
+        return ExportacionAnaliticasModel.transmitir(
+            cupo, definicion['sql'], (desde, hasta + timedelta(days=1)) * definicion['rangos'],
+            definicion['columnas'], formato
+        )
+
+    @staticmethod
+    def comprimir(bloques: Iterable[bytes]) -> Iterator[bytes]:
+        """Los mismos bloques comprimidos como un único archivo .gz"""
+        compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        try:
+            for bloque in bloques:
+                # Vaciar por bloque: cada uno sale en cuanto se lee de la BD
+                yield compresor.compress(bloque) + compresor.flush(zlib.Z_SYNC_FLUSH)
+            yield compresor.flush()
+        finally:
+            # Cerrar la compresión cierra la exportación (y libera su cupo)
+            cerrar = getattr(bloques, 'close', None)
+            if cerrar:
+                cerrar()
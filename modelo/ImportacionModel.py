@@ -0,0 +1,597 @@
+# modelo/ImportacionModel.py - IMPORTACIÓN MASIVA DESDE CSV (USUARIOS, PACIENTES, TERAPEUTAS)
+import csv
+import hashlib
+import io
+import itertools
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import BinaryIO, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from bd.conexion_bd import get_db_connection, close_db_connection
+from modelo.AdminUsuariosModel import ESTADOS_USUARIO, TERAPEUTAS_SIN_RESERVA
+from modelo.BusquedaModel import BusquedaModel
+from modelo.CitaModel import CONDICION_RESERVA_ACTIVA
+from modelo.CodigoCitaModel import CodigoCitaModel
+from modelo.DisponibilidadModel import DisponibilidadModel
+from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
+from modelo.UsuarioModel import UsuarioModel
+
+# Columnas aceptadas por tipo (las cabeceras no distinguen mayúsculas; las
+# desconocidas se ignoran) y las que toda fila debe traer
+IMPORTACIONES = {
+    'usuarios': {
+        'columnas': ('nombre', 'apellido', 'correo', 'telefono', 'genero', 'estado',
+                     'historial_medico', 'password'),
+        'requeridas': ('nombre', 'apellido', 'correo', 'telefono'),
+    },
+    'pacientes': {
+        'columnas': ('nombre', 'apellido', 'correo', 'telefono', 'genero', 'historial_medico',
+                     'servicio', 'terapeuta_asignado', 'fecha_cita', 'hora_cita', 'tipo_pago',
+                     'estado_cita', 'tipo_plan', 'precio_plan', 'notas_adicionales'),
+        'requeridas': ('nombre', 'apellido', 'correo', 'telefono'),
+    },
+    'terapeutas': {
+        'columnas': ('Codigo_trabajador', 'nombre_completo', 'fisio_correo', 'telefono',
+                     'especializacion', 'franja_horaria_dias', 'franja_horaria_horas', 'estado'),
+        'requeridas': ('Codigo_trabajador', 'nombre_completo', 'fisio_correo', 'telefono'),
+    },
+}
+CODIFICACIONES = ('utf-8', 'latin-1')
+
+# Filas validadas por transacción (una consulta de duplicados y un
+# executemany por tabla en cada lote)
+FILAS_POR_LOTE = 1000
+# Errores que se devuelven en la respuesta; el resto, en el reporte CSV
+MUESTRA_ERRORES = 20
+# Reportes de errores descargables durante este tiempo (segundos)
+REPORTE_VIGENCIA = 3600
+
+_CORREO = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def _maximo_filas() -> int:
+    try:
+        return max(1, int(os.environ.get('IMPORTACION_MAX_FILAS', '200000')))
+    except ValueError:
+        return 200000
+
+
+def _marcadores(valores: Sequence) -> str:
+    return ', '.join(['%s'] * len(valores))
+
+
+def _correo(valor: str, campo: str = 'correo') -> str:
+    correo = UsuarioModel.normalizar_correo(valor)
+    if not _CORREO.match(correo):
+        raise ValueError(f"{campo} no válido: {valor!r}")
+    return correo
+
+
+def _fecha(valor: str) -> date:
+    """YYYY-MM-DD o DD/MM/YYYY (vacía: hoy)"""
+    if not valor:
+        return date.today()
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            pass
+    raise ValueError(f"fecha_cita no válida (YYYY-MM-DD o DD/MM/YYYY): {valor!r}")
+
+
+def _hora(valor) -> str:
+    """HH:MM[:SS] normalizada a HH:MM:SS (también el timedelta de MySQL)"""
+    if isinstance(valor, timedelta):
+        segundos = int(valor.total_seconds())
+        return f"{segundos // 3600:02d}:{segundos % 3600 // 60:02d}:{segundos % 60:02d}"
+    if not valor:
+        return '09:00:00'
+    for formato in ('%H:%M:%S', '%H:%M'):
+        try:
+            return datetime.strptime(valor, formato).strftime('%H:%M:%S')
+        except ValueError:
+            pass
+    raise ValueError(f"hora_cita no válida (HH:MM): {valor!r}")
+
+
+def _estado_usuario(valor: str) -> str:
+    if not valor:
+        return 'Activo'
+    for estado in ESTADOS_USUARIO:
+        if estado.lower() == valor.lower():
+            return estado
+    raise ValueError(f"estado no válido: {valor!r} (usa {', '.join(ESTADOS_USUARIO)})")
+
+
+def _hash_contrasena(password: str) -> str:
+    # Igual que crear_usuario: sin contraseña se genera una temporal
+    return hashlib.sha256((password or str(random.randint(100000, 999999))).encode()).hexdigest()
+
+
+class _Lote:
+    """Resultado de importar un lote: filas rechazadas y acciones tras el commit"""
+
+    def __init__(self):
+        self.importadas = 0
+        self.rechazos: List[Tuple[int, Dict, str]] = []
+        self.efectos: List[Callable[[], None]] = []
+
+    def rechazar(self, fila: Dict, error: str):
+        self.rechazos.append((fila['_fila'], fila, error))
+
+
+class _Reporte:
+    """CSV de filas rechazadas, escrito en disco a medida que aparecen"""
+
+    def __init__(self, columnas: Sequence[str]):
+        # Las contraseñas nunca se copian al reporte
+        self.columnas = [c for c in columnas if c != 'password']
+        self.archivo = None
+        self.writer = None
+        self.total = 0
+        self.muestra: List[Dict] = []
+
+    def agregar(self, numero: int, fila: Dict, error: str):
+        if self.archivo is None:
+            self.archivo = tempfile.NamedTemporaryFile(
+                'w', encoding='utf-8-sig', newline='', suffix='.csv',
+                prefix='importacion_errores_', delete=False
+            )
+            self.writer = csv.writer(self.archivo)
+            self.writer.writerow(['fila', 'error', *self.columnas])
+        self.writer.writerow([numero, error, *(fila.get(c, '') for c in self.columnas)])
+        self.total += 1
+        if len(self.muestra) < MUESTRA_ERRORES:
+            self.muestra.append({'fila': numero, 'error': error})
+
+    def cerrar(self) -> Optional[str]:
+        if self.archivo is None:
+            return None
+        self.archivo.close()
+        return self.archivo.name
+
+
+class ImportacionModel:
+    """
+    Importa usuarios, pacientes o terapeutas desde un CSV subido sin
+    cargarlo entero: las filas se leen en streaming, se validan y se agrupan
+    en lotes de FILAS_POR_LOTE. Cada lote busca sus duplicados con una sola
+    consulta IN (...), inserta con executemany y se confirma en su propia
+    transacción; si falla, solo se pierde ese lote y se informa en el reporte.
+
+    Las filas rechazadas se escriben en un CSV temporal descargable durante
+    REPORTE_VIGENCIA segundos, así que la memoria no depende del tamaño del
+    archivo. Solo hay una importación en curso a la vez.
+    """
+
+    _simultaneas = threading.BoundedSemaphore(1)
+    _reportes: Dict[str, Tuple[str, str, float]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def validar(tipo: str, codificacion: str):
+        """ValueError si el tipo o la codificación no existen"""
+        if tipo not in IMPORTACIONES:
+            raise ValueError(f"tipo debe ser uno de: {', '.join(IMPORTACIONES)}")
+        if codificacion not in CODIFICACIONES:
+            raise ValueError(f"codificacion debe ser una de: {', '.join(CODIFICACIONES)}")
+
+    @staticmethod
+    def reservar() -> bool:
+        """Ocupa el cupo de importación; False si ya hay una en curso"""
+        return ImportacionModel._simultaneas.acquire(blocking=False)
+
+    @staticmethod
+    def liberar():
+        ImportacionModel._simultaneas.release()
+
+    # ------------------------------------------------------------------
+    # Reportes de errores
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _registrar_reporte(tipo: str, ruta: str) -> str:
+        token = uuid.uuid4().hex
+        with ImportacionModel._lock:
+            ImportacionModel._reportes[token] = (ruta, tipo, time.time())
+        return token
+
+    @staticmethod
+    def _limpiar_reportes():
+        """Borra los reportes caducados"""
+        limite = time.time() - REPORTE_VIGENCIA
+        with ImportacionModel._lock:
+            caducados = [t for t, (_, _, creado) in ImportacionModel._reportes.items() if creado < limite]
+            rutas = [ImportacionModel._reportes.pop(t)[0] for t in caducados]
+        for ruta in rutas:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+    @staticmethod
+    def reporte(token: str) -> Optional[Tuple[str, str]]:
+        """(ruta, nombre de descarga) del reporte vigente, o None"""
+        ImportacionModel._limpiar_reportes()
+        with ImportacionModel._lock:
+            registro = ImportacionModel._reportes.get(token)
+        if registro is None or not os.path.exists(registro[0]):
+            return None
+        ruta, tipo, creado = registro
+        return ruta, f"errores_importacion_{tipo}_{datetime.fromtimestamp(creado).strftime('%Y%m%d_%H%M%S')}.csv"
+
+    # ------------------------------------------------------------------
+    # Lectura y validación
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _cabeceras(tipo: str, cabecera: List[str]) -> Tuple[Dict[int, str], List[str]]:
+        """Posición -> columna conocida, y las cabeceras ignoradas; ValueError si falta alguna requerida"""
+        definicion = IMPORTACIONES[tipo]
+        conocidas = {c.lower(): c for c in definicion['columnas']}
+        posiciones, ignoradas = {}, []
+        for posicion, nombre in enumerate(cabecera):
+            columna = conocidas.get(nombre.strip().lower())
+            if columna and columna not in posiciones.values():
+                posiciones[posicion] = columna
+            elif nombre.strip():
+                ignoradas.append(nombre.strip())
+        faltan = [c for c in definicion['requeridas'] if c not in posiciones.values()]
+        if faltan:
+            raise ValueError(f"Faltan columnas requeridas: {', '.join(faltan)}")
+        return posiciones, ignoradas
+
+    @staticmethod
+    def _validar_fila(tipo: str, fila: Dict) -> Dict:
+        """Valores listos para insertar; ValueError con el motivo si la fila no es válida"""
+        for columna in IMPORTACIONES[tipo]['requeridas']:
+            if not fila.get(columna):
+                raise ValueError(f"Campo '{columna}' es requerido")
+
+        if tipo == 'terapeutas':
+            return {
+                **fila,
+                'Codigo_trabajador': fila['Codigo_trabajador'].upper(),
+                'fisio_correo': _correo(fila['fisio_correo'], 'fisio_correo'),
+                'estado': fila.get('estado') or 'Activo',
+            }
+
+        valores = {**fila, 'correo': _correo(fila['correo'])}
+        if tipo == 'usuarios':
+            valores['estado'] = _estado_usuario(fila.get('estado', ''))
+            return valores
+
+        try:
+            precio = float((fila.get('precio_plan') or '0').replace(',', '.'))
+        except ValueError:
+            raise ValueError(f"precio_plan no válido: {fila.get('precio_plan')!r}")
+        valores.update({
+            'fecha_cita': _fecha(fila.get('fecha_cita', '')),
+            'hora_cita': _hora(fila.get('hora_cita', '')),
+            'precio_plan': precio,
+            'terapeuta_asignado': fila.get('terapeuta_asignado', ''),
+        })
+        return valores
+
+    # ------------------------------------------------------------------
+    # Lotes
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _insertar_usuarios(cursor, filas: List[Dict]) -> Dict[str, int]:
+        """Inserta los usuarios con un executemany; retorna correo -> ID"""
+        valores = []
+        for f in filas:
+            contrasena = _hash_contrasena(f.get('password', ''))
+            valores.append((
+                f['nombre'], f['apellido'], f.get('genero', ''), f['correo'], f['telefono'],
+                contrasena, contrasena, f.get('estado', 'Activo'), f.get('historial_medico', ''),
+            ))
+        cursor.executemany("""
+            INSERT INTO usuario (
+                nombre, apellido, genero, correo, telefono,
+                contraseña, contraseña_confirmada, estado, historial_medico
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, valores)
+        # executemany no devuelve los IDs de cada fila: se releen por correo
+        correos = [f['correo'] for f in filas]
+        cursor.execute(f"SELECT ID, correo FROM usuario WHERE correo IN ({_marcadores(correos)})", correos)
+        return {UsuarioModel.normalizar_correo(fila['correo']): fila['ID'] for fila in cursor.fetchall()}
+
+    @staticmethod
+    def _lote_usuarios(conn, cursor, filas: List[Dict]) -> _Lote:
+        lote = _Lote()
+        correos = list({f['correo'] for f in filas})
+        cursor.execute(f"SELECT correo FROM usuario WHERE correo IN ({_marcadores(correos)})", correos)
+        existentes = {UsuarioModel.normalizar_correo(fila['correo']) for fila in cursor.fetchall()}
+
+        nuevas, vistos = [], set()
+        for fila in filas:
+            if fila['correo'] in existentes:
+                lote.rechazar(fila, "El correo ya está registrado")
+            elif fila['correo'] in vistos:
+                lote.rechazar(fila, "Correo repetido en el archivo")
+            else:
+                vistos.add(fila['correo'])
+                nuevas.append(fila)
+
+        if nuevas:
+            ids = ImportacionModel._insertar_usuarios(cursor, nuevas)
+            lote.importadas = len(nuevas)
+            lote.efectos.append(lambda: BusquedaModel.marcar('usuarios', ids.values()))
+        return lote
+
+    @staticmethod
+    def _lote_pacientes(conn, cursor, filas: List[Dict]) -> _Lote:
+        lote = _Lote()
+        correos = list({f['correo'] for f in filas})
+        cursor.execute(f"""
+            SELECT u.ID, u.correo,
+                   EXISTS (SELECT 1 FROM paciente p WHERE p.ID_usuario = u.ID) as es_paciente
+            FROM usuario u WHERE u.correo IN ({_marcadores(correos)})
+        """, correos)
+        usuarios = {UsuarioModel.normalizar_correo(fila['correo']): fila for fila in cursor.fetchall()}
+
+        # Terapeutas del archivo que existen (sin contar '' ni 'Por asignar')
+        nombres = list({f['terapeuta_asignado'] for f in filas} - set(TERAPEUTAS_SIN_RESERVA))
+        terapeutas: Set[str] = set()
+        if nombres:
+            cursor.execute(
+                f"SELECT nombre_completo FROM terapeuta WHERE nombre_completo IN ({_marcadores(nombres)})", nombres
+            )
+            terapeutas = {fila['nombre_completo'] for fila in cursor.fetchall()}
+
+        # Horarios que ya ocupan una cita activa (solo terapeutas con reserva)
+        horarios = list({
+            (f['terapeuta_asignado'], f['fecha_cita'], f['hora_cita'])
+            for f in filas if f['terapeuta_asignado'] not in TERAPEUTAS_SIN_RESERVA
+        })
+        ocupados: Set[Tuple[str, date, str]] = set()
+        if horarios:
+            cursor.execute(f"""
+                SELECT terapeuta_designado, fecha_cita, hora_cita FROM cita
+                WHERE (terapeuta_designado, fecha_cita, hora_cita) IN ({', '.join(['(%s, %s, %s)'] * len(horarios))})
+                AND {CONDICION_RESERVA_ACTIVA}
+            """, [valor for horario in horarios for valor in horario])
+            ocupados = {
+                (fila['terapeuta_designado'], fila['fecha_cita'], _hora(fila['hora_cita']))
+                for fila in cursor.fetchall()
+            }
+
+        validas, vistos, reservados = [], set(), set()
+        for fila in filas:
+            usuario = usuarios.get(fila['correo'])
+            horario = (fila['terapeuta_asignado'], fila['fecha_cita'], fila['hora_cita'])
+            if usuario and usuario['es_paciente']:
+                lote.rechazar(fila, "Este usuario ya es paciente")
+            elif fila['correo'] in vistos:
+                lote.rechazar(fila, "Correo repetido en el archivo")
+            elif fila['terapeuta_asignado'] not in TERAPEUTAS_SIN_RESERVA and fila['terapeuta_asignado'] not in terapeutas:
+                lote.rechazar(fila, f"El terapeuta no existe: {fila['terapeuta_asignado']!r}")
+            elif horario in ocupados:
+                lote.rechazar(fila, "El terapeuta ya tiene una cita en ese horario")
+            elif horario in reservados:
+                lote.rechazar(fila, "Horario del terapeuta repetido en el archivo")
+            else:
+                vistos.add(fila['correo'])
+                if fila['terapeuta_asignado'] not in TERAPEUTAS_SIN_RESERVA:
+                    reservados.add(horario)
+                validas.append(fila)
+        if not validas:
+            return lote
+
+        # Usuarios nuevos (los que no existían) y luego cita + paciente de todos
+        nuevos = [f for f in validas if f['correo'] not in usuarios]
+        ids = ImportacionModel._insertar_usuarios(cursor, nuevos) if nuevos else {}
+        ids.update({correo: usuario['ID'] for correo, usuario in usuarios.items()})
+
+        codigos = CodigoCitaModel.asignar_codigos('admin', len(validas), conn=conn)
+        if len(codigos) != len(validas):
+            raise RuntimeError("No hay códigos de cita disponibles en el rango admin")
+
+        filas_cita, filas_paciente = [], []
+        for codigo, f in zip(codigos, validas):
+            nombre_completo = f"{f['nombre']} {f['apellido']}"
+            estado = f.get('estado_cita') or 'pendiente'
+            filas_cita.append((
+                codigo, nombre_completo, f.get('servicio') or 'Consulta General',
+                f['terapeuta_asignado'], f['telefono'], f['correo'], f['fecha_cita'], f['hora_cita'],
+                f.get('notas_adicionales', ''), f.get('tipo_pago') or 'Por definir', estado,
+            ))
+            filas_paciente.append((
+                codigo, ids[f['correo']], nombre_completo, None, f.get('historial_medico', ''),
+                f['terapeuta_asignado'], '', estado, f.get('tipo_plan', ''), f['precio_plan'],
+            ))
+        cursor.executemany("""
+            INSERT INTO cita (
+                cita_id, nombre_paciente, servicio, terapeuta_designado,
+                telefono, correo, fecha_cita, hora_cita, notas_adicionales,
+                tipo_pago, estado
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, filas_cita)
+        cursor.executemany("""
+            INSERT INTO paciente (
+                codigo_cita, ID_usuario, nombre_completo, ID_acudiente,
+                historial_medico, terapeuta_asignado, ejercicios_registrados,
+                estado_cita, tipo_plan, precio_plan, fecha_creacion_reporte
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURDATE())
+        """, filas_paciente)
+
+        lote.importadas = len(validas)
+        fechas = [f['fecha_cita'] for f in validas]
+        nuevos_ids = [ids[f['correo']] for f in nuevos]
+
+        def efectos():
+            CodigoCitaModel.marcar_ocupacion(codigos, True)
+            DisponibilidadModel.invalidar()
+            ResumenAnaliticasModel.marcar_citas(fechas)
+            ResumenAnaliticasModel.marcar_planes([date.today()])
+            BusquedaModel.marcar('usuarios', nuevos_ids)
+            BusquedaModel.marcar('citas', codigos)
+            BusquedaModel.marcar('pacientes', codigos)
+
+        lote.efectos.append(efectos)
+        return lote
+
+    @staticmethod
+    def _lote_terapeutas(conn, cursor, filas: List[Dict]) -> _Lote:
+        lote = _Lote()
+        claves = list({f['Codigo_trabajador'] for f in filas})
+        cursor.execute(
+            f"SELECT Codigo_trabajador FROM terapeuta WHERE Codigo_trabajador IN ({_marcadores(claves)})", claves
+        )
+        existentes = {fila['Codigo_trabajador'].upper() for fila in cursor.fetchall()}
+
+        nuevas, vistos = [], set()
+        for fila in filas:
+            if fila['Codigo_trabajador'] in existentes:
+                lote.rechazar(fila, "El código de trabajador ya existe")
+            elif fila['Codigo_trabajador'] in vistos:
+                lote.rechazar(fila, "Código de trabajador repetido en el archivo")
+            else:
+                vistos.add(fila['Codigo_trabajador'])
+                nuevas.append(fila)
+
+        if nuevas:
+            cursor.executemany("""
+                INSERT INTO terapeuta (
+                    Codigo_trabajador, nombre_completo, fisio_correo,
+                    telefono, especializacion, franja_horaria_dias,
+                    franja_horaria_horas, estado
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, [
+                (f['Codigo_trabajador'], f['nombre_completo'], f['fisio_correo'], f['telefono'],
+                 f.get('especializacion', ''), f.get('franja_horaria_dias', ''),
+                 f.get('franja_horaria_horas', ''), f['estado'])
+                for f in nuevas
+            ])
+            lote.importadas = len(nuevas)
+            codigos = [f['Codigo_trabajador'] for f in nuevas]
+            lote.efectos.append(lambda: BusquedaModel.marcar('terapeutas', codigos))
+        return lote
+
+    @staticmethod
+    def _procesar_lote(conn, tipo: str, filas: List[Dict]) -> _Lote:
+        """Un lote en su propia transacción; si falla, todas sus filas quedan rechazadas"""
+        procesar = {
+            'usuarios': ImportacionModel._lote_usuarios,
+            'pacientes': ImportacionModel._lote_pacientes,
+            'terapeutas': ImportacionModel._lote_terapeutas,
+        }[tipo]
+        try:
+            conn.begin()
+            with conn.cursor() as cursor:
+                lote = procesar(conn, cursor, filas)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Lote de {tipo} no importado (filas {filas[0]['_fila']}-{filas[-1]['_fila']}): {e}")
+            lote = _Lote()
+            for fila in filas:
+                lote.rechazar(fila, f"Lote no importado: {e}")
+            return lote
+        for efecto in lote.efectos:
+            efecto()
+        return lote
+
+    # ------------------------------------------------------------------
+    # Importación
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def importar(tipo: str, archivo: BinaryIO, codificacion: str = 'utf-8') -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Importa el CSV `archivo` (binario, p. ej. UploadFile.file). El
+        separador (coma o punto y coma) se deduce de la cabecera. Retorna
+        (resumen, error); ValueError si la cabecera no es válida.
+
+        El resumen trae filas, importadas, rechazadas, una muestra de
+        errores y el token del reporte descargable (None si no hubo
+        rechazos). Si el archivo no se puede leer a mitad, 'interrumpido'
+        explica por qué; los lotes ya confirmados se conservan.
+        """
+        ImportacionModel.validar(tipo, codificacion)
+        ImportacionModel._limpiar_reportes()
+        texto = io.TextIOWrapper(archivo, encoding='utf-8-sig' if codificacion == 'utf-8' else codificacion, newline='')
+        try:
+            try:
+                primera = texto.readline()
+            except UnicodeDecodeError:
+                raise ValueError(f"El archivo no está en {codificacion}; prueba con codificacion=latin-1")
+            if not primera.strip():
+                raise ValueError("El archivo está vacío")
+            separador = ';' if primera.count(';') > primera.count(',') else ','
+            lector = csv.reader(itertools.chain([primera], texto), delimiter=separador)
+            posiciones, ignoradas = ImportacionModel._cabeceras(tipo, next(lector))
+
+            conn = get_db_connection()
+            if conn is None:
+                return None, "Error de conexión con la base de datos"
+
+            reporte = _Reporte(IMPORTACIONES[tipo]['columnas'])
+            maximo = _maximo_filas()
+            filas = importadas = lotes = 0
+            interrumpido = None
+            pendientes: List[Dict] = []
+
+            def vaciar():
+                nonlocal importadas, lotes
+                lote = ImportacionModel._procesar_lote(conn, tipo, pendientes)
+                importadas += lote.importadas
+                lotes += 1
+                for numero, fila, error in lote.rechazos:
+                    reporte.agregar(numero, fila, error)
+                pendientes.clear()
+
+            try:
+                while True:
+                    try:
+                        valores = next(lector, None)
+                    except (UnicodeDecodeError, csv.Error) as e:
+                        interrumpido = f"No se pudo leer el archivo tras la línea {lector.line_num}: {e}"
+                        break
+                    if valores is None:
+                        break
+                    if not any(v.strip() for v in valores):
+                        continue
+                    if filas >= maximo:
+                        interrumpido = f"El archivo supera el máximo de {maximo} filas; el resto no se importó"
+                        break
+                    filas += 1
+                    fila = {columna: valores[p].strip() for p, columna in posiciones.items() if p < len(valores)}
+                    fila['_fila'] = lector.line_num
+                    try:
+                        pendientes.append(ImportacionModel._validar_fila(tipo, fila))
+                    except ValueError as e:
+                        reporte.agregar(lector.line_num, fila, str(e))
+                        continue
+                    if len(pendientes) >= FILAS_POR_LOTE:
+                        vaciar()
+                if pendientes:
+                    vaciar()
+            finally:
+                close_db_connection(conn)
+                ruta = reporte.cerrar()
+        finally:
+            # El archivo subido lo cierra quien lo abrió
+            texto.detach()
+
+        token = ImportacionModel._registrar_reporte(tipo, ruta) if ruta else None
+        print(f"📥 Importación de {tipo}: {importadas}/{filas} filas en {lotes} lotes, {reporte.total} rechazadas")
+        return {
+            'tipo': tipo,
+            'filas': filas,
+            'importadas': importadas,
+            'rechazadas': reporte.total,
+            'lotes': lotes,
+            'columnas_ignoradas': ignoradas,
+            'errores': reporte.muestra,
+            'reporte': token,
+            'interrumpido': interrumpido,
+        }, None
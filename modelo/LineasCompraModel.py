@@ -0,0 +1,226 @@
+# modelo/LineasCompraModel.py - LÍNEAS DE PEDIDO NORMALIZADAS (compras_lineas)
+import json
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+import pymysql
+
+from bd.conexion_bd import get_db_connection, close_db_connection
+
+TABLA_LINEAS = """
+    CREATE TABLE IF NOT EXISTS compras_lineas (
+        id BIGINT NOT NULL AUTO_INCREMENT,
+        orden_id VARCHAR(32) NOT NULL,
+        linea SMALLINT NOT NULL,
+        fecha_compra DATETIME NOT NULL,
+        producto_id VARCHAR(64) NOT NULL DEFAULT '',
+        producto_tipo VARCHAR(50) NOT NULL DEFAULT '',
+        producto_nombre VARCHAR(255) NOT NULL DEFAULT '',
+        precio_unitario DECIMAL(12,2) NOT NULL DEFAULT 0,
+        cantidad INT NOT NULL DEFAULT 1,
+        subtotal DECIMAL(14,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (id),
+        UNIQUE KEY uk_compras_lineas_orden (orden_id, linea),
+        KEY idx_compras_lineas_producto (producto_tipo, producto_id, fecha_compra),
+        KEY idx_compras_lineas_fecha (fecha_compra)
+    ) ENGINE=InnoDB
+"""
+
+# INSERT IGNORE: la clave (orden_id, linea) hace que repetir el backfill no duplique
+SQL_INSERTAR = """
+    INSERT IGNORE INTO compras_lineas
+    (orden_id, linea, fecha_compra, producto_id, producto_tipo, producto_nombre,
+     precio_unitario, cantidad, subtotal)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# Pedidos leídos / insertados por lote durante el backfill
+_TAMANIO_LOTE = 500
+
+
+class LineasCompraModel:
+    """
+    Una fila por producto de cada pedido confirmado. compras_confirmadas
+    guarda solo el primer producto en producto_id/producto_nombre y el resto
+    dentro del JSON items_detalle, así que las analíticas de productos
+    agregan sobre esta tabla (vía resumen_ventas_dia) en lugar de sobre la
+    compra.
+
+    CarritoModel.confirmar_compra escribe las líneas en la misma transacción
+    que la compra; las compras anteriores se copian desde items_detalle con
+    `backfill()` (al arrancar, o con `python -m modelo.LineasCompraModel`).
+    """
+
+    _tabla_lista = False
+
+    @staticmethod
+    def asegurar_tabla():
+        """Crea compras_lineas con su propia conexión (el DDL hace commit implícito)"""
+        if LineasCompraModel._tabla_lista:
+            return
+        conn = get_db_connection()
+        if conn is None:
+            raise RuntimeError("Sin conexión para preparar compras_lineas")
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(TABLA_LINEAS)
+            LineasCompraModel._tabla_lista = True
+        finally:
+            close_db_connection(conn)
+
+    @staticmethod
+    def _filas(orden_id: str, fecha_compra, items: Iterable[Dict]) -> List[tuple]:
+        """Tuplas para SQL_INSERTAR a partir de los items (formato de items_detalle)"""
+        filas = []
+        for linea, item in enumerate(items, start=1):
+            cantidad = int(item.get('cantidad') or 1)
+            precio = float(item.get('precio_unitario') or 0)
+            subtotal = item.get('subtotal')
+            filas.append((
+                orden_id,
+                linea,
+                fecha_compra,
+                str(item.get('producto_id') or '')[:64],
+                str(item.get('producto_tipo') or '')[:50],
+                str(item.get('nombre') or '')[:255],
+                precio,
+                cantidad,
+                float(subtotal) if subtotal is not None else precio * cantidad,
+            ))
+        return filas
+
+    @staticmethod
+    def insertar(cursor, orden_id: str, fecha_compra, items: Iterable[Dict]) -> int:
+        """
+        Inserta las líneas de un pedido con el cursor de la transacción de la
+        compra (un solo executemany). Retorna cuántas líneas se enviaron.
+        """
+        filas = LineasCompraModel._filas(orden_id, fecha_compra, items)
+        if filas:
+            cursor.executemany(SQL_INSERTAR, filas)
+        return len(filas)
+
+    # ------------------------------------------------------------------
+    # Backfill desde items_detalle
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _items_de_compra(compra: Dict) -> List[Dict]:
+        """Items del JSON items_detalle o, si falta o no se puede leer, el producto principal"""
+        try:
+            items = json.loads(compra['items_detalle']) if compra.get('items_detalle') else []
+        except (TypeError, ValueError):
+            items = []
+        if isinstance(items, list):
+            items = [item for item in items if isinstance(item, dict)]
+        else:
+            items = []
+        if items:
+            return items
+
+        cantidad = int(compra.get('cantidad_total') or 1)
+        total = float(compra.get('total') or 0)
+        return [{
+            'producto_id': compra.get('producto_id'),
+            'producto_tipo': compra.get('producto_tipo'),
+            'nombre': compra.get('producto_nombre'),
+            'precio_unitario': total / cantidad if cantidad else total,
+            'cantidad': cantidad,
+            'subtotal': total,
+        }]
+
+    @staticmethod
+    def backfill() -> Optional[Set[date]]:
+        """
+        Copia a compras_lineas las compras que aún no tienen líneas. Lee con
+        un cursor sin buffer e inserta por lotes con otra conexión, así que la
+        memoria no depende del histórico. Retorna los días afectados (None si
+        falló).
+        """
+        LineasCompraModel.asegurar_tabla()
+        lectura = get_db_connection()
+        if lectura is None:
+            return None
+        escritura = get_db_connection()
+        if escritura is None:
+            close_db_connection(lectura)
+            return None
+
+        dias: Set[date] = set()
+        pedidos = 0
+        completa = False
+        try:
+            # Sin `with`: cerrar un SSCursor lee antes todo lo que quede
+            origen = lectura.cursor(pymysql.cursors.SSDictCursor)
+            origen.execute("""
+                SELECT c.orden_id, c.fecha_compra, c.producto_id, c.producto_tipo,
+                       c.producto_nombre, c.cantidad_total, c.total, c.items_detalle
+                FROM compras_confirmadas c
+                LEFT JOIN compras_lineas l ON l.orden_id = c.orden_id AND l.linea = 1
+                WHERE l.id IS NULL AND c.orden_id IS NOT NULL AND c.fecha_compra IS NOT NULL
+            """)
+            with escritura.cursor() as cursor:
+                while True:
+                    compras = origen.fetchmany(_TAMANIO_LOTE)
+                    if not compras:
+                        break
+                    filas = []
+                    for compra in compras:
+                        filas.extend(LineasCompraModel._filas(
+                            compra['orden_id'], compra['fecha_compra'],
+                            LineasCompraModel._items_de_compra(compra)
+                        ))
+                        fecha = compra['fecha_compra']
+                        dias.add(fecha.date() if isinstance(fecha, datetime) else fecha)
+                    # Todas las líneas de un pedido entran juntas (o ninguna)
+                    escritura.begin()
+                    cursor.executemany(SQL_INSERTAR, filas)
+                    escritura.commit()
+                    pedidos += len(compras)
+            origen.close()
+            completa = True
+        except Exception as e:
+            print(f"❌ Error en el backfill de compras_lineas: {e}")
+            return None
+        finally:
+            close_db_connection(escritura)
+            if completa:
+                close_db_connection(lectura)
+            else:
+                # Resultado sin leer entero: no se puede devolver al pool
+                lectura.descartar()
+
+        if pedidos:
+            print(f"🧾 compras_lineas: {pedidos} compras copiadas desde items_detalle")
+        return dias
+
+    @staticmethod
+    def inicializar():
+        """Crea la tabla, copia las compras antiguas y recalcula sus días en resumen_ventas_dia"""
+        from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
+        try:
+            dias = LineasCompraModel.backfill()
+            if dias:
+                ResumenAnaliticasModel.marcar_ventas(dias)
+        except Exception as e:
+            print(f"❌ Error al inicializar compras_lineas: {e}")
+
+    @staticmethod
+    def contar_pedidos(cursor, desde: date, hasta: date) -> int:
+        """Pedidos distintos con fecha entre desde y hasta (inclusive)"""
+        cursor.execute("""
+            SELECT COUNT(DISTINCT orden_id) as pedidos
+            FROM compras_lineas
+            WHERE fecha_compra >= %s AND fecha_compra < %s + INTERVAL 1 DAY
+        """, (desde, hasta))
+        fila = cursor.fetchone()
+        return int(fila['pedidos'] or 0) if fila else 0
+
+
+if __name__ == '__main__':
+    from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
+    dias = LineasCompraModel.backfill()
+    if dias:
+        # En primer plano: el proceso termina al acabar
+        for desde, hasta in ResumenAnaliticasModel._rangos(dias):
+            ResumenAnaliticasModel.recalcular('ventas', desde, hasta)
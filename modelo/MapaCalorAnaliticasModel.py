@@ -0,0 +1,270 @@
+# modelo/MapaCalorAnaliticasModel.py - MAPA DE CALOR DÍA × HORA DE LA OCUPACIÓN
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np  # type: ignore
+
+from bd.conexion_bd import get_db_connection, close_db_connection
+from modelo.CacheAnaliticasModel import CacheAnaliticasModel
+from modelo.CitaModel import CONDICION_RESERVA_ACTIVA
+from modelo.DisponibilidadModel import DisponibilidadModel
+
+DIAS_SEMANA = ('Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo')
+AGRUPACIONES = ('terapeuta', 'servicio')
+MAX_DIAS = 731
+
+# Límites de cada hora en minutos desde medianoche: [0, 60), [60, 120), ...
+_INICIO_HORAS = np.arange(24) * 60
+
+
+def _ocurrencias_dia_semana(desde: date, hasta: date) -> np.ndarray:
+    """Cuántos lunes, martes... hay entre desde y hasta (inclusive)"""
+    dias = np.datetime64(desde, 'D') + np.arange((hasta - desde).days + 1)
+    return np.bincount((dias.astype('int64') + 3) % 7, minlength=7)
+
+
+class MapaCalorAnaliticasModel:
+    """
+    Ocupación por día de la semana y hora (matriz 7×24) de un período.
+
+    Las citas del período se cargan UNA vez en arrays de NumPy (día, minuto de
+    inicio, duración del servicio y códigos de terapeuta y servicio) y se
+    guardan en CacheAnaliticasModel con el período como rango, así que
+    cualquier cambio de citas en esos días las recarga. Cada filtro o
+    agrupación se resuelve sobre esos arrays sin volver a la BD.
+
+    Cada cita ocupa los minutos reales de su servicio (servicio_terapia.duracion),
+    repartidos entre las horas que cubre: una cita de 90 minutos a las 9:30
+    suma 30 minutos a las 9 y 60 a las 10.
+    """
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _cargar(desde: date, hasta: date) -> Tuple[Optional[Dict], Optional[str]]:
+        conn = get_db_connection()
+        if conn is None:
+            return None, "Error de conexión con la base de datos"
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT nombre, duracion FROM servicio_terapia WHERE nombre IS NOT NULL")
+                duraciones = {
+                    fila['nombre']: DisponibilidadModel.a_minutos(fila['duracion'])
+                    for fila in cursor.fetchall()
+                }
+                cursor.execute(f"""
+                    SELECT WEEKDAY(fecha_cita) as dia,
+                           TIME_TO_SEC(hora_cita) DIV 60 as minuto,
+                           COALESCE(terapeuta_designado, '') as terapeuta,
+                           COALESCE(servicio, '') as servicio
+                    FROM cita
+                    WHERE fecha_cita BETWEEN %s AND %s
+                    AND hora_cita IS NOT NULL
+                    AND {CONDICION_RESERVA_ACTIVA}
+                """, (desde, hasta))
+                filas = cursor.fetchall()
+        except Exception as e:
+            print(f"❌ Error al cargar las citas del mapa de calor: {e}")
+            return None, f"Error interno: {str(e)}"
+        finally:
+            close_db_connection(conn)
+
+        n = len(filas)
+        terapeutas, codigo_terapeuta = np.unique([f['terapeuta'] for f in filas] or [''], return_inverse=True)
+        servicios, codigo_servicio = np.unique([f['servicio'] for f in filas] or [''], return_inverse=True)
+        duracion_servicio = np.array([
+            duraciones.get(s) or DisponibilidadModel.DURACION_POR_DEFECTO for s in servicios
+        ], dtype=np.int16)
+
+        minuto = np.fromiter((int(f['minuto'] or 0) for f in filas), dtype=np.int16, count=n)
+        return {
+            'desde': desde,
+            'hasta': hasta,
+            'dia': np.fromiter((int(f['dia']) for f in filas), dtype=np.int8, count=n),
+            'inicio': minuto,
+            'fin': np.minimum(minuto + duracion_servicio[codigo_servicio[:n]], 24 * 60).astype(np.int16),
+            'terapeuta': codigo_terapeuta[:n].astype(np.int32),
+            'servicio': codigo_servicio[:n].astype(np.int32),
+            'terapeutas': terapeutas.tolist(),
+            'servicios': servicios.tolist(),
+            'ocurrencias': _ocurrencias_dia_semana(desde, hasta),
+        }, None
+
+    @staticmethod
+    def obtener_datos(desde: date, hasta: date) -> Tuple[Optional[Dict], Optional[str]]:
+        """Arrays del período, desde la caché o cargados una sola vez"""
+        return CacheAnaliticasModel.obtener(
+            'mapa_calor', 300, (desde, hasta), MapaCalorAnaliticasModel._cargar, (desde, hasta)
+        )
+
+    # ------------------------------------------------------------------
+    # Cálculo
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _minutos_por_hora(inicio: np.ndarray, fin: np.ndarray) -> np.ndarray:
+        """Matriz (citas × 24) con los minutos de cada cita que caen en cada hora"""
+        return np.clip(
+            np.minimum(fin[:, None], _INICIO_HORAS + 60) - np.maximum(inicio[:, None], _INICIO_HORAS),
+            0, 60
+        ).astype(np.float32)
+
+    @staticmethod
+    def _filtro(datos: Dict, terapeutas: Optional[Sequence[str]], servicios: Optional[Sequence[str]]) -> np.ndarray:
+        mascara = np.ones(len(datos['dia']), dtype=bool)
+        for campo, nombres in (('terapeuta', terapeutas), ('servicio', servicios)):
+            if nombres:
+                buscados = set(nombres)
+                codigos = [i for i, nombre in enumerate(datos[f'{campo}s']) if nombre in buscados]
+                mascara &= np.isin(datos[campo], codigos)
+        return mascara
+
+    @staticmethod
+    def _matriz(datos: Dict, mascara: np.ndarray, grupo: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Minutos ocupados y número de citas (por hora de inicio) por día × hora.
+        Con grupo ('terapeuta' o 'servicio') devuelve una matriz por código: (G, 7, 24).
+        """
+        dia = datos['dia'][mascara].astype(np.intp)
+        inicio = datos['inicio'][mascara]
+        minutos = MapaCalorAnaliticasModel._minutos_por_hora(inicio, datos['fin'][mascara])
+        hora_inicio = np.minimum(inicio // 60, 23).astype(np.intp)
+
+        if grupo is None:
+            ocupado = np.zeros((7, 24), dtype=np.float64)
+            np.add.at(ocupado, dia, minutos)
+            citas = np.zeros((7, 24), dtype=np.int64)
+            np.add.at(citas, (dia, hora_inicio), 1)
+            return ocupado, citas
+
+        codigo = datos[grupo][mascara].astype(np.intp)
+        tamanio = len(datos[f'{grupo}s'])
+        ocupado = np.zeros((tamanio, 7, 24), dtype=np.float64)
+        np.add.at(ocupado, (codigo, dia), minutos)
+        citas = np.zeros((tamanio, 7, 24), dtype=np.int64)
+        np.add.at(citas, (codigo, dia, hora_inicio), 1)
+        return ocupado, citas
+
+    @staticmethod
+    def _ocupacion(minutos: np.ndarray, ocurrencias: np.ndarray, terapeutas: int) -> np.ndarray:
+        """% de los minutos disponibles de cada celda (cada terapeuta aporta 60 por hora y día)"""
+        disponibles = ocurrencias[:, None] * 60 * max(terapeutas, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(disponibles > 0, minutos / disponibles * 100, 0)
+
+    @staticmethod
+    def _celdas(minutos: np.ndarray, citas: np.ndarray, ocurrencias: np.ndarray, terapeutas: int) -> Dict:
+        return {
+            'horas': np.round(minutos / 60, 2).tolist(),
+            'citas': citas.tolist(),
+            'ocupacion': np.round(MapaCalorAnaliticasModel._ocupacion(minutos, ocurrencias, terapeutas), 1).tolist(),
+            'total_horas': round(float(minutos.sum()) / 60, 2),
+            'total_citas': int(citas.sum()),
+        }
+
+    @staticmethod
+    def picos(minutos: np.ndarray, citas: np.ndarray, cantidad: int = 5) -> List[Dict]:
+        """Las `cantidad` celdas día × hora con más horas ocupadas"""
+        orden = np.argsort(minutos, axis=None)[::-1][:cantidad]
+        resultado = []
+        for dia, hora in zip(*np.unravel_index(orden, minutos.shape)):
+            if minutos[dia, hora] <= 0:
+                break
+            resultado.append({
+                'dia': DIAS_SEMANA[dia],
+                'hora': int(hora),
+                'horas': round(float(minutos[dia, hora]) / 60, 2),
+                'citas': int(citas[dia, hora]),
+            })
+        return resultado
+
+    @staticmethod
+    def validar(desde: date, hasta: date, agrupar: Optional[str] = None):
+        """ValueError si el período o la agrupación no son válidos"""
+        if hasta < desde:
+            raise ValueError("La fecha final es anterior a la inicial")
+        if (hasta - desde).days + 1 > MAX_DIAS:
+            raise ValueError(f"El período no puede superar {MAX_DIAS} días")
+        if agrupar is not None and agrupar not in AGRUPACIONES:
+            raise ValueError(f"agrupar debe ser uno de: {', '.join(AGRUPACIONES)}")
+
+    @staticmethod
+    def obtener_mapa_calor(desde: date, hasta: date, terapeutas: Optional[Sequence[str]] = None,
+                           servicios: Optional[Sequence[str]] = None,
+                           agrupar: Optional[str] = None) -> Tuple[Dict, Optional[str]]:
+        """
+        Matriz 7×24 (lunes a domingo × 0 a 23 h) de horas ocupadas, citas y %
+        de ocupación entre desde y hasta, filtrada por terapeutas y/o servicios.
+        agrupar='terapeuta'|'servicio' añade una matriz por cada uno.
+        """
+        try:
+            MapaCalorAnaliticasModel.validar(desde, hasta, agrupar)
+        except ValueError as e:
+            return {}, str(e)
+
+        datos, error = MapaCalorAnaliticasModel.obtener_datos(desde, hasta)
+        if error:
+            return {}, error
+
+        mascara = MapaCalorAnaliticasModel._filtro(datos, terapeutas, servicios)
+        ocurrencias = datos['ocurrencias']
+        # Capacidad: los terapeutas filtrados, o los que tienen citas en la selección
+        if terapeutas:
+            num_terapeutas = len(set(terapeutas))
+        else:
+            num_terapeutas = len(np.unique(datos['terapeuta'][mascara]))
+
+        minutos, citas = MapaCalorAnaliticasModel._matriz(datos, mascara)
+        resultado = {
+            'desde': desde.strftime('%Y-%m-%d'),
+            'hasta': hasta.strftime('%Y-%m-%d'),
+            'dias': list(DIAS_SEMANA),
+            'horas': list(range(24)),
+            'terapeutas': num_terapeutas,
+            'total': MapaCalorAnaliticasModel._celdas(minutos, citas, ocurrencias, num_terapeutas),
+            'picos': MapaCalorAnaliticasModel.picos(minutos, citas),
+        }
+
+        if agrupar:
+            minutos_grupo, citas_grupo = MapaCalorAnaliticasModel._matriz(datos, mascara, agrupar)
+            nombres = datos[f'{agrupar}s']
+            grupos = {}
+            # Solo los grupos con citas en la selección
+            for codigo in np.flatnonzero(citas_grupo.sum(axis=(1, 2))):
+                capacidad = 1 if agrupar == 'terapeuta' else len(
+                    np.unique(datos['terapeuta'][mascara & (datos['servicio'] == codigo)])
+                )
+                grupos[nombres[codigo] or 'Sin asignar'] = MapaCalorAnaliticasModel._celdas(
+                    minutos_grupo[codigo], citas_grupo[codigo], ocurrencias, capacidad
+                )
+            resultado['agrupado_por'] = agrupar
+            resultado['grupos'] = grupos
+
+        return resultado, None
+
+    @staticmethod
+    def picos_periodo(desde: date, hasta: date, cantidad: int = 5) -> Tuple[List[Dict], Optional[str]]:
+        """Horas pico de todas las citas del período"""
+        datos, error = MapaCalorAnaliticasModel.obtener_datos(desde, hasta)
+        if error:
+            return [], error
+        minutos, citas = MapaCalorAnaliticasModel._matriz(datos, np.ones(len(datos['dia']), dtype=bool))
+        return MapaCalorAnaliticasModel.picos(minutos, citas, cantidad), None
+
+    @staticmethod
+    def horas_por_cita(desde: date, hasta: date) -> Tuple[float, Optional[str]]:
+        """Duración media de las citas del período en horas, según su servicio"""
+        datos, error = MapaCalorAnaliticasModel.obtener_datos(desde, hasta)
+        if error:
+            return 0.0, error
+        if not len(datos['dia']):
+            return DisponibilidadModel.DURACION_POR_DEFECTO / 60, None
+        return float((datos['fin'].astype(np.int32) - datos['inicio']).mean()) / 60, None
+
+    @staticmethod
+    def rango_por_defecto(hoy: Optional[date] = None) -> Tuple[date, date]:
+        """Los últimos 3 meses hasta hoy"""
+        hoy = hoy or date.today()
+        return hoy - timedelta(days=91), hoy
@@ -0,0 +1,208 @@
+# modelo/OcupacionCodigosModel.py - OCUPACIÓN DE LOS POOLS DE CÓDIGOS FS-xxxx
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from bd.conexion_bd import get_db_connection, close_db_connection
+from modelo.CodigoCitaModel import CodigoCitaModel
+
+
+class _MapaPool:
+    """Bitmap de números usados de un tipo (todos sus tramos) + contadores por tramo"""
+
+    def __init__(self, tramos):
+        self.tramos = tramos
+        self.offsets = []
+        total = 0
+        for inicio, fin in tramos:
+            self.offsets.append(total)
+            total += fin - inicio + 1
+        self.total = total
+        self.bits = bytearray((total + 7) // 8)
+        self.usados_por_tramo = [0] * len(tramos)
+
+    def _posicion(self, numero: int):
+        for i, (inicio, fin) in enumerate(self.tramos):
+            if inicio <= numero <= fin:
+                return i, self.offsets[i] + numero - inicio
+        return None, None
+
+    def _numero(self, posicion: int) -> int:
+        for i in range(len(self.tramos) - 1, -1, -1):
+            if posicion >= self.offsets[i]:
+                return self.tramos[i][0] + posicion - self.offsets[i]
+        return self.tramos[0][0] + posicion
+
+    def _usado(self, posicion: int) -> bool:
+        return bool(self.bits[posicion >> 3] & (1 << (posicion & 7)))
+
+    def marcar(self, numero: int, usado: bool) -> bool:
+        """Actualiza el bit; True si cambió"""
+        tramo, posicion = self._posicion(numero)
+        if posicion is None or self._usado(posicion) == usado:
+            return False
+        if usado:
+            self.bits[posicion >> 3] |= 1 << (posicion & 7)
+            self.usados_por_tramo[tramo] += 1
+        else:
+            self.bits[posicion >> 3] &= ~(1 << (posicion & 7)) & 0xFF
+            self.usados_por_tramo[tramo] -= 1
+        return True
+
+    def siguientes_libres(self, cantidad: int) -> List[int]:
+        """Los `cantidad` números libres más bajos (mismo orden que el asignador)"""
+        libres = []
+        for indice, byte in enumerate(self.bits):
+            if byte == 0xFF:
+                continue
+            for bit in range(8):
+                posicion = (indice << 3) + bit
+                if posicion >= self.total:
+                    return libres
+                if not byte & (1 << bit):
+                    libres.append(self._numero(posicion))
+                    if len(libres) >= cantidad:
+                        return libres
+        return libres
+
+    def fragmentacion(self) -> Dict[str, Any]:
+        """Huecos por debajo del número más alto usado y bloques libres contiguos"""
+        ultima_usada = -1
+        for indice in range(len(self.bits) - 1, -1, -1):
+            byte = self.bits[indice]
+            if byte:
+                ultima_usada = (indice << 3) + byte.bit_length() - 1
+                break
+
+        huecos = 0
+        bloques = 0
+        anterior_libre = False
+        for posicion in range(ultima_usada + 1):
+            libre = not self._usado(posicion)
+            if libre:
+                huecos += 1
+                if not anterior_libre:
+                    bloques += 1
+            anterior_libre = libre
+
+        libres_total = self.total - sum(self.usados_por_tramo)
+        return {
+            "huecos": huecos,
+            "bloques_libres": bloques,
+            "porcentaje": round(huecos / libres_total * 100, 2) if libres_total else 0.0,
+        }
+
+
+class OcupacionCodigosModel:
+    """
+    Ocupación de los pools de códigos mantenida en memoria.
+
+    El asignador (CodigoCitaModel) marca cada código al repartirlo o liberarlo,
+    así que los paneles leen contadores ya calculados en vez de recorrer la
+    tabla `cita`. Como otros procesos o inserciones manuales también tocan la
+    tabla, `reconciliar()` reconstruye todo desde la BD cada
+    CODIGOS_RECONCILIAR_SEGUNDOS (300 por defecto).
+    """
+
+    _mapas: Dict[str, _MapaPool] = {}
+    _ultima_reconciliacion: Optional[float] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def intervalo_reconciliacion() -> int:
+        try:
+            return max(30, int(os.environ.get('CODIGOS_RECONCILIAR_SEGUNDOS', '300')))
+        except ValueError:
+            return 300
+
+    @staticmethod
+    def reconciliar(conn=None) -> bool:
+        """Reconstruye los bitmaps de todos los tipos con un único recorrido de `cita`"""
+        conexion_propia = conn is None
+        if conexion_propia:
+            conn = get_db_connection()
+        if conn is None:
+            return False
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT cita_id FROM cita WHERE cita_id LIKE 'FS-%'")
+                filas = cursor.fetchall()
+
+            mapas = {tipo: _MapaPool(tramos) for tipo, tramos in CodigoCitaModel.TRAMOS.items()}
+            for fila in filas:
+                numero = CodigoCitaModel.numero_de_codigo(fila['cita_id'])
+                tipo = CodigoCitaModel.tipo_de_numero(numero) if numero is not None else None
+                if tipo:
+                    mapas[tipo].marcar(numero, True)
+
+            with OcupacionCodigosModel._lock:
+                OcupacionCodigosModel._mapas = mapas
+                OcupacionCodigosModel._ultima_reconciliacion = time.time()
+            print(f"🔄 Ocupación de códigos reconciliada ({len(filas)} códigos FS)")
+            return True
+
+        except Exception as e:
+            print(f"❌ Error al reconciliar la ocupación de códigos: {e}")
+            return False
+        finally:
+            if conexion_propia:
+                close_db_connection(conn)
+
+    @staticmethod
+    def _asegurar_cargado():
+        if OcupacionCodigosModel._ultima_reconciliacion is None:
+            OcupacionCodigosModel.reconciliar()
+
+    @staticmethod
+    def marcar(codigo: str, usado: bool):
+        """Llamado por el asignador al repartir (usado=True) o liberar un código"""
+        numero = CodigoCitaModel.numero_de_codigo(codigo)
+        tipo = CodigoCitaModel.tipo_de_numero(numero) if numero is not None else None
+        if not tipo:
+            return
+        with OcupacionCodigosModel._lock:
+            mapa = OcupacionCodigosModel._mapas.get(tipo)
+            if mapa is not None:
+                mapa.marcar(numero, usado)
+
+    @staticmethod
+    def estado(tipo_usuario: str, siguientes: int = 1) -> Dict[str, Any]:
+        """
+        Estado del pool principal del tipo (p. ej. FS-0001 a FS-0500 para usuario)
+        más los próximos `siguientes` códigos libres y la fragmentación.
+        """
+        OcupacionCodigosModel._asegurar_cargado()
+        if OcupacionCodigosModel._ultima_reconciliacion is None:
+            return {"error": "No hay conexión"}
+        with OcupacionCodigosModel._lock:
+            mapa = OcupacionCodigosModel._mapas.get(tipo_usuario)
+            if mapa is None:
+                return {"error": f"Tipo de usuario desconocido: {tipo_usuario}"}
+
+            inicio_num, fin_num = mapa.tramos[0]
+            total_codigos = fin_num - inicio_num + 1
+            codigos_usados = mapa.usados_por_tramo[0]
+            proximos = [CodigoCitaModel.formatear(n) for n in mapa.siguientes_libres(max(1, siguientes))]
+            fragmentacion = mapa.fragmentacion()
+            usados_extendidos = sum(mapa.usados_por_tramo[1:])
+            total_extendidos = mapa.total - total_codigos
+            ultima = OcupacionCodigosModel._ultima_reconciliacion
+
+        porcentaje_uso = (codigos_usados / total_codigos * 100) if total_codigos > 0 else 0
+        return {
+            "rango": f"{CodigoCitaModel.formatear(inicio_num)} - {CodigoCitaModel.formatear(fin_num)}",
+            "total_codigos": total_codigos,
+            "codigos_usados": codigos_usados,
+            "codigos_disponibles": total_codigos - codigos_usados,
+            "siguiente_disponible": proximos[0] if proximos else None,
+            "siguientes_disponibles": proximos,
+            "porcentaje_uso": round(porcentaje_uso, 2),
+            "rangos_extendidos": {
+                "total_codigos": total_extendidos,
+                "codigos_usados": usados_extendidos,
+            },
+            "fragmentacion": fragmentacion,
+            "ultima_reconciliacion": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ultima)) if ultima else None,
+        }
@@ -4,6 +4,8 @@ from datetime import datetime, date, timedelta
 import json
 
 from bd.conexion_bd import get_db_connection
+from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
+from modelo.BusquedaModel import BusquedaModel
 
 class PacienteFisioModel:
     
@@ -195,9 +197,12 @@ class PacienteFisioModel:
             
         try:
             with connection.cursor() as cursor:
+                fechas = ResumenAnaliticasModel.fechas_de_planes(cursor, 'codigo_cita', codigo_cita)
                 sql = "DELETE FROM paciente WHERE codigo_cita = %s"
                 cursor.execute(sql, (codigo_cita,))
                 connection.commit()
+                ResumenAnaliticasModel.marcar_planes(fechas)
+                BusquedaModel.marcar('pacientes', [codigo_cita])
                 print(f"✅ Paciente {codigo_cita} eliminado correctamente")
                 return True
                 
@@ -0,0 +1,272 @@
+# modelo/PronosticoAnaliticasModel.py - PRONÓSTICO DE CITAS, INGRESOS Y OCUPACIÓN
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+from bd.conexion_bd import get_db_connection, close_db_connection
+from modelo.CacheAnaliticasModel import CacheAnaliticasModel
+from modelo.DisponibilidadModel import DisponibilidadModel
+
+# Historia que se ajusta y días mínimos para estimar cada componente
+HISTORIA_DIAS = 3 * 365
+MIN_DIAS_TENDENCIA = 28
+MIN_DIAS_SEMANA = 28
+MIN_DIAS_MES = 2 * 365
+DIAS_NIVEL_RECIENTE = 90
+
+# Banda de confianza del 95%
+Z_CONFIANZA = 1.96
+
+PERIODOS_PRONOSTICO = ('week', 'month')
+MAX_PERIODOS = 24
+
+# Los parámetros se reajustan como mucho cada 6 horas (y al cambiar la historia)
+TTL_MODELO = 6 * 3600
+
+
+def _dia_semana(dias: np.ndarray) -> np.ndarray:
+    """0 = lunes ... 6 = domingo (el 1970-01-01 fue jueves)"""
+    return (dias.astype('int64') + 3) % 7
+
+
+class PronosticoAnaliticasModel:
+    """
+    Regresión lineal por mínimos cuadrados sobre las series diarias de citas
+    e ingresos de las tablas resumen:
+
+        y(día) = a + b·t + efecto del día de la semana + efecto del mes + ε
+
+    Las dos series comparten la matriz de diseño y se ajustan a la vez. Los
+    parámetros se guardan en CacheAnaliticasModel con la historia como rango,
+    así que se reajustan en cuanto ResumenAnaliticasModel recalcula algún día.
+    """
+
+    # ------------------------------------------------------------------
+    # Ajuste
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _cargar_series(cursor, desde: date, hasta: date) -> np.ndarray:
+        """Matriz (días × 2) con citas e ingresos de cada día, en una sola consulta"""
+        cursor.execute("""
+            SELECT fecha, SUM(citas) as citas, 0 as ingresos
+            FROM resumen_citas_dia WHERE fecha BETWEEN %s AND %s GROUP BY fecha
+            UNION ALL
+            SELECT fecha, 0, SUM(ingresos)
+            FROM resumen_planes_dia WHERE fecha BETWEEN %s AND %s GROUP BY fecha
+            UNION ALL
+            SELECT fecha, 0, SUM(ingresos)
+            FROM resumen_ventas_dia WHERE fecha BETWEEN %s AND %s GROUP BY fecha
+        """, (desde, hasta) * 3)
+        filas = cursor.fetchall()
+
+        series = np.zeros(((hasta - desde).days + 1, 2))
+        if filas:
+            indices = np.fromiter(((f['fecha'] - desde).days for f in filas), dtype=np.int64, count=len(filas))
+            valores = np.array([(float(f['citas'] or 0), float(f['ingresos'] or 0)) for f in filas])
+            np.add.at(series, indices, valores)
+        return series
+
+    @staticmethod
+    def _disenio(dias: np.ndarray, origen: date, componentes: Dict[str, bool]) -> np.ndarray:
+        """Matriz de diseño para un vector de días datetime64[D]"""
+        columnas = [np.ones(len(dias))]
+        if componentes['tendencia']:
+            columnas.append((dias - np.datetime64(origen, 'D')).astype(float) / 365.25)
+        if componentes['semana']:
+            # El lunes y enero quedan como referencia
+            columnas.append(np.eye(7)[_dia_semana(dias)][:, 1:])
+        if componentes['mes']:
+            columnas.append(np.eye(12)[dias.astype('datetime64[M]').astype('int64') % 12][:, 1:])
+        return np.column_stack(columnas)
+
+    @staticmethod
+    def _ajustar(hoy: date) -> Tuple[Optional[Dict], Optional[str]]:
+        """Ajusta el modelo con la historia hasta ayer (el día en curso está incompleto)"""
+        hasta = hoy - timedelta(days=1)
+        desde = hasta - timedelta(days=HISTORIA_DIAS - 1)
+
+        conn = get_db_connection()
+        if conn is None:
+            return None, "Error de conexión con la base de datos"
+        try:
+            with conn.cursor() as cursor:
+                series = PronosticoAnaliticasModel._cargar_series(cursor, desde, hasta)
+        except Exception as e:
+            print(f"❌ Error al cargar las series del pronóstico: {e}")
+            return None, f"Error interno: {str(e)}"
+        finally:
+            close_db_connection(conn)
+
+        # La historia empieza el primer día con actividad
+        activos = np.flatnonzero(series.any(axis=1))
+        if activos.size:
+            origen = desde + timedelta(days=int(activos[0]))
+            series = series[activos[0]:]
+        else:
+            origen = hoy
+            series = series[:0]
+
+        n = len(series)
+        componentes = {
+            'tendencia': n >= MIN_DIAS_TENDENCIA,
+            'semana': n >= MIN_DIAS_SEMANA,
+            'mes': n >= MIN_DIAS_MES,
+        }
+        dias = np.datetime64(origen, 'D') + np.arange(n)
+        X = PronosticoAnaliticasModel._disenio(dias, origen, componentes)
+        k = X.shape[1]
+
+        if n:
+            covarianza = np.linalg.pinv(X.T @ X)
+            coeficientes = covarianza @ X.T @ series
+            residuos = series - X @ coeficientes
+            varianza = (residuos ** 2).sum(axis=0) / max(n - k, 1)
+            nivel = series[-DIAS_NIVEL_RECIENTE:].mean(axis=0)
+        else:
+            covarianza = np.zeros((k, k))
+            coeficientes = np.zeros((k, 2))
+            varianza = np.zeros(2)
+            nivel = np.zeros(2)
+
+        return {
+            'origen': origen,
+            'dias': n,
+            'componentes': componentes,
+            'coeficientes': coeficientes,
+            'covarianza': covarianza,
+            'varianza': varianza,
+            'nivel': nivel,
+        }, None
+
+    @staticmethod
+    def obtener_modelo(hoy: Optional[date] = None) -> Tuple[Optional[Dict], Optional[str]]:
+        """Parámetros ajustados para hoy, desde la caché o ajustados una sola vez"""
+        hoy = hoy or date.today()
+        historia = (hoy - timedelta(days=HISTORIA_DIAS), None)
+        return CacheAnaliticasModel.obtener(
+            'pronostico', TTL_MODELO, historia, PronosticoAnaliticasModel._ajustar, (hoy,)
+        )
+
+    # ------------------------------------------------------------------
+    # Proyección
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def validar_periodos(periodos: int, periodo: str):
+        """ValueError si no se puede proyectar `periodos` períodos de tipo `periodo`"""
+        if periodo not in PERIODOS_PRONOSTICO:
+            raise ValueError(f"periodo debe ser uno de: {', '.join(PERIODOS_PRONOSTICO)}")
+        if not 1 <= periodos <= MAX_PERIODOS:
+            raise ValueError(f"periodos debe estar entre 1 y {MAX_PERIODOS}")
+
+    @staticmethod
+    def _periodos(hoy: date, periodo: str, cantidad: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Inicio y fin (datetime64[D]) de los próximos `cantidad` meses o semanas completos"""
+        PronosticoAnaliticasModel.validar_periodos(cantidad, periodo)
+
+        if periodo == 'week':
+            lunes = np.datetime64(hoy + timedelta(days=7 - hoy.weekday()), 'D')
+            inicios = lunes + 7 * np.arange(cantidad)
+            return inicios, inicios + 6
+
+        meses = np.datetime64(hoy, 'M') + np.arange(1, cantidad + 1)
+        return meses.astype('datetime64[D]'), (meses + 1).astype('datetime64[D]') - 1
+
+    @staticmethod
+    def horas_semana(cursor) -> np.ndarray:
+        """Horas de atención de los terapeutas activos por día (lunes a domingo), según su franja horaria"""
+        horas = np.zeros(7)
+        for terapeuta in DisponibilidadModel._cargar_terapeutas(cursor, None).values():
+            inicio, fin = terapeuta['horas']
+            horas[sorted(terapeuta['dias'])] += (fin - inicio) / 60
+        return horas
+
+    @staticmethod
+    def proyectar(modelo: Dict, hoy: date, periodos: int = 3, periodo: str = 'month',
+                  horas_semana: Optional[np.ndarray] = None, horas_por_cita: float = 1.0) -> List[Dict]:
+        """
+        Citas, ingresos y ocupación estimados para cada período, con la banda
+        de confianza del 95% del total del período. La ocupación son las horas
+        de las citas (horas_por_cita) sobre las horas de atención del período
+        (horas_semana: horas de todos los terapeutas por día de la semana).
+        """
+        inicios, fines = PronosticoAnaliticasModel._periodos(hoy, periodo, periodos)
+        largos = (fines - inicios).astype('int64') + 1
+
+        # Todos los días de todos los períodos en un solo vector
+        indice = np.repeat(np.arange(periodos), largos)
+        desplazamiento = np.arange(largos.sum()) - np.repeat(np.cumsum(largos) - largos, largos)
+        dias = inicios[indice] + desplazamiento
+
+        X = PronosticoAnaliticasModel._disenio(dias, modelo['origen'], modelo['componentes'])
+        diario = np.clip(X @ modelo['coeficientes'], 0, None)
+
+        # S suma los días de cada período: total = S·X·β y Var(total) = σ²·(n + s·C·sᵀ)
+        S = (indice == np.arange(periodos)[:, None]).astype(float)
+        estimado = S @ diario
+        SX = S @ X
+        incertidumbre = largos + np.einsum('pk,kl,pl->p', SX, modelo['covarianza'], SX)
+        margen = Z_CONFIANZA * np.sqrt(incertidumbre[:, None] * modelo['varianza'][None, :])
+        minimo = np.clip(estimado - margen, 0, None)
+        maximo = estimado + margen
+
+        horas_semana = np.zeros(7) if horas_semana is None else np.asarray(horas_semana, dtype=float)
+        capacidad = S @ horas_semana[_dia_semana(dias)]
+
+        def ocupacion(citas: np.ndarray) -> np.ndarray:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(capacidad > 0, np.minimum(100, citas * horas_por_cita / capacidad * 100), 0)
+
+        ocupacion_estimada = ocupacion(estimado[:, 0])
+        ocupacion_minima = ocupacion(minimo[:, 0])
+        ocupacion_maxima = ocupacion(maximo[:, 0])
+
+        resultado = []
+        for p in range(periodos):
+            inicio = inicios[p].item()
+            resultado.append({
+                'periodo': inicio.strftime('%Y-%m') if periodo == 'month' else inicio.strftime('%G-W%V'),
+                'fecha_inicio': inicio.strftime('%Y-%m-%d'),
+                'fecha_fin': fines[p].item().strftime('%Y-%m-%d'),
+                'citas': {
+                    'estimado': int(round(estimado[p, 0])),
+                    'minimo': int(round(minimo[p, 0])),
+                    'maximo': int(round(maximo[p, 0])),
+                },
+                'ingresos': {
+                    'estimado': round(float(estimado[p, 1]), 2),
+                    'minimo': round(float(minimo[p, 1]), 2),
+                    'maximo': round(float(maximo[p, 1]), 2),
+                },
+                'ocupacion': {
+                    'estimado': round(float(ocupacion_estimada[p]), 1),
+                    'minimo': round(float(ocupacion_minima[p]), 1),
+                    'maximo': round(float(ocupacion_maxima[p]), 1),
+                },
+            })
+        return resultado
+
+    @staticmethod
+    def tasa_crecimiento_mensual(modelo: Dict) -> float:
+        """Pendiente de la tendencia de citas en un mes, en % del nivel de los últimos 90 días"""
+        nivel = float(modelo['nivel'][0])
+        if not modelo['componentes']['tendencia'] or nivel <= 0:
+            return 0.0
+        pendiente_diaria = float(modelo['coeficientes'][1, 0]) / 365.25
+        return pendiente_diaria * 30.44 / nivel * 100
+
+    @staticmethod
+    def resumen_modelo(modelo: Dict) -> Dict:
+        """Descripción del ajuste para mostrar junto al pronóstico"""
+        return {
+            'desde': modelo['origen'].strftime('%Y-%m-%d'),
+            'dias_historia': modelo['dias'],
+            'tendencia': modelo['componentes']['tendencia'],
+            'estacionalidad_semanal': modelo['componentes']['semana'],
+            'estacionalidad_mensual': modelo['componentes']['mes'],
+            'error_diario_citas': round(float(np.sqrt(modelo['varianza'][0])), 2),
+            'error_diario_ingresos': round(float(np.sqrt(modelo['varianza'][1])), 2),
+            'confianza': 95,
+        }
@@ -4,6 +4,8 @@ from datetime import datetime, date
 import logging
 
 from bd.conexion_bd import get_db_connection
+from modelo.ResumenAnaliticasModel import ResumenAnaliticasModel
+from modelo.BusquedaModel import BusquedaModel
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -60,6 +62,9 @@ class ReporteFisioModel:
                 logger.warning(f"⚠️ Archivo no tiene firma PDF válida para {codigo_cita}")
             
             with connection.cursor() as cursor:
+                # El plan pasa a contar en el día de hoy (resumen de planes)
+                fechas = ResumenAnaliticasModel.fechas_de_planes(cursor, 'codigo_cita', codigo_cita)
+                
                 # SQL para guardar BLOB
                 sql = """
                 UPDATE paciente 
@@ -80,6 +85,9 @@ class ReporteFisioModel:
                 
                 affected = cursor.rowcount
                 connection.commit()
+                if affected > 0:
+                    ResumenAnaliticasModel.marcar_planes(fechas + [date.today()])
+                    BusquedaModel.marcar('pacientes', [codigo_cita])
                 
                 if affected > 0:
                     logger.info(f"✅ PDF guardado exitosamente: {codigo_cita}")
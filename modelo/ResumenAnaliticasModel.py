@@ -0,0 +1,381 @@
+# modelo/ResumenAnaliticasModel.py - TABLAS RESUMEN (ROLLUPS) PARA LAS ANALÍTICAS
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pymysql
+
+from bd.conexion_bd import get_db_connection, close_db_connection
+from bd.unidad_trabajo import despues_de_confirmar
+from modelo.CacheAnaliticasModel import CacheAnaliticasModel
+from modelo.LineasCompraModel import LineasCompraModel
+from modelo.SnapshotAnaliticasModel import SnapshotAnaliticasModel
+
+# Una tabla por hecho que consulta el panel de analíticas, con una fila por día
+# y dimensión. Los totales mensuales se obtienen sumando como mucho 31 filas
+# por clave, así que no hace falta una segunda tabla por mes.
+TABLAS_RESUMEN = {
+    'citas': """
+        CREATE TABLE IF NOT EXISTS resumen_citas_dia (
+            fecha DATE NOT NULL,
+            terapeuta VARCHAR(255) NOT NULL DEFAULT '',
+            servicio VARCHAR(255) NOT NULL DEFAULT '',
+            estado VARCHAR(50) NOT NULL DEFAULT '',
+            citas INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (fecha, terapeuta, servicio, estado),
+            KEY idx_resumen_citas_terapeuta (terapeuta, fecha),
+            KEY idx_resumen_citas_servicio (servicio, fecha)
+        ) ENGINE=InnoDB
+    """,
+    'ventas': """
+        CREATE TABLE IF NOT EXISTS resumen_ventas_dia (
+            fecha DATE NOT NULL,
+            producto_nombre VARCHAR(255) NOT NULL DEFAULT '',
+            producto_tipo VARCHAR(50) NOT NULL DEFAULT '',
+            ventas INT NOT NULL DEFAULT 0,
+            unidades INT NOT NULL DEFAULT 0,
+            ingresos DECIMAL(14,2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (fecha, producto_nombre, producto_tipo)
+        ) ENGINE=InnoDB
+    """,
+    'planes': """
+        CREATE TABLE IF NOT EXISTS resumen_planes_dia (
+            fecha DATE NOT NULL,
+            terapeuta VARCHAR(255) NOT NULL DEFAULT '',
+            planes INT NOT NULL DEFAULT 0,
+            ingresos DECIMAL(14,2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (fecha, terapeuta)
+        ) ENGINE=InnoDB
+    """,
+}
+
+# Por cada resumen: (tabla resumen, tabla origen, columna de fecha, INSERT ... SELECT
+# que recalcula un rango [desde, hasta + 1 día) desde la tabla origen)
+RECALCULO_RESUMEN = {
+    'citas': ('resumen_citas_dia', 'cita', 'fecha_cita', """
+        INSERT INTO resumen_citas_dia (fecha, terapeuta, servicio, estado, citas)
+        SELECT DATE(fecha_cita),
+               LEFT(COALESCE(terapeuta_designado, ''), 255),
+               LEFT(COALESCE(servicio, ''), 255),
+               LEFT(LOWER(COALESCE(estado, '')), 50),
+               COUNT(*)
+        FROM cita
+        WHERE fecha_cita >= %s AND fecha_cita < %s
+        GROUP BY 1, 2, 3, 4
+    """),
+    # ventas = pedidos que incluyen el producto; unidades = cantidad vendida
+    'ventas': ('resumen_ventas_dia', 'compras_lineas', 'fecha_compra', """
+        INSERT INTO resumen_ventas_dia (fecha, producto_nombre, producto_tipo, ventas, unidades, ingresos)
+        SELECT DATE(fecha_compra),
+               producto_nombre,
+               producto_tipo,
+               COUNT(DISTINCT orden_id),
+               COALESCE(SUM(cantidad), 0),
+               COALESCE(SUM(subtotal), 0)
+        FROM compras_lineas
+        WHERE fecha_compra >= %s AND fecha_compra < %s
+        GROUP BY 1, 2, 3
+    """),
+    'planes': ('resumen_planes_dia', 'paciente', 'fecha_creacion_reporte', """
+        INSERT INTO resumen_planes_dia (fecha, terapeuta, planes, ingresos)
+        SELECT DATE(fecha_creacion_reporte),
+               LEFT(COALESCE(terapeuta_asignado, ''), 255),
+               COUNT(*),
+               COALESCE(SUM(precio_plan), 0)
+        FROM paciente
+        WHERE fecha_creacion_reporte >= %s AND fecha_creacion_reporte < %s
+        GROUP BY 1, 2
+    """),
+}
+
+# Columnas añadidas después de crear las tablas: (tabla, columna, ALTER TABLE)
+COLUMNAS_RESUMEN = (
+    ('resumen_ventas_dia', 'unidades',
+     "ALTER TABLE resumen_ventas_dia ADD COLUMN unidades INT NOT NULL DEFAULT 0 AFTER ventas"),
+)
+
+
+class ResumenAnaliticasModel:
+    """
+    Mantiene las tablas resumen_*_dia que lee AdminAnaliticasModel, para que
+    el panel no recorra `cita`, `compras_lineas` y `paciente` completas.
+
+    Quien crea, cambia o elimina una cita, una compra o un plan llama a
+    marcar_citas / marcar_ventas / marcar_planes con las fechas afectadas
+    (la anterior y la nueva si la fecha cambió). Esos días se recalculan en
+    segundo plano desde la tabla origen, lo que cuesta lo mismo tenga el
+    histórico 1.000 o 1.000.000 de filas. `reconstruir()` rehace todo (carga
+    inicial o reparación) y también se puede lanzar con:
+
+        python -m modelo.ResumenAnaliticasModel [desde] [hasta]
+    """
+
+    _tablas_listas = False
+    _pendientes: Dict[str, Set[date]] = {tipo: set() for tipo in RECALCULO_RESUMEN}
+    _procesando = False
+    _lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Esquema
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _asegurar_tablas():
+        """Crea las tablas resumen con su propia conexión (el DDL hace commit implícito)"""
+        if ResumenAnaliticasModel._tablas_listas:
+            return
+        conn = get_db_connection()
+        if conn is None:
+            raise RuntimeError("Sin conexión para preparar las tablas resumen")
+        try:
+            with conn.cursor() as cursor:
+                for ddl in TABLAS_RESUMEN.values():
+                    cursor.execute(ddl)
+                for tabla, columna, ddl in COLUMNAS_RESUMEN:
+                    cursor.execute(f"SHOW COLUMNS FROM {tabla} LIKE %s", (columna,))
+                    if cursor.fetchone() is None:
+                        # Las filas existentes quedan a 0 hasta que LineasCompraModel
+                        # recalcula sus días al hacer el backfill
+                        cursor.execute(ddl)
+            # Origen de resumen_ventas_dia
+            LineasCompraModel.asegurar_tabla()
+            ResumenAnaliticasModel._tablas_listas = True
+        finally:
+            close_db_connection(conn)
+
+    @staticmethod
+    def inicializar():
+        """Crea las tablas y, si están vacías, hace la carga inicial completa"""
+        try:
+            ResumenAnaliticasModel._asegurar_tablas()
+            conn = get_db_connection()
+            if conn is None:
+                return
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1 FROM resumen_citas_dia LIMIT 1")
+                    vacias = cursor.fetchone() is None
+            finally:
+                close_db_connection(conn)
+            if vacias:
+                print("📊 Tablas resumen vacías: reconstruyendo desde el histórico...")
+                ResumenAnaliticasModel.reconstruir()
+        except Exception as e:
+            print(f"❌ Error al inicializar las tablas resumen: {e}")
+
+    # ------------------------------------------------------------------
+    # Recalcular rangos
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _a_fecha(valor) -> Optional[date]:
+        if isinstance(valor, datetime):
+            return valor.date()
+        if isinstance(valor, date):
+            return valor
+        if isinstance(valor, str) and valor:
+            try:
+                return datetime.strptime(valor[:10], '%Y-%m-%d').date()
+            except ValueError:
+                return None
+        return None
+
+    @staticmethod
+    def _rangos(fechas: Iterable[date]) -> List[Tuple[date, date]]:
+        """Agrupa fechas sueltas en rangos de días consecutivos"""
+        rangos: List[Tuple[date, date]] = []
+        for fecha in sorted(set(fechas)):
+            if rangos and fecha - rangos[-1][1] <= timedelta(days=1):
+                rangos[-1] = (rangos[-1][0], fecha)
+            else:
+                rangos.append((fecha, fecha))
+        return rangos
+
+    @staticmethod
+    def recalcular(tipo: str, desde: date, hasta: date) -> bool:
+        """Rehace las filas del resumen `tipo` entre desde y hasta (inclusive)"""
+        tabla, _, _, sql_insertar = RECALCULO_RESUMEN[tipo]
+        ResumenAnaliticasModel._asegurar_tablas()
+
+        for intento in range(3):
+            conn = get_db_connection()
+            if conn is None:
+                return False
+            try:
+                conn.begin()
+                with conn.cursor() as cursor:
+                    cursor.execute(f"DELETE FROM {tabla} WHERE fecha BETWEEN %s AND %s", (desde, hasta))
+                    cursor.execute(sql_insertar, (desde, hasta + timedelta(days=1)))
+                conn.commit()
+                # Primero la copia columnar, para que lo que se recalcule tras
+                # invalidar ya la lea actualizada
+                SnapshotAnaliticasModel.refrescar(tipo, desde, hasta)
+                # Los resultados del panel que dependen de estos días quedan vencidos
+                CacheAnaliticasModel.invalidar(desde, hasta)
+                return True
+            except pymysql.err.OperationalError as e:
+                conn.rollback()
+                # Interbloqueo con otro proceso recalculando el mismo día: reintentar
+                if e.args and e.args[0] in (1205, 1213) and intento < 2:
+                    continue
+                print(f"❌ Error al recalcular {tabla} ({desde} - {hasta}): {e}")
+                return False
+            except Exception as e:
+                conn.rollback()
+                print(f"❌ Error al recalcular {tabla} ({desde} - {hasta}): {e}")
+                return False
+            finally:
+                close_db_connection(conn)
+        return False
+
+    @staticmethod
+    def reconstruir(desde: Optional[date] = None, hasta: Optional[date] = None) -> Dict[str, int]:
+        """
+        Carga inicial / reparación: recalcula cada resumen mes a mes entre
+        desde y hasta (por defecto, todo el histórico de la tabla origen).
+        Cada mes se reemplaza en su sitio, así que el panel nunca lee el
+        resumen vacío; con el histórico completo, al final se descartan las
+        filas huérfanas fuera de él. Retorna cuántos meses se recalcularon.
+        """
+        ResumenAnaliticasModel._asegurar_tablas()
+        completo = desde is None and hasta is None
+        resultado = {}
+        for tipo, (tabla, origen, columna, _) in RECALCULO_RESUMEN.items():
+            inicio, fin = desde, hasta
+            if inicio is None or fin is None:
+                conn = get_db_connection()
+                if conn is None:
+                    continue
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute(f"SELECT MIN({columna}) AS minimo, MAX({columna}) AS maximo FROM {origen}")
+                        fila = cursor.fetchone() or {}
+                finally:
+                    close_db_connection(conn)
+                inicio = inicio or ResumenAnaliticasModel._a_fecha(fila.get('minimo'))
+                fin = fin or ResumenAnaliticasModel._a_fecha(fila.get('maximo'))
+            if inicio is None or fin is None:
+                if completo:
+                    ResumenAnaliticasModel._descartar_fuera(tabla, None, None)
+                resultado[tipo] = 0
+                continue
+
+            meses = 0
+            actual = inicio
+            while actual <= fin:
+                siguiente = (actual.replace(day=1) + timedelta(days=32)).replace(day=1)
+                ResumenAnaliticasModel.recalcular(tipo, actual, min(fin, siguiente - timedelta(days=1)))
+                meses += 1
+                actual = siguiente
+            if completo:
+                ResumenAnaliticasModel._descartar_fuera(tabla, inicio, fin)
+            resultado[tipo] = meses
+            print(f"📊 {tabla}: {meses} meses recalculados ({inicio} - {fin})")
+        return resultado
+
+    @staticmethod
+    def _descartar_fuera(tabla: str, inicio: Optional[date], fin: Optional[date]):
+        """Borra las filas del resumen fuera de [inicio, fin] (todas si el origen está vacío)"""
+        conn = get_db_connection()
+        if conn is None:
+            return
+        try:
+            with conn.cursor() as cursor:
+                if inicio is None or fin is None:
+                    cursor.execute(f"DELETE FROM {tabla}")
+                else:
+                    cursor.execute(f"DELETE FROM {tabla} WHERE fecha < %s OR fecha > %s", (inicio, fin))
+                borradas = cursor.rowcount
+            if borradas:
+                print(f"🧹 {tabla}: {borradas} filas huérfanas descartadas")
+                CacheAnaliticasModel.invalidar()
+        except Exception as e:
+            print(f"❌ Error al descartar filas huérfanas de {tabla}: {e}")
+        finally:
+            close_db_connection(conn)
+
+    # ------------------------------------------------------------------
+    # Marcar días modificados
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def marcar(tipo: str, fechas: Iterable, conn=None):
+        """
+        Encola las fechas para recalcular el resumen `tipo`. Si se pasa la
+        conexión de una unidad de trabajo, se espera a que confirme.
+        """
+        dias = {d for d in (ResumenAnaliticasModel._a_fecha(f) for f in fechas) if d}
+        if dias:
+            despues_de_confirmar(conn, lambda: ResumenAnaliticasModel._encolar(tipo, dias))
+
+    @staticmethod
+    def marcar_citas(fechas: Iterable, conn=None):
+        ResumenAnaliticasModel.marcar('citas', fechas, conn)
+
+    @staticmethod
+    def marcar_ventas(fechas: Iterable, conn=None):
+        ResumenAnaliticasModel.marcar('ventas', fechas, conn)
+
+    @staticmethod
+    def marcar_planes(fechas: Iterable, conn=None):
+        ResumenAnaliticasModel.marcar('planes', fechas, conn)
+
+    @staticmethod
+    def fechas_de_citas(cursor, cita_ids: Iterable[str]) -> List[date]:
+        """Fechas actuales de las citas (llamar ANTES de eliminarlas o moverlas)"""
+        ids = [i for i in cita_ids if i]
+        if not ids:
+            return []
+        marcadores = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"SELECT DISTINCT fecha_cita FROM cita WHERE cita_id IN ({marcadores})", ids)
+        return [fila['fecha_cita'] for fila in cursor.fetchall() if fila['fecha_cita']]
+
+    @staticmethod
+    def fechas_de_planes(cursor, columna: str, valor) -> List[date]:
+        """Fechas de los planes (paciente) por codigo_cita o ID_usuario"""
+        if columna not in ('codigo_cita', 'ID_usuario'):
+            raise ValueError(f"Columna no permitida: {columna}")
+        cursor.execute(
+            f"SELECT DISTINCT fecha_creacion_reporte FROM paciente WHERE {columna} = %s", (valor,)
+        )
+        return [fila['fecha_creacion_reporte'] for fila in cursor.fetchall() if fila['fecha_creacion_reporte']]
+
+    @staticmethod
+    def _encolar(tipo: str, dias: Set[date]):
+        with ResumenAnaliticasModel._lock:
+            ResumenAnaliticasModel._pendientes[tipo].update(dias)
+            if ResumenAnaliticasModel._procesando:
+                return
+            ResumenAnaliticasModel._procesando = True
+
+        from bd.ejecutor_bd import obtener_ejecutor
+        try:
+            obtener_ejecutor().submit(ResumenAnaliticasModel._procesar_pendientes)
+        except RuntimeError:
+            # Ejecutor cerrado (apagado): `reconstruir` repara lo que falte
+            with ResumenAnaliticasModel._lock:
+                ResumenAnaliticasModel._procesando = False
+
+    @staticmethod
+    def _procesar_pendientes():
+        """Un solo hilo recalcula a la vez; las fechas que llegan mientras tanto se acumulan"""
+        while True:
+            with ResumenAnaliticasModel._lock:
+                lote = {tipo: dias for tipo, dias in ResumenAnaliticasModel._pendientes.items() if dias}
+                if not lote:
+                    ResumenAnaliticasModel._procesando = False
+                    return
+                ResumenAnaliticasModel._pendientes = {tipo: set() for tipo in RECALCULO_RESUMEN}
+            try:
+                for tipo, dias in lote.items():
+                    for desde, hasta in ResumenAnaliticasModel._rangos(dias):
+                        ResumenAnaliticasModel.recalcular(tipo, desde, hasta)
+            except Exception as e:
+                print(f"❌ Error al actualizar las tablas resumen: {e}")
+
+
+if __name__ == "__main__":
+    # Reconstrucción manual: python -m modelo.ResumenAnaliticasModel [AAAA-MM-DD] [AAAA-MM-DD]
+    argumentos = [ResumenAnaliticasModel._a_fecha(a) for a in sys.argv[1:3]]
+    print(ResumenAnaliticasModel.reconstruir(*argumentos))
@@ -1,4 +1,4 @@
-from bd.conexion_bd import get_db_connection, close_db_connection
+from modelo.CatalogoModel import CatalogoModel
 
 class ServicioImplementosModel:
     @staticmethod
@@ -6,111 +6,40 @@ class ServicioImplementosModel:
         """
         Obtiene todos los implementos
         """
-        conn = get_db_connection()
-        if not conn:
-            return None, "Error de conexión con la base de datos"
-
-        try:
-            with conn.cursor() as cursor:
-                query = "SELECT * FROM servicio_implementos"
-                cursor.execute(query)
-                servicios = cursor.fetchall()
-                
-                # Convertir Decimal a float
-                for servicio in servicios:
-                    # Campos que SÍ existen según tu tabla
-                    campos_decimales = [
-                        'precio', 'peso', 'peso_total_set', 'dificultad'
-                    ]
-                    
-                    for campo in campos_decimales:
-                        if campo in servicio and servicio[campo] is not None:
-                            servicio[campo] = float(servicio[campo])
-                
-                print(f"✅ Productos implementos obtenidos: {len(servicios)}")
-                return servicios, None
-
-        except Exception as e:
-            print(f"Error en modelo obtener_todos_servicios (implementos): {e}")
+        servicios = CatalogoModel.implementos()
+        if servicios is None:
             return None, "Error interno al obtener implementos"
-        finally:
-            close_db_connection(conn)
+        return servicios, None
 
     @staticmethod
     def obtener_servicio_por_codigo(codigo):
         """
-        Obtiene un implemento por su código desde la base de datos
+        Obtiene un implemento por su código (catálogo en memoria)
         """
-        conn = get_db_connection()
-        if not conn:
-            return None, "Error de conexión con la base de datos"
-
-        try:
-            with conn.cursor() as cursor:
-                query = "SELECT * FROM servicio_implementos WHERE codigo = %s"
-                cursor.execute(query, (codigo,))
-                servicio = cursor.fetchone()
-
-                if not servicio:
-                    return None, "Implemento no encontrado"
-
-                # Convertir Decimal a float
-                campos_decimales = [
-                    'precio', 'peso', 'peso_total_set', 'dificultad'
-                ]
-                
-                for campo in campos_decimales:
-                    if campo in servicio and servicio[campo] is not None:
-                        servicio[campo] = float(servicio[campo])
-
-                return servicio, None
-
-        except Exception as e:
-            print(f"Error en modelo obtener_servicio_por_codigo (implementos): {e}")
+        if not CatalogoModel.disponible():
             return None, "Error interno al obtener el implemento"
-        finally:
-            close_db_connection(conn)
+        servicio = CatalogoModel.implemento(codigo)
+        if not servicio:
+            return None, "Implemento no encontrado"
+        return servicio, None
 
     @staticmethod
     def obtener_grupos_musculares():
         """
         Obtiene los grupos musculares únicos de implementos
         """
-        conn = get_db_connection()
-        if not conn:
-            return None, "Error de conexión con la base de datos"
-
-        try:
-            with conn.cursor() as cursor:
-                query = "SELECT DISTINCT grupo_muscular FROM servicio_implementos WHERE grupo_muscular IS NOT NULL AND grupo_muscular != ''"
-                cursor.execute(query)
-                grupos = cursor.fetchall()
-                return [g['grupo_muscular'] for g in grupos], None
-
-        except Exception as e:
-            print(f"Error en modelo obtener_grupos_musculares: {e}")
+        grupos = CatalogoModel.grupos_musculares()
+        if grupos is None:
             return None, "Error interno al obtener grupos musculares"
-        finally:
-            close_db_connection(conn)
+        return grupos, None
 
     @staticmethod
     def obtener_niveles_dificultad():
         """
         Obtiene los niveles de dificultad únicos
         """
-        conn = get_db_connection()
-        if not conn:
-            return None, "Error de conexión con la base de datos"
-
-        try:
-            with conn.cursor() as cursor:
-                query = "SELECT DISTINCT dificultad FROM servicio_implementos WHERE dificultad IS NOT NULL ORDER BY dificultad"
-                cursor.execute(query)
-                niveles = cursor.fetchall()
-                return [n['dificultad'] for n in niveles], None
-
-        except Exception as e:
-            print(f"Error en modelo obtener_niveles_dificultad: {e}")
+        niveles = CatalogoModel.niveles_dificultad()
+        if niveles is None:
             return None, "Error interno al obtener niveles de dificultad"
-        finally:
-            close_db_connection(conn)
\ No newline at end of file
+        return niveles, None
+
@@ -1,6 +1,7 @@
 from bd.conexion_bd import get_db_connection, close_db_connection
 from datetime import timedelta, time
 import json
+from modelo.CatalogoModel import CatalogoModel
 
 class ServicioModel:
     @staticmethod
@@ -87,85 +88,20 @@ class ServicioModel:
         """
         Obtiene todos los servicios terapéuticos con información básica de terapeutas
         """
-        conn = get_db_connection()
-        if not conn:
-            return None, "Error de conexión con la base de datos"
-
-        try:
-            with conn.cursor() as cursor:
-                query = "SELECT * FROM servicio_terapia"
-                cursor.execute(query)
-                servicios = cursor.fetchall()
-                
-                servicios_list = []
-                for servicio in servicios:
-                    servicio_dict = dict(servicio)
-                    
-                    # Convertir timedelta a string para los horarios
-                    if isinstance(servicio_dict.get('inicio_jornada'), timedelta):
-                        servicio_dict['inicio_jornada_str'] = str(servicio_dict['inicio_jornada'])[:5]
-                    elif servicio_dict.get('inicio_jornada'):
-                        servicio_dict['inicio_jornada_str'] = str(servicio_dict['inicio_jornada'])[:5]
-                    
-                    if isinstance(servicio_dict.get('final_jornada'), timedelta):
-                        servicio_dict['final_jornada_str'] = str(servicio_dict['final_jornada'])[:5]
-                    elif servicio_dict.get('final_jornada'):
-                        servicio_dict['final_jornada_str'] = str(servicio_dict['final_jornada'])[:5]
-                    
-                    # Contar terapeutas disponibles
-                    if servicio_dict.get('terapeuta_disponible'):
-                        terapeutas_count = len(servicio_dict['terapeuta_disponible'].split('|'))
-                        servicio_dict['terapeutas_count'] = terapeutas_count
-                    
-                    servicios_list.append(servicio_dict)
-                
-                return servicios_list, None
-
-        except Exception as e:
-            print(f"Error en modelo obtener_todos_servicios: {e}")
+        servicios = CatalogoModel.servicios_terapia()
+        if servicios is None:
             return None, "Error interno al obtener servicios"
-        finally:
-            close_db_connection(conn)
+        return servicios, None
 
     @staticmethod
     def obtener_servicios_por_categoria(categoria):
         """
         Obtiene servicios filtrados por categoría
         """
-        conn = get_db_connection()
-        if not conn:
-            return None, "Error de conexión con la base de datos"
-
-        try:
-            with conn.cursor() as cursor:
-                query = "SELECT * FROM servicio_terapia WHERE categoria = %s"
-                cursor.execute(query, (categoria,))
-                servicios = cursor.fetchall()
-                
-                servicios_list = []
-                for servicio in servicios:
-                    servicio_dict = dict(servicio)
-                    
-                    # Convertir timedelta a string para los horarios
-                    if isinstance(servicio_dict.get('inicio_jornada'), timedelta):
-                        servicio_dict['inicio_jornada_str'] = str(servicio_dict['inicio_jornada'])[:5]
-                    elif servicio_dict.get('inicio_jornada'):
-                        servicio_dict['inicio_jornada_str'] = str(servicio_dict['inicio_jornada'])[:5]
-                    
-                    if isinstance(servicio_dict.get('final_jornada'), timedelta):
-                        servicio_dict['final_jornada_str'] = str(servicio_dict['final_jornada'])[:5]
-                    elif servicio_dict.get('final_jornada'):
-                        servicio_dict['final_jornada_str'] = str(servicio_dict['final_jornada'])[:5]
-                    
-                    servicios_list.append(servicio_dict)
-                
-                return servicios_list, None
-
-        except Exception as e:
-            print(f"Error en modelo obtener_servicios_por_categoria: {e}")
+        servicios = CatalogoModel.servicios_por_categoria(categoria)
+        if servicios is None:
             return None, "Error interno al filtrar servicios"
-        finally:
-            close_db_connection(conn)
+        return servicios, None
 
     @staticmethod
     def obtener_servicios_por_terapeuta(terapeuta_busqueda):
@@ -0,0 +1,325 @@
+# modelo/SnapshotAnaliticasModel.py - COPIA COLUMNAR EN MEMORIA DE CITAS Y VENTAS
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np  # type: ignore
+
+from bd.conexion_bd import get_db_connection, close_db_connection
+from modelo.LineasCompraModel import LineasCompraModel
+
+EPOCA = date(1970, 1, 1)
+GRANULARIDADES = ('day', 'week', 'month', 'quarter')
+
+# Cada tabla: consulta por rango [desde, hasta), columnas categóricas
+# (guardadas como códigos int32 de un diccionario) y columnas numéricas
+TABLAS_SNAPSHOT = {
+    'citas': {
+        'sql': """
+            SELECT DATE(fecha_cita) as fecha,
+                   COALESCE(terapeuta_designado, '') as terapeuta,
+                   COALESCE(servicio, '') as servicio,
+                   LOWER(COALESCE(estado, '')) as estado
+            FROM cita
+            WHERE fecha_cita >= %s AND fecha_cita < %s
+        """,
+        'categorias': ('terapeuta', 'servicio', 'estado'),
+        'numericas': (),
+    },
+    'ventas': {
+        'sql': """
+            SELECT DATE(fecha_compra) as fecha,
+                   producto_tipo,
+                   producto_nombre as producto,
+                   subtotal as total,
+                   cantidad
+            FROM compras_lineas
+            WHERE fecha_compra >= %s AND fecha_compra < %s
+        """,
+        'categorias': ('producto_tipo', 'producto'),
+        'numericas': ('total', 'cantidad'),
+    },
+}
+
+_TAMANIO_LOTE = 10000
+
+
+class _Diccionario:
+    """Texto <-> código int32. Solo crece: un código nunca cambia de significado"""
+
+    def __init__(self):
+        self.nombres: List[str] = []
+        self._codigos: Dict[str, int] = {}
+
+    def codigo(self, nombre: str) -> int:
+        codigo = self._codigos.get(nombre)
+        if codigo is None:
+            codigo = self._codigos[nombre] = len(self.nombres)
+            self.nombres.append(nombre)
+        return codigo
+
+    def buscar(self, nombres: Sequence[str]) -> List[int]:
+        return [self._codigos[n] for n in nombres if n in self._codigos]
+
+
+def _a_dia(fecha) -> int:
+    return (fecha - EPOCA).days
+
+
+def _cubetas(dias: np.ndarray, granularidad: str) -> np.ndarray:
+    """Número de día / semana (desde un lunes) / mes / trimestre desde 1970"""
+    if granularidad == 'day':
+        return dias
+    if granularidad == 'week':
+        return (dias + 3) // 7
+    meses = dias.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    return meses if granularidad == 'month' else meses // 3
+
+
+def _etiqueta(cubeta: int, granularidad: str) -> str:
+    if granularidad == 'day':
+        return (EPOCA + timedelta(days=cubeta)).strftime('%d/%m')
+    if granularidad == 'week':
+        return (EPOCA + timedelta(days=cubeta * 7 - 3)).strftime('%G-W%V')
+    if granularidad == 'month':
+        return f"{1970 + cubeta // 12}-{cubeta % 12 + 1:02d}"
+    return f"{1970 + cubeta // 4}-T{cubeta % 4 + 1}"
+
+
+class SnapshotAnaliticasModel:
+    """
+    Copia columnar en memoria de `cita` y `compras_lineas` (fechas como
+    días int32, terapeuta/servicio/producto/estado como códigos de diccionario
+    e importes float64) para responder series de cualquier rango,
+    granularidad y filtro con NumPy, sin un GROUP BY por petición.
+
+    Se carga entera una vez y luego se actualiza por días: cada vez que
+    ResumenAnaliticasModel recalcula un rango de fechas (tras crear, cambiar o
+    borrar citas o compras), refrescar() relee solo esos días. Además se
+    recarga entera cada ANALITICAS_SNAPSHOT_RECARGA segundos (600 por
+    defecto) en segundo plano, por si escribió otro proceso.
+
+    Las lecturas toman una referencia a los arrays actuales; los cambios
+    construyen arrays nuevos y los sustituyen, así que no hace falta bloquear
+    al leer.
+    """
+
+    _tablas: Dict[str, Dict[str, np.ndarray]] = {}
+    _diccionarios: Dict[str, Dict[str, _Diccionario]] = {
+        tipo: {campo: _Diccionario() for campo in definicion['categorias']}
+        for tipo, definicion in TABLAS_SNAPSHOT.items()
+    }
+    _cargado_en = 0.0
+    _recargando = False
+    _lock_escritura = threading.Lock()
+    _lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _intervalo_recarga() -> float:
+        try:
+            return float(os.environ.get('ANALITICAS_SNAPSHOT_RECARGA', '600'))
+        except ValueError:
+            return 600.0
+
+    @staticmethod
+    def _leer(cursor, tipo: str, desde: date, hasta: date) -> Dict[str, np.ndarray]:
+        """Filas de `tipo` entre desde y hasta (inclusive) como columnas"""
+        definicion = TABLAS_SNAPSHOT[tipo]
+        diccionarios = SnapshotAnaliticasModel._diccionarios[tipo]
+        cursor.execute(definicion['sql'], (desde, hasta + timedelta(days=1)))
+
+        partes: Dict[str, List[np.ndarray]] = {'fecha': []}
+        partes.update({campo: [] for campo in definicion['categorias'] + definicion['numericas']})
+        while True:
+            filas = cursor.fetchmany(_TAMANIO_LOTE)
+            if not filas:
+                break
+            n = len(filas)
+            partes['fecha'].append(np.fromiter((_a_dia(f['fecha']) for f in filas), dtype=np.int32, count=n))
+            for campo in definicion['categorias']:
+                diccionario = diccionarios[campo]
+                partes[campo].append(np.fromiter(
+                    (diccionario.codigo(f[campo]) for f in filas), dtype=np.int32, count=n
+                ))
+            for campo in definicion['numericas']:
+                partes[campo].append(np.fromiter((float(f[campo] or 0) for f in filas), dtype=np.float64, count=n))
+
+        vacias = {'fecha': np.int32}
+        vacias.update({campo: np.int32 for campo in definicion['categorias']})
+        vacias.update({campo: np.float64 for campo in definicion['numericas']})
+        return {
+            campo: np.concatenate(lista) if lista else np.zeros(0, dtype=vacias[campo])
+            for campo, lista in partes.items()
+        }
+
+    @staticmethod
+    def cargar() -> bool:
+        """Carga completa de todas las tablas (al arrancar y cada ANALITICAS_SNAPSHOT_RECARGA)"""
+        with SnapshotAnaliticasModel._lock_escritura:
+            conn = get_db_connection()
+            if conn is None:
+                print("⚠️ Sin conexión para cargar la copia de analíticas")
+                return False
+            try:
+                LineasCompraModel.asegurar_tabla()
+                inicio = time.perf_counter()
+                tablas = {}
+                with conn.cursor() as cursor:
+                    for tipo in TABLAS_SNAPSHOT:
+                        tablas[tipo] = SnapshotAnaliticasModel._leer(cursor, tipo, date(1000, 1, 1), date(9999, 12, 30))
+                SnapshotAnaliticasModel._tablas = tablas
+                SnapshotAnaliticasModel._cargado_en = time.monotonic()
+                filas = ', '.join(f"{tipo}={len(t['fecha'])}" for tipo, t in tablas.items())
+                print(f"🧮 Copia columnar de analíticas cargada ({filas}) en {time.perf_counter() - inicio:.2f}s")
+                return True
+            except Exception as e:
+                print(f"❌ Error al cargar la copia de analíticas: {e}")
+                return False
+            finally:
+                close_db_connection(conn)
+
+    @staticmethod
+    def refrescar(tipo: str, desde: date, hasta: date):
+        """Relee las filas de `tipo` entre desde y hasta y sustituye las que había"""
+        if tipo not in TABLAS_SNAPSHOT:
+            return
+        with SnapshotAnaliticasModel._lock_escritura:
+            actual = SnapshotAnaliticasModel._tablas.get(tipo)
+            if actual is None:
+                return  # aún no cargada: la carga completa ya verá el cambio
+            conn = get_db_connection()
+            if conn is None:
+                # Sin poder releer, forzar la recarga completa en la próxima lectura
+                SnapshotAnaliticasModel._cargado_en = 0.0
+                return
+            try:
+                with conn.cursor() as cursor:
+                    nuevas = SnapshotAnaliticasModel._leer(cursor, tipo, desde, hasta)
+            except Exception as e:
+                print(f"⚠️ Error al refrescar la copia de {tipo} ({desde} - {hasta}): {e}")
+                SnapshotAnaliticasModel._cargado_en = 0.0
+                return
+            finally:
+                close_db_connection(conn)
+
+            fuera = (actual['fecha'] < _a_dia(desde)) | (actual['fecha'] > _a_dia(hasta))
+            SnapshotAnaliticasModel._tablas = dict(SnapshotAnaliticasModel._tablas, **{
+                tipo: {campo: np.concatenate((columna[fuera], nuevas[campo])) for campo, columna in actual.items()}
+            })
+
+    @staticmethod
+    def _recargar_en_fondo():
+        try:
+            SnapshotAnaliticasModel.cargar()
+        finally:
+            with SnapshotAnaliticasModel._lock:
+                SnapshotAnaliticasModel._recargando = False
+
+    @staticmethod
+    def _tabla(tipo: str) -> Optional[Dict[str, np.ndarray]]:
+        """Columnas actuales de `tipo`; la primera lectura carga, las viejas se recargan en segundo plano"""
+        tabla = SnapshotAnaliticasModel._tablas.get(tipo)
+        if tabla is None:
+            SnapshotAnaliticasModel.cargar()
+            return SnapshotAnaliticasModel._tablas.get(tipo)
+
+        if time.monotonic() - SnapshotAnaliticasModel._cargado_en > SnapshotAnaliticasModel._intervalo_recarga():
+            with SnapshotAnaliticasModel._lock:
+                lanzar = not SnapshotAnaliticasModel._recargando
+                SnapshotAnaliticasModel._recargando = True
+            if lanzar:
+                from bd.ejecutor_bd import obtener_ejecutor
+                try:
+                    obtener_ejecutor().submit(SnapshotAnaliticasModel._recargar_en_fondo)
+                except RuntimeError:
+                    with SnapshotAnaliticasModel._lock:
+                        SnapshotAnaliticasModel._recargando = False
+        return tabla
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def validar_granularidad(granularidad: str):
+        if granularidad not in GRANULARIDADES:
+            raise ValueError(f"granularidad debe ser una de: {', '.join(GRANULARIDADES)}")
+
+    @staticmethod
+    def agregar(dias: np.ndarray, desde: date, hasta: date, granularidad: str,
+                pesos: Optional[np.ndarray] = None) -> Dict[str, List]:
+        """
+        Suma `pesos` (o cuenta) por cubeta entre desde y hasta, con todas las
+        cubetas del rango aunque estén vacías. `dias` son días desde 1970.
+        """
+        SnapshotAnaliticasModel.validar_granularidad(granularidad)
+        if desde > hasta:
+            return {'labels': [], 'data': []}
+        extremos = _cubetas(np.array([_a_dia(desde), _a_dia(hasta)], dtype=np.int64), granularidad)
+        primera, ultima = int(extremos[0]), int(extremos[1])
+        total = ultima - primera + 1
+
+        dentro = (dias >= _a_dia(desde)) & (dias <= _a_dia(hasta))
+        cubetas = _cubetas(dias[dentro].astype(np.int64), granularidad) - primera
+        valores = np.bincount(cubetas, weights=None if pesos is None else pesos[dentro], minlength=total)
+
+        return {
+            'labels': [_etiqueta(c, granularidad) for c in range(primera, ultima + 1)],
+            'data': valores.astype(int).tolist() if pesos is None else np.round(valores, 2).tolist(),
+        }
+
+    @staticmethod
+    def contar_distintos(dias: np.ndarray, claves: np.ndarray, desde: date, hasta: date,
+                         granularidad: str) -> Dict[str, List]:
+        """Cuántas claves distintas hay en cada cubeta (p. ej. pacientes nuevos por mes)"""
+        SnapshotAnaliticasModel.validar_granularidad(granularidad)
+        if len(dias) == 0:
+            return SnapshotAnaliticasModel.agregar(dias, desde, hasta, granularidad)
+        _, codigos = np.unique(claves, return_inverse=True)
+        pares = np.stack((_cubetas(dias.astype(np.int64), granularidad), codigos.ravel()))
+        # Un día representativo por (cubeta, clave)
+        _, primeros = np.unique(pares, axis=1, return_index=True)
+        return SnapshotAnaliticasModel.agregar(dias[primeros], desde, hasta, granularidad)
+
+    @staticmethod
+    def serie(tipo: str, desde: date, hasta: date, granularidad: str = 'day',
+              filtros: Optional[Dict[str, Sequence[str]]] = None,
+              medida: Optional[str] = None) -> Tuple[Dict[str, List], Optional[str]]:
+        """
+        Serie de `tipo` ('citas' o 'ventas') entre desde y hasta: número de
+        filas, o la suma de la columna numérica `medida` ('total', 'cantidad').
+        filtros = {'terapeuta': [...], 'estado': [...]} por nombre.
+        """
+        tabla = SnapshotAnaliticasModel._tabla(tipo)
+        if tabla is None:
+            return {}, "No se pudo cargar la copia de analíticas"
+        if medida is not None and medida not in TABLAS_SNAPSHOT[tipo]['numericas']:
+            return {}, f"Medida no válida para {tipo}: {medida}"
+
+        mascara = np.ones(len(tabla['fecha']), dtype=bool)
+        for campo, nombres in (filtros or {}).items():
+            if not nombres:
+                continue
+            if campo not in SnapshotAnaliticasModel._diccionarios[tipo]:
+                return {}, f"Filtro no válido para {tipo}: {campo}"
+            codigos = SnapshotAnaliticasModel._diccionarios[tipo][campo].buscar(nombres)
+            mascara &= np.isin(tabla[campo], codigos)
+
+        pesos = tabla[medida][mascara] if medida else None
+        return SnapshotAnaliticasModel.agregar(tabla['fecha'][mascara], desde, hasta, granularidad, pesos), None
+
+    @staticmethod
+    def estado() -> Dict[str, Any]:
+        """Filas y antigüedad de la copia"""
+        tablas = SnapshotAnaliticasModel._tablas
+        cargado_en = SnapshotAnaliticasModel._cargado_en
+        return {
+            'filas': {tipo: int(len(t['fecha'])) for tipo, t in tablas.items()},
+            'segundos_desde_carga': round(time.monotonic() - cargado_en, 1) if tablas and cargado_en else None,
+        }
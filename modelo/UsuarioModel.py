@@ -1,19 +1,26 @@
 from bd.conexion_bd import get_db_connection, close_db_connection
+from modelo.BusquedaModel import BusquedaModel
 import os
 import shutil
 
 class UsuarioModel:
+    @staticmethod
+    def normalizar_correo(correo) -> str:
+        """Forma única de guardar y buscar correos: sin espacios y en minúsculas"""
+        return (correo or '').strip().lower()
+
     @staticmethod
     def crear_usuario(datos_usuario):
         conn = get_db_connection()
         if not conn:
             return None, "Error de conexión con la base de datos"
         
+        correo = UsuarioModel.normalizar_correo(datos_usuario['email'])
         try:
             with conn.cursor() as cursor:
                 # Verificar si el correo ya existe
                 check_query = "SELECT ID FROM usuario WHERE correo = %s"
-                cursor.execute(check_query, (datos_usuario['email'],))
+                cursor.execute(check_query, (correo,))
                 if cursor.fetchone():
                     return None, "El correo ya está registrado"
                 
@@ -27,7 +34,7 @@ class UsuarioModel:
                     datos_usuario['nombre'],
                     datos_usuario['apellido'],
                     datos_usuario['genero'],
-                    datos_usuario['email'],
+                    correo,
                     datos_usuario['telefono'],  # Cambié 'phone' por 'telefono'
                     datos_usuario['contraseña'],
                     datos_usuario['contraseña_confirmada'],
@@ -35,6 +42,7 @@ class UsuarioModel:
                     datos_usuario.get('medical_file_path')
                 ))
                 conn.commit()
+                BusquedaModel.marcar('usuarios', [datos_usuario['ID']])
                 return True, "Usuario registrado exitosamente"
                 
         except Exception as e:
@@ -54,7 +62,7 @@ class UsuarioModel:
             with conn.cursor() as cursor:
                 # Solo permitir login si el estado es "Activo"
                 query = "SELECT * FROM usuario WHERE correo = %s AND estado = 'Activo'"
-                cursor.execute(query, (correo,))
+                cursor.execute(query, (UsuarioModel.normalizar_correo(correo),))
                 user = cursor.fetchone()
 
                 if not user:
@@ -119,7 +127,7 @@ class UsuarioModel:
         try:
             with conn.cursor() as cursor:
                 query = "SELECT * FROM usuario WHERE correo = %s"
-                cursor.execute(query, (correo,))
+                cursor.execute(query, (UsuarioModel.normalizar_correo(correo),))
                 user = cursor.fetchone()
                 return user
         except Exception as e: